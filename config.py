@@ -184,6 +184,31 @@ BARCODE_PREFIX = "PRD"
 SYNC_SERVER_URL = "https://gbserver.pythonanywhere.com"
 SYNC_INTERVAL = 300  # 5 minutes
 
+# Profils de connexion SQLite (appliques par Database.connect)
+# - caisse : WAL, lecteurs (dashboard, sync, sauvegarde) non bloques par les ventes
+# - compatibilite : journal classique, pour une base sur partage reseau (WAL interdit)
+SQLITE_PROFILS = {
+    'caisse': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,        # negatif = Kio (16 Mo)
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,        # ms d'attente sur verrou avant "database is locked"
+        'wal_autocheckpoint': 1000,  # pages (~4 Mo) avant checkpoint automatique
+        'checkpoint_wal_max_mo': 32,  # checkpoint force au-dela de cette taille de WAL
+        'lecteurs': 4,               # connexions de lecture seule du pool (database.Database)
+        'cached_statements': 256,    # requetes preparees gardees par connexion (defaut sqlite3 : 128)
+    },
+    'compatibilite': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+        'lecteurs': 1,               # sans WAL, les lecteurs retardent les commits
+    },
+}
+SQLITE_PROFIL_ACTIF = os.environ.get('GB_SQLITE_PROFIL', 'caisse')
+
 # Configuration des sauvegardes
 BACKUP_DIR = os.path.join(BASE_DIR, 'sauvegardes')
 BACKUP_MAX_COUNT = 10  # Nombre max de sauvegardes locales
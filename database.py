@@ -1,44 +1,996 @@
 """
 Gestion de la base de donnees SQLite
 """
+import functools
+import os
+import queue
 import sqlite3
-from config import DB_PATH
+import threading
+import time
+from contextlib import contextmanager
+from config import DB_PATH, SQLITE_PROFILS, SQLITE_PROFIL_ACTIF
 from datetime import datetime
 from modules.logger import get_logger
+from modules.stats_requetes import StatistiquesRequetes
 
 logger = get_logger('database')
 
+# PRAGMAs reconnus dans un profil, dans l'ordre d'application
+# (busy_timeout d'abord : le passage en WAL peut attendre un verrou)
+PRAGMAS_PROFIL = ('busy_timeout', 'journal_mode', 'synchronous', 'cache_size',
+                  'mmap_size', 'temp_store', 'wal_autocheckpoint')
+
+MODES_CHECKPOINT = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+# Taille par defaut du cache de requetes preparees de chaque connexion
+# (defaut sqlite3 : 128), remplacable par la cle 'cached_statements' du profil
+CACHED_STATEMENTS = 256
+
+# Reprise apres perte de connexion (voir Database._reessayer)
+TENTATIVES_RECONNEXION = 2
+DELAI_RECONNEXION = 0.05  # s, double a chaque nouvelle tentative
+
+
+class RequeteInterrompue(Exception):
+    """Lecture annulee par Connection.interrupt() (requete depassee)"""
+
+
+def connexion_perdue(erreur):
+    """L'erreur vient de la connexion (fermee, fichier inaccessible), pas de la requete"""
+    message = str(erreur).lower()
+    if isinstance(erreur, sqlite3.ProgrammingError):
+        return 'closed' in message
+    if isinstance(erreur, sqlite3.OperationalError):
+        return message in ('disk i/o error', 'unable to open database file')
+    return False
+
+
+def _ecriture(methode):
+    """Executer la methode en tenant le verrou de la connexion d'ecriture"""
+    @functools.wraps(methode)
+    def enveloppe(self, *args, **kwargs):
+        with self._verrou:
+            return methode(self, *args, **kwargs)
+    return enveloppe
+
+
+def appliquer_profil(conn, profil):
+    """Appliquer les PRAGMAs d'un profil (dict de SQLITE_PROFILS) a une connexion"""
+    for pragma in PRAGMAS_PROFIL:
+        if pragma not in profil:
+            continue
+        try:
+            conn.execute(f"PRAGMA {pragma} = {profil[pragma]}")
+        except sqlite3.Error as e:
+            logger.warning(f"PRAGMA {pragma} non applique : {e}")
+
+
+def checkpoint_par_taille_wal(database):
+    """Politique de checkpoint par defaut : TRUNCATE quand le fichier WAL
+    depasse 'checkpoint_wal_max_mo' du profil, sinon rien (l'auto-checkpoint
+    de SQLite suffit). Retourne un mode de MODES_CHECKPOINT ou None."""
+    max_mo = database.profil.get('checkpoint_wal_max_mo')
+    if max_mo and database.taille_wal() > max_mo * 1024 * 1024:
+        return 'TRUNCATE'
+    return None
+
+
+def _colonnes(cur, table):
+    # table_xinfo : inclut les colonnes generees
+    return [row[1] for row in cur.execute(f"PRAGMA table_xinfo({table})").fetchall()]
+
+
+def _ajouter_colonne(cur, table, colonne, definition):
+    """ALTER TABLE ADD COLUMN idempotent (bases anterieures a schema_version)"""
+    if colonne in _colonnes(cur, table):
+        return False
+    cur.execute(f"ALTER TABLE {table} ADD COLUMN {colonne} {definition}")
+    return True
+
+
+def _migration_utilisateur_vente(cur):
+    _ajouter_colonne(cur, 'ventes', 'utilisateur_id', 'INTEGER')
+
+
+def _migration_super_admin(cur):
+    _ajouter_colonne(cur, 'utilisateurs', 'super_admin', 'BOOLEAN DEFAULT 0')
+
+
+def _migration_updated_at(cur):
+    for table in ('produits', 'utilisateurs'):
+        if _ajouter_colonne(cur, table, 'updated_at', 'TIMESTAMP'):
+            cur.execute(f"UPDATE {table} SET updated_at = datetime('now') WHERE updated_at IS NULL")
+
+
+def _migration_clients_ventes(cur):
+    """client_id sur ventes + creation des fiches clients depuis les noms saisis"""
+    if not _ajouter_colonne(cur, 'ventes', 'client_id', 'INTEGER REFERENCES clients(id)'):
+        return
+    noms = cur.execute(
+        "SELECT DISTINCT client FROM ventes WHERE client IS NOT NULL AND client != ''"
+    ).fetchall()
+    for (nom,) in noms:
+        cur.execute("INSERT INTO clients (nom) VALUES (?)", (nom,))
+        cur.execute("UPDATE ventes SET client_id = ? WHERE client = ?", (cur.lastrowid, nom))
+
+
+def _migration_index_requetes(cur):
+    """Index des requetes chaudes (rapports, historique client, details, sync)"""
+    for sql in (
+        # (date_vente, total) : les sommes par periode se lisent dans l'index seul
+        "CREATE INDEX IF NOT EXISTS idx_ventes_date ON ventes(date_vente, total)",
+        "CREATE INDEX IF NOT EXISTS idx_ventes_utilisateur_date ON ventes(utilisateur_id, date_vente, total)",
+        "CREATE INDEX IF NOT EXISTS idx_ventes_client_date ON ventes(client_id, date_vente)",
+        "CREATE INDEX IF NOT EXISTS idx_details_ventes_vente ON details_ventes(vente_id)",
+        "CREATE INDEX IF NOT EXISTS idx_details_ventes_produit ON details_ventes(produit_id)",
+        "CREATE INDEX IF NOT EXISTS idx_paiements_vente ON paiements(vente_id)",
+        "CREATE INDEX IF NOT EXISTS idx_historique_stock_produit_date ON historique_stock(produit_id, date_operation)",
+        "CREATE INDEX IF NOT EXISTS idx_historique_stock_date ON historique_stock(date_operation)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_actions_date ON logs_actions(date_action)",
+    ):
+        cur.execute(sql)
+
+
+# Colonnes de produits ajoutees apres les premieres versions : une base
+# ancienne peut ne pas les avoir, alors que les triggers et agregats les lisent
+COLONNES_PRODUITS = (
+    ('categorie', 'TEXT'),
+    ('prix_achat', 'REAL DEFAULT 0'),
+    ('stock_actuel', 'INTEGER DEFAULT 0'),
+    ('stock_alerte', 'INTEGER DEFAULT 5'),
+    ('type_code_barre', "TEXT DEFAULT 'code128'"),
+    ('date_ajout', 'TIMESTAMP'),
+    ('description', 'TEXT'),
+)
+
+
+def _completer_produits(cur):
+    for colonne, definition in COLONNES_PRODUITS:
+        _ajouter_colonne(cur, 'produits', colonne, definition)
+
+
+def reconstruire_compteurs(cur):
+    """Recalculer la table compteurs depuis les donnees (migration ou reparation)"""
+    cur.execute("""
+        INSERT OR REPLACE INTO compteurs (cle, valeur)
+        SELECT 'ca_total', COALESCE(SUM(total), 0) FROM ventes
+        UNION ALL SELECT 'nb_ventes', COUNT(*) FROM ventes
+        UNION ALL SELECT 'nb_produits', COUNT(*) FROM produits
+        UNION ALL SELECT 'valeur_stock', COALESCE(SUM(prix_vente * stock_actuel), 0) FROM produits
+        UNION ALL SELECT 'nb_alertes_stock', COUNT(*) FROM produits WHERE stock_actuel < stock_alerte
+    """)
+
+
+def _migration_compteurs(cur):
+    """Compteurs globaux du dashboard maintenus par triggers : lire le CA total
+    ou la valeur du stock ne parcourt plus l'historique"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS compteurs (
+            cle TEXT PRIMARY KEY,
+            valeur REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    _completer_produits(cur)
+    reconstruire_compteurs(cur)
+
+    # (stock_actuel < stock_alerte) vaut 0, 1 ou NULL : le delta d'alertes se calcule directement
+    for sql in (
+        """CREATE TRIGGER IF NOT EXISTS compteurs_ventes_insert AFTER INSERT ON ventes BEGIN
+            UPDATE compteurs SET valeur = valeur + CASE cle WHEN 'ca_total' THEN NEW.total ELSE 1 END
+            WHERE cle IN ('ca_total', 'nb_ventes');
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS compteurs_ventes_update AFTER UPDATE OF total ON ventes
+        WHEN NEW.total IS NOT OLD.total BEGIN
+            UPDATE compteurs SET valeur = valeur + NEW.total - OLD.total WHERE cle = 'ca_total';
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS compteurs_ventes_delete AFTER DELETE ON ventes BEGIN
+            UPDATE compteurs SET valeur = valeur - CASE cle WHEN 'ca_total' THEN OLD.total ELSE 1 END
+            WHERE cle IN ('ca_total', 'nb_ventes');
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS compteurs_produits_insert AFTER INSERT ON produits BEGIN
+            UPDATE compteurs SET valeur = valeur + CASE cle
+                WHEN 'nb_produits' THEN 1
+                WHEN 'valeur_stock' THEN NEW.prix_vente * COALESCE(NEW.stock_actuel, 0)
+                ELSE COALESCE(NEW.stock_actuel < NEW.stock_alerte, 0) END
+            WHERE cle IN ('nb_produits', 'valeur_stock', 'nb_alertes_stock');
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS compteurs_produits_update
+        AFTER UPDATE OF prix_vente, stock_actuel, stock_alerte ON produits BEGIN
+            UPDATE compteurs SET valeur = valeur + CASE cle
+                WHEN 'valeur_stock' THEN NEW.prix_vente * COALESCE(NEW.stock_actuel, 0)
+                                         - OLD.prix_vente * COALESCE(OLD.stock_actuel, 0)
+                ELSE COALESCE(NEW.stock_actuel < NEW.stock_alerte, 0) - COALESCE(OLD.stock_actuel < OLD.stock_alerte, 0) END
+            WHERE cle IN ('valeur_stock', 'nb_alertes_stock');
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS compteurs_produits_delete AFTER DELETE ON produits BEGIN
+            UPDATE compteurs SET valeur = valeur - CASE cle
+                WHEN 'nb_produits' THEN 1
+                WHEN 'valeur_stock' THEN OLD.prix_vente * COALESCE(OLD.stock_actuel, 0)
+                ELSE COALESCE(OLD.stock_actuel < OLD.stock_alerte, 0) END
+            WHERE cle IN ('nb_produits', 'valeur_stock', 'nb_alertes_stock');
+        END""",
+    ):
+        cur.execute(sql)
+
+
+# Cle de ventes_jour pour une ligne de ventes (NEW ou OLD dans les triggers).
+# COALESCE : une cle primaire WITHOUT ROWID n'accepte pas NULL, et une date
+# illisible ne doit pas faire echouer l'encaissement.
+def _cle_ventes_jour(v):
+    return (f"COALESCE(DATE({v}.date_vente), ''), "
+            f"COALESCE(CAST(strftime('%H', {v}.date_vente) AS INTEGER), 0), "
+            f"COALESCE({v}.utilisateur_id, 0)")
+
+
+def _delta_ventes_jour(v, signe, nb, articles):
+    """UPSERT ajoutant signe * (nb, total, articles) a la case de la vente v"""
+    return f"""
+        INSERT INTO ventes_jour (jour, heure, utilisateur_id, nb_ventes, ca, nb_articles)
+        VALUES ({_cle_ventes_jour(v)}, {signe}{nb}, {signe}{v}.total, {signe}{articles})
+        ON CONFLICT (jour, heure, utilisateur_id) DO UPDATE SET
+            nb_ventes = nb_ventes + excluded.nb_ventes,
+            ca = ca + excluded.ca,
+            nb_articles = nb_articles + excluded.nb_articles;"""
+
+
+def reconstruire_ventes_jour(cur):
+    """Recalculer entierement ventes_jour depuis ventes et details_ventes"""
+    cur.execute("DELETE FROM ventes_jour")
+    cur.execute(f"""
+        INSERT INTO ventes_jour (jour, heure, utilisateur_id, nb_ventes, ca, nb_articles)
+        SELECT {_cle_ventes_jour('v')}, COUNT(*), COALESCE(SUM(v.total), 0),
+               COALESCE(SUM(a.articles), 0)
+        FROM ventes v
+        LEFT JOIN (SELECT vente_id, SUM(quantite) AS articles
+                   FROM details_ventes GROUP BY vente_id) a ON a.vente_id = v.id
+        GROUP BY 1, 2, 3
+    """)
+
+
+def _migration_ventes_jour(cur):
+    """Agregat des ventes par (jour, heure, caissier) tenu a jour par triggers :
+    les rapports et graphiques lisent O(jours) lignes au lieu de O(ventes)"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ventes_jour (
+            jour TEXT NOT NULL,
+            heure INTEGER NOT NULL,
+            utilisateur_id INTEGER NOT NULL DEFAULT 0,
+            nb_ventes INTEGER NOT NULL DEFAULT 0,
+            ca REAL NOT NULL DEFAULT 0,
+            nb_articles INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (jour, heure, utilisateur_id)
+        ) WITHOUT ROWID
+    """)
+    reconstruire_ventes_jour(cur)
+
+    articles_vente = "(SELECT COALESCE(SUM(quantite), 0) FROM details_ventes WHERE vente_id = {}.id)"
+    # Les articles d'une vente sont ajoutes par les triggers de details_ventes
+    # (inseres apres la vente, supprimes avant elle a l'annulation)
+    purge_vide = f"DELETE FROM ventes_jour WHERE (jour, heure, utilisateur_id) = ({_cle_ventes_jour('OLD')}) AND nb_ventes = 0;"
+    for sql in (
+        f"""CREATE TRIGGER IF NOT EXISTS ventes_jour_ventes_insert AFTER INSERT ON ventes BEGIN
+            {_delta_ventes_jour('NEW', '', 1, 0)}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS ventes_jour_ventes_update
+        AFTER UPDATE OF date_vente, total, utilisateur_id ON ventes BEGIN
+            {_delta_ventes_jour('OLD', '-', 1, articles_vente.format('OLD'))}
+            {purge_vide}
+            {_delta_ventes_jour('NEW', '', 1, articles_vente.format('NEW'))}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS ventes_jour_ventes_delete AFTER DELETE ON ventes BEGIN
+            {_delta_ventes_jour('OLD', '-', 1, 0)}
+            {purge_vide}
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS ventes_jour_details_insert AFTER INSERT ON details_ventes BEGIN
+            UPDATE ventes_jour SET nb_articles = nb_articles + NEW.quantite
+            WHERE (jour, heure, utilisateur_id) = (SELECT """ + _cle_ventes_jour('v') + """
+                                                   FROM ventes v WHERE v.id = NEW.vente_id);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS ventes_jour_details_update AFTER UPDATE OF quantite ON details_ventes BEGIN
+            UPDATE ventes_jour SET nb_articles = nb_articles + NEW.quantite - OLD.quantite
+            WHERE (jour, heure, utilisateur_id) = (SELECT """ + _cle_ventes_jour('v') + """
+                                                   FROM ventes v WHERE v.id = NEW.vente_id);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS ventes_jour_details_delete AFTER DELETE ON details_ventes BEGIN
+            UPDATE ventes_jour SET nb_articles = nb_articles - OLD.quantite
+            WHERE (jour, heure, utilisateur_id) = (SELECT """ + _cle_ventes_jour('v') + """
+                                                   FROM ventes v WHERE v.id = OLD.vente_id);
+        END""",
+    ):
+        cur.execute(sql)
+
+
+def reconstruire_ventes_produits(cur):
+    """Recalculer ventes_produits et ventes_produits_jour depuis details_ventes.
+    L'historique des prix d'achat n'etant pas conserve, le cout est recalcule
+    au prix_achat actuel des produits."""
+    cur.execute("DELETE FROM ventes_produits_jour")
+    cur.execute("DELETE FROM ventes_produits")
+    cur.execute("""
+        INSERT INTO ventes_produits_jour (produit_id, jour, quantite, ca, cout)
+        SELECT dv.produit_id, COALESCE(DATE(v.date_vente), ''), SUM(dv.quantite),
+               SUM(dv.sous_total), SUM(dv.quantite * COALESCE(p.prix_achat, 0))
+        FROM details_ventes dv
+        JOIN ventes v ON v.id = dv.vente_id
+        LEFT JOIN produits p ON p.id = dv.produit_id
+        GROUP BY 1, 2
+    """)
+    cur.execute("""
+        INSERT INTO ventes_produits (produit_id, quantite, ca, cout)
+        SELECT produit_id, SUM(quantite), SUM(ca), SUM(cout)
+        FROM ventes_produits_jour GROUP BY produit_id
+    """)
+
+
+def _migration_ventes_produits(cur):
+    """Ventes par produit (total et par jour) : quantite, CA et cout au
+    prix_achat du moment, tenus a jour par triggers sur details_ventes.
+    Top produits, CA par categorie et marges n'agregent plus details_ventes."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ventes_produits (
+            produit_id INTEGER PRIMARY KEY,
+            quantite INTEGER NOT NULL DEFAULT 0,
+            ca REAL NOT NULL DEFAULT 0,
+            cout REAL NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ventes_produits_jour (
+            produit_id INTEGER NOT NULL,
+            jour TEXT NOT NULL,
+            quantite INTEGER NOT NULL DEFAULT 0,
+            ca REAL NOT NULL DEFAULT 0,
+            cout REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (produit_id, jour)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventes_produits_quantite ON ventes_produits(quantite)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventes_produits_jour_jour ON ventes_produits_jour(jour, quantite)")
+    reconstruire_ventes_produits(cur)
+
+    jour_vente = "(SELECT COALESCE(DATE(date_vente), '') FROM ventes WHERE id = {}.vente_id)"
+    cout_unitaire = "COALESCE((SELECT prix_achat FROM produits WHERE id = NEW.produit_id), 0)"
+    # Le prix d'achat a pu changer depuis la vente : une ligne retiree emporte
+    # le cout moyen de sa case plutot que le prix d'achat courant.
+    ajout = f"""
+        INSERT INTO ventes_produits (produit_id, quantite, ca, cout)
+        VALUES (NEW.produit_id, NEW.quantite, NEW.sous_total, NEW.quantite * {cout_unitaire})
+        ON CONFLICT (produit_id) DO UPDATE SET
+            quantite = quantite + excluded.quantite, ca = ca + excluded.ca, cout = cout + excluded.cout;
+        INSERT INTO ventes_produits_jour (produit_id, jour, quantite, ca, cout)
+        SELECT NEW.produit_id, {jour_vente.format('NEW')}, NEW.quantite, NEW.sous_total,
+               NEW.quantite * {cout_unitaire}
+        WHERE true
+        ON CONFLICT (produit_id, jour) DO UPDATE SET
+            quantite = quantite + excluded.quantite, ca = ca + excluded.ca, cout = cout + excluded.cout;"""
+    retrait = """
+        UPDATE {table} SET
+            cout = cout - CASE WHEN quantite > 0 THEN cout * OLD.quantite / quantite ELSE 0 END,
+            quantite = quantite - OLD.quantite,
+            ca = ca - OLD.sous_total
+        WHERE produit_id = OLD.produit_id{filtre};"""
+    retrait = (retrait.format(table='ventes_produits', filtre='')
+               + retrait.format(table='ventes_produits_jour', filtre=f" AND jour = {jour_vente.format('OLD')}")
+               + "\n        DELETE FROM ventes_produits_jour WHERE produit_id = OLD.produit_id AND quantite = 0;")
+    for sql in (
+        f"""CREATE TRIGGER IF NOT EXISTS ventes_produits_insert AFTER INSERT ON details_ventes BEGIN
+            {ajout}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS ventes_produits_update
+        AFTER UPDATE OF produit_id, quantite, sous_total ON details_ventes BEGIN
+            {retrait}
+            {ajout}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS ventes_produits_delete AFTER DELETE ON details_ventes BEGIN
+            {retrait}
+        END""",
+        # Vente redatee : ses lignes changent de jour en emportant leur cout moyen
+        """CREATE TRIGGER IF NOT EXISTS ventes_produits_jour_redatee AFTER UPDATE OF date_vente ON ventes
+        WHEN DATE(NEW.date_vente) IS NOT DATE(OLD.date_vente) BEGIN
+            INSERT INTO ventes_produits_jour (produit_id, jour, quantite, ca, cout)
+            SELECT d.produit_id, COALESCE(DATE(NEW.date_vente), ''), d.quantite, d.ca,
+                   COALESCE(a.cout * d.quantite / NULLIF(a.quantite, 0), 0)
+            FROM (SELECT produit_id, SUM(quantite) AS quantite, SUM(sous_total) AS ca
+                  FROM details_ventes WHERE vente_id = NEW.id GROUP BY produit_id) d
+            LEFT JOIN ventes_produits_jour a
+                   ON a.produit_id = d.produit_id AND a.jour = COALESCE(DATE(OLD.date_vente), '')
+            WHERE true
+            ON CONFLICT (produit_id, jour) DO UPDATE SET
+                quantite = quantite + excluded.quantite, ca = ca + excluded.ca, cout = cout + excluded.cout;
+            UPDATE ventes_produits_jour SET
+                cout = ventes_produits_jour.cout
+                       - ventes_produits_jour.cout * d.quantite / ventes_produits_jour.quantite,
+                quantite = ventes_produits_jour.quantite - d.quantite,
+                ca = ventes_produits_jour.ca - d.ca
+            FROM (SELECT produit_id, SUM(quantite) AS quantite, SUM(sous_total) AS ca
+                  FROM details_ventes WHERE vente_id = NEW.id GROUP BY produit_id) d
+            WHERE ventes_produits_jour.produit_id = d.produit_id
+              AND ventes_produits_jour.jour = COALESCE(DATE(OLD.date_vente), '');
+            DELETE FROM ventes_produits_jour
+            WHERE jour = COALESCE(DATE(OLD.date_vente), '') AND quantite = 0;
+        END""",
+    ):
+        cur.execute(sql)
+
+
+def fts5_disponible(cur):
+    """SQLite compile avec FTS5 (c'est le cas des builds Python officiels)"""
+    return bool(cur.execute(
+        "SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_FTS5'").fetchone())
+
+
+def _migration_produits_fts(cur):
+    """Index plein texte des produits (nom, categorie, description, code-barres).
+
+    Table FTS5 a contenu externe (produits) : seuls les termes sont stockes.
+    Tokenizer unicode61 sans diacritiques ('creme' trouve 'Crème'), index
+    de prefixes de 2 et 3 caracteres pour la recherche pendant la saisie.
+    Sans FTS5, la migration ne cree rien : Produit retombe sur LIKE.
+    """
+    if not fts5_disponible(cur):
+        logger.warning("FTS5 indisponible : recherche produits par LIKE")
+        return
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS produits_fts USING fts5(
+            nom, categorie, description, code_barre,
+            content='produits', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    cur.execute("INSERT INTO produits_fts(produits_fts) VALUES ('rebuild')")
+
+    colonnes = "nom, categorie, description, code_barre"
+    ajout = f"""INSERT INTO produits_fts (rowid, {colonnes})
+            VALUES (NEW.id, NEW.nom, NEW.categorie, NEW.description, NEW.code_barre);"""
+    retrait = f"""INSERT INTO produits_fts (produits_fts, rowid, {colonnes})
+            VALUES ('delete', OLD.id, OLD.nom, OLD.categorie, OLD.description, OLD.code_barre);"""
+    for sql in (
+        f"""CREATE TRIGGER IF NOT EXISTS produits_fts_insert AFTER INSERT ON produits BEGIN
+            {ajout}
+        END""",
+        # Seulement les colonnes indexees : les mouvements de stock ne touchent pas l'index
+        f"""CREATE TRIGGER IF NOT EXISTS produits_fts_update
+        AFTER UPDATE OF {colonnes} ON produits BEGIN
+            {retrait}
+            {ajout}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS produits_fts_delete AFTER DELETE ON produits BEGIN
+            {retrait}
+        END""",
+    ):
+        cur.execute(sql)
+
+
+def _migration_index_clients(cur):
+    """Liste des clients triee par nom, paginee par cle (nom, id)"""
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_clients_nom ON clients(nom)")
+
+
+# Separateurs retires des numeros saisis ('+225 07-12.34' -> '225071234')
+SEPARATEURS_TELEPHONE = " -.+()/"
+# Chiffres retournes au-dela : E.164 limite un numero a 15 chiffres
+MAX_CHIFFRES_TELEPHONE = 15
+
+
+def _expression_telephone_inverse(colonne):
+    """Expression SQL : chiffres du numero, dans l'ordre inverse.
+
+    Ecrite en SQL pur (replace/substr) pour etre calculee par SQLite quelle
+    que soit la connexion qui ecrit, sans fonction Python enregistree."""
+    chiffres = colonne
+    for separateur in SEPARATEURS_TELEPHONE:
+        chiffres = f"replace({chiffres}, '{separateur}', '')"
+    return " || ".join(f"substr({chiffres}, {i}, 1)" for i in range(MAX_CHIFFRES_TELEPHONE, 0, -1))
+
+
+def _migration_recherche_clients(cur):
+    """Recherche des clients pendant la saisie en caisse.
+
+    - telephone_inverse : colonne generee (chiffres du telephone a l'envers)
+      indexee ; les derniers chiffres tapes deviennent un prefixe, donc une
+      recherche par intervalle dans l'index.
+    - clients_fts : index plein texte du nom et de l'email, prefixes de 2 et
+      3 caracteres, sans diacritiques (meme reglage que produits_fts).
+    """
+    _ajouter_colonne(cur, 'clients', 'telephone_inverse',
+                     f"TEXT GENERATED ALWAYS AS ({_expression_telephone_inverse('telephone')}) VIRTUAL")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_clients_telephone_inverse ON clients(telephone_inverse)")
+
+    if not fts5_disponible(cur):
+        logger.warning("FTS5 indisponible : recherche clients par LIKE")
+        return
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5(
+            nom, email,
+            content='clients', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    cur.execute("INSERT INTO clients_fts(clients_fts) VALUES ('rebuild')")
+
+    ajout = "INSERT INTO clients_fts (rowid, nom, email) VALUES (NEW.id, NEW.nom, NEW.email);"
+    retrait = """INSERT INTO clients_fts (clients_fts, rowid, nom, email)
+            VALUES ('delete', OLD.id, OLD.nom, OLD.email);"""
+    for sql in (
+        f"""CREATE TRIGGER IF NOT EXISTS clients_fts_insert AFTER INSERT ON clients BEGIN
+            {ajout}
+        END""",
+        # Les points fidelite et totaux d'achats ne touchent pas l'index
+        f"""CREATE TRIGGER IF NOT EXISTS clients_fts_update AFTER UPDATE OF nom, email ON clients BEGIN
+            {retrait}
+            {ajout}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS clients_fts_delete AFTER DELETE ON clients BEGIN
+            {retrait}
+        END""",
+    ):
+        cur.execute(sql)
+
+
+# Tables suivies par le journal des changements (synchronisation) -> colonne
+# conservee a la suppression : cle identifiant la ligne d'un poste a l'autre,
+# ou vente_id pour les details (les lignes d'une vente sont renvoyees en bloc)
+TABLES_JOURNAL = {
+    'produits': 'code_barre',
+    'ventes': 'numero_vente',
+    'details_ventes': 'vente_id',
+    'historique_stock': None,
+    'utilisateurs': 'email',
+}
+
+
+def _migration_journal_changements(cur):
+    """Journal des changements (capture par triggers) pour la synchronisation.
+
+    Chaque INSERT / UPDATE / DELETE sur TABLES_JOURNAL ajoute une ligne
+    (seq, table, id, operation). seq AUTOINCREMENT : strictement croissant,
+    jamais reutilise meme apres purge, donc un point de reprise fiable.
+    Le push envoie les seq au-dela du dernier acquittement (modules.journal).
+
+    Rattrapage : les lignes que l'ancienne synchronisation par dates aurait
+    envoyees au prochain push sont journalisees comme insertions.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS journal_changements (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            ligne_id INTEGER NOT NULL,
+            operation TEXT NOT NULL CHECK (operation IN ('I', 'U', 'D')),
+            cle TEXT,
+            date_changement TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    creer_triggers_journal(cur)
+    # dernier_sync de l'ancienne synchronisation : isoformat, heure locale
+    dernier_sync = cur.execute("SELECT datetime(valeur, 'utc') FROM parametres "
+                               "WHERE cle = 'dernier_sync'").fetchone()
+    amorcer_journal(cur, dernier_sync[0] if dernier_sync else None)
+
+
+def creer_triggers_journal(cur):
+    """Triggers de capture du journal (poses par modules.journal.activer)"""
+    for table, colonne_cle in TABLES_JOURNAL.items():
+        cle_supprimee = f"OLD.{colonne_cle}" if colonne_cle else "NULL"
+        for sql in (
+            f"""CREATE TRIGGER IF NOT EXISTS journal_{table}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO journal_changements (table_name, ligne_id, operation)
+                VALUES ('{table}', NEW.id, 'I');
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS journal_{table}_update AFTER UPDATE ON {table} BEGIN
+                INSERT INTO journal_changements (table_name, ligne_id, operation)
+                VALUES ('{table}', NEW.id, 'U');
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS journal_{table}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO journal_changements (table_name, ligne_id, operation, cle)
+                VALUES ('{table}', OLD.id, 'D', {cle_supprimee});
+            END""",
+        ):
+            cur.execute(sql)
+
+
+# Triggers gardes quand la capture est suspendue : ce qu'amorcer_journal ne
+# retrouve pas a la reprise (suppressions, ventes et utilisateurs modifies
+# sans date de modification)
+TRIGGERS_JOURNAL_PERMANENTS = (
+    {f"journal_{table}_delete" for table in TABLES_JOURNAL}
+    | {"journal_ventes_update", "journal_utilisateurs_update"}
+)
+
+
+def supprimer_triggers_journal(cur, garder_permanents=False):
+    """Plus de capture (sauf TRIGGERS_JOURNAL_PERMANENTS si garder_permanents) :
+    le journal cesse de grossir"""
+    for table in TABLES_JOURNAL:
+        for operation in ('insert', 'update', 'delete'):
+            nom = f"journal_{table}_{operation}"
+            if not (garder_permanents and nom in TRIGGERS_JOURNAL_PERMANENTS):
+                cur.execute(f"DROP TRIGGER IF EXISTS {nom}")
+
+
+def amorcer_journal(cur, depuis=None):
+    """Journaliser comme insertions les lignes modifiees depuis depuis (UTC,
+    format de datetime('now')), toutes si None.
+
+    Large par prudence : bornes incluses, produits et utilisateurs sans
+    updated_at toujours repris ; date_vente est en heure locale. Une ligne
+    deja journalisee ne part qu'une fois.
+    """
+    depuis = depuis or '2000-01-01 00:00:00'
+    for table, condition in (
+        ('produits', "updated_at IS NULL OR updated_at >= ?"),
+        ('ventes', "date_vente >= datetime(?, 'localtime')"),
+        ('details_ventes', "vente_id IN (SELECT id FROM ventes WHERE date_vente >= datetime(?, 'localtime'))"),
+        ('historique_stock', "date_operation >= ?"),
+        ('utilisateurs', "updated_at IS NULL OR updated_at >= ?"),
+    ):
+        cur.execute(
+            f"INSERT INTO journal_changements (table_name, ligne_id, operation) "
+            f"SELECT '{table}', id, 'I' FROM {table} WHERE {condition} ORDER BY id",
+            (depuis,)
+        )
+
+
+def _migration_journal_a_la_demande(cur):
+    """Sans synchronisation, rien ne purge le journal : ses triggers ne sont
+    poses qu'au premier push (modules.journal.activer). Une base qui n'a
+    jamais synchronise les perd, et son journal est vide."""
+    if cur.execute("SELECT 1 FROM parametres WHERE cle IN ('dernier_sync', 'sync_seq_acquitte') "
+                   "AND COALESCE(valeur, '') != ''").fetchone():
+        return
+    supprimer_triggers_journal(cur)
+    cur.execute("DELETE FROM journal_changements")
+
+
+# Migrations de schema : (version, description, fonction(cursor)).
+# Ordre strict, chacune appliquee une seule fois (table schema_version).
+# Ne jamais modifier une migration publiee : en ajouter une nouvelle a la fin.
+MIGRATIONS = [
+    (1, "ventes.utilisateur_id", _migration_utilisateur_vente),
+    (2, "utilisateurs.super_admin", _migration_super_admin),
+    (3, "updated_at sur produits et utilisateurs", _migration_updated_at),
+    (4, "ventes.client_id et fiches clients", _migration_clients_ventes),
+    (5, "index des requetes chaudes", _migration_index_requetes),
+    (6, "compteurs du dashboard", _migration_compteurs),
+    (7, "agregat ventes_jour", _migration_ventes_jour),
+    (8, "ventes par produit", _migration_ventes_produits),
+    (9, "recherche plein texte des produits", _migration_produits_fts),
+    (10, "index clients par nom", _migration_index_clients),
+    (11, "recherche rapide des clients", _migration_recherche_clients),
+    (12, "journal des changements pour la synchronisation", _migration_journal_changements),
+    (13, "journal des changements a la demande", _migration_journal_a_la_demande),
+]
+
 
 class Database:
-    def __init__(self):
+    """Acces SQLite partage par tous les threads.
+
+    Une connexion d'ecriture (self.conn) utilisee sous verrou, et un pool de
+    connexions de lecture seule ouvertes a la demande (profil 'lecteurs') :
+    en WAL les lectures ne bloquent ni l'ecriture ni les autres lectures.
+    Chaque appel a son propre curseur. Base :memory: : tout passe par self.conn.
+    """
+
+    def __init__(self, profil=None):
         self.conn = None
-        self.cursor = None
+        self.nom_profil = profil or SQLITE_PROFIL_ACTIF
+        if self.nom_profil not in SQLITE_PROFILS:
+            logger.warning(f"Profil SQLite inconnu '{self.nom_profil}', utilisation de 'caisse'")
+            self.nom_profil = 'caisse'
+        self.profil = dict(SQLITE_PROFILS[self.nom_profil])
+        # Hook remplacable : callable(database) -> mode de checkpoint ou None
+        self.politique_checkpoint = checkpoint_par_taille_wal
+        # Cache de la table parametres (voir _parametres_a_jour)
+        self._parametres = None
+        self._jeton_parametres = None
+        # Connexion de lecture liee au thread courant (voir lier_connexion_lecture)
+        self._lecture = threading.local()
+        # Connexion d'ecriture : un thread a la fois, reentrant (transaction())
+        self._verrou = threading.RLock()
+        self._transaction_locale = threading.local()
+        # Lecteurs libres (connexion, self.conn a leur ouverture) : ceux d'une
+        # connexion d'ecriture remplacee (reconnexion, restauration) sont fermes
+        self._lecteurs = queue.LifoQueue()
+        self._nb_lecteurs = 0
+        self._verrou_lecteurs = threading.Lock()
+        # Lecteurs lies a un thread (id -> connexion) : fermes avec les autres
+        # (close, reconnexion), sinon ils garderaient l'ancien fichier ouvert
+        self._lecteurs_lies = {}
+        # Parametres de chaque lecteur lie : id -> (connexion, data_version, dict)
+        self._parametres_lecteurs = {}
+        # Rappel set_trace_callback pose sur toutes les connexions (voir tracer)
+        self._trace = None
+        # Appels, temps et lignes par gabarit de requete (fetch_*, execute_*)
+        self.statistiques = StatistiquesRequetes()
+        # Commits de execute_*/transaction() (voir jeton_ecritures)
+        self._ecritures = 0
         self.connect()
         self.create_tables()
 
+    @_ecriture
     def connect(self):
         """Connexion a la base de donnees"""
+        self._fermer_lecteurs()
         try:
-            self.conn = sqlite3.connect(DB_PATH)
+            # Partagee entre threads, toujours utilisee sous self._verrou
+            self.conn = sqlite3.connect(DB_PATH, check_same_thread=False,
+                                        cached_statements=self.taille_cache_requetes)
             self.conn.row_factory = sqlite3.Row  # Activer Row Factory pour accès par clé
-            self.cursor = self.conn.cursor()
-            logger.info("Connexion a la base de donnees reussie")
+            self.conn.set_trace_callback(self._trace)
+            self.appliquer_profil()
+            logger.info(f"Connexion a la base de donnees reussie (profil {self.nom_profil})")
         except Exception as e:
             logger.error(f"Erreur de connexion : {e}")
 
-    def _ensure_connection(self):
-        """Reconnexion automatique si la connexion est perdue"""
+    def appliquer_profil(self):
+        """Appliquer les PRAGMAs du profil de connexion actif"""
+        appliquer_profil(self.conn, self.profil)
+
+        voulu = str(self.profil.get('journal_mode', '')).lower()
+        if voulu and DB_PATH != ':memory:':
+            obtenu = self.conn.execute("PRAGMA journal_mode").fetchone()[0].lower()
+            if obtenu != voulu:
+                logger.warning(f"journal_mode={obtenu} (demande: {voulu})")
+
+    def taille_wal(self):
+        """Taille du fichier -wal en octets (0 si absent ou hors mode WAL)"""
         try:
-            self.conn.execute("SELECT 1")
-        except Exception:
-            logger.warning("Connexion perdue, reconnexion...")
-            self.connect()
+            return os.path.getsize(f"{DB_PATH}-wal")
+        except OSError:
+            return 0
+
+    @_ecriture
+    def checkpoint(self, mode='PASSIVE'):
+        """Reporter le contenu du WAL dans la base.
+        Retourne (bloque, pages_wal, pages_reportees) ou None en cas d'erreur."""
+        mode = mode.upper()
+        if mode not in MODES_CHECKPOINT:
+            logger.warning(f"Mode de checkpoint invalide : {mode}")
+            return None
+        try:
+            if self.conn.in_transaction:
+                self.conn.commit()
+            result = self.conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            return tuple(result) if result else None
+        except Exception as e:
+            logger.warning(f"Checkpoint {mode} echoue : {e}")
+            return None
+
+    def checkpoint_si_necessaire(self):
+        """Appliquer la politique de checkpoint (appele aux moments calmes)"""
+        if not self.politique_checkpoint:
+            return None
+        mode = self.politique_checkpoint(self)
+        if not mode:
+            return None
+        result = self.checkpoint(mode)
+        logger.info(f"Checkpoint WAL {mode} : {result}")
+        return result
+
+    def version_donnees(self):
+        """PRAGMA data_version de la connexion du thread : change quand une
+        AUTRE connexion (autre processus, thread de synchronisation) a commite.
+
+        Les commits de la connexion interrogee ne la modifient pas : hors
+        lecteur lie au thread, c'est self.conn, et les ecritures de db n'y
+        apparaissent pas. Un cache
+        qui l'utilise seule comme cle doit suivre les ecritures locales par ses
+        propres crochets (CacheProduits, set_parametre) ; sinon, prendre
+        jeton_ecritures(), qui compte aussi les commits de db."""
+        lecture = self._connexion_thread()
+        if lecture is not None:
+            return lecture.execute("PRAGMA data_version").fetchone()[0]
+        with self._verrou:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def jeton_ecritures(self):
+        """Valeur qui change a chaque ecriture commitee, par db (execute_*,
+        transaction()) ou par une autre connexion (PRAGMA data_version).
+        Sert a invalider les caches de resultats (comptages filtres...)."""
+        with self._verrou:
+            return (self.conn, self._ecritures, self.conn.execute("PRAGMA data_version").fetchone()[0])
+
+    def ouvrir_connexion_lecture(self):
+        """Nouvelle connexion en lecture seule (pool de lecteurs, threads de
+        chargement).
+
+        En WAL, les lectures d'une seconde connexion ne bloquent pas la
+        caisse. Elle peut etre ouverte sur un thread et utilisee sur un autre.
+        Retourne None pour une base :memory: (propre a sa connexion) : lire
+        alors sur self.conn.
+        """
+        if not self.lectures_paralleles_possibles():
+            return None
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False,
+                               cached_statements=self.taille_cache_requetes)
+        conn.row_factory = sqlite3.Row
+        conn.set_trace_callback(self._trace)
+        appliquer_profil(conn, self.profil)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def lectures_paralleles_possibles(self):
+        """Une base :memory: n'existe que dans sa connexion"""
+        return DB_PATH != ':memory:'
+
+    def lier_connexion_lecture(self, conn):
+        """Router les lectures (fetch_*, parametres) du thread courant vers conn,
+        une connexion de ouvrir_connexion_lecture. None : revenir au pool.
+        Les ecritures restent sur self.conn.
+
+        Le lecteur lie est ferme par close() et a chaque reconnexion : le
+        thread en ouvre alors un autre (voir ui.utils.requetes)."""
+        ancienne = self._connexion_thread()
+        with self._verrou_lecteurs:
+            if ancienne is not None and ancienne is not conn:
+                self._lecteurs_lies.pop(id(ancienne), None)
+                self._parametres_lecteurs.pop(id(ancienne), None)
+            if conn is not None:
+                self._lecteurs_lies[id(conn)] = conn
+        self._lecture.conn = conn
 
+    def _connexion_thread(self):
+        return getattr(self._lecture, 'conn', None)
+
+    @property
+    def taille_cache_requetes(self):
+        return self.profil.get('cached_statements', CACHED_STATEMENTS)
+
+    @property
+    def nb_lecteurs_max(self):
+        return self.profil.get('lecteurs', 4)
+
+    def _emprunter_lecteur(self):
+        """Lecteur libre du pool, ou nouveau sous la limite, sinon attendre"""
+        while True:
+            conn = None
+            ouvrir = False
+            with self._verrou_lecteurs:
+                try:
+                    conn, ecrivain = self._lecteurs.get_nowait()
+                except queue.Empty:
+                    ecrivain = self.conn
+                    if self._nb_lecteurs < self.nb_lecteurs_max:
+                        self._nb_lecteurs += 1
+                        ouvrir = True
+            if ouvrir:
+                try:
+                    return self.ouvrir_connexion_lecture(), ecrivain
+                except Exception:
+                    with self._verrou_lecteurs:
+                        self._nb_lecteurs -= 1
+                    raise
+            if conn is None:
+                conn, ecrivain = self._lecteurs.get()
+            if ecrivain is self.conn:
+                return conn, ecrivain
+            self._rendre_lecteur(conn, ecrivain)
+
+    def _rendre_lecteur(self, conn, ecrivain):
+        with self._verrou_lecteurs:
+            if ecrivain is self.conn:
+                self._lecteurs.put((conn, ecrivain))
+                return
+            self._nb_lecteurs -= 1
+        conn.close()  # Ouvert avant une reconnexion
+
+    def _fermer_lecteurs(self):
+        """Fermer les lecteurs libres et ceux lies a un thread (requete en cours
+        interrompue) ; ceux empruntes au pool le seront a leur retour"""
+        with self._verrou_lecteurs:
+            for conn in self._lecteurs_lies.values():
+                try:
+                    conn.interrupt()
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass  # Deja ferme par son thread
+            self._lecteurs_lies.clear()
+            self._parametres_lecteurs.clear()
+            while True:
+                try:
+                    conn, _ = self._lecteurs.get_nowait()
+                except queue.Empty:
+                    break
+                self._nb_lecteurs -= 1
+                conn.close()
+
+    def tracer(self, rappel):
+        """Poser rappel(sql) en set_trace_callback sur la connexion d'ecriture,
+        les lecteurs libres et ceux ouverts ensuite. None : retirer."""
+        with self._verrou, self._verrou_lecteurs:
+            self._trace = rappel
+            if self.conn:
+                self.conn.set_trace_callback(rappel)
+            for conn, _ in list(self._lecteurs.queue):
+                conn.set_trace_callback(rappel)
+
+    @contextmanager
+    def _connexion_lecture(self):
+        """Connexion pour une lecture : celle liee au thread s'il y en a une,
+        self.conn pour une base :memory: ou dans un db.transaction() du thread
+        (voir ses ecritures non commitees), sinon un lecteur du pool."""
+        lecture = self._connexion_thread()
+        if lecture is not None:
+            yield lecture
+        elif self._dans_transaction() or not self.lectures_paralleles_possibles():
+            with self._verrou:
+                yield self.conn
+        else:
+            conn, ecrivain = self._emprunter_lecteur()
+            try:
+                yield conn
+            finally:
+                self._rendre_lecteur(conn, ecrivain)
+
+    def _lire(self, query, params, un_seul):
+        def lire():
+            with self._connexion_lecture() as conn:
+                debut = time.perf_counter()
+                cur = conn.execute(query, params)
+                resultat = cur.fetchone() if un_seul else cur.fetchall()
+                lignes = (resultat is not None) if un_seul else len(resultat)
+                self.statistiques.enregistrer(query, time.perf_counter() - debut, lignes)
+                return resultat
+
+        try:
+            return self._reessayer(lire)
+        except sqlite3.OperationalError as e:
+            if str(e) == 'interrupted':
+                raise RequeteInterrompue(query[:100]) from e
+            logger.error(f"Erreur {'fetch_one' if un_seul else 'fetch_all'} : {e}")
+        except Exception as e:
+            logger.error(f"Erreur {'fetch_one' if un_seul else 'fetch_all'} : {e}")
+        return None if un_seul else []
+
+    def _dans_transaction(self):
+        """Le thread courant est-il dans un bloc db.transaction()"""
+        return getattr(self._transaction_locale, 'profondeur', 0) > 0
+
+    def _reessayer(self, operation):
+        """Executer operation() ; si la connexion est perdue (connexion_perdue),
+        reconnecter et recommencer, au plus TENTATIVES_RECONNEXION fois.
+
+        Pas de requete de sonde avant chaque appel : la reconnexion ne coute
+        que quand elle sert. Jamais au milieu d'un db.transaction() (le debut
+        du bloc serait perdu) : l'erreur remonte.
+        """
+        tentative = 0
+        while True:
+            ecrivain = self.conn
+            try:
+                if ecrivain is None:
+                    raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+                return operation()
+            except sqlite3.Error as e:
+                if (tentative >= TENTATIVES_RECONNEXION or not connexion_perdue(e)
+                        or self._dans_transaction()):
+                    raise
+                tentative += 1
+                logger.warning(f"Connexion perdue ({e}), reconnexion (tentative {tentative})")
+                if tentative > 1:
+                    time.sleep(DELAI_RECONNEXION * 2 ** (tentative - 2))
+                self._reconnecter(ecrivain)
+
+    def _reconnecter(self, ecrivain):
+        """Rouvrir la connexion d'ecriture si c'est toujours celle en echec
+        (un autre thread a pu reconnecter entre-temps)"""
+        with self._verrou:
+            if self.conn is ecrivain:
+                if ecrivain is not None:
+                    try:
+                        ecrivain.close()
+                    except sqlite3.Error:
+                        pass
+                self.connect()
+
+    @_ecriture
     def create_tables(self):
         """Creation des tables"""
+        cur = self.conn.cursor()
 
         # Table Produits
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS produits (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 nom TEXT NOT NULL,
@@ -55,7 +1007,7 @@ class Database:
         ''')
 
         # Table Ventes
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS ventes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 numero_vente TEXT UNIQUE NOT NULL,
@@ -69,24 +1021,8 @@ class Database:
             )
         ''')
 
-        # Migration : Ajouter colonne utilisateur_id si absente
-        try:
-            self.cursor.execute("SELECT utilisateur_id FROM ventes LIMIT 1")
-        except sqlite3.OperationalError:
-            logger.info("Migration: Ajout colonne utilisateur_id à table ventes")
-            self.cursor.execute("ALTER TABLE ventes ADD COLUMN utilisateur_id INTEGER")
-            self.conn.commit()
-
-        # Migration : Ajouter colonne client_id si absente
-        try:
-            self.cursor.execute("SELECT client_id FROM ventes LIMIT 1")
-        except sqlite3.OperationalError:
-            logger.info("Migration: Ajout colonne client_id à table ventes")
-            self.cursor.execute("ALTER TABLE ventes ADD COLUMN client_id INTEGER")
-            self.conn.commit()
-
         # Table Details des ventes
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS details_ventes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 vente_id INTEGER,
@@ -100,7 +1036,7 @@ class Database:
         ''')
 
         # Table Historique du stock
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS historique_stock (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 produit_id INTEGER,
@@ -113,7 +1049,7 @@ class Database:
         ''')
 
         # Table Parametres
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS parametres (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 cle TEXT UNIQUE NOT NULL,
@@ -123,7 +1059,7 @@ class Database:
         ''')
 
         # Table Utilisateurs
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS utilisateurs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 nom TEXT NOT NULL,
@@ -138,27 +1074,8 @@ class Database:
             )
         ''')
 
-        # Migration: Ajouter colonne super_admin a la table utilisateurs si elle n'existe pas
-        try:
-            self.cursor.execute("SELECT super_admin FROM utilisateurs LIMIT 1")
-        except sqlite3.OperationalError:
-            logger.info("Migration: Ajout colonne super_admin a table utilisateurs")
-            self.cursor.execute("ALTER TABLE utilisateurs ADD COLUMN super_admin BOOLEAN DEFAULT 0")
-            self.conn.commit()
-
-        # Si aucun super-admin n'existe, marquer le premier utilisateur comme super-admin
-        result = self.fetch_one("SELECT COUNT(*) FROM utilisateurs WHERE super_admin = 1")
-        if result and result[0] == 0:
-            # Marquer le premier utilisateur actif comme super-admin
-            self.execute_query("""
-                UPDATE utilisateurs
-                SET super_admin = 1, role = 'patron'
-                WHERE id = (SELECT id FROM utilisateurs ORDER BY id LIMIT 1)
-            """)
-            logger.info("Le premier utilisateur a ete marque comme Super-Admin.")
-
         # Table Logs d'actions
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS logs_actions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 utilisateur_id INTEGER,
@@ -170,7 +1087,7 @@ class Database:
         ''')
 
         # Table file d'attente sync hors-ligne
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS sync_queue (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 action TEXT NOT NULL,
@@ -181,7 +1098,7 @@ class Database:
         ''')
 
         # Table Clients
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS clients (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 nom TEXT NOT NULL,
@@ -196,7 +1113,7 @@ class Database:
         ''')
 
         # Table Paiements
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS paiements (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 vente_id INTEGER NOT NULL,
@@ -211,7 +1128,7 @@ class Database:
         ''')
 
         # Table Taux TVA par categorie
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS taux_tva (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 categorie TEXT UNIQUE NOT NULL,
@@ -221,7 +1138,7 @@ class Database:
         ''')
 
         # Table Devises
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TABLE IF NOT EXISTS devises (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 code TEXT UNIQUE NOT NULL,
@@ -231,17 +1148,35 @@ class Database:
             )
         ''')
 
-        # Migration : ajouter updated_at aux tables existantes
-        self.migrer_updated_at()
+        # Versions de schema appliquees (voir MIGRATIONS)
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                date_application TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.conn.commit()
+
+        # Migrations versionnees (colonnes ajoutees, index...)
+        self.appliquer_migrations()
 
-        # Migration : ajouter client_id aux ventes
-        self.migrer_clients()
+        # Si aucun super-admin n'existe, marquer le premier utilisateur comme super-admin
+        result = self.fetch_one("SELECT COUNT(*) FROM utilisateurs WHERE super_admin = 1")
+        if result and result[0] == 0:
+            # Marquer le premier utilisateur actif comme super-admin
+            self.execute_query("""
+                UPDATE utilisateurs
+                SET super_admin = 1, role = 'patron'
+                WHERE id = (SELECT id FROM utilisateurs ORDER BY id LIMIT 1)
+            """)
+            logger.info("Le premier utilisateur a ete marque comme Super-Admin.")
 
         # Inserer parametres par defaut
         self.init_parametres()
 
         # TRIGGER : Empêcher stock négatif (sécurité supplémentaire)
-        self.cursor.execute('''
+        cur.execute('''
             CREATE TRIGGER IF NOT EXISTS verifier_stock_positif
             BEFORE UPDATE ON produits
             FOR EACH ROW
@@ -254,42 +1189,37 @@ class Database:
         self.conn.commit()
         logger.info("Tables creees/verifiees avec succes")
 
-    def migrer_updated_at(self):
-        """Ajouter la colonne updated_at aux tables produits et utilisateurs si absente"""
-        for table in ('produits', 'utilisateurs'):
-            try:
-                colonnes = [row[1] for row in self.cursor.execute(f"PRAGMA table_info({table})").fetchall()]
-                if 'updated_at' not in colonnes:
-                    self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP")
-                    self.cursor.execute(f"UPDATE {table} SET updated_at = datetime('now') WHERE updated_at IS NULL")
-                    logger.info(f"Colonne updated_at ajoutee a {table}")
-            except Exception as e:
-                logger.warning(f"Migration updated_at pour {table}: {e}")
+    @_ecriture
+    def version_schema(self):
+        """Version de schema courante (0 pour une base jamais migree)"""
+        result = self.conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+        return result[0] or 0
 
-    def migrer_clients(self):
-        """Ajouter la colonne client_id a la table ventes et migrer les noms existants"""
-        try:
-            colonnes = [row[1] for row in self.cursor.execute("PRAGMA table_info(ventes)").fetchall()]
-            if 'client_id' not in colonnes:
-                self.cursor.execute("ALTER TABLE ventes ADD COLUMN client_id INTEGER REFERENCES clients(id)")
-                # Migrer les noms existants vers la table clients
-                noms = self.cursor.execute(
-                    "SELECT DISTINCT client FROM ventes WHERE client IS NOT NULL AND client != ''"
-                ).fetchall()
-                for (nom,) in noms:
-                    self.cursor.execute(
-                        "INSERT INTO clients (nom) VALUES (?)", (nom,)
-                    )
-                    client_id = self.cursor.lastrowid
-                    self.cursor.execute(
-                        "UPDATE ventes SET client_id = ? WHERE client = ?", (client_id, nom)
+    def appliquer_migrations(self):
+        """Appliquer dans l'ordre les MIGRATIONS pas encore enregistrees dans schema_version.
+        Chaque migration tourne dans sa propre transaction ; au premier echec on s'arrete
+        pour ne pas appliquer une migration dont une precedente manque."""
+        actuelle = self.version_schema()
+        for version, description, migration in MIGRATIONS:
+            if version <= actuelle:
+                continue
+            try:
+                with self.transaction() as cur:
+                    migration(cur)
+                    cur.execute(
+                        "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                        (version, description)
                     )
-                logger.info("Migration client_id effectuee sur la table ventes")
-        except Exception as e:
-            logger.warning(f"Migration clients: {e}")
+                logger.info(f"Migration {version} appliquee : {description}")
+            except Exception as e:
+                logger.error(f"Migration {version} ({description}) echouee : {e}")
+                return False
+        return True
 
+    @_ecriture
     def init_parametres(self):
         """Initialiser les parametres par defaut"""
+        cur = self.conn.cursor()
         from config import BOUTIQUE_NOM, BOUTIQUE_ADRESSE, BOUTIQUE_TELEPHONE, BOUTIQUE_EMAIL
 
         parametres_defaut = [
@@ -325,10 +1255,11 @@ class Database:
         ]
 
         for cle, valeur, description in parametres_defaut:
-            self.cursor.execute(
+            cur.execute(
                 'INSERT OR IGNORE INTO parametres (cle, valeur, description) VALUES (?, ?, ?)',
                 (cle, valeur, description)
             )
+        self.invalider_parametres()
 
         # Devises par defaut
         devises_defaut = [
@@ -337,67 +1268,112 @@ class Database:
             ('USD', '$', 600.0),
         ]
         for code, symbole, taux in devises_defaut:
-            self.cursor.execute(
+            cur.execute(
                 'INSERT OR IGNORE INTO devises (code, symbole, taux_change, actif) VALUES (?, ?, ?, 1)',
                 (code, symbole, taux)
             )
 
         self.conn.commit()
 
+    def _annuler(self):
+        try:
+            self.conn.rollback()
+        except Exception:
+            pass
+
+    @_ecriture
     def execute_query(self, query, params=()):
         """Executer une requete INSERT/UPDATE/DELETE avec rollback en cas d'erreur"""
-        self._ensure_connection()
-        try:
-            self.cursor.execute(query, params)
-            self.conn.commit()
+        def executer():
+            cursor = self.conn.cursor()
+            try:
+                debut = time.perf_counter()
+                cursor.execute(query, params)
+                self.conn.commit()
+                self._ecritures += 1
+                self.statistiques.enregistrer(query, time.perf_counter() - debut, cursor.rowcount)
+            except sqlite3.Error:
+                self._annuler()
+                raise
+            return cursor.lastrowid
 
+        try:
+            lastrowid = self._reessayer(executer)
             if query.strip().upper().startswith('INSERT'):
-                return self.cursor.lastrowid
+                return lastrowid
             return True
 
         except Exception as e:
             logger.error(f"Erreur SQL : {e} | Requete: {query[:100]}")
-            try:
-                self.conn.rollback()
-            except Exception:
-                pass
+            self._annuler()
             return None
 
+    @_ecriture
     def execute_transaction(self, queries_params_list):
         """Executer plusieurs requetes dans une transaction atomique"""
-        self._ensure_connection()
+        def executer():
+            cursor = self.conn.cursor()
+            try:
+                for query, params in queries_params_list:
+                    debut = time.perf_counter()
+                    cursor.execute(query, params)
+                    self.statistiques.enregistrer(query, time.perf_counter() - debut, cursor.rowcount)
+                self.conn.commit()
+                self._ecritures += 1
+            except sqlite3.Error:
+                self._annuler()
+                raise
+
         try:
-            for query, params in queries_params_list:
-                self.cursor.execute(query, params)
-            self.conn.commit()
+            self._reessayer(executer)
             return True
         except Exception as e:
             logger.error(f"Erreur transaction : {e}")
+            self._annuler()
+            return None
+
+    @contextmanager
+    def transaction(self):
+        """Transaction d'ecriture explicite (BEGIN IMMEDIATE).
+
+        Le verrou d'ecriture est pris des l'ouverture : aucune autre connexion
+        ne peut s'intercaler entre les lectures et les ecritures du bloc.
+        Un seul COMMIT a la sortie, ROLLBACK complet si une exception survient.
+
+            with db.transaction() as cur:
+                cur.execute(...)
+
+        Les ecritures des autres threads attendent la fin du bloc ; les
+        db.fetch_* du thread qui le tient lisent sur la meme connexion.
+        """
+        def commencer():
+            if self.conn.in_transaction:
+                self.conn.commit()
+            cursor = self.conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            return cursor
+
+        with self._verrou:
+            cursor = self._reessayer(commencer)
+            local = self._transaction_locale
+            local.profondeur = getattr(local, 'profondeur', 0) + 1
             try:
-                self.conn.rollback()
+                yield cursor
+                self.conn.commit()
+                self._ecritures += 1
             except Exception:
-                pass
-            return None
+                self.conn.rollback()
+                raise
+            finally:
+                local.profondeur -= 1
 
     def fetch_all(self, query, params=()):
         """Recuperer tous les resultats"""
-        self._ensure_connection()
-        try:
-            self.cursor.execute(query, params)
-            return self.cursor.fetchall()
-        except Exception as e:
-            logger.error(f"Erreur fetch_all : {e}")
-            return []
+        return self._lire(query, params, un_seul=False)
 
     def fetch_one(self, query, params=()):
         """Recuperer un seul resultat"""
-        self._ensure_connection()
-        try:
-            self.cursor.execute(query, params)
-            return self.cursor.fetchone()
-        except Exception as e:
-            logger.error(f"Erreur fetch_one : {e}")
-            return None
+        return self._lire(query, params, un_seul=True)
 
     def fetch_one_dict(self, query, params=()):
         """Recuperer un seul resultat en dict explicite"""
@@ -409,19 +1385,72 @@ class Database:
         rows = self.fetch_all(query, params)
         return [dict(row) for row in rows] if rows else []
 
+    def _parametres_a_jour(self):
+        """Table parametres en memoire (dict cle -> valeur).
+
+        Chargee en une requete, rechargee quand une autre connexion a commite
+        (PRAGMA data_version) ou apres une reconnexion. Les ecritures de cette
+        connexion passent par set_parametre (ecriture immediate dans le dict).
+        Chaque lecteur lie a un thread (lier_connexion_lecture) a son propre
+        dict, recharge quand le data_version de ce lecteur change : tout
+        commit, ceux de db compris, vient pour lui d'une autre connexion.
+        Range par lecteur et non par thread : un thread du pool Qt perd son
+        etat Python (threading.local) d'une tache a l'autre.
+        """
+        lecture = self._connexion_thread()
+        if lecture is not None:
+            with self._verrou_lecteurs:
+                cache = self._parametres_lecteurs.get(id(lecture))
+            try:
+                version = lecture.execute("PRAGMA data_version").fetchone()[0]
+                if cache is None or cache[0] is not lecture or cache[1] != version:
+                    lignes = lecture.execute("SELECT cle, valeur FROM parametres").fetchall()
+                    cache = (lecture, version, {cle: valeur for cle, valeur in lignes})
+                    with self._verrou_lecteurs:
+                        self._parametres_lecteurs[id(lecture)] = cache
+            except sqlite3.Error as e:
+                logger.error(f"Erreur lecture parametres : {e}")
+                return {}
+            return cache[2]
+        with self._verrou:
+            jeton = (self.conn, self.version_donnees())
+            if self._parametres is None or jeton != self._jeton_parametres:
+                try:
+                    lignes = self.conn.execute("SELECT cle, valeur FROM parametres").fetchall()
+                except sqlite3.Error as e:
+                    logger.error(f"Erreur lecture parametres : {e}")
+                    return {}
+                self._parametres = {cle: valeur for cle, valeur in lignes}
+                self._jeton_parametres = jeton
+            return self._parametres
+
+    def invalider_parametres(self):
+        """Forcer la relecture des parametres (ecriture SQL hors set_parametre)"""
+        self._parametres = None
+
     def get_parametre(self, cle, defaut=""):
-        """Recuperer un parametre"""
-        result = self.fetch_one("SELECT valeur FROM parametres WHERE cle = ?", (cle,))
-        return result['valeur'] if result else defaut
+        """Recuperer un parametre (sans requete tant que le cache est a jour)"""
+        parametres = self._parametres_a_jour()
+        return parametres[cle] if cle in parametres else defaut
 
     def set_parametre(self, cle, valeur):
         """Definir un parametre"""
         query = "INSERT OR REPLACE INTO parametres (cle, valeur) VALUES (?, ?)"
-        return self.execute_query(query, (cle, valeur))
+        result = self.execute_query(query, (cle, valeur))
+        if result and self._parametres is not None:
+            if valeur is None or isinstance(valeur, str):
+                self._parametres[cle] = valeur
+            else:
+                # Colonne TEXT : SQLite convertit les nombres, relire plutot que deviner
+                self._parametres = None
+        return result
 
+    @_ecriture
     def close(self):
-        """Fermer la connexion"""
+        """Fermer la connexion, les lecteurs du pool et ceux lies a un thread"""
+        self._fermer_lecteurs()
         if self.conn:
+            self.checkpoint('TRUNCATE')
             self.conn.close()
             logger.info("Connexion fermee")
 
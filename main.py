@@ -173,6 +173,13 @@ def main():
     # 4. Dashboard avec routage par role
     lancer_dashboard(app, utilisateur)
 
+    # Terminer les recus PDF encore en file avant de quitter
+    from modules.file_recus import file_recus
+    app.aboutToQuit.connect(lambda: file_recus.arreter(timeout=10))
+    # Interrompre les lectures en cours et fermer leurs connexions
+    from ui.utils.requetes import executeur
+    app.aboutToQuit.connect(executeur.arreter)
+
     sys.exit(app.exec())
 
 
@@ -0,0 +1,326 @@
+"""
+Import / export du catalogue produits en masse (CSV, XLSX)
+
+    rapport = importer_produits("fournisseur.csv", simulation=True)
+    rapport.resume()  # '10000 ligne(s) lue(s) : 9812 a importer, 188 en erreur'
+    rapport.ecrire_erreurs("erreurs.csv")  # une ligne par ligne rejetee
+    rapport = importer_produits("fournisseur.csv")
+
+    exporter_produits("catalogue.xlsx")
+
+Import : le fichier est lu ligne a ligne, chaque ligne validee comme dans
+Produit.ajouter (nom, prix et stock positifs, format du code-barres) et
+l'unicite des codes-barres verifiee contre un ensemble charge une seule fois
+(base + lignes deja acceptees du fichier). Les lignes valides sont inserees
+par lots (executemany) dans une seule transaction : tout ou rien en cas
+d'erreur SQL. Les lignes invalides ne bloquent pas les autres, elles sont
+listees dans le rapport. En simulation, rien n'est ecrit.
+L'index plein texte (produits_fts) est alimente en une instruction a la fin
+plutot que ligne par ligne par son trigger.
+
+Export : les produits sont relus par pages de cle (id) et ecrits au fil de
+l'eau, sans charger tout le catalogue en memoire.
+
+XLSX : openpyxl (optionnel) en mode lecture / ecriture seule.
+"""
+import csv
+import math
+import os
+from contextlib import contextmanager
+
+from database import db
+from modules.logger import get_logger
+from modules.produits import Produit, cache_produits
+
+logger = get_logger('catalogue')
+
+# Colonnes du fichier (en-tete de l'export, attendues a l'import)
+COLONNES = ['code_barre', 'nom', 'categorie', 'prix_achat', 'prix_vente',
+            'stock_actuel', 'stock_alerte', 'type_code_barre', 'description']
+OBLIGATOIRES = ('nom', 'prix_vente')
+
+# En-tetes acceptes en plus des noms de COLONNES
+ALIAS = {
+    'code barre': 'code_barre', 'code-barre': 'code_barre', 'code-barres': 'code_barre',
+    'code_barres': 'code_barre', 'ean': 'code_barre',
+    'produit': 'nom', 'designation': 'nom', 'libelle': 'nom',
+    'prix': 'prix_vente', 'stock': 'stock_actuel', 'alerte': 'stock_alerte',
+}
+
+TYPES_CODE_BARRE = ('code128', 'ean13', 'ean8')
+TAILLE_LOT = 1000
+
+_INSERTION = f"INSERT INTO produits ({', '.join(COLONNES)}) VALUES ({', '.join('?' * len(COLONNES))})"
+
+
+class ErreurFichier(Exception):
+    """Fichier illisible : format inconnu, en-tete incomplet, openpyxl absent"""
+
+
+class RapportImport:
+    """Bilan d'un import : compteurs et erreurs par ligne du fichier"""
+
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.lues = 0
+        self.importees = 0
+        self.erreurs = []  # (numero de ligne du fichier, code-barres, message)
+
+    @property
+    def valides(self):
+        return self.lues - len(self.erreurs)
+
+    def resume(self):
+        verbe = "a importer" if self.simulation else "importees"
+        return (f"{self.lues} ligne(s) lue(s) : {self.valides} {verbe}, "
+                f"{len(self.erreurs)} en erreur")
+
+    def ecrire_erreurs(self, chemin):
+        """Rapport des lignes rejetees en CSV (ligne, code_barre, erreur)"""
+        with open(chemin, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(['ligne', 'code_barre', 'erreur'])
+            writer.writerows(self.erreurs)
+
+
+# --- Lecture ---
+
+def _normaliser_entete(valeur):
+    nom = str(valeur or "").strip().lower()
+    return ALIAS.get(nom, nom.replace(' ', '_'))
+
+
+def _lignes_csv(chemin):
+    with open(chemin, newline='', encoding='utf-8-sig') as f:
+        echantillon = f.read(4096)
+        f.seek(0)
+        try:
+            dialecte = csv.Sniffer().sniff(echantillon, delimiters=';,\t')
+        except csv.Error:
+            dialecte = csv.excel
+        yield from csv.reader(f, dialecte)
+
+
+def _lignes_xlsx(chemin):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErreurFichier("openpyxl est necessaire pour les fichiers Excel (pip install openpyxl)")
+    classeur = load_workbook(chemin, read_only=True, data_only=True)
+    try:
+        yield from classeur.active.iter_rows(values_only=True)
+    finally:
+        classeur.close()
+
+
+def lire_fichier(chemin):
+    """(numero de ligne, dict colonne -> valeur brute) pour chaque ligne de
+    donnees ; l'en-tete est la premiere ligne non vide."""
+    extension = os.path.splitext(chemin)[1].lower()
+    if extension == '.csv':
+        lignes = _lignes_csv(chemin)
+    elif extension in ('.xlsx', '.xlsm'):
+        lignes = _lignes_xlsx(chemin)
+    else:
+        raise ErreurFichier(f"Format non gere : {extension or chemin} (CSV ou XLSX)")
+
+    entete = None
+    for numero, ligne in enumerate(lignes, start=1):
+        if not any(v not in (None, "") for v in ligne):
+            continue
+        if entete is None:
+            entete = [_normaliser_entete(v) for v in ligne]
+            manquantes = [c for c in OBLIGATOIRES if c not in entete]
+            if manquantes:
+                raise ErreurFichier(f"Colonne(s) manquante(s) : {', '.join(manquantes)}")
+            continue
+        yield numero, dict(zip(entete, ligne))
+
+
+# --- Validation ---
+
+def _texte(valeur):
+    if valeur is None:
+        return ""
+    if isinstance(valeur, float) and valeur.is_integer():
+        valeur = int(valeur)  # Code-barres numerique lu par Excel
+    return str(valeur).strip()
+
+
+def _nombre(valeur, champ, entier=False, defaut=0):
+    """Nombre positif ; accepte '1 500,50' (espaces insecables compris). ValueError avec un message lisible."""
+    if isinstance(valeur, (int, float)):
+        nombre = valeur
+    else:
+        texte = _texte(valeur).replace('\u00a0', '').replace('\u202f', '').replace(' ', '').replace(',', '.')
+        if not texte:
+            return defaut
+        try:
+            nombre = float(texte)
+        except ValueError:
+            raise ValueError(f"{champ} invalide : {valeur!r}")
+    if not math.isfinite(nombre):  # float() accepte 'nan' et 'inf'
+        raise ValueError(f"{champ} invalide : {valeur!r}")
+    if nombre < 0:
+        raise ValueError(f"{champ} negatif : {valeur}")
+    if entier:
+        if nombre != int(nombre):
+            raise ValueError(f"{champ} doit etre entier : {valeur}")
+        return int(nombre)
+    return float(nombre)
+
+
+def valider_ligne(brut, codes_existants):
+    """Tuple de valeurs dans l'ordre de COLONNES, ou ValueError(message).
+
+    Memes regles que Produit.ajouter ; un code-barres absent est genere,
+    l'unicite est verifiee dans codes_existants (non modifie ici)."""
+    nom = _texte(brut.get('nom'))
+    if not nom:
+        raise ValueError("Nom manquant")
+    if _texte(brut.get('prix_vente')) == "":
+        raise ValueError("Prix de vente manquant")
+    prix_vente = _nombre(brut.get('prix_vente'), "Prix de vente")
+    prix_achat = _nombre(brut.get('prix_achat'), "Prix d'achat")
+    stock_actuel = _nombre(brut.get('stock_actuel'), "Stock", entier=True)
+    stock_alerte = _nombre(brut.get('stock_alerte'), "Stock d'alerte", entier=True, defaut=5)
+
+    type_code = _texte(brut.get('type_code_barre')).lower() or 'code128'
+    if type_code not in TYPES_CODE_BARRE:
+        raise ValueError(f"Type de code-barres inconnu : {type_code}")
+    code_barre = _texte(brut.get('code_barre'))
+    if code_barre:
+        valide, message = Produit.verifier_format_code_barre(code_barre, type_code)
+        if not valide:
+            raise ValueError(message)
+        if code_barre in codes_existants:
+            raise ValueError("Ce code-barres existe deja")
+    else:
+        code_barre = Produit.generer_code_barre(type_code, codes_existants=codes_existants)
+        while code_barre in codes_existants:  # EAN tires au hasard sans verification
+            code_barre = Produit.generer_code_barre(type_code, codes_existants=codes_existants)
+
+    return (code_barre, nom, _texte(brut.get('categorie')) or None, prix_achat, prix_vente,
+            stock_actuel, stock_alerte, type_code, _texte(brut.get('description')))
+
+
+# --- Import ---
+
+@contextmanager
+def _indexation_differee(cur):
+    """Sans le trigger produits_fts_insert le temps du bloc, puis indexation
+    des produits ajoutes en une seule instruction (le trigger coute ~80 % du
+    temps d'un INSERT). DROP/CREATE font partie de la transaction : une
+    erreur annule tout, trigger compris."""
+    trigger = cur.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'produits_fts_insert'").fetchone()
+    if trigger is None:
+        yield
+        return
+    # AUTOINCREMENT : les nouveaux id sont tous au-dela
+    dernier_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM produits").fetchone()[0]
+    cur.execute("DROP TRIGGER produits_fts_insert")
+    yield
+    cur.execute(
+        "INSERT INTO produits_fts (rowid, nom, categorie, description, code_barre) "
+        "SELECT id, nom, categorie, description, code_barre FROM produits WHERE id > ?",
+        (dernier_id,)
+    )
+    cur.execute(trigger[0])
+
+def importer_lignes(lignes, simulation=False, taille_lot=TAILLE_LOT):
+    """Importer des produits depuis des (numero, dict) (voir lire_fichier).
+    Retourne un RapportImport."""
+    rapport = RapportImport(simulation)
+    codes_sql = "SELECT code_barre FROM produits"
+
+    def parcourir(codes_existants, ecrire_lot):
+        lot = []
+        for numero, brut in lignes:
+            rapport.lues += 1
+            try:
+                valeurs = valider_ligne(brut, codes_existants)
+            except ValueError as e:
+                rapport.erreurs.append((numero, _texte(brut.get('code_barre')), str(e)))
+                continue
+            codes_existants.add(valeurs[0])
+            lot.append(valeurs)
+            if len(lot) >= taille_lot:
+                ecrire_lot(lot)
+                lot = []
+        if lot:
+            ecrire_lot(lot)
+
+    if simulation:
+        parcourir({row[0] for row in db.fetch_all(codes_sql)}, lambda lot: None)
+        logger.info(f"Simulation d'import : {rapport.resume()}")
+        return rapport
+
+    with db.transaction() as cur:
+        def ecrire_lot(lot):
+            cur.executemany(_INSERTION, lot)
+            rapport.importees += len(lot)
+        # Codes lus dans la transaction : aucun autre ecrivain ne peut s'intercaler
+        codes_existants = {row[0] for row in cur.execute(codes_sql).fetchall()}
+        with _indexation_differee(cur):
+            parcourir(codes_existants, ecrire_lot)
+
+    if rapport.importees:
+        cache_produits.invalider()
+    logger.info(f"Import produits : {rapport.resume()}")
+    return rapport
+
+
+def importer_produits(chemin, simulation=False, taille_lot=TAILLE_LOT):
+    """Importer un fichier CSV / XLSX (voir le docstring du module).
+
+    ErreurFichier si le fichier ne peut pas etre lu ; sqlite3.Error annule
+    tout l'import."""
+    return importer_lignes(lire_fichier(chemin), simulation, taille_lot)
+
+
+# --- Export ---
+
+def parcourir_produits(taille_page=TAILLE_LOT):
+    """Produits (colonnes COLONNES) par pages de cle, dans l'ordre des id"""
+    dernier_id = 0
+    while True:
+        page = db.fetch_all(
+            f"SELECT id, {', '.join(COLONNES)} FROM produits WHERE id > ? ORDER BY id LIMIT ?",
+            (dernier_id, taille_page)
+        )
+        for produit in page:
+            yield tuple(produit)[1:]
+        if len(page) < taille_page:
+            return
+        dernier_id = page[-1]['id']
+
+
+def exporter_produits(chemin):
+    """Ecrire tout le catalogue en CSV ou XLSX (selon l'extension).
+    Retourne le nombre de produits exportes."""
+    extension = os.path.splitext(chemin)[1].lower()
+    nombre = 0
+    if extension == '.csv':
+        with open(chemin, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(COLONNES)
+            for produit in parcourir_produits():
+                writer.writerow(produit)
+                nombre += 1
+    elif extension == '.xlsx':
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ErreurFichier("openpyxl est necessaire pour les fichiers Excel (pip install openpyxl)")
+        classeur = Workbook(write_only=True)
+        feuille = classeur.create_sheet("Produits")
+        feuille.append(COLONNES)
+        for produit in parcourir_produits():
+            feuille.append(list(produit))
+            nombre += 1
+        classeur.save(chemin)
+    else:
+        raise ErreurFichier(f"Format non gere : {extension or chemin} (CSV ou XLSX)")
+    logger.info(f"Export produits : {nombre} ligne(s) vers {chemin}")
+    return nombre
@@ -0,0 +1,118 @@
+"""
+Client HTTP partage (synchronisation, licence, mises a jour)
+
+Une seule requests.Session pour toute l'application : les connexions
+keep-alive sont reutilisees d'un appel a l'autre (pas de nouvelle poignee
+de main TCP + TLS a chaque requete).
+
+Chaque point d'appel a ses reglages (REGLAGES) : delais de connexion et de
+lecture, nombre de tentatives. Une tentative est rejouee apres une erreur
+de connexion, un delai depasse ou un code 429 / 502 / 503 / 504, avec un
+delai exponentiel tire au hasard (full jitter) :
+
+    reponse = client_http.post('sync.push', url, data=corps, headers=...)
+
+Les exceptions de requests (ConnectionError, Timeout...) remontent apres
+la derniere tentative.
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import APP_VERSION
+from modules.logger import get_logger
+
+logger = get_logger('http')
+
+# Point d'appel -> ((connexion, lecture) en secondes, tentatives)
+REGLAGES = {
+    'sync.ping': ((3, 5), 1),
+    'sync.push': ((3, 30), 2),
+    'sync.pull': ((3, 30), 2),
+    'licence.activer': ((5, 15), 3),
+    'updater.verifier': ((5, 10), 2),  # Reseaux mobiles lents : 10 s de lecture
+}
+REGLAGE_DEFAUT = ((5, 15), 2)
+
+CODES_A_REESSAYER = {429, 502, 503, 504}
+DELAI_BASE = 0.5  # secondes, double a chaque tentative
+DELAI_MAX = 8
+CONNEXIONS_PAR_HOTE = 4
+
+
+class ClientHTTP:
+    """Session partagee, tentatives avec delai exponentiel et hasard"""
+
+    def __init__(self, reglages=None, delai_base=DELAI_BASE, delai_max=DELAI_MAX,
+                 attendre=time.sleep, hasard=random.uniform):
+        self.reglages = dict(REGLAGES, **(reglages or {}))
+        self.delai_base = delai_base
+        self.delai_max = delai_max
+        self._attendre = attendre
+        self._hasard = hasard
+        self._verrou = threading.Lock()
+        self._session = None
+
+    @property
+    def session(self):
+        """Session creee au premier appel (pool de connexions keep-alive)"""
+        with self._verrou:
+            if self._session is None:
+                session = requests.Session()
+                adaptateur = HTTPAdapter(pool_connections=CONNEXIONS_PAR_HOTE,
+                                         pool_maxsize=CONNEXIONS_PAR_HOTE, max_retries=0)
+                session.mount('https://', adaptateur)
+                session.mount('http://', adaptateur)
+                session.headers['User-Agent'] = f"GestionBoutique/{APP_VERSION}"
+                self._session = session
+            return self._session
+
+    def delai(self, tentative, reponse=None):
+        """Attente avant la tentative suivante (Retry-After du serveur si present)"""
+        if reponse is not None:
+            try:
+                return min(self.delai_max, float(reponse.headers.get('Retry-After', '')))
+            except ValueError:
+                pass
+        return self._hasard(0, min(self.delai_max, self.delai_base * 2 ** tentative))
+
+    def requete(self, methode, point, url, **kwargs):
+        """Requete avec les reglages de point ; timeout / tentatives surchargeables"""
+        delais, tentatives = self.reglages.get(point, REGLAGE_DEFAUT)
+        kwargs.setdefault('timeout', delais)
+        tentatives = kwargs.pop('tentatives', tentatives)
+
+        for tentative in range(tentatives):
+            derniere = tentative == tentatives - 1
+            try:
+                reponse = self.session.request(methode, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if derniere:
+                    raise
+                logger.warning(f"{point} : {e.__class__.__name__} (tentative {tentative + 1}/{tentatives})")
+                self._attendre(self.delai(tentative))
+                continue
+            if reponse.status_code not in CODES_A_REESSAYER or derniere:
+                return reponse
+            logger.warning(f"{point} : HTTP {reponse.status_code} (tentative {tentative + 1}/{tentatives})")
+            reponse.close()
+            self._attendre(self.delai(tentative, reponse))
+
+    def get(self, point, url, **kwargs):
+        return self.requete('GET', point, url, **kwargs)
+
+    def post(self, point, url, **kwargs):
+        return self.requete('POST', point, url, **kwargs)
+
+    def fermer(self):
+        """Fermer les connexions du pool (recreees au prochain appel)"""
+        with self._verrou:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+client_http = ClientHTTP()
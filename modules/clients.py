@@ -1,11 +1,28 @@
 """
 Module de gestion des clients
 """
-from database import db
+import re
+
+from database import db, SEPARATEURS_TELEPHONE, MAX_CHIFFRES_TELEPHONE
 from modules.logger import get_logger
+from modules.pagination import comptages, condition_apres
+from modules.produits import requete_fts, recherche_fts_disponible
 
 logger = get_logger('clients')
 
+# Saisie composee uniquement de chiffres et de separateurs : un telephone
+_SAISIE_TELEPHONE = re.compile(rf"^[\d{re.escape(SEPARATEURS_TELEPHONE)}]+$")
+# Correspondances examinees au plus pour classer les suggestions : temps borne
+# meme pour un prefixe tres frequent ('ko' : 40 % des clients)
+MAX_CANDIDATS = 500
+
+
+def chiffres_inverses(saisie):
+    """Chiffres d'une saisie de telephone a l'envers, comme la colonne
+    clients.telephone_inverse ('07 12 34' -> '432170')"""
+    chiffres = re.sub(r"\D", "", saisie or "")
+    return chiffres[::-1][:MAX_CHIFFRES_TELEPHONE]
+
 
 class Client:
 
@@ -89,17 +106,83 @@ class Client:
         )
 
     @staticmethod
-    def compter_filtre(terme=""):
-        """Compter les clients correspondant au filtre"""
+    def page_filtre(terme="", apres=None, limit=50):
+        """Page de clients tries par nom, reprenant apres le curseur (nom, id)
+        apres (None : premiere page), voir modules.pagination.
+        Retourne (lignes, suivant) ; suivant vaut None en fin de liste."""
+        conditions = []
+        params = []
         if terme:
+            conditions.append("(nom LIKE ? OR telephone LIKE ? OR email LIKE ?)")
             t = f"%{terme}%"
-            result = db.fetch_one(
-                "SELECT COUNT(*) FROM clients WHERE nom LIKE ? OR telephone LIKE ? OR email LIKE ?",
-                (t, t, t)
-            )
+            params.extend([t, t, t])
+        if apres is not None:
+            condition, valeurs = condition_apres(["nom", "id"], apres)
+            conditions.append(condition)
+            params.extend(valeurs)
+
+        where = " AND ".join(conditions) if conditions else "1=1"
+        lignes = db.fetch_all(
+            f"SELECT * FROM clients WHERE {where} ORDER BY nom ASC, id ASC LIMIT ?",
+            tuple(params) + (limit + 1,)
+        )
+        suivant = None
+        if len(lignes) > limit:
+            lignes = lignes[:limit]
+            suivant = (lignes[-1]['nom'], lignes[-1]['id'])
+        return lignes, suivant
+
+    @staticmethod
+    def compter_filtre(terme=""):
+        """Compter les clients correspondant au filtre (memorise jusqu'a la prochaine ecriture)"""
+        def compter():
+            if terme:
+                t = f"%{terme}%"
+                result = db.fetch_one(
+                    "SELECT COUNT(*) FROM clients WHERE nom LIKE ? OR telephone LIKE ? OR email LIKE ?",
+                    (t, t, t)
+                )
+            else:
+                result = db.fetch_one("SELECT COUNT(*) FROM clients")
+            return result[0] if result else 0
+
+        return comptages.obtenir(('clients', terme), compter)
+
+    @staticmethod
+    def suggerer(terme, limit=5):
+        """Clients proposes pendant la saisie en caisse, les plus fideles d'abord.
+
+        - chiffres (et separateurs) : fin du numero de telephone, quel que
+          soit son format ('1234' trouve '+225 07 12 12 34') ;
+        - sinon : debut des mots du nom ou de l'email ('awa kou' trouve
+          'Awa Kouassi'), sans accents.
+
+        Le classement porte sur les MAX_CANDIDATS premieres correspondances :
+        un terme tres court et frequent ne propose pas forcement les meilleurs
+        clients de toute la base, mais reste instantane."""
+        terme = (terme or "").strip()
+        if _SAISIE_TELEPHONE.match(terme):
+            debut = chiffres_inverses(terme)
+            if not debut:
+                return []
+            # Chiffres seulement : ':' suit '9' dans l'ordre ASCII
+            candidats = ("SELECT id FROM clients WHERE telephone_inverse >= ? AND telephone_inverse < ? "
+                         "LIMIT ?")
+            params = (debut, debut + ":", MAX_CANDIDATS)
+        elif recherche_fts_disponible('clients_fts'):
+            expression = requete_fts(terme)
+            if not expression:
+                return []
+            candidats = "SELECT rowid FROM clients_fts WHERE clients_fts MATCH ? LIMIT ?"
+            params = (expression, MAX_CANDIDATS)
         else:
-            result = db.fetch_one("SELECT COUNT(*) FROM clients")
-        return result[0] if result else 0
+            return Client.rechercher_filtre(terme, limit=limit)
+
+        return db.fetch_all(
+            f"SELECT * FROM clients WHERE id IN ({candidats}) "
+            "ORDER BY nombre_achats DESC, nom ASC, id ASC LIMIT ?",
+            params + (limit,)
+        )
 
     # --- Historique ---
 
@@ -134,11 +217,15 @@ class Client:
     # --- Fidelite ---
 
     @staticmethod
-    def ajouter_points(client_id, montant_vente):
-        """Ajouter des points de fidelite apres un achat. Retourne les points gagnes."""
+    def preparer_ajout_points(client_id, montant_vente):
+        """Calculer les points d'un achat sans ecrire en base.
+
+        Retourne (points_gagnes, (query, params)) ou (0, None) si le programme
+        fidelite est inactif. Utilise par la transaction de caisse.
+        """
         fidelite_active = db.get_parametre('fidelite_active', '1')
         if fidelite_active != '1':
-            return 0
+            return 0, None
 
         try:
             points_par_fcfa = int(db.get_parametre('fidelite_points_par_fcfa', '1000'))
@@ -146,23 +233,32 @@ class Client:
             points_par_fcfa = 1000
 
         if points_par_fcfa <= 0:
-            return 0
+            return 0, None
 
         points_gagnes = int(montant_vente // points_par_fcfa)
         if points_gagnes > 0:
-            db.execute_query(
+            return points_gagnes, (
                 "UPDATE clients SET points_fidelite = points_fidelite + ?, "
                 "total_achats = total_achats + ?, nombre_achats = nombre_achats + 1 "
                 "WHERE id = ?",
                 (points_gagnes, montant_vente, client_id)
             )
+        return 0, (
+            "UPDATE clients SET total_achats = total_achats + ?, "
+            "nombre_achats = nombre_achats + 1 WHERE id = ?",
+            (montant_vente, client_id)
+        )
+
+    @staticmethod
+    def ajouter_points(client_id, montant_vente):
+        """Ajouter des points de fidelite apres un achat. Retourne les points gagnes."""
+        points_gagnes, requete = Client.preparer_ajout_points(client_id, montant_vente)
+        if requete is None:
+            return 0
+
+        db.execute_query(*requete)
+        if points_gagnes > 0:
             logger.info(f"Client {client_id}: +{points_gagnes} points fidelite")
-        else:
-            db.execute_query(
-                "UPDATE clients SET total_achats = total_achats + ?, "
-                "nombre_achats = nombre_achats + 1 WHERE id = ?",
-                (montant_vente, client_id)
-            )
         return points_gagnes
 
     @staticmethod
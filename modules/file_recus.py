@@ -0,0 +1,159 @@
+"""
+File d'attente de generation des recus PDF en arriere-plan
+
+La mise en page ReportLab et le QR code prennent plusieurs centaines de ms :
+la caisse ne les attend plus. Les donnees sont lues en base sur le thread
+appelant (connexion db), seul le rendu tourne dans le thread de la file.
+
+    travail = file_recus.soumettre(vente_id, rappel=lambda t: ...)
+    file_recus.profondeur()        # recus en attente
+    file_recus.statistiques()      # generes, echecs, temps de rendu
+
+Le rappel est appele depuis le thread de la file : cote Qt, emettre un
+Signal (connexion en file d'attente vers le thread GUI).
+"""
+import queue
+import threading
+import time
+from modules.logger import get_logger
+
+logger = get_logger('file_recus')
+
+
+class TravailRecu:
+    """Un recu a generer et son resultat"""
+
+    def __init__(self, vente_id, donnees, rappel=None):
+        self.vente_id = vente_id
+        self.donnees = donnees
+        self.rappel = rappel
+        self.tentatives = 0
+        self.chemin = None
+        self.erreur = None
+        self.duree_ms = None  # Temps de rendu de la tentative reussie
+        self._termine = threading.Event()
+
+    @property
+    def termine(self):
+        return self._termine.is_set()
+
+    def attendre(self, timeout=None):
+        """Bloquer jusqu'a la fin du travail. Retourne le chemin du PDF ou None"""
+        self._termine.wait(timeout)
+        return self.chemin
+
+
+class FileRecus:
+    """Thread unique consommant une file de recus, avec reessais.
+
+    collecte(vente_id) -> donnees et rendu(donnees) -> chemin sont
+    remplacables (tests) ; par defaut ceux de modules.recus.
+    """
+
+    def __init__(self, collecte=None, rendu=None, tentatives=3, delai_reessai=0.5):
+        self._collecte = collecte
+        self._rendu = rendu
+        self.tentatives = tentatives
+        self.delai_reessai = delai_reessai
+        self._file = queue.Queue()
+        self._thread = None
+        self._verrou = threading.Lock()
+        self._generes = 0
+        self._echecs = 0
+        self._durees_ms = []
+
+    def _demarrer(self):
+        with self._verrou:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._boucle, name="file_recus", daemon=True)
+                self._thread.start()
+
+    def soumettre(self, vente_id, rappel=None):
+        """Lire les donnees du recu (thread appelant) et mettre le rendu en file.
+
+        Retourne le TravailRecu, ou None si la vente est introuvable.
+        """
+        collecte = self._collecte
+        if collecte is None:
+            from modules.recus import collecter_donnees_recu as collecte
+        donnees = collecte(vente_id)
+        if not donnees:
+            return None
+
+        travail = TravailRecu(vente_id, donnees, rappel)
+        self._file.put(travail)
+        self._demarrer()
+        return travail
+
+    def profondeur(self):
+        """Nombre de recus en attente de rendu (hors recu en cours)"""
+        return self._file.qsize()
+
+    def statistiques(self):
+        with self._verrou:
+            durees = list(self._durees_ms)
+            return {
+                'en_attente': self._file.qsize(),
+                'generes': self._generes,
+                'echecs': self._echecs,
+                'derniere_duree_ms': durees[-1] if durees else None,
+                'duree_moyenne_ms': sum(durees) / len(durees) if durees else None,
+            }
+
+    def arreter(self, timeout=None):
+        """Finir les recus en file puis arreter le thread"""
+        if self._thread is None:
+            return
+        self._file.put(None)
+        self._thread.join(timeout)
+
+    def _boucle(self):
+        while True:
+            travail = self._file.get()
+            if travail is None:
+                break
+            self._traiter(travail)
+
+    def _traiter(self, travail):
+        rendu = self._rendu
+        if rendu is None:
+            from modules.recus import rendre_recu_pdf as rendu
+
+        while travail.tentatives < self.tentatives:
+            travail.tentatives += 1
+            debut = time.perf_counter()
+            try:
+                travail.chemin = rendu(travail.donnees)
+                travail.duree_ms = (time.perf_counter() - debut) * 1000
+                travail.erreur = None
+                break
+            except Exception as e:
+                travail.erreur = str(e)
+                logger.warning(f"Recu vente {travail.vente_id} : tentative {travail.tentatives} echouee ({e})")
+                if travail.tentatives < self.tentatives:
+                    time.sleep(self.delai_reessai * 2 ** (travail.tentatives - 1))
+
+        with self._verrou:
+            if travail.chemin:
+                self._generes += 1
+                # Fenetre glissante pour la moyenne
+                self._durees_ms = (self._durees_ms + [travail.duree_ms])[-100:]
+            else:
+                self._echecs += 1
+
+        if travail.chemin:
+            logger.info(f"Recu vente {travail.vente_id} genere en {travail.duree_ms:.0f} ms "
+                        f"(file : {self._file.qsize()})")
+        else:
+            logger.error(f"Recu vente {travail.vente_id} abandonne apres "
+                         f"{travail.tentatives} tentatives : {travail.erreur}")
+
+        travail._termine.set()
+        if travail.rappel:
+            try:
+                travail.rappel(travail)
+            except Exception as e:
+                logger.error(f"Erreur rappel recu vente {travail.vente_id} : {e}")
+
+
+file_recus = FileRecus()
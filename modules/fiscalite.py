@@ -3,6 +3,7 @@ Module de gestion fiscale - TVA et devises
 """
 from database import db
 from modules.logger import get_logger
+from modules.periodes import condition_plage, plage_mois
 
 logger = get_logger('fiscalite')
 
@@ -124,19 +125,13 @@ class Fiscalite:
         if annee is None:
             annee = datetime.now().year
 
-        date_debut = f"{annee}-{mois:02d}-01"
-        if mois == 12:
-            date_fin = f"{annee + 1}-01-01"
-        else:
-            date_fin = f"{annee}-{mois + 1:02d}-01"
-
         # Total des ventes du mois
-        query = """
+        query = f"""
             SELECT COALESCE(SUM(total), 0)
             FROM ventes
-            WHERE date_vente >= ? AND date_vente < ?
+            WHERE {condition_plage('date_vente')}
         """
-        result = db.fetch_one(query, (date_debut, date_fin))
+        result = db.fetch_one(query, plage_mois(mois, annee))
         total_ttc = result[0] if result else 0
 
         taux = Fiscalite.taux_tva_defaut()
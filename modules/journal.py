@@ -0,0 +1,471 @@
+"""
+Journal des changements pour la synchronisation
+
+Des triggers (migration 12, database.TABLES_JOURNAL) ajoutent une ligne a
+journal_changements pour chaque insertion, modification ou suppression :
+(seq, table, id, operation). seq croit strictement et n'est jamais reutilise.
+
+Push : changements_a_envoyer() lit les seq au-dela du dernier acquittement,
+ne relit que les lignes touchees et liste les cles supprimees ; une fois le
+serveur d'accord, acquitter(seq) avance le point de reprise et purge le
+journal. Le cout d'un cycle depend du nombre de changements, pas de la
+taille des tables.
+
+pousser() envoie le journal par lots bornes (entrees et octets), chacun
+acquitte par le serveur : apres une coupure, l'envoi reprend apres le
+dernier lot acquitte au lieu de tout renvoyer. Le serveur garde le dernier
+seq recu par poste et par journal (identifiant tire a la premiere lecture :
+une base reinstallee repart de zero).
+
+Les triggers ne sont poses qu'au premier push (activer) : sans
+synchronisation, rien n'acquitte ni ne purge le journal, et la caisse n'a
+pas a l'alimenter. Une entree non acquittee n'est jamais perdue : une base
+qui ne synchronise plus garde son journal, compacte (limiter) a une entree
+par ligne touchee plus les suppressions.
+
+Pull : appliquer_changements() ecrit les donnees recues sans les journaliser
+(elles ne repartent pas au serveur au push suivant), en quelques instructions
+ensemblistes depuis des tables TEMP, puis previent les abonnes (caches).
+"""
+import json
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from database import (db, TABLES_JOURNAL, amorcer_journal, creer_triggers_journal,
+                      supprimer_triggers_journal)
+from modules.logger import get_logger
+
+logger = get_logger('journal')
+
+CLE_ACQUITTEMENT = 'sync_seq_acquitte'
+CLE_IDENTIFIANT = 'sync_journal_id'
+# Date (UTC, format de datetime('now')) du dernier acquittement : reprise
+# de la capture apres une suspension (activer)
+CLE_DATE_ACQUITTEMENT = 'sync_acquitte_le'
+TAILLE_LOT = 500
+
+# Taille d'un envoi : entrees du journal et corps JSON (une entree trop
+# grosse a elle seule part quand meme)
+ENTREES_PAR_ENVOI = 500
+OCTETS_MAX_ENVOI = 256 * 1024
+
+# Entrees non acquittees au-dela desquelles le journal est compacte
+ENTREES_MAX_HORS_LIGNE = 100000
+
+# Lignes envoyees au serveur, relues par id (details : par vente_id)
+REQUETES = {
+    'produits':
+        "SELECT id, nom, categorie, prix_achat, prix_vente, stock_actuel, stock_alerte, "
+        "code_barre, type_code_barre, date_ajout, description, updated_at "
+        "FROM produits WHERE id IN ({})",
+    'ventes':
+        "SELECT id, numero_vente, date_vente, total, client, statut, deleted_at "
+        "FROM ventes WHERE id IN ({})",
+    'details_ventes':
+        "SELECT d.id, d.vente_id, d.produit_id, d.quantite, d.prix_unitaire, d.sous_total, "
+        "v.numero_vente, p.code_barre AS produit_code_barre "
+        "FROM details_ventes d JOIN ventes v ON v.id = d.vente_id "
+        "LEFT JOIN produits p ON p.id = d.produit_id WHERE d.vente_id IN ({})",
+    'historique_stock':
+        "SELECT h.id, h.produit_id, h.quantite_avant, h.quantite_apres, h.operation, "
+        "h.date_operation, p.code_barre AS produit_code_barre "
+        "FROM historique_stock h LEFT JOIN produits p ON p.id = h.produit_id WHERE h.id IN ({})",
+    'utilisateurs':
+        "SELECT id, nom, prenom, email, mot_de_passe, role, actif, date_creation, "
+        "dernier_login, updated_at FROM utilisateurs WHERE id IN ({})",
+}
+
+# Suppressions recues : table -> (colonne cle, condition supplementaire)
+SUPPRESSIONS = {
+    'produits': ('code_barre', ""),
+    'ventes': ('numero_vente', ""),
+    'utilisateurs': ('email', " AND COALESCE(super_admin, 0) = 0"),
+}
+
+
+def _par_lots(valeurs, taille=TAILLE_LOT):
+    valeurs = list(valeurs)
+    for i in range(0, len(valeurs), taille):
+        yield valeurs[i:i + taille]
+
+
+def _lire_par_ids(requete, ids):
+    lignes = []
+    for lot in _par_lots(sorted(ids)):
+        lignes.extend(db.fetch_all_dicts(requete.format(','.join('?' * len(lot))), tuple(lot)))
+    return lignes
+
+
+def sequence_acquittee():
+    """Dernier seq accepte par le serveur (0 : jamais)"""
+    return int(db.get_parametre(CLE_ACQUITTEMENT, '0') or 0)
+
+
+def identifiant_journal():
+    """Identifiant de ce journal aupres du serveur (cree au premier appel)"""
+    identifiant = db.get_parametre(CLE_IDENTIFIANT, '')
+    if not identifiant:
+        identifiant = uuid.uuid4().hex
+        db.set_parametre(CLE_IDENTIFIANT, identifiant)
+    return identifiant
+
+
+def actif():
+    """Les triggers de capture sont poses"""
+    return db.fetch_one("SELECT 1 FROM sqlite_master WHERE type = 'trigger' "
+                        "AND name = 'journal_ventes_insert'") is not None
+
+
+def activer():
+    """Poser les triggers et journaliser ce qui a change depuis le dernier
+    acquittement (tout si le serveur n'a jamais rien acquitte). Les
+    suppressions faites entre-temps sont deja au journal (desactiver)."""
+    depuis = db.get_parametre(CLE_DATE_ACQUITTEMENT, '') if sequence_acquittee() else ''
+    with db.transaction() as cur:
+        creer_triggers_journal(cur)
+        amorcer_journal(cur, depuis or None)
+    logger.info("Journal des changements active")
+
+
+def desactiver():
+    """Suspendre la capture jusqu'au prochain activer(). Les entrees non
+    acquittees restent ; suppressions et modifications sans date restent
+    journalisees (database.TRIGGERS_JOURNAL_PERMANENTS)."""
+    with db.transaction() as cur:
+        supprimer_triggers_journal(cur, garder_permanents=True)
+
+
+def limiter(entrees_max=ENTREES_MAX_HORS_LIGNE):
+    """Compacter le journal s'il depasse entrees_max (aucun push acquitte
+    depuis longtemps) : une ligne modifiee plusieurs fois ne garde que sa
+    derniere entree, les suppressions restent toutes (changements_a_envoyer
+    les envoie toutes). Rien de ce qui part au push n'est perdu. A appeler
+    dans un moment calme.
+
+    Returns: nombre d'entrees retirees
+    """
+    if db.fetch_one("SELECT COUNT(*) FROM journal_changements")[0] <= entrees_max:
+        return 0
+    depuis = sequence_acquittee()
+    with db.transaction() as cur:
+        cur.execute(
+            "DELETE FROM journal_changements WHERE seq > ? AND operation != 'D' AND seq NOT IN ("
+            "SELECT MAX(seq) FROM journal_changements WHERE seq > ? GROUP BY table_name, ligne_id)",
+            (depuis, depuis)
+        )
+        retirees = cur.rowcount
+    logger.warning(f"Journal des changements au-dela de {entrees_max} entrees sans synchronisation : "
+                   f"{retirees} entrees remplacees par une plus recente retirees")
+    return retirees
+
+
+def renouveler_identifiant():
+    """Nouvel identifiant de journal apres une restauration : la base restauree
+    reprend d'anciens seq, que le serveur croirait deja recus sous l'ancien
+    identifiant"""
+    identifiant = uuid.uuid4().hex
+    db.set_parametre(CLE_IDENTIFIANT, identifiant)
+    return identifiant
+
+
+def changements_a_envoyer(limite=None):
+    """Changements non acquittes, au format du push, ou None s'il n'y en a pas.
+
+    Une ligne modifiee plusieurs fois n'est envoyee qu'une fois, dans son
+    etat actuel. Le dict contient 'depuis' (dernier seq acquitte) et 'seq' :
+    a passer a acquitter() apres acceptation par le serveur. Les changements
+    journalises pendant la lecture ont un seq superieur et partiront au
+    cycle suivant.
+
+    limite : nombre maximal d'entrees du journal couvertes (les premieres).
+    """
+    depuis = sequence_acquittee()
+    seq = None
+    if limite:
+        ligne = db.fetch_one(
+            "SELECT seq FROM journal_changements WHERE seq > ? ORDER BY seq LIMIT 1 OFFSET ?",
+            (depuis, limite - 1)
+        )
+        seq = ligne[0] if ligne else None
+    if seq is None:
+        seq = db.fetch_one("SELECT MAX(seq) FROM journal_changements")[0]
+    if seq is None or seq <= depuis:
+        return None
+
+    # Derniere operation de chaque ligne (colonnes nues de MAX(seq))
+    journal = db.fetch_all(
+        "SELECT table_name, ligne_id, operation, cle, MAX(seq) FROM journal_changements "
+        "WHERE seq > ? AND seq <= ? GROUP BY table_name, ligne_id",
+        (depuis, seq)
+    )
+    ids = {table: set() for table in TABLES_JOURNAL}
+    ventes_details = set()
+    for table, ligne_id, operation, cle, _ in journal:
+        if operation != 'D':
+            ids[table].add(ligne_id)
+        elif table == 'details_ventes':
+            ventes_details.add(int(cle))
+
+    # Toutes les suppressions : une cle supprimee puis recreee sous un autre id
+    # est effacee puis reinseree chez les autres postes
+    suppressions = {}
+    for table, cle in db.fetch_all(
+        "SELECT DISTINCT table_name, cle FROM journal_changements "
+        "WHERE seq > ? AND seq <= ? AND operation = 'D' AND cle IS NOT NULL AND table_name != 'details_ventes'",
+        (depuis, seq)
+    ):
+        suppressions.setdefault(table, []).append(cle)
+
+    # Details : une ligne touchee renvoie toutes les lignes de sa vente
+    for lot in _par_lots(ids.pop('details_ventes')):
+        ventes_details.update(r[0] for r in db.fetch_all(
+            f"SELECT DISTINCT vente_id FROM details_ventes WHERE id IN ({','.join('?' * len(lot))})",
+            tuple(lot)
+        ))
+    ids['details_ventes'] = ventes_details
+
+    changements = {table: _lire_par_ids(REQUETES[table], ids[table]) for table in TABLES_JOURNAL}
+    changements['suppressions'] = suppressions
+    changements['journal'] = identifiant_journal()
+    changements['depuis'] = depuis
+    changements['seq'] = seq
+    changements['timestamp'] = datetime.now().isoformat()
+    return changements
+
+
+def acquitter(seq):
+    """Le serveur a accepte les changements jusqu'a seq : avancer et purger"""
+    seq = max(seq, sequence_acquittee())
+    with db.transaction() as cur:
+        cur.execute("INSERT OR REPLACE INTO parametres (cle, valeur) VALUES (?, ?)",
+                    (CLE_ACQUITTEMENT, str(seq)))
+        cur.execute("INSERT OR REPLACE INTO parametres (cle, valeur) VALUES (?, datetime('now'))",
+                    (CLE_DATE_ACQUITTEMENT,))
+        cur.execute("DELETE FROM journal_changements WHERE seq <= ?", (seq,))
+    db.invalider_parametres()
+
+
+def _json(changements):
+    return json.dumps(changements, default=str).encode('utf-8')
+
+
+def prochain_envoi(limite=ENTREES_PAR_ENVOI, octets_max=OCTETS_MAX_ENVOI, serialiser=_json):
+    """(changements, corps) du prochain lot a envoyer, ou None.
+
+    serialiser(changements) -> octets envoyes (JSON par defaut, format
+    negocie avec le serveur sinon : modules.format_sync). Le lot couvre au
+    plus limite entrees du journal ; tant que le corps depasse octets_max,
+    le nombre d'entrees est divise par deux.
+    """
+    while True:
+        changements = changements_a_envoyer(limite)
+        if changements is None:
+            return None
+        corps = serialiser(changements)
+        if len(corps) <= octets_max or limite <= 1:
+            return changements, corps
+        limite //= 2
+
+
+def pousser(envoyer, limite=ENTREES_PAR_ENVOI, octets_max=OCTETS_MAX_ENVOI, serialiser=_json):
+    """Envoyer le journal lot par lot jusqu'a le vider.
+
+    envoyer(corps) -> (code HTTP, reponse JSON) ; ses exceptions (coupure
+    reseau) sont propagees, les lots deja acquittes le restent.
+    Reponses du serveur :
+    - 200 {'seq': n} : lot recu (ou deja recu), acquitte jusqu'a n
+    - 409 {'seq': n} : le serveur a deja tout jusqu'a n (reponse perdue
+      d'un envoi precedent) ; reprise apres n
+
+    Returns: True si tout est acquitte, False si le serveur refuse un lot
+    """
+    if not actif():
+        activer()
+    while True:
+        envoi = prochain_envoi(limite, octets_max, serialiser)
+        if envoi is None:
+            return True
+        changements, corps = envoi
+        code, reponse = envoyer(corps)
+        reponse = reponse or {}
+        if code == 200:
+            acquitter(max(changements['seq'], reponse.get('seq') or 0))
+        elif code == 409 and reponse.get('seq'):
+            acquitter(reponse['seq'])
+        else:
+            logger.warning(f"Lot {changements['depuis']}-{changements['seq']} refuse : {code}")
+            return False
+
+
+@contextmanager
+def hors_journal(cur):
+    """Ecritures du bloc retirees du journal (donnees venant du serveur).
+
+    A utiliser dans db.transaction() : le verrou d'ecriture garantit
+    qu'aucune ecriture locale ne s'intercale.
+    """
+    avant = cur.execute("SELECT COALESCE(MAX(seq), 0) FROM journal_changements").fetchone()[0]
+    yield cur
+    cur.execute("DELETE FROM journal_changements WHERE seq > ?", (avant,))
+
+
+# Tables de reception (TEMP, connexion d'ecriture) : colonnes recues par table
+RECEPTION = {
+    'produits': ('nom', 'categorie', 'prix_achat', 'prix_vente', 'stock_actuel', 'stock_alerte',
+                 'code_barre', 'type_code_barre', 'date_ajout', 'description', 'updated_at'),
+    'ventes': ('numero_vente', 'date_vente', 'total', 'client', 'statut', 'deleted_at'),
+    'details_ventes': ('numero_vente', 'produit_id', 'produit_code_barre', 'quantite',
+                       'prix_unitaire', 'sous_total'),
+    'historique_stock': ('produit_id', 'produit_code_barre', 'quantite_avant', 'quantite_apres',
+                         'operation', 'date_operation'),
+    'utilisateurs': ('nom', 'prenom', 'email', 'mot_de_passe', 'role', 'actif', 'date_creation',
+                     'dernier_login', 'updated_at'),
+    'suppressions': ('table_name', 'cle'),
+}
+
+# Cle naturelle des lignes recues, passee aux abonnes
+CLES_RECUES = {'produits': 'code_barre', 'ventes': 'numero_vente', 'utilisateurs': 'email'}
+
+# id local du produit d'une ligne recue : par code-barres s'il est connu
+# (les id different d'un poste a l'autre), sinon l'id envoye
+_PRODUIT_RESOLU = ("CASE WHEN COALESCE(r.produit_code_barre, '') != '' "
+                   "THEN p.id ELSE r.produit_id END")
+
+# Upserts ensemblistes depuis les tables de reception, dans l'ordre
+# d'application (WHERE true : leve l'ambiguite ON de la jointure / ON CONFLICT)
+APPLICATION = (
+    """INSERT INTO produits (nom, categorie, prix_achat, prix_vente, stock_actuel, stock_alerte,
+            code_barre, type_code_barre, date_ajout, description, updated_at)
+        SELECT nom, categorie, prix_achat, prix_vente, stock_actuel, stock_alerte,
+            code_barre, type_code_barre, date_ajout, description, updated_at
+        FROM temp.recu_produits WHERE true ORDER BY updated_at
+        ON CONFLICT(code_barre) DO UPDATE SET
+            nom=excluded.nom, categorie=excluded.categorie,
+            prix_achat=excluded.prix_achat, prix_vente=excluded.prix_vente,
+            stock_actuel=excluded.stock_actuel, stock_alerte=excluded.stock_alerte,
+            type_code_barre=excluded.type_code_barre, description=excluded.description,
+            updated_at=excluded.updated_at
+        WHERE COALESCE(excluded.updated_at > datetime(produits.updated_at), 1)""",
+    # Ventes : pas de reecriture (ni de triggers d'agregats) si rien n'a change
+    """INSERT INTO ventes (numero_vente, date_vente, total, client, statut, deleted_at)
+        SELECT numero_vente, date_vente, total, client, statut, deleted_at
+        FROM temp.recu_ventes WHERE true ORDER BY rowid
+        ON CONFLICT(numero_vente) DO UPDATE SET
+            total=excluded.total, client=excluded.client,
+            statut=excluded.statut, deleted_at=excluded.deleted_at
+        WHERE ventes.total IS NOT excluded.total OR ventes.client IS NOT excluded.client
+            OR ventes.statut IS NOT excluded.statut OR ventes.deleted_at IS NOT excluded.deleted_at""",
+    # Une vente recue remplace toutes ses lignes
+    """DELETE FROM details_ventes WHERE vente_id IN (
+        SELECT v.id FROM ventes v WHERE v.numero_vente IN (SELECT numero_vente FROM temp.recu_details_ventes))""",
+    f"""INSERT INTO details_ventes (vente_id, produit_id, quantite, prix_unitaire, sous_total)
+        SELECT v.id, {_PRODUIT_RESOLU}, r.quantite, r.prix_unitaire, r.sous_total
+        FROM temp.recu_details_ventes r
+        JOIN ventes v ON v.numero_vente = r.numero_vente
+        LEFT JOIN produits p ON p.code_barre = r.produit_code_barre
+        ORDER BY r.rowid""",
+    # Mouvement d'un produit inconnu ici : ignore
+    f"""INSERT INTO historique_stock (produit_id, quantite_avant, quantite_apres, operation, date_operation)
+        SELECT produit_id, quantite_avant, quantite_apres, operation, date_operation FROM (
+            SELECT {_PRODUIT_RESOLU} AS produit_id, r.quantite_avant, r.quantite_apres,
+                r.operation, r.date_operation, r.rowid AS ordre
+            FROM temp.recu_historique_stock r
+            LEFT JOIN produits p ON p.code_barre = r.produit_code_barre)
+        WHERE produit_id IS NOT NULL ORDER BY ordre""",
+    """INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, actif, date_creation,
+            dernier_login, updated_at)
+        SELECT nom, prenom, email, mot_de_passe, role, actif, date_creation, dernier_login, updated_at
+        FROM temp.recu_utilisateurs WHERE true ORDER BY updated_at
+        ON CONFLICT(email) DO UPDATE SET
+            nom=excluded.nom, prenom=excluded.prenom,
+            mot_de_passe=excluded.mot_de_passe, role=excluded.role,
+            actif=excluded.actif, dernier_login=excluded.dernier_login,
+            updated_at=excluded.updated_at
+        WHERE COALESCE(excluded.updated_at > datetime(utilisateurs.updated_at), 1)""",
+)
+
+# Rappels appeles apres chaque application de changements distants
+_abonnes = []
+
+
+def abonner(rappel):
+    """rappel(cles) apres chaque appliquer_changements valide : cles est un dict
+    table -> ensemble des cles naturelles recues (code_barre, numero_vente,
+    email), supprimees comprises. Sert a invalider les caches."""
+    if rappel not in _abonnes:
+        _abonnes.append(rappel)
+
+
+def desabonner(rappel):
+    if rappel in _abonnes:
+        _abonnes.remove(rappel)
+
+
+def _notifier(cles):
+    for rappel in list(_abonnes):
+        try:
+            rappel(cles)
+        except Exception as e:
+            logger.error(f"Abonne {getattr(rappel, '__name__', rappel)} : {e}")
+
+
+def _recevoir(cur, data):
+    """Remplir les tables de reception (creees a la premiere reception sur la connexion).
+
+    updated_at recu ramene au format des valeurs locales (datetime('now') :
+    UTC, 'YYYY-MM-DD HH:MM:SS'), maintenant s'il manque : le last write wins
+    compare des textes.
+    """
+    for table, colonnes in RECEPTION.items():
+        cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS recu_{table} ({', '.join(colonnes)})")
+        cur.execute(f"DELETE FROM temp.recu_{table}")
+        if table == 'suppressions':
+            lignes = ((t, cle) for t in SUPPRESSIONS for cle in (data.get(table) or {}).get(t) or [])
+        else:
+            lignes = ([ligne.get(c) for c in colonnes] for ligne in data.get(table) or [])
+        cur.executemany(f"INSERT INTO temp.recu_{table} VALUES ({', '.join('?' * len(colonnes))})", lignes)
+        if 'updated_at' in colonnes:
+            cur.execute(f"UPDATE temp.recu_{table} SET updated_at = CASE "
+                        f"WHEN COALESCE(updated_at, '') = '' THEN datetime('now') "
+                        f"ELSE COALESCE(datetime(updated_at), updated_at) END")
+
+
+def _supprimer(cur):
+    for table, (colonne, condition) in SUPPRESSIONS.items():
+        cles = "SELECT cle FROM temp.recu_suppressions WHERE table_name = ?"
+        if table == 'ventes':
+            for dependante in ('details_ventes', 'paiements'):
+                cur.execute(f"DELETE FROM {dependante} WHERE vente_id IN "
+                            f"(SELECT id FROM ventes WHERE numero_vente IN ({cles}))", (table,))
+        cur.execute(f"DELETE FROM {table} WHERE {colonne} IN ({cles}){condition}", (table,))
+
+
+def appliquer_changements(data):
+    """Appliquer les changements recus du serveur (une transaction).
+
+    Les lignes recues sont chargees dans des tables TEMP (executemany), puis
+    appliquees table par table en une instruction chacune : suppressions
+    d'abord, produits et utilisateurs en last write wins (updated_at recu
+    strictement plus recent), ventes par numero, lignes de vente remplacees
+    vente par vente, produits retrouves par code-barres. Les abonnes
+    (abonner) sont prevenus apres la validation.
+    """
+    with db.transaction() as cur, hors_journal(cur):
+        _recevoir(cur, data)
+        _supprimer(cur)
+        for requete in APPLICATION:
+            cur.execute(requete)
+        for table in RECEPTION:
+            cur.execute(f"DELETE FROM temp.recu_{table}")
+
+    suppressions = data.get('suppressions') or {}
+    cles = {}
+    for table, colonne in CLES_RECUES.items():
+        recues = {ligne.get(colonne) for ligne in data.get(table) or []}
+        recues.update(suppressions.get(table) or [])
+        recues.discard(None)
+        if recues:
+            cles[table] = recues
+    if cles:
+        _notifier(cles)
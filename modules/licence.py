@@ -7,6 +7,7 @@ import uuid
 from datetime import datetime
 from cryptography.fernet import Fernet
 from config import DATA_DIR
+from modules.client_http import client_http
 from modules.logger import get_logger
 
 logger = get_logger('licence')
@@ -97,7 +98,7 @@ class GestionLicence:
             }
 
             logger.info(f"Tentative d'activation licence...")
-            response = requests.post(f"{URL_SERVEUR}/api/activer", json=payload, timeout=10)
+            response = client_http.post('licence.activer', f"{URL_SERVEUR}/api/activer", json=payload)
 
             if response.status_code == 200:
                 data = response.json()
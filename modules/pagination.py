@@ -0,0 +1,65 @@
+"""
+Pagination par cle et comptages memorises pour les listes filtrees
+
+Pagination par cle (keyset) : la page suivante reprend apres la cle de tri
+de la derniere ligne affichee, (tri, id), au lieu de sauter OFFSET lignes.
+Le cout d'une page ne depend plus de sa profondeur.
+
+    lignes, suivant = Produit.page_filtre(terme, ..., apres=curseur)
+    # suivant : curseur de la page d'apres, None en fin de liste
+
+Les fenetres gardent le curseur de debut de chaque page visitee pour
+revenir en arriere.
+
+Le nombre total de resultats d'un filtre (COUNT(*)) est memorise jusqu'a
+la prochaine ecriture en base (Database.jeton_ecritures).
+"""
+import threading
+
+from database import db
+
+
+def condition_apres(colonnes, curseur):
+    """Clause '(col1, col2) > (?, ?)' et ses parametres pour reprendre apres curseur"""
+    marques = ", ".join("?" * len(curseur))
+    return f"({', '.join(colonnes)}) > ({marques})", list(curseur)
+
+
+class CacheComptages:
+    """Comptages par cle de filtre, vides a chaque ecriture commitee"""
+
+    def __init__(self, taille=128):
+        self.taille = taille
+        self._verrou = threading.Lock()
+        self._valeurs = {}
+        self._jeton = None
+        self.succes = 0
+        self.echecs = 0
+
+    def obtenir(self, cle, calcul):
+        """Valeur memorisee pour cle, sinon calcul() (hors verrou) puis memorisee"""
+        jeton = db.jeton_ecritures()
+        with self._verrou:
+            if jeton != self._jeton:
+                self._valeurs.clear()
+                self._jeton = jeton
+            if cle in self._valeurs:
+                self.succes += 1
+                return self._valeurs[cle]
+            self.echecs += 1
+
+        valeur = calcul()
+        with self._verrou:
+            # Un autre appel a vu une ecriture plus recente : valeur peut-etre perimee
+            if self._jeton == jeton:
+                if len(self._valeurs) >= self.taille:
+                    self._valeurs.clear()
+                self._valeurs[cle] = valeur
+        return valeur
+
+    def vider(self):
+        with self._verrou:
+            self._valeurs.clear()
+
+
+comptages = CacheComptages()
@@ -3,6 +3,7 @@ Module de gestion des paiements
 """
 from database import db
 from modules.logger import get_logger
+from modules.periodes import condition_plage, plage_jour
 
 logger = get_logger('paiements')
 
@@ -64,17 +65,14 @@ class Paiement:
     @staticmethod
     def total_par_mode_jour(date=None):
         """Totaux par mode de paiement pour une journee"""
-        from datetime import datetime
-        if date is None:
-            date = datetime.now().strftime("%Y-%m-%d")
-        query = """
+        query = f"""
             SELECT p.mode, SUM(p.montant) as total, COUNT(*) as nb
-            FROM paiements p
-            JOIN ventes v ON p.vente_id = v.id
-            WHERE DATE(v.date_vente) = ?
+            FROM ventes v
+            JOIN paiements p ON p.vente_id = v.id
+            WHERE {condition_plage('v.date_vente')}
             GROUP BY p.mode
         """
-        return db.fetch_all(query, (date,))
+        return db.fetch_all(query, plage_jour(date))
 
     @staticmethod
     def rapport_caisse_jour(date=None):
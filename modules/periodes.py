@@ -0,0 +1,58 @@
+"""
+Plages de dates pour les filtres SQL (jour, mois)
+
+Les colonnes date_vente, date_action... sont des TEXT 'YYYY-MM-DD HH:MM:SS'.
+Filtrer avec DATE(colonne) = ? empeche SQLite d'utiliser un index : on filtre
+plutot sur une plage semi-ouverte colonne >= debut AND colonne < fin, qui
+reste valable pour les formats 'YYYY-MM-DD HH:MM:SS' et ISO 'YYYY-MM-DDTHH:MM:SS'.
+
+    debut, fin = plage_jour()
+    db.fetch_all(f"SELECT ... FROM ventes WHERE {condition_plage('date_vente')}", (debut, fin))
+"""
+from datetime import date, datetime, timedelta
+
+FORMAT_JOUR = "%Y-%m-%d"
+
+
+def _en_date(jour):
+    """Accepte None (aujourd'hui), un date/datetime ou une chaine 'YYYY-MM-DD[...]'"""
+    if jour is None:
+        return date.today()
+    if isinstance(jour, datetime):
+        return jour.date()
+    if isinstance(jour, date):
+        return jour
+    return datetime.strptime(str(jour)[:10], FORMAT_JOUR).date()
+
+
+def condition_plage(colonne):
+    """Fragment SQL sargable pour une plage semi-ouverte (2 parametres)"""
+    return f"{colonne} >= ? AND {colonne} < ?"
+
+
+def plage_jours(premier_jour, dernier_jour):
+    """Du premier au dernier jour inclus -> (debut, fin_exclue)"""
+    debut = _en_date(premier_jour)
+    fin = _en_date(dernier_jour) + timedelta(days=1)
+    return debut.strftime(FORMAT_JOUR), fin.strftime(FORMAT_JOUR)
+
+
+def plage_jour(jour=None):
+    """Une journee -> ('YYYY-MM-DD', 'YYYY-MM-DD du lendemain')"""
+    return plage_jours(jour, jour)
+
+
+def plage_derniers_jours(nb_jours, jour=None):
+    """Les nb_jours jours precedant jour, plus jour lui-meme"""
+    fin = _en_date(jour)
+    return plage_jours(fin - timedelta(days=nb_jours), fin)
+
+
+def plage_mois(mois=None, annee=None):
+    """Un mois calendaire -> ('YYYY-MM-01', 'premier jour du mois suivant')"""
+    aujourd_hui = date.today()
+    mois = mois or aujourd_hui.month
+    annee = annee or aujourd_hui.year
+    debut = date(annee, mois, 1)
+    fin = date(annee + 1, 1, 1) if mois == 12 else date(annee, mois + 1, 1)
+    return debut.strftime(FORMAT_JOUR), fin.strftime(FORMAT_JOUR)
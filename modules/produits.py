@@ -2,19 +2,154 @@
 Module de gestion des produits
 """
 from database import db
+from modules import journal
 from datetime import datetime
 from modules.logger import get_logger
+from modules.pagination import comptages, condition_apres
 import random
+import re
 import string
+import threading
 
 logger = get_logger('produits')
 
+# Pertinence FTS5 (plus petit = meilleur), poids par colonne de produits_fts :
+# nom, categorie, description, code_barre
+RANG_FTS = "bm25(produits_fts, 10.0, 2.0, 1.0, 5.0)"
+# Au-dela, pas de tri par pertinence (bm25 sur chaque correspondance coute
+# plus qu'un LIKE ; une frappe d'un caractere ne classe rien d'utile) : tri par id
+MAX_CLASSEMENT = 1000
+
+_MOTS = re.compile(r"[^\W_]+")
+
+# (connexion d'ecriture, table) -> la table FTS existe (migrations 9 et 11 avec FTS5)
+_index_fts = {}
+
+
+def requete_fts(terme):
+    """Expression MATCH pour un texte saisi : chaque mot en prefixe, tous
+    requis ('sav palm' -> "sav"* "palm"*). None si le texte n'a aucun mot."""
+    mots = _MOTS.findall(terme or "")
+    if not mots:
+        return None
+    return " ".join(f'"{mot}"*' for mot in mots)
+
+
+def recherche_fts_disponible(table='produits_fts'):
+    conn = db.conn
+    if (conn, table) not in _index_fts:
+        if any(c is not conn for c, _ in _index_fts):
+            _index_fts.clear()
+        _index_fts[(conn, table)] = db.fetch_one(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)) is not None
+    return _index_fts[(conn, table)]
+
+
+class CacheProduits:
+    """Fiches produits en memoire indexees par code-barres, pour le scan en caisse.
+
+    Rempli a la demande (ou d'un coup par precharger()). Invalidation :
+    - ecritures de ce processus : hooks de Produit, Vente.finaliser_panier
+      et de la synchronisation ;
+    - ecritures des autres connexions : PRAGMA data_version, et changement
+      de connexion (restauration de sauvegarde).
+    Le stock lu ici ne sert qu'au controle d'affichage : finaliser_panier
+    revalide le stock dans sa transaction.
+    """
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._par_code = {}
+        self._code_par_id = {}
+        self._jeton = None
+        self.succes = 0
+        self.echecs = 0
+
+    def _verifier_fraicheur(self):
+        """Vider le cache si une autre connexion a ecrit (appele sous verrou)"""
+        jeton = (db.conn, db.version_donnees())
+        if jeton != self._jeton:
+            self._par_code.clear()
+            self._code_par_id.clear()
+            self._jeton = jeton
+
+    def _memoriser(self, produit):
+        self._par_code[produit['code_barre']] = produit
+        self._code_par_id[produit['id']] = produit['code_barre']
+
+    def obtenir(self, code_barre):
+        """Fiche produit (sqlite3.Row) ou None ; une requete seulement en cas d'absence"""
+        with self._verrou:
+            self._verifier_fraicheur()
+            produit = self._par_code.get(code_barre)
+            if produit is not None:
+                self.succes += 1
+                return produit
+            self.echecs += 1
+
+        produit = db.fetch_one("SELECT * FROM produits WHERE code_barre = ?", (code_barre,))
+        if produit:
+            with self._verrou:
+                self._memoriser(produit)
+        return produit
+
+    def precharger(self):
+        """Charger tout le catalogue en une requete (ouverture de la caisse)"""
+        produits = db.fetch_all("SELECT * FROM produits")
+        with self._verrou:
+            self._verifier_fraicheur()
+            for produit in produits:
+                self._memoriser(produit)
+        return len(produits)
+
+    def rafraichir(self, produit_ids):
+        """Relire les fiches deja en cache parmi produit_ids (ex. stock apres une vente)"""
+        with self._verrou:
+            ids = [i for i in set(produit_ids) if i in self._code_par_id]
+        if not ids:
+            return
+        marques = ", ".join("?" * len(ids))
+        produits = db.fetch_all(f"SELECT * FROM produits WHERE id IN ({marques})", tuple(ids))
+        with self._verrou:
+            for produit_id in ids:
+                self._par_code.pop(self._code_par_id.pop(produit_id), None)
+            for produit in produits:
+                self._memoriser(produit)
+
+    def invalider(self, produit_id=None, code_barre=None):
+        """Oublier une fiche (par id ou code-barres), ou tout le cache sans argument"""
+        with self._verrou:
+            if produit_id is None and code_barre is None:
+                self._par_code.clear()
+                self._code_par_id.clear()
+                return
+            if produit_id is not None:
+                code_barre = self._code_par_id.pop(produit_id, code_barre)
+            produit = self._par_code.pop(code_barre, None)
+            if produit is not None:
+                self._code_par_id.pop(produit['id'], None)
+
+
+cache_produits = CacheProduits()
+
+
+def _invalider_changements_distants(cles):
+    """Fiches des produits recus ou supprimes par la synchronisation"""
+    for code_barre in cles.get('produits', ()):
+        cache_produits.invalider(code_barre=code_barre)
+
+
+journal.abonner(_invalider_changements_distants)
+
 
 class Produit:
 
     @staticmethod
-    def generer_code_barre(type_code='code128', prefixe='PRD'):
-        """Generer un code-barres selon le type"""
+    def generer_code_barre(type_code='code128', prefixe='PRD', codes_existants=None):
+        """Generer un code-barres selon le type.
+
+        codes_existants : ensemble des codes deja pris (import en masse),
+        sinon verification en base."""
         if type_code == 'ean13':
             code = ''.join(random.choices(string.digits, k=12))
             checksum = Produit.calculer_checksum_ean13(code)
@@ -27,7 +162,10 @@ class Produit:
             while True:
                 nombre = ''.join(random.choices(string.digits, k=6))
                 code = f"{prefixe}{nombre}"
-                if not Produit.code_barre_existe(code):
+                if codes_existants is not None:
+                    if code not in codes_existants:
+                        return code
+                elif not Produit.code_barre_existe(code):
                     return code
 
     @staticmethod
@@ -44,6 +182,18 @@ class Produit:
     @staticmethod
     def valider_code_barre(code, type_code='code128'):
         """Valider un code-barres selon son type"""
+        valide, message = Produit.verifier_format_code_barre(code, type_code)
+        if not valide:
+            return valide, message
+
+        if Produit.code_barre_existe(code):
+            return False, "Ce code-barres existe deja"
+
+        return True, "Code-barres valide"
+
+    @staticmethod
+    def verifier_format_code_barre(code, type_code='code128'):
+        """Longueur et checksum selon le type, sans verifier l'unicite"""
         if not code:
             return False, "Le code-barres ne peut pas etre vide"
 
@@ -60,9 +210,6 @@ class Produit:
             if int(code[-1]) != checksum_calcule:
                 return False, "Checksum EAN-8 invalide"
 
-        if Produit.code_barre_existe(code):
-            return False, "Ce code-barres existe deja"
-
         return True, "Code-barres valide"
 
     @staticmethod
@@ -105,6 +252,7 @@ class Produit:
         result = db.execute_query(query, (nom, categorie, prix_achat, prix_vente, stock_actuel,
                                           stock_alerte, code_barre, type_code_barre, description))
         if result:
+            cache_produits.invalider(code_barre=code_barre)
             logger.info(f"Produit ajoute : '{nom}' (code: {code_barre})")
             return code_barre
         return None
@@ -134,6 +282,7 @@ class Produit:
         result = db.execute_query(query, (nom, categorie, prix_achat, prix_vente, stock_actuel,
                                           stock_alerte, description, id_produit))
         if result:
+            cache_produits.invalider(produit_id=id_produit)
             logger.info(f"Produit modifie : ID {id_produit}")
             return True
         return False
@@ -144,6 +293,7 @@ class Produit:
         query = "DELETE FROM produits WHERE id = ?"
         result = db.execute_query(query, (id_produit,))
         if result:
+            cache_produits.invalider(produit_id=id_produit)
             logger.info(f"Produit supprime : ID {id_produit}")
             if user_id:
                 from modules.utilisateurs import Utilisateur
@@ -166,16 +316,14 @@ class Produit:
 
     @staticmethod
     def obtenir_par_code_barre(code_barre):
-        """Obtenir un produit par son code-barres"""
-        query = "SELECT * FROM produits WHERE code_barre = ?"
-        return db.fetch_one(query, (code_barre,))
+        """Obtenir un produit par son code-barres (via cache_produits)"""
+        return cache_produits.obtenir(code_barre)
 
     @staticmethod
     def rechercher(terme):
-        """Rechercher des produits par nom ou categorie"""
-        query = "SELECT * FROM produits WHERE nom LIKE ? OR categorie LIKE ? OR code_barre LIKE ?"
-        terme = f"%{terme}%"
-        return db.fetch_all(query, (terme, terme, terme))
+        """Rechercher des produits par nom, categorie, description ou code-barres,
+        les plus pertinents d'abord"""
+        return Produit.rechercher_filtre(terme, limit=-1)
 
     @staticmethod
     def mettre_a_jour_stock(id_produit, nouvelle_quantite, operation="Mise a jour", user_id=None):
@@ -190,6 +338,7 @@ class Produit:
             ancien_stock = ancien['stock_actuel']
             query = "UPDATE produits SET stock_actuel = ?, updated_at = datetime('now') WHERE id = ?"
             if db.execute_query(query, (nouvelle_quantite, id_produit)):
+                cache_produits.invalider(produit_id=id_produit)
                 query_historique = """
                     INSERT INTO historique_stock (produit_id, quantite_avant, quantite_apres, operation)
                     VALUES (?, ?, ?, ?)
@@ -234,73 +383,116 @@ class Produit:
         return categories
 
     @staticmethod
-    def rechercher_filtre(terme="", categorie=None, stock_filter=None,
-                          prix_min=None, prix_max=None, limit=50, offset=0):
-        """Rechercher des produits avec filtres multiples et pagination"""
+    def _conditions_filtre(terme, categorie, stock_filter, prix_min, prix_max, classer=False):
+        """Source (FROM), clause WHERE, parametres et tri communs a
+        rechercher_filtre et compter_filtre.
+
+        Le terme passe par l'index plein texte produits_fts (prefixes, sans
+        accents) ; LIKE '%terme%' si FTS5 est absent. classer : tri par
+        pertinence, si le terme a au plus MAX_CLASSEMENT correspondances.
+        Conditions toujours ajoutees dans le meme ordre : une combinaison de
+        filtres donne toujours le meme texte SQL (cache de requetes preparees,
+        statistiques par gabarit)."""
+        source = "produits p"
         conditions = []
         params = []
+        ordre = "p.id ASC"
 
         if terme:
-            conditions.append("(nom LIKE ? OR categorie LIKE ? OR code_barre LIKE ?)")
-            t = f"%{terme}%"
-            params.extend([t, t, t])
+            expression = requete_fts(terme) if recherche_fts_disponible() else None
+            if expression:
+                source = "produits_fts JOIN produits p ON p.id = produits_fts.rowid"
+                conditions.append("produits_fts MATCH ?")
+                params.append(expression)
+                if classer and Produit._peu_de_correspondances(expression):
+                    ordre = f"{RANG_FTS}, p.id ASC"
+            else:
+                conditions.append("(p.nom LIKE ? OR p.categorie LIKE ? OR p.code_barre LIKE ?)")
+                t = f"%{terme}%"
+                params.extend([t, t, t])
 
         if categorie and categorie != "Toutes":
-            conditions.append("categorie = ?")
+            conditions.append("p.categorie = ?")
             params.append(categorie)
 
         if stock_filter == "Stock faible":
-            conditions.append("stock_actuel <= stock_alerte AND stock_actuel > 0")
+            conditions.append("p.stock_actuel <= p.stock_alerte AND p.stock_actuel > 0")
         elif stock_filter == "Rupture":
-            conditions.append("stock_actuel = 0")
+            conditions.append("p.stock_actuel = 0")
         elif stock_filter == "Stock négatif":
-            conditions.append("stock_actuel < 0")
+            conditions.append("p.stock_actuel < 0")
 
         if prix_min is not None:
-            conditions.append("prix_vente >= ?")
+            conditions.append("p.prix_vente >= ?")
             params.append(prix_min)
         if prix_max is not None:
-            conditions.append("prix_vente <= ?")
+            conditions.append("p.prix_vente <= ?")
             params.append(prix_max)
 
         where = " AND ".join(conditions) if conditions else "1=1"
-        query = f"SELECT * FROM produits WHERE {where} ORDER BY id ASC LIMIT ? OFFSET ?"
+        return source, where, params, ordre
+
+    @staticmethod
+    def _peu_de_correspondances(expression):
+        """Au plus MAX_CLASSEMENT produits pour l'expression (arret au-dela)"""
+        ligne = db.fetch_one(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM produits_fts WHERE produits_fts MATCH ? LIMIT ?)",
+            (expression, MAX_CLASSEMENT + 1))
+        return ligne is not None and ligne[0] <= MAX_CLASSEMENT
+
+    @staticmethod
+    def rechercher_filtre(terme="", categorie=None, stock_filter=None,
+                          prix_min=None, prix_max=None, limit=50, offset=0):
+        """Rechercher des produits avec filtres multiples et pagination
+        (par pertinence si terme, sinon par id)"""
+        source, where, params, ordre = Produit._conditions_filtre(
+            terme, categorie, stock_filter, prix_min, prix_max, classer=True)
+        query = f"SELECT p.* FROM {source} WHERE {where} ORDER BY {ordre} LIMIT ? OFFSET ?"
         params.extend([limit, offset])
 
         return db.fetch_all(query, tuple(params))
 
+    @staticmethod
+    def page_filtre(terme="", categorie=None, stock_filter=None,
+                    prix_min=None, prix_max=None, apres=None, limit=50):
+        """Page de produits filtres reprenant apres le curseur apres (None :
+        premiere page), voir modules.pagination.
+
+        Retourne (lignes, suivant), suivant etant le curseur de la page
+        d'apres ou None en fin de liste. Cle : (pertinence, id) pour une
+        recherche classee, sinon (id,) ; un curseur d'une autre forme (le
+        classement a change entre deux pages) repart du debut."""
+        source, where, params, ordre = Produit._conditions_filtre(
+            terme, categorie, stock_filter, prix_min, prix_max, classer=True)
+        classee = ordre.startswith(RANG_FTS)
+        colonnes_cle = [RANG_FTS, "p.id"] if classee else ["p.id"]
+        if apres is not None and len(apres) == len(colonnes_cle):
+            condition, valeurs = condition_apres(colonnes_cle, apres)
+            where = f"{where} AND {condition}"
+            params.extend(valeurs)
+
+        selection = f"p.*, {RANG_FTS} AS rang_fts" if classee else "p.*"
+        query = f"SELECT {selection} FROM {source} WHERE {where} ORDER BY {ordre} LIMIT ?"
+        params.append(limit + 1)
+        lignes = db.fetch_all(query, tuple(params))
+
+        suivant = None
+        if len(lignes) > limit:
+            lignes = lignes[:limit]
+            derniere = lignes[-1]
+            suivant = (derniere['rang_fts'], derniere['id']) if classee else (derniere['id'],)
+        return lignes, suivant
+
     @staticmethod
     def compter_filtre(terme="", categorie=None, stock_filter=None,
                        prix_min=None, prix_max=None):
         """Compter les produits correspondant aux filtres (pour pagination)"""
-        conditions = []
-        params = []
-
-        if terme:
-            conditions.append("(nom LIKE ? OR categorie LIKE ? OR code_barre LIKE ?)")
-            t = f"%{terme}%"
-            params.extend([t, t, t])
-
-        if categorie and categorie != "Toutes":
-            conditions.append("categorie = ?")
-            params.append(categorie)
-
-        if stock_filter == "Stock faible":
-            conditions.append("stock_actuel <= stock_alerte AND stock_actuel > 0")
-        elif stock_filter == "Rupture":
-            conditions.append("stock_actuel = 0")
-        elif stock_filter == "Stock négatif":
-            conditions.append("stock_actuel < 0")
-
-        if prix_min is not None:
-            conditions.append("prix_vente >= ?")
-            params.append(prix_min)
-        if prix_max is not None:
-            conditions.append("prix_vente <= ?")
-            params.append(prix_max)
-
-        where = " AND ".join(conditions) if conditions else "1=1"
-        query = f"SELECT COUNT(*) as count FROM produits WHERE {where}"
-
-        result = db.fetch_one(query, tuple(params))
-        return result['count'] if result else 0
+        def compter():
+            source, where, params, _ = Produit._conditions_filtre(
+                terme, categorie, stock_filter, prix_min, prix_max)
+            query = f"SELECT COUNT(*) as count FROM {source} WHERE {where}"
+            result = db.fetch_one(query, tuple(params))
+            return result['count'] if result else 0
+
+        # Memorise jusqu'a la prochaine ecriture : pas de recomptage a chaque page
+        return comptages.obtenir(('produits', terme, categorie, stock_filter, prix_min, prix_max), compter)
@@ -3,58 +3,62 @@ Module de génération de rapports et statistiques
 """
 from database import db
 from datetime import datetime, timedelta
+from modules.periodes import condition_plage, plage_jour, plage_jours, plage_mois, plage_derniers_jours
 
 class Rapport:
-        
+    """Rapports de ventes.
+
+    Les agrégats par jour/heure/caissier (nombre de ventes, CA, articles) se
+    lisent dans la table ventes_jour, maintenue par triggers sur ventes et
+    details_ventes (voir database._migration_ventes_jour) ; les quantités, CA
+    et coûts par produit dans ventes_produits et ventes_produits_jour
+    (database._migration_ventes_produits).
+    """
+
     @staticmethod
     def statistiques_generales():
-        """Obtenir les statistiques générales"""
+        """Obtenir les statistiques générales du dashboard en une seule requête.
+
+        Jour et mois se lisent dans l'agrégat ventes_jour ; CA total, nombre de
+        produits, valeur du stock et alertes viennent de la table compteurs.
+        Les deux sont tenus à jour par triggers : le coût ne dépend pas de l'historique.
+        """
         stats = {
             'nb_ventes': 0,
             'ca_jour': 0,
             'ca_mois': 0,
-            'ca_total': 0,  # ✅ AJOUTÉ
+            'ca_total': 0,
             'nb_produits': 0,
-            'valeur_stock': 0
+            'valeur_stock': 0,
+            'nb_alertes_stock': 0,
         }
-        
+
         try:
-            # Ventes du jour
-            aujourd_hui = datetime.now().strftime("%Y-%m-%d")
-            query_jour = "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM ventes WHERE DATE(date_vente) = ?"
-            result = db.fetch_one(query_jour, (aujourd_hui,))
+            query = f"""
+                SELECT j.nb, j.ca, m.ca, c.ca_total, c.nb_produits, c.valeur_stock, c.nb_alertes_stock
+                FROM (SELECT COALESCE(SUM(nb_ventes), 0) AS nb, COALESCE(SUM(ca), 0) AS ca
+                      FROM ventes_jour WHERE {condition_plage('jour')}) j,
+                     (SELECT COALESCE(SUM(ca), 0) AS ca
+                      FROM ventes_jour WHERE {condition_plage('jour')}) m,
+                     (SELECT MAX(CASE cle WHEN 'ca_total' THEN valeur END) AS ca_total,
+                             MAX(CASE cle WHEN 'nb_produits' THEN valeur END) AS nb_produits,
+                             MAX(CASE cle WHEN 'valeur_stock' THEN valeur END) AS valeur_stock,
+                             MAX(CASE cle WHEN 'nb_alertes_stock' THEN valeur END) AS nb_alertes_stock
+                      FROM compteurs) c
+            """
+            result = db.fetch_one(query, (*plage_jour(), *plage_mois()))
             if result:
                 stats['nb_ventes'] = result[0] or 0
                 stats['ca_jour'] = result[1] or 0
-            
-            # CA du mois
-            debut_mois = datetime.now().replace(day=1).strftime("%Y-%m-%d")
-            query_mois = "SELECT COALESCE(SUM(total), 0) FROM ventes WHERE date_vente >= ?"
-            result = db.fetch_one(query_mois, (debut_mois,))
-            if result:
-                stats['ca_mois'] = result[0] or 0
-            
-            # CA total ✅ AJOUTÉ
-            query_total = "SELECT COALESCE(SUM(total), 0) FROM ventes"
-            result = db.fetch_one(query_total)
-            if result:
-                stats['ca_total'] = result[0] or 0
-            
-            # Nombre de produits
-            query_produits = "SELECT COUNT(*) FROM produits"
-            result = db.fetch_one(query_produits)
-            if result:
-                stats['nb_produits'] = result[0] or 0
-            
-            # Valeur du stock
-            query_valeur = "SELECT COALESCE(SUM(prix_vente * stock_actuel), 0) FROM produits"
-            result = db.fetch_one(query_valeur)
-            if result:
-                stats['valeur_stock'] = result[0] or 0
-                
+                stats['ca_mois'] = result[2] or 0
+                stats['ca_total'] = result[3] or 0
+                stats['nb_produits'] = int(result[4] or 0)
+                stats['valeur_stock'] = result[5] or 0
+                stats['nb_alertes_stock'] = int(result[6] or 0)
+
         except Exception as e:
             print(f"❌ Erreur statistiques: {e}")
-        
+
         return stats
 
     @staticmethod
@@ -67,13 +71,12 @@ class Rapport:
 
         try:
             # Ventes du jour pour cet utilisateur
-            aujourd_hui = datetime.now().strftime("%Y-%m-%d")
-            query_jour = """
-                SELECT COUNT(*), COALESCE(SUM(total), 0)
-                FROM ventes
-                WHERE DATE(date_vente) = ? AND utilisateur_id = ?
+            query_jour = f"""
+                SELECT COALESCE(SUM(nb_ventes), 0), COALESCE(SUM(ca), 0)
+                FROM ventes_jour
+                WHERE utilisateur_id = ? AND {condition_plage('jour')}
             """
-            result = db.fetch_one(query_jour, (aujourd_hui, utilisateur_id))
+            result = db.fetch_one(query_jour, (utilisateur_id, *plage_jour()))
             if result:
                 stats['nb_ventes'] = result[0] or 0
                 stats['ca_jour'] = result[1] or 0
@@ -85,56 +88,83 @@ class Rapport:
 
     @staticmethod
     def top_produits(limite=20):
-        """Obtenir les produits les plus vendus"""
+        """Obtenir les produits les plus vendus (parcours de idx_ventes_produits_quantite)"""
         query = """
-            SELECT p.nom, p.categorie, SUM(dv.quantite) as total_vendu, 
-                   SUM(dv.sous_total) as ca_total
-            FROM details_ventes dv
-            JOIN produits p ON dv.produit_id = p.id
-            GROUP BY p.id
-            ORDER BY total_vendu DESC
+            SELECT p.nom, p.categorie, vp.quantite as total_vendu, vp.ca as ca_total
+            FROM ventes_produits vp
+            JOIN produits p ON vp.produit_id = p.id
+            WHERE vp.quantite > 0
+            ORDER BY vp.quantite DESC
             LIMIT ?
         """
         return db.fetch_all(query, (limite,))
     
     @staticmethod
     def ventes_par_periode(date_debut, date_fin):
-        """Obtenir les ventes pour une période"""
-        query = """
-            SELECT DATE(date_vente) as jour, COUNT(*) as nb_ventes, 
-                   SUM(total) as ca
-            FROM ventes
-            WHERE date_vente BETWEEN ? AND ?
-            GROUP BY DATE(date_vente)
+        """Obtenir les ventes par jour, du premier au dernier jour inclus"""
+        query = f"""
+            SELECT jour, SUM(nb_ventes) as nb_ventes, SUM(ca) as ca
+            FROM ventes_jour
+            WHERE {condition_plage('jour')}
+            GROUP BY jour
             ORDER BY jour DESC
         """
-        return db.fetch_all(query, (date_debut, date_fin))
+        return db.fetch_all(query, plage_jours(date_debut, date_fin))
     
     @staticmethod
     def ca_par_categorie():
         """Chiffre d'affaires par catégorie"""
         query = """
-            SELECT p.categorie, SUM(dv.sous_total) as ca_total
-            FROM details_ventes dv
-            JOIN produits p ON dv.produit_id = p.id
+            SELECT p.categorie, SUM(vp.ca) as ca_total
+            FROM ventes_produits vp
+            JOIN produits p ON vp.produit_id = p.id
+            WHERE vp.quantite > 0
             GROUP BY p.categorie
             ORDER BY ca_total DESC
         """
         return db.fetch_all(query)
+
+    @staticmethod
+    def marges_produits(date_debut=None, date_fin=None, limite=None):
+        """Marge brute par produit : CA - cout au prix d'achat du moment de la vente.
+
+        Sans dates : totaux depuis l'origine (ventes_produits) ; avec dates :
+        du premier au dernier jour inclus (ventes_produits_jour).
+        Lignes (nom, categorie, quantite, ca, cout, marge, taux_marge en %),
+        triees par marge decroissante.
+        """
+        if date_debut and date_fin:
+            source = f"""(SELECT produit_id, SUM(quantite) AS quantite, SUM(ca) AS ca, SUM(cout) AS cout
+                         FROM ventes_produits_jour WHERE {condition_plage('jour')}
+                         GROUP BY produit_id)"""
+            params = plage_jours(date_debut, date_fin)
+        else:
+            source, params = "ventes_produits", ()
+        query = f"""
+            SELECT p.nom, p.categorie, vp.quantite, vp.ca, vp.cout,
+                   vp.ca - vp.cout as marge,
+                   CASE WHEN vp.ca > 0 THEN (vp.ca - vp.cout) * 100.0 / vp.ca ELSE 0 END as taux_marge
+            FROM {source} vp
+            JOIN produits p ON vp.produit_id = p.id
+            WHERE vp.quantite > 0
+            ORDER BY marge DESC
+        """
+        if limite:
+            query += " LIMIT ?"
+            params = (*params, limite)
+        return db.fetch_all(query, params)
     
     @staticmethod
     def evolution_ventes_7_jours():
         """Évolution des ventes sur 7 jours"""
-        il_y_a_7_jours = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-        query = """
-            SELECT DATE(date_vente) as jour, COUNT(*) as nb_ventes, 
-                   COALESCE(SUM(total), 0) as ca
-            FROM ventes
-            WHERE date_vente >= ?
-            GROUP BY DATE(date_vente)
+        query = f"""
+            SELECT jour, SUM(nb_ventes) as nb_ventes, COALESCE(SUM(ca), 0) as ca
+            FROM ventes_jour
+            WHERE {condition_plage('jour')}
+            GROUP BY jour
             ORDER BY jour ASC
         """
-        return db.fetch_all(query, (il_y_a_7_jours,))
+        return db.fetch_all(query, plage_derniers_jours(7))
     
     @staticmethod
     def rapport_journalier(date=None):
@@ -151,50 +181,39 @@ class Rapport:
             'top_produits': []
         }
         
+        plage = plage_jour(date)
         try:
-            # Stats globales du jour
-            query_stats = """
-                SELECT COUNT(*), COALESCE(SUM(total), 0)
-                FROM ventes
-                WHERE DATE(date_vente) = ?
+            # Stats globales du jour et nombre d'articles vendus
+            query_stats = f"""
+                SELECT COALESCE(SUM(nb_ventes), 0), COALESCE(SUM(ca), 0), COALESCE(SUM(nb_articles), 0)
+                FROM ventes_jour
+                WHERE {condition_plage('jour')}
             """
-            result = db.fetch_one(query_stats, (date,))
+            result = db.fetch_one(query_stats, plage)
             if result:
                 rapport['nb_ventes'] = result[0] or 0
                 rapport['ca_total'] = result[1] or 0
-            
-            # Nombre total d'articles vendus
-            query_articles = """
-                SELECT COALESCE(SUM(dv.quantite), 0)
-                FROM details_ventes dv
-                JOIN ventes v ON dv.vente_id = v.id
-                WHERE DATE(v.date_vente) = ?
-            """
-            result = db.fetch_one(query_articles, (date,))
-            if result:
-                rapport['nb_articles'] = result[0] or 0
+                rapport['nb_articles'] = result[2] or 0
             
             # Liste des ventes
-            query_ventes = """
+            query_ventes = f"""
                 SELECT numero_vente, date_vente, total, client
                 FROM ventes
-                WHERE DATE(date_vente) = ?
+                WHERE {condition_plage('date_vente')}
                 ORDER BY date_vente DESC
             """
-            rapport['ventes'] = db.fetch_all(query_ventes, (date,))
+            rapport['ventes'] = db.fetch_all(query_ventes, plage)
             
             # Top produits du jour
             query_top = """
-                SELECT p.nom, SUM(dv.quantite) as qte, SUM(dv.sous_total) as ca
-                FROM details_ventes dv
-                JOIN produits p ON dv.produit_id = p.id
-                JOIN ventes v ON dv.vente_id = v.id
-                WHERE DATE(v.date_vente) = ?
-                GROUP BY p.id
+                SELECT p.nom, vp.quantite as qte, vp.ca as ca
+                FROM ventes_produits_jour vp
+                JOIN produits p ON vp.produit_id = p.id
+                WHERE vp.jour = ?
                 ORDER BY qte DESC
                 LIMIT 10
             """
-            rapport['top_produits'] = db.fetch_all(query_top, (date,))
+            rapport['top_produits'] = db.fetch_all(query_top, (plage[0],))
             
         except Exception as e:
             print(f"❌ Erreur rapport journalier: {e}")
@@ -241,13 +260,13 @@ class Rapport:
         aujourd_hui = datetime.now().strftime("%Y-%m-%d")
         hier = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
 
-        query = """
-            SELECT DATE(date_vente) as jour, COUNT(*) as nb, COALESCE(SUM(total), 0) as ca
-            FROM ventes
-            WHERE DATE(date_vente) IN (?, ?)
-            GROUP BY DATE(date_vente)
+        query = f"""
+            SELECT jour, SUM(nb_ventes) as nb, COALESCE(SUM(ca), 0) as ca
+            FROM ventes_jour
+            WHERE {condition_plage('jour')}
+            GROUP BY jour
         """
-        results = db.fetch_all(query, (aujourd_hui, hier))
+        results = db.fetch_all(query, plage_jours(hier, aujourd_hui))
 
         data = {'aujourd_hui': {'nb': 0, 'ca': 0}, 'hier': {'nb': 0, 'ca': 0}}
         for row in results:
@@ -267,24 +286,22 @@ class Rapport:
     def donnees_graphique_ventes(periode='semaine'):
         """Donnees formatees pour graphique matplotlib: list de (label, ca)"""
         if periode == 'jour':
-            aujourd_hui = datetime.now().strftime("%Y-%m-%d")
-            query = """
-                SELECT strftime('%H', date_vente) as heure, COALESCE(SUM(total), 0)
-                FROM ventes WHERE DATE(date_vente) = ?
+            query = f"""
+                SELECT heure, COALESCE(SUM(ca), 0)
+                FROM ventes_jour WHERE {condition_plage('jour')}
                 GROUP BY heure ORDER BY heure
             """
-            results = db.fetch_all(query, (aujourd_hui,))
-            return [(f"{r[0]}h", r[1]) for r in results]
+            results = db.fetch_all(query, plage_jour())
+            return [(f"{r[0]:02d}h", r[1]) for r in results]
         elif periode == 'semaine':
             data = Rapport.evolution_ventes_7_jours()
             return [(r[0][-5:], r[2]) for r in data]
         elif periode == 'mois':
-            debut_mois = datetime.now().replace(day=1).strftime("%Y-%m-%d")
-            query = """
-                SELECT DATE(date_vente), COALESCE(SUM(total), 0)
-                FROM ventes WHERE date_vente >= ?
-                GROUP BY DATE(date_vente) ORDER BY DATE(date_vente)
+            query = f"""
+                SELECT jour, COALESCE(SUM(ca), 0)
+                FROM ventes_jour WHERE {condition_plage('jour')}
+                GROUP BY jour ORDER BY jour
             """
-            results = db.fetch_all(query, (debut_mois,))
+            results = db.fetch_all(query, plage_mois())
             return [(r[0][-2:], r[1]) for r in results]
         return []
\ No newline at end of file
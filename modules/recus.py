@@ -79,7 +79,7 @@ def _obtenir_infos_paiement(vente_id):
     """Recuperer les informations de paiement d'une vente (si disponibles)"""
     try:
         paiements = db.fetch_all(
-            "SELECT mode, montant, montant_recu, monnaie_rendue, reference FROM paiements WHERE vente_id = ?",
+            "SELECT mode AS mode_paiement, montant, montant_recu, monnaie_rendue, reference FROM paiements WHERE vente_id = ?",
             (vente_id,)
         )
         return paiements
@@ -87,428 +87,462 @@ def _obtenir_infos_paiement(vente_id):
         return []
 
 
-def generer_recu_pdf(vente_id):
-    """
-    Générer un reçu PDF professionnel pour une vente
-    """
-    try:
-        # Récupérer les informations de la vente
-        vente = Vente.obtenir_vente(vente_id)
-        if not vente:
-            logger.error("Vente introuvable")
-            return None
-
-        details = Vente.obtenir_details_vente(vente_id)
-        if not details:
-            logger.error("Aucun detail de vente")
-            return None
-
-        # Informations vente
-        numero_vente = vente['numero_vente']
-        date_vente = vente['date_vente']
-        total = vente['total']
-        client = vente['client'] if vente['client'] else ""
-
-        # Informations boutique
-        nom_boutique = db.get_parametre('boutique_nom', BOUTIQUE_NOM)
-        adresse = db.get_parametre('boutique_adresse', BOUTIQUE_ADRESSE)
-        telephone = db.get_parametre('boutique_telephone', BOUTIQUE_TELEPHONE)
-
-        # Créer le PDF
-        filename = f"recu_{numero_vente}.pdf"
-        filepath = os.path.join(RECUS_DIR, filename)
-
-        # Configuration du document (format ticket de caisse)
-        doc = SimpleDocTemplate(
-            filepath,
-            pagesize=A4,
-            rightMargin=2*cm,
-            leftMargin=2*cm,
-            topMargin=1.5*cm,
-            bottomMargin=1.5*cm
-        )
-
-        elements = []
-        styles = getSampleStyleSheet()
-
-        # ==========================================
-        # STYLES PERSONNALISÉS
-        # ==========================================
-
-        # Style titre boutique
-        style_boutique = ParagraphStyle(
-            'Boutique',
-            parent=styles['Heading1'],
-            fontSize=20,
-            textColor=colors.HexColor('#1F2937'),
-            spaceAfter=5,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
-
-        # Style info boutique
-        style_info = ParagraphStyle(
-            'Info',
-            parent=styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#6B7280'),
-            alignment=TA_CENTER,
-            spaceAfter=3
-        )
-
-        # Style numéro reçu
-        style_numero = ParagraphStyle(
-            'Numero',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#10B981'),
-            spaceAfter=10,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
+def collecter_donnees_recu(vente_id):
+    """Lire en base tout ce qu'affiche le recu (a appeler sur le thread de db).
 
-        # ==========================================
-        # EN-TÊTE AVEC LOGO
-        # ==========================================
-
-        # Vérifier si un logo existe
-        logo_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'images', 'logo.png')
-
-        if os.path.exists(logo_path):
-            # AVEC LOGO : Disposition logo à gauche + infos à droite
-            logo_img = Image(logo_path, width=3*cm, height=3*cm)
-
-            info_boutique = [
-                [Paragraph(nom_boutique.upper(), style_boutique)],
-                [Paragraph(adresse, style_info)],
-                [Paragraph(f"Tél: {telephone}", style_info)]
-            ]
-
-            info_table = Table(info_boutique, colWidths=[13*cm])
-            info_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
-
-            header_data = [[logo_img, info_table]]
-            header_table = Table(header_data, colWidths=[3*cm, 13*cm])
-            header_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (0, -1), 0),
-                ('RIGHTPADDING', (1, 0), (-1, -1), 0),
-            ]))
-
-            elements.append(header_table)
-
-        else:
-            # SANS LOGO : Disposition classique centrée
-            elements.append(Paragraph(nom_boutique.upper(), style_boutique))
-            elements.append(Paragraph(adresse, style_info))
-            elements.append(Paragraph(f"Tél: {telephone}", style_info))
+    Retourne un dict de valeurs simples, utilisable depuis un autre thread
+    par rendre_recu_pdf, ou None si la vente est introuvable ou sans details.
+    """
+    vente = Vente.obtenir_vente(vente_id)
+    if not vente:
+        logger.error("Vente introuvable")
+        return None
 
-        elements.append(Spacer(1, 0.7*cm))
+    details = Vente.obtenir_details_vente(vente_id)
+    if not details:
+        logger.error("Aucun detail de vente")
+        return None
 
-        # Titre "REÇU DE VENTE"
-        titre_recu = ParagraphStyle(
-            'TitreRecu',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#1F2937'),
-            spaceAfter=15,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
-        elements.append(Paragraph("REÇU DE VENTE", titre_recu))
+    from modules.fiscalite import Fiscalite
+
+    # Informations client enrichies (telephone, points fidelite)
+    client_info = db.fetch_one(
+        "SELECT c.nom, c.telephone, c.points_fidelite FROM clients c "
+        "JOIN ventes v ON v.client_id = c.id WHERE v.id = ?", (vente_id,))
+
+    return {
+        'vente_id': vente_id,
+        'numero_vente': vente['numero_vente'],
+        'date_vente': vente['date_vente'],
+        'total': vente['total'],
+        'client': vente['client'] or "",
+        'details': [dict(d) for d in details],
+        'boutique': {
+            'nom': db.get_parametre('boutique_nom', BOUTIQUE_NOM),
+            'adresse': db.get_parametre('boutique_adresse', BOUTIQUE_ADRESSE),
+            'telephone': db.get_parametre('boutique_telephone', BOUTIQUE_TELEPHONE),
+        },
+        'client_info': dict(client_info) if client_info else None,
+        'tva': Fiscalite.calculer_tva(vente['total']) if Fiscalite.tva_active() else None,
+        'paiements': [dict(p) for p in _obtenir_infos_paiement(vente_id)],
+    }
+
+
+def rendre_recu_pdf(donnees):
+    """Mise en page ReportLab du recu a partir de collecter_donnees_recu.
+
+    Aucun acces a la base : peut tourner dans un thread de fond
+    (voir modules.file_recus). Leve une exception en cas d'echec.
+    """
+    numero_vente = donnees['numero_vente']
+    date_vente = donnees['date_vente']
+    total = donnees['total']
+    client = donnees['client']
+    nom_boutique = donnees['boutique']['nom']
+    adresse = donnees['boutique']['adresse']
+    telephone = donnees['boutique']['telephone']
+
+    # Créer le PDF
+    filename = f"recu_{numero_vente}.pdf"
+    filepath = os.path.join(RECUS_DIR, filename)
+
+    # Configuration du document (format ticket de caisse)
+    doc = SimpleDocTemplate(
+        filepath,
+        pagesize=A4,
+        rightMargin=2*cm,
+        leftMargin=2*cm,
+        topMargin=1.5*cm,
+        bottomMargin=1.5*cm
+    )
+
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # ==========================================
+    # STYLES PERSONNALISÉS
+    # ==========================================
+
+    # Style titre boutique
+    style_boutique = ParagraphStyle(
+        'Boutique',
+        parent=styles['Heading1'],
+        fontSize=20,
+        textColor=colors.HexColor('#1F2937'),
+        spaceAfter=5,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+
+    # Style info boutique
+    style_info = ParagraphStyle(
+        'Info',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#6B7280'),
+        alignment=TA_CENTER,
+        spaceAfter=3
+    )
+
+    # Style numéro reçu
+    style_numero = ParagraphStyle(
+        'Numero',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=colors.HexColor('#10B981'),
+        spaceAfter=10,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+
+    # ==========================================
+    # EN-TÊTE AVEC LOGO
+    # ==========================================
+
+    # Vérifier si un logo existe
+    logo_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'images', 'logo.png')
+
+    if os.path.exists(logo_path):
+        # AVEC LOGO : Disposition logo à gauche + infos à droite
+        logo_img = Image(logo_path, width=3*cm, height=3*cm)
+
+        info_boutique = [
+            [Paragraph(nom_boutique.upper(), style_boutique)],
+            [Paragraph(adresse, style_info)],
+            [Paragraph(f"Tél: {telephone}", style_info)]
+        ]
 
-        # Ligne de séparation décorative
-        sep_table = Table([['']], colWidths=[16*cm])
-        sep_table.setStyle(TableStyle([
-            ('LINEABOVE', (0, 0), (-1, 0), 2, colors.HexColor('#E5E7EB')),
-            ('LINEBELOW', (0, 0), (-1, 0), 2, colors.HexColor('#E5E7EB')),
+        info_table = Table(info_boutique, colWidths=[13*cm])
+        info_table.setStyle(TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ]))
-        elements.append(sep_table)
-
-        elements.append(Spacer(1, 0.5*cm))
-
-        # ==========================================
-        # NUMÉRO DE REÇU ET BADGE SUCCÈS
-        # ==========================================
-
-        elements.append(Paragraph(f"REÇU N° {numero_vente}", style_numero))
 
-        badge_style = ParagraphStyle(
-            'Badge',
-            parent=styles['Normal'],
-            fontSize=11,
-            textColor=colors.HexColor('#059669'),
-            alignment=TA_CENTER,
-            spaceAfter=15,
-            fontName='Helvetica-Bold'
-        )
-        elements.append(Paragraph("✓ VENTE ENREGISTRÉE", badge_style))
-
-        elements.append(Spacer(1, 0.3*cm))
-
-        # ==========================================
-        # INFORMATIONS VENTE (tableau simple)
-        # ==========================================
+        header_data = [[logo_img, info_table]]
+        header_table = Table(header_data, colWidths=[3*cm, 13*cm])
+        header_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (0, -1), 0),
+            ('RIGHTPADDING', (1, 0), (-1, -1), 0),
+        ]))
 
-        try:
-            dt = datetime.strptime(date_vente, "%Y-%m-%d %H:%M:%S")
-            date_formatee = dt.strftime("%d/%m/%Y %H:%M")
-        except Exception:
-            date_formatee = date_vente
+        elements.append(header_table)
+
+    else:
+        # SANS LOGO : Disposition classique centrée
+        elements.append(Paragraph(nom_boutique.upper(), style_boutique))
+        elements.append(Paragraph(adresse, style_info))
+        elements.append(Paragraph(f"Tél: {telephone}", style_info))
+
+    elements.append(Spacer(1, 0.7*cm))
+
+    # Titre "REÇU DE VENTE"
+    titre_recu = ParagraphStyle(
+        'TitreRecu',
+        parent=styles['Heading1'],
+        fontSize=18,
+        textColor=colors.HexColor('#1F2937'),
+        spaceAfter=15,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+    elements.append(Paragraph("REÇU DE VENTE", titre_recu))
+
+    # Ligne de séparation décorative
+    sep_table = Table([['']], colWidths=[16*cm])
+    sep_table.setStyle(TableStyle([
+        ('LINEABOVE', (0, 0), (-1, 0), 2, colors.HexColor('#E5E7EB')),
+        ('LINEBELOW', (0, 0), (-1, 0), 2, colors.HexColor('#E5E7EB')),
+    ]))
+    elements.append(sep_table)
+
+    elements.append(Spacer(1, 0.5*cm))
+
+    # ==========================================
+    # NUMÉRO DE REÇU ET BADGE SUCCÈS
+    # ==========================================
+
+    elements.append(Paragraph(f"REÇU N° {numero_vente}", style_numero))
+
+    badge_style = ParagraphStyle(
+        'Badge',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=colors.HexColor('#059669'),
+        alignment=TA_CENTER,
+        spaceAfter=15,
+        fontName='Helvetica-Bold'
+    )
+    elements.append(Paragraph("✓ VENTE ENREGISTRÉE", badge_style))
+
+    elements.append(Spacer(1, 0.3*cm))
+
+    # ==========================================
+    # INFORMATIONS VENTE (tableau simple)
+    # ==========================================
 
-        info_data = [
-            ['Numéro de vente:', numero_vente],
-            ['Date:', date_formatee]
+    try:
+        dt = datetime.strptime(date_vente, "%Y-%m-%d %H:%M:%S")
+        date_formatee = dt.strftime("%d/%m/%Y %H:%M")
+    except Exception:
+        date_formatee = date_vente
+
+    info_data = [
+        ['Numéro de vente:', numero_vente],
+        ['Date:', date_formatee]
+    ]
+
+    if client:
+        info_data.append(['Client:', client])
+
+    # Informations client enrichies (telephone, points fidelite)
+    client_info = donnees['client_info']
+    if client_info:
+        if client_info['telephone']:
+            info_data.append(['Tel. client:', client_info['telephone']])
+        info_data.append(['Points fidelite:', str(client_info['points_fidelite'])])
+
+    info_table = Table(info_data, colWidths=[5*cm, 11*cm])
+    info_table.setStyle(TableStyle([
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+        ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('LEFTPADDING', (0, 0), (-1, -1), 10),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (-1, -1), 'Helvetica'),
+    ]))
+    elements.append(info_table)
+
+    elements.append(Spacer(1, 0.7*cm))
+
+    # ==========================================
+    # TITRE "ARTICLES VENDUS"
+    # ==========================================
+
+    titre_articles = ParagraphStyle(
+        'TitreArticles',
+        parent=styles['Heading3'],
+        fontSize=13,
+        textColor=colors.HexColor('#1F2937'),
+        spaceAfter=10,
+        fontName='Helvetica-Bold'
+    )
+    elements.append(Paragraph("ARTICLES VENDUS", titre_articles))
+
+    # ==========================================
+    # TABLEAU DES PRODUITS
+    # ==========================================
+
+    data = [['Article', 'Qté', 'Prix unit.', 'Total']]
+
+    for detail in donnees['details']:
+        nom = detail['nom']
+        quantite = detail['quantite']
+        prix_unit = detail['prix_unitaire']
+        sous_total = detail['sous_total']
+
+        data.append([
+            nom,
+            str(quantite),
+            f"{prix_unit:,.0f} FCFA",
+            f"{sous_total:,.0f} FCFA"
+        ])
+
+    table = Table(data, colWidths=[8*cm, 2*cm, 3*cm, 3*cm])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3B82F6')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
+        ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+        ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('LEFTPADDING', (0, 0), (-1, -1), 10),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ]))
+
+    elements.append(table)
+    elements.append(Spacer(1, 0.3*cm))
+
+    # ==========================================
+    # TVA (si active)
+    # ==========================================
+
+    decomp = donnees['tva']
+    if decomp:
+        tva_data = [
+            ['Sous-total HT', f"{decomp['ht']:,.0f} FCFA"],
+            [f"TVA ({decomp['taux']:.0f}%)", f"{decomp['tva']:,.0f} FCFA"],
         ]
 
-        if client:
-            info_data.append(['Client:', client])
-
-        # Informations client enrichies (telephone, points fidelite)
-        client_info = db.fetch_one(
-            "SELECT c.nom, c.telephone, c.points_fidelite FROM clients c "
-            "JOIN ventes v ON v.client_id = c.id WHERE v.id = ?", (vente_id,))
-        if client_info:
-            if client_info['telephone']:
-                info_data.append(['Tel. client:', client_info['telephone']])
-            info_data.append(['Points fidelite:', str(client_info['points_fidelite'])])
-
-        info_table = Table(info_data, colWidths=[5*cm, 11*cm])
-        info_table.setStyle(TableStyle([
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),
-            ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.black),
+        tva_table = Table(tva_data, colWidths=[13*cm, 3*cm])
+        tva_table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+            ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
             ('LEFTPADDING', (0, 0), (-1, -1), 10),
             ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (-1, -1), 'Helvetica'),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('BOX', (0, 0), (-1, -1), 0.5, colors.HexColor('#E5E7EB')),
+            ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#E5E7EB')),
         ]))
-        elements.append(info_table)
-
-        elements.append(Spacer(1, 0.7*cm))
-
-        # ==========================================
-        # TITRE "ARTICLES VENDUS"
-        # ==========================================
+        elements.append(tva_table)
+        elements.append(Spacer(1, 0.1*cm))
+
+    # ==========================================
+    # TOTAL (fond vert)
+    # ==========================================
+
+    total_label = "TOTAL TTC" if decomp else "TOTAL A PAYER"
+    total_data = [[total_label, f"{total:,.0f} FCFA"]]
+
+    total_table = Table(total_data, colWidths=[13*cm, 3*cm])
+    total_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#10B981')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 10),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+        ('TOPPADDING', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+    ]))
+    elements.append(total_table)
+
+    # ==========================================
+    # INFORMATIONS DE PAIEMENT
+    # ==========================================
+
+    paiements = donnees['paiements']
+    if paiements:
+        elements.append(Spacer(1, 0.5*cm))
 
-        titre_articles = ParagraphStyle(
-            'TitreArticles',
+        style_paiement_titre = ParagraphStyle(
+            'PaiementTitre',
             parent=styles['Heading3'],
-            fontSize=13,
+            fontSize=12,
             textColor=colors.HexColor('#1F2937'),
-            spaceAfter=10,
+            spaceAfter=8,
             fontName='Helvetica-Bold'
         )
-        elements.append(Paragraph("ARTICLES VENDUS", titre_articles))
-
-        # ==========================================
-        # TABLEAU DES PRODUITS
-        # ==========================================
-
-        data = [['Article', 'Qté', 'Prix unit.', 'Total']]
-
-        for detail in details:
-            nom = detail['nom']
-            quantite = detail['quantite']
-            prix_unit = detail['prix_unitaire']
-            sous_total = detail['sous_total']
-
-            data.append([
-                nom,
-                str(quantite),
-                f"{prix_unit:,.0f} FCFA",
-                f"{sous_total:,.0f} FCFA"
-            ])
-
-        table = Table(data, colWidths=[8*cm, 2*cm, 3*cm, 3*cm])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3B82F6')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),
-            ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
-
-        elements.append(table)
-        elements.append(Spacer(1, 0.3*cm))
-
-        # ==========================================
-        # TVA (si active)
-        # ==========================================
-
-        from modules.fiscalite import Fiscalite
-
-        if Fiscalite.tva_active():
-            decomp = Fiscalite.calculer_tva(total)
-            tva_data = [
-                ['Sous-total HT', f"{decomp['ht']:,.0f} FCFA"],
-                [f"TVA ({decomp['taux']:.0f}%)", f"{decomp['tva']:,.0f} FCFA"],
-            ]
-
-            tva_table = Table(tva_data, colWidths=[13*cm, 3*cm])
-            tva_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-                ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+        elements.append(Paragraph("MODE DE PAIEMENT", style_paiement_titre))
+
+        mode_labels = {
+            'especes': 'Espèces',
+            'orange_money': 'Orange Money',
+            'mtn_momo': 'MTN MoMo',
+            'moov_money': 'Moov Money',
+        }
+
+        paiement_data = []
+        for p in paiements:
+            mode = mode_labels.get(p['mode_paiement'], p['mode_paiement'])
+            montant = p['montant']
+            montant_recu = p['montant_recu']
+            monnaie_rendue = p['monnaie_rendue']
+            reference = p['reference']
+
+            paiement_data.append([f"Paiement {mode}:", f"{montant:,.0f} FCFA"])
+            if p['mode_paiement'] == 'especes' and montant_recu and monnaie_rendue:
+                paiement_data.append(["Montant reçu:", f"{montant_recu:,.0f} FCFA"])
+                paiement_data.append(["Monnaie rendue:", f"{monnaie_rendue:,.0f} FCFA"])
+            if reference:
+                paiement_data.append(["Référence:", reference])
+
+        if paiement_data:
+            p_table = Table(paiement_data, colWidths=[5*cm, 11*cm])
+            p_table.setStyle(TableStyle([
+                ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#E5E7EB')),
+                ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#E5E7EB')),
                 ('LEFTPADDING', (0, 0), (-1, -1), 10),
                 ('RIGHTPADDING', (0, 0), (-1, -1), 10),
                 ('TOPPADDING', (0, 0), (-1, -1), 6),
                 ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('BOX', (0, 0), (-1, -1), 0.5, colors.HexColor('#E5E7EB')),
-                ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#E5E7EB')),
-            ]))
-            elements.append(tva_table)
-            elements.append(Spacer(1, 0.1*cm))
-
-        # ==========================================
-        # TOTAL (fond vert)
-        # ==========================================
-
-        total_label = "TOTAL TTC" if Fiscalite.tva_active() else "TOTAL A PAYER"
-        total_data = [[total_label, f"{total:,.0f} FCFA"]]
-
-        total_table = Table(total_data, colWidths=[13*cm, 3*cm])
-        total_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#10B981')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-            ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ]))
-        elements.append(total_table)
-
-        # ==========================================
-        # INFORMATIONS DE PAIEMENT
-        # ==========================================
-
-        paiements = _obtenir_infos_paiement(vente_id)
-        if paiements:
-            elements.append(Spacer(1, 0.5*cm))
-
-            style_paiement_titre = ParagraphStyle(
-                'PaiementTitre',
-                parent=styles['Heading3'],
-                fontSize=12,
-                textColor=colors.HexColor('#1F2937'),
-                spaceAfter=8,
-                fontName='Helvetica-Bold'
-            )
-            elements.append(Paragraph("MODE DE PAIEMENT", style_paiement_titre))
-
-            mode_labels = {
-                'especes': 'Espèces',
-                'orange_money': 'Orange Money',
-                'mtn_momo': 'MTN MoMo',
-                'moov_money': 'Moov Money',
-            }
-
-            paiement_data = []
-            for p in paiements:
-                mode = mode_labels.get(p['mode_paiement'], p['mode_paiement'])
-                montant = p['montant']
-                montant_recu = p['montant_recu']
-                monnaie_rendue = p['monnaie_rendue']
-                reference = p['reference']
-
-                paiement_data.append([f"Paiement {mode}:", f"{montant:,.0f} FCFA"])
-                if p['mode_paiement'] == 'especes' and montant_recu and monnaie_rendue:
-                    paiement_data.append(["Montant reçu:", f"{montant_recu:,.0f} FCFA"])
-                    paiement_data.append(["Monnaie rendue:", f"{monnaie_rendue:,.0f} FCFA"])
-                if reference:
-                    paiement_data.append(["Référence:", reference])
-
-            if paiement_data:
-                p_table = Table(paiement_data, colWidths=[5*cm, 11*cm])
-                p_table.setStyle(TableStyle([
-                    ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#E5E7EB')),
-                    ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#E5E7EB')),
-                    ('LEFTPADDING', (0, 0), (-1, -1), 10),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-                    ('TOPPADDING', (0, 0), (-1, -1), 6),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                    ('FONTNAME', (1, 0), (-1, -1), 'Helvetica'),
-                    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#F9FAFB')),
-                ]))
-                elements.append(p_table)
-
-        # ==========================================
-        # QR CODE
-        # ==========================================
-
-        qr_img = generer_qr_code_image(numero_vente, taille=3.5*cm)
-        if qr_img:
-            elements.append(Spacer(1, 0.5*cm))
-
-            # QR code centre dans un tableau
-            qr_label = ParagraphStyle(
-                'QRLabel',
-                parent=styles['Normal'],
-                fontSize=8,
-                textColor=colors.HexColor('#9CA3AF'),
-                alignment=TA_CENTER,
-                spaceBefore=4,
-            )
-
-            qr_data = [
-                [qr_img],
-                [Paragraph("Scannez pour vérifier ce reçu", qr_label)]
-            ]
-            qr_table = Table(qr_data, colWidths=[16*cm])
-            qr_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                ('FONTNAME', (1, 0), (-1, -1), 'Helvetica'),
+                ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#F9FAFB')),
             ]))
-            elements.append(qr_table)
+            elements.append(p_table)
 
-        # ==========================================
-        # PIED DE PAGE
-        # ==========================================
+    # ==========================================
+    # QR CODE
+    # ==========================================
 
-        elements.append(Spacer(1, 0.8*cm))
+    qr_img = generer_qr_code_image(numero_vente, taille=3.5*cm)
+    if qr_img:
+        elements.append(Spacer(1, 0.5*cm))
 
-        footer_style = ParagraphStyle(
-            'Footer',
+        # QR code centre dans un tableau
+        qr_label = ParagraphStyle(
+            'QRLabel',
             parent=styles['Normal'],
-            fontSize=10,
+            fontSize=8,
+            textColor=colors.HexColor('#9CA3AF'),
             alignment=TA_CENTER,
-            spaceAfter=3
+            spaceBefore=4,
         )
 
-        elements.append(Paragraph("Merci pour votre confiance !", footer_style))
-        elements.append(Paragraph(f"Ce reçu a été généré automatiquement par {nom_boutique}", footer_style))
+        qr_data = [
+            [qr_img],
+            [Paragraph("Scannez pour vérifier ce reçu", qr_label)]
+        ]
+        qr_table = Table(qr_data, colWidths=[16*cm])
+        qr_table.setStyle(TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+        elements.append(qr_table)
 
-        # ==========================================
-        # CONSTRUIRE LE PDF
-        # ==========================================
+    # ==========================================
+    # PIED DE PAGE
+    # ==========================================
 
-        doc.build(
-            elements,
-            onFirstPage=ajouter_filigrane_footer,
-            onLaterPages=ajouter_filigrane_footer
-        )
+    elements.append(Spacer(1, 0.8*cm))
+
+    footer_style = ParagraphStyle(
+        'Footer',
+        parent=styles['Normal'],
+        fontSize=10,
+        alignment=TA_CENTER,
+        spaceAfter=3
+    )
+
+    elements.append(Paragraph("Merci pour votre confiance !", footer_style))
+    elements.append(Paragraph(f"Ce reçu a été généré automatiquement par {nom_boutique}", footer_style))
+
+    # ==========================================
+    # CONSTRUIRE LE PDF
+    # ==========================================
+
+    doc.build(
+        elements,
+        onFirstPage=ajouter_filigrane_footer,
+        onLaterPages=ajouter_filigrane_footer
+    )
+
+    logger.info(f"Recu PDF genere: {filepath}")
+    return filepath
 
-        logger.info(f"Recu PDF genere: {filepath}")
-        return filepath
 
+def generer_recu_pdf(vente_id):
+    """
+    Générer un reçu PDF professionnel pour une vente (synchrone)
+    """
+    try:
+        donnees = collecter_donnees_recu(vente_id)
+        if not donnees:
+            return None
+        return rendre_recu_pdf(donnees)
     except Exception as e:
         logger.error(f"Erreur lors de la generation du recu: {e}")
         import traceback
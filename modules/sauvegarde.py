@@ -3,6 +3,7 @@ Module de sauvegarde et restauration
 """
 import os
 import shutil
+import sqlite3
 import zipfile
 import threading
 from datetime import datetime
@@ -21,6 +22,38 @@ def _assurer_dossier_backup():
         os.makedirs(BACKUP_DIR, exist_ok=True)
 
 
+def _supprimer_fichiers_wal(chemin_db):
+    """Supprimer les fichiers -wal/-shm orphelins (base fermee) avant remplacement"""
+    for suffixe in ('-wal', '-shm'):
+        chemin = f"{chemin_db}{suffixe}"
+        if os.path.exists(chemin):
+            try:
+                os.remove(chemin)
+            except Exception as e:
+                logger.warning(f"Impossible de supprimer {chemin}: {e}")
+
+
+def _copier_base(destination):
+    """Copie coherente de la base dans destination (API de sauvegarde SQLite).
+
+    Une connexion a part lit un instantane : transactions encore dans le WAL
+    comprises, et une ecriture d'un autre thread pendant la copie n'y
+    apparait pas a moitie. Ecrite a cote puis renommee : pas de fichier
+    tronque a la place de destination en cas d'echec.
+    """
+    temporaire = f"{destination}.tmp"
+    source = sqlite3.connect(config.DB_PATH)
+    try:
+        cible = sqlite3.connect(temporaire)
+        try:
+            source.backup(cible)
+        finally:
+            cible.close()
+    finally:
+        source.close()
+    os.replace(temporaire, destination)
+
+
 def sauvegarder_locale():
     """Sauvegarder la base de donnees avec timestamp.
     Garde les N dernieres sauvegardes (defaut 10).
@@ -33,7 +66,7 @@ def sauvegarder_locale():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_file = os.path.join(BACKUP_DIR, f"boutique_{timestamp}.db")
 
-        shutil.copy2(config.DB_PATH, backup_file)
+        _copier_base(backup_file)
         logger.info(f"Sauvegarde locale creee: {backup_file}")
 
         # Nettoyage des anciennes sauvegardes
@@ -122,12 +155,16 @@ def restaurer(chemin_backup):
         # Fermer la connexion
         db.close()
 
-        # Remplacer le fichier
+        # Remplacer le fichier (un WAL residuel serait rejoue sur la base restauree)
+        _supprimer_fichiers_wal(config.DB_PATH)
         shutil.copy2(chemin_backup, config.DB_PATH)
 
         # Rouvrir la connexion
         db.connect()
         db.create_tables()
+        # Les seq du journal repartent en arriere : nouveau journal pour le serveur
+        from modules import journal
+        journal.renouveler_identifiant()
 
         logger.info(f"Restauration reussie depuis: {chemin_backup}")
         return True, "Restauration reussie! L'application va se recharger."
@@ -155,9 +192,14 @@ def exporter_zip():
         zip_path = os.path.join(BACKUP_DIR, f"export_{timestamp}.zip")
 
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            # Base de donnees
+            # Base de donnees : instantane coherent, pas le fichier vivant
             if os.path.exists(config.DB_PATH):
-                zf.write(config.DB_PATH, os.path.join('data', 'boutique.db'))
+                instantane = f"{zip_path}.db"
+                _copier_base(instantane)
+                try:
+                    zf.write(instantane, os.path.join('data', 'boutique.db'))
+                finally:
+                    os.remove(instantane)
 
             # Images
             if os.path.exists(config.IMAGES_DIR):
@@ -209,15 +251,16 @@ def importer_zip(chemin_zip):
 
             # Fermer la connexion avant remplacement
             db.close()
+            _supprimer_fichiers_wal(config.DB_PATH)
 
             # Extraire les fichiers
             for nom in noms:
                 if nom.startswith('data/'):
-                    dest = os.path.join(BASE_DIR, nom)
+                    dest = os.path.join(config.BASE_DIR, nom)
                 elif nom.startswith('images/'):
-                    dest = os.path.join(BASE_DIR, nom)
+                    dest = os.path.join(config.BASE_DIR, nom)
                 elif nom.startswith('recus/'):
-                    dest = os.path.join(BASE_DIR, nom)
+                    dest = os.path.join(config.BASE_DIR, nom)
                 else:
                     continue
 
@@ -231,6 +274,8 @@ def importer_zip(chemin_zip):
             # Rouvrir la connexion
             db.connect()
             db.create_tables()
+            from modules import journal
+            journal.renouveler_identifiant()
 
         logger.info(f"Import ZIP reussi depuis: {chemin_zip}")
         return True, "Import reussi! L'application va se recharger."
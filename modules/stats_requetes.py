@@ -0,0 +1,97 @@
+"""
+Statistiques d'execution des requetes SQL, par gabarit
+
+Les requetes construites a la volee (filtres optionnels, listes IN,
+valeurs ecrites en dur) sont ramenees a un gabarit : espaces normalises,
+litteraux remplaces par ?, listes IN (?, ?, ...) reduites a IN (?...).
+Pour chaque gabarit : nombre d'appels, temps total et maximum, lignes
+retournees (lectures) ou modifiees (ecritures).
+
+    db.statistiques.top(20)                      # les plus couteuses
+    db.statistiques.top(20, tri='appels')
+    db.statistiques.reinitialiser()
+
+Le nombre de gabarits est borne : au-dela, les appels sont comptes dans
+AUTRES, ce qui signale un constructeur de requetes a revoir.
+"""
+import re
+import threading
+
+AUTRES = "(autres gabarits)"
+
+TRIS = ('temps_total_ms', 'appels', 'temps_moyen_ms', 'temps_max_ms', 'lignes')
+
+_CHAINES = re.compile(r"'(?:[^']|'')*'")
+_NOMBRES = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LISTES_IN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACES = re.compile(r"\s+")
+
+
+def gabarit_requete(sql):
+    """Forme normalisee d'une requete (voir le docstring du module)"""
+    sql = _CHAINES.sub("?", sql)
+    sql = _NOMBRES.sub("?", sql)
+    sql = _LISTES_IN.sub("(?...)", sql)
+    return _ESPACES.sub(" ", sql).strip()
+
+
+class StatistiquesRequetes:
+    """Compteurs par gabarit, partages par tous les threads"""
+
+    def __init__(self, max_gabarits=500, taille_cache=2000):
+        self.actif = True
+        self.max_gabarits = max_gabarits
+        self.taille_cache = taille_cache
+        self._verrou = threading.Lock()
+        self._gabarits = {}   # texte SQL -> gabarit (evite les regex a chaque appel)
+        self._compteurs = {}  # gabarit -> [appels, temps total (s), temps max (s), lignes]
+
+    def _gabarit(self, sql):
+        gabarit = self._gabarits.get(sql)
+        if gabarit is None:
+            gabarit = gabarit_requete(sql)
+            if len(self._gabarits) >= self.taille_cache:
+                self._gabarits.clear()
+            self._gabarits[sql] = gabarit
+        return gabarit
+
+    def enregistrer(self, sql, duree, lignes):
+        """Compter un appel : duree en secondes, lignes lues ou modifiees"""
+        if not self.actif:
+            return
+        with self._verrou:
+            gabarit = self._gabarit(sql)
+            compteur = self._compteurs.get(gabarit)
+            if compteur is None:
+                if len(self._compteurs) >= self.max_gabarits:
+                    gabarit = AUTRES
+                compteur = self._compteurs.setdefault(gabarit, [0, 0.0, 0.0, 0])
+            compteur[0] += 1
+            compteur[1] += duree
+            if duree > compteur[2]:
+                compteur[2] = duree
+            compteur[3] += max(lignes, 0)
+
+    def top(self, n=20, tri='temps_total_ms'):
+        """Les n gabarits en tete selon tri (un des TRIS), en dicts"""
+        if tri not in TRIS:
+            raise ValueError(f"Tri inconnu : {tri}")
+        with self._verrou:
+            lignes = [{
+                'gabarit': gabarit,
+                'appels': appels,
+                'temps_total_ms': total * 1000,
+                'temps_moyen_ms': total * 1000 / appels,
+                'temps_max_ms': maximum * 1000,
+                'lignes': nb_lignes,
+            } for gabarit, (appels, total, maximum, nb_lignes) in self._compteurs.items()]
+        lignes.sort(key=lambda ligne: ligne[tri], reverse=True)
+        return lignes[:n] if n else lignes
+
+    def nombre_gabarits(self):
+        with self._verrou:
+            return len(self._compteurs)
+
+    def reinitialiser(self):
+        with self._verrou:
+            self._compteurs.clear()
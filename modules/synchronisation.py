@@ -1,16 +1,17 @@
 """
 Systeme de synchronisation cloud-only
 Synchronise les donnees via le serveur PythonAnywhere
-Avec file d'attente hors-ligne
+Hors ligne, les changements restent dans le journal (modules.journal)
 """
 import requests
 import json
-import sqlite3
 import threading
 import time
 from datetime import datetime
 from database import db
-from config import DB_PATH, SYNC_SERVER_URL, SYNC_INTERVAL
+from config import SYNC_SERVER_URL, SYNC_INTERVAL
+from modules import format_sync, journal
+from modules.client_http import client_http
 from modules.logger import get_logger
 
 logger = get_logger('sync')
@@ -21,6 +22,10 @@ class Synchronisation:
         self.mode = 'offline'
         self._licence_key = None
         self._machine_id = None
+        # Format des envois accepte par le serveur (format_sync.negocier) :
+        # JSON tant qu'il ne l'a pas annonce
+        self._colonnes = False
+        self._encodage = None
 
     def _get_licence_info(self):
         """Recupere la cle de licence et le machine_id depuis le fichier licence local"""
@@ -67,14 +72,16 @@ class Synchronisation:
         db.set_parametre('dernier_sync', timestamp)
 
     def detecter_mode(self):
-        """Teste la connectivite au serveur cloud uniquement"""
+        """Teste la connectivite au serveur cloud (ecran de configuration ;
+        synchroniser() n'en a pas besoin : push et pull echouent vite hors ligne)"""
         try:
-            response = requests.get(
+            response = client_http.get(
+                'sync.ping',
                 f'{SYNC_SERVER_URL}/api/sync/ping',
-                headers=self._get_headers(),
-                timeout=5
+                headers=self._get_headers()
             )
             if response.status_code == 200:
+                self._negocier(response)
                 self.mode = 'cloud'
                 return 'cloud'
         except Exception:
@@ -85,24 +92,26 @@ class Synchronisation:
 
     def synchroniser(self):
         """Synchronise avec le serveur cloud (push puis pull)"""
-        mode = self.detecter_mode()
-
-        if mode == 'offline':
-            logger.info("Mode offline - synchronisation reportee")
-            return False
-
         try:
-            # 1. Vider la file d'attente en premier
+            # 1. Vider l'ancienne file d'attente en premier (plus ancienne que le journal)
             self._flush_queue()
 
-            # 2. Push : envoyer les changements locaux
+            # 2. Push : envoyer les changements locaux ; pas de ping prealable,
+            # un serveur injoignable fait echouer le push en quelques secondes
             succes_push = self._push()
 
+            if not succes_push and self.mode == 'offline':
+                logger.info("Serveur injoignable - synchronisation reportee")
+                return False
+
             # 3. Pull : recuperer les changements distants
             succes_pull = self._pull()
 
-            if succes_push or succes_pull:
+            # dernier_sync : point de reprise du pull seulement, le push
+            # reprend au dernier lot acquitte (modules.journal)
+            if succes_pull:
                 self._set_dernier_sync(datetime.now().isoformat())
+            if succes_push or succes_pull:
                 logger.info("Synchronisation cloud terminee")
                 return True
 
@@ -112,35 +121,49 @@ class Synchronisation:
             return False
 
     def _push(self):
-        """Envoie les changements locaux au serveur"""
-        try:
-            changements = self.obtenir_changements_locaux()
+        """Envoie les changements locaux au serveur, par lots acquittes.
 
-            if not any(changements.get(k) for k in ('produits', 'ventes', 'details_ventes', 'historique_stock', 'utilisateurs')):
-                return True
-
-            response = requests.post(
-                f'{SYNC_SERVER_URL}/api/sync/push',
-                headers=self._get_headers(),
-                json=changements,
-                timeout=15
-            )
-
-            if response.status_code == 200:
+        Les changements viennent du journal (modules.journal) : apres un
+        echec, le cycle suivant reprend apres le dernier lot acquitte.
+        """
+        try:
+            if journal.pousser(self._envoyer_lot, serialiser=self._serialiser):
                 logger.info("Push reussi")
                 return True
-            else:
-                logger.warning(f"Erreur push: {response.status_code}")
-                self._enqueue(changements)
-                return False
+            return False
         except Exception as e:
-            logger.error(f"Erreur push: {e}")
-            try:
-                self._enqueue(changements)
-            except Exception:
-                pass
+            logger.error(f"Erreur push (reprise au prochain cycle): {e}")
             return False
 
+    def _negocier(self, response):
+        """Retenir le format d'envoi annonce par le serveur"""
+        self._colonnes, self._encodage = format_sync.negocier(response.headers)
+
+    def _serialiser(self, changements):
+        return format_sync.encoder(changements, self._colonnes, self._encodage)[0]
+
+    def _poster(self, point, route, corps):
+        """POST d'un corps deja serialise (format negocie) -> (code HTTP, reponse decodee)
+
+        Met a jour self.mode : 'offline' si le serveur est injoignable.
+        """
+        headers = self._get_headers()
+        headers.update(format_sync.entetes_requete(format_sync.encodage_de(corps)))
+        try:
+            response = client_http.post(point, f'{SYNC_SERVER_URL}{route}', headers=headers, data=corps)
+        except (requests.ConnectionError, requests.Timeout):
+            self.mode = 'offline'
+            raise
+        self.mode = 'cloud'
+        self._negocier(response)
+        try:
+            return response.status_code, format_sync.decoder(response.content)
+        except (ValueError, OSError):
+            return response.status_code, {}
+
+    def _envoyer_lot(self, corps):
+        return self._poster('sync.push', '/api/sync/push', corps)
+
     def _pull(self):
         """Recupere les changements distants depuis le serveur"""
         try:
@@ -149,20 +172,14 @@ class Synchronisation:
                 'depuis': dernier_sync or '2000-01-01T00:00:00'
             }
 
-            response = requests.post(
-                f'{SYNC_SERVER_URL}/api/sync/pull',
-                headers=self._get_headers(),
-                json=payload,
-                timeout=15
-            )
+            code, data = self._poster('sync.pull', '/api/sync/pull', format_sync.encoder(payload)[0])
 
-            if response.status_code == 200:
-                data = response.json()
+            if code == 200:
                 self.appliquer_changements_distants(data)
                 logger.info("Pull reussi")
                 return True
             else:
-                logger.warning(f"Erreur pull: {response.status_code}")
+                logger.warning(f"Erreur pull: {code}")
                 return False
         except Exception as e:
             logger.error(f"Erreur pull: {e}")
@@ -170,20 +187,8 @@ class Synchronisation:
 
     # --- File d'attente hors-ligne ---
 
-    def _enqueue(self, changements):
-        """Stocker les changements en attente dans sync_queue"""
-        try:
-            data_json = json.dumps(changements, default=str)
-            db.execute_query(
-                "INSERT INTO sync_queue (action, table_name, data_json) VALUES (?, ?, ?)",
-                ('push', 'all', data_json)
-            )
-            logger.info("Changements mis en file d'attente")
-        except Exception as e:
-            logger.error(f"Erreur enqueue: {e}")
-
     def _flush_queue(self):
-        """Envoyer tous les changements en attente"""
+        """Envoyer les changements mis en attente avant le journal des changements"""
         try:
             queue = db.fetch_all("SELECT id, data_json FROM sync_queue ORDER BY created_at ASC")
             if not queue:
@@ -195,11 +200,11 @@ class Synchronisation:
                 item_id, data_json = item[0], item[1]
                 try:
                     changements = json.loads(data_json)
-                    response = requests.post(
+                    response = client_http.post(
+                        'sync.push',
                         f'{SYNC_SERVER_URL}/api/sync/push',
                         headers=self._get_headers(),
-                        json=changements,
-                        timeout=15
+                        json=changements
                     )
                     if response.status_code == 200:
                         db.execute_query("DELETE FROM sync_queue WHERE id = ?", (item_id,))
@@ -216,182 +221,13 @@ class Synchronisation:
     # --- Donnees locales ---
 
     def obtenir_changements_locaux(self):
-        """Recupere toutes les donnees modifiees depuis le dernier sync"""
-        dernier_sync = self._get_dernier_sync()
-        depuis = dernier_sync or '2000-01-01T00:00:00'
-
-        changements = {
-            'produits': [],
-            'ventes': [],
-            'details_ventes': [],
-            'historique_stock': [],
-            'utilisateurs': [],
-            'timestamp': datetime.now().isoformat()
-        }
-
-        # Produits modifies
-        produits = db.fetch_all(
-            "SELECT id, nom, categorie, prix_achat, prix_vente, stock_actuel, "
-            "stock_alerte, code_barre, type_code_barre, date_ajout, description, updated_at "
-            "FROM produits WHERE updated_at > ?",
-            (depuis,)
-        )
-        for p in produits:
-            changements['produits'].append({
-                'id': p[0], 'nom': p[1], 'categorie': p[2],
-                'prix_achat': p[3], 'prix_vente': p[4],
-                'stock_actuel': p[5], 'stock_alerte': p[6],
-                'code_barre': p[7], 'type_code_barre': p[8],
-                'date_ajout': p[9], 'description': p[10],
-                'updated_at': p[11]
-            })
-
-        # Ventes
-        ventes = db.fetch_all(
-            "SELECT id, numero_vente, date_vente, total, client, statut, deleted_at "
-            "FROM ventes WHERE date_vente > ?",
-            (depuis,)
-        )
-        for v in ventes:
-            changements['ventes'].append({
-                'id': v[0], 'numero_vente': v[1], 'date_vente': v[2],
-                'total': v[3], 'client': v[4], 'statut': v[5],
-                'deleted_at': v[6]
-            })
-
-        # Details des ventes liees
-        if changements['ventes']:
-            vente_ids = [v['id'] for v in changements['ventes']]
-            placeholders = ','.join('?' * len(vente_ids))
-            details = db.fetch_all(
-                f"SELECT id, vente_id, produit_id, quantite, prix_unitaire, sous_total "
-                f"FROM details_ventes WHERE vente_id IN ({placeholders})",
-                tuple(vente_ids)
-            )
-            for d in details:
-                changements['details_ventes'].append({
-                    'id': d[0], 'vente_id': d[1], 'produit_id': d[2],
-                    'quantite': d[3], 'prix_unitaire': d[4], 'sous_total': d[5]
-                })
-
-        # Historique stock
-        historique = db.fetch_all(
-            "SELECT id, produit_id, quantite_avant, quantite_apres, operation, date_operation "
-            "FROM historique_stock WHERE date_operation > ?",
-            (depuis,)
-        )
-        for h in historique:
-            changements['historique_stock'].append({
-                'id': h[0], 'produit_id': h[1],
-                'quantite_avant': h[2], 'quantite_apres': h[3],
-                'operation': h[4], 'date_operation': h[5]
-            })
-
-        # Utilisateurs modifies
-        utilisateurs = db.fetch_all(
-            "SELECT id, nom, prenom, email, mot_de_passe, role, actif, date_creation, dernier_login, updated_at "
-            "FROM utilisateurs WHERE updated_at > ?",
-            (depuis,)
-        )
-        for u in utilisateurs:
-            changements['utilisateurs'].append({
-                'id': u[0], 'nom': u[1], 'prenom': u[2],
-                'email': u[3], 'mot_de_passe': u[4], 'role': u[5],
-                'actif': u[6], 'date_creation': u[7],
-                'dernier_login': u[8], 'updated_at': u[9]
-            })
-
-        return changements
+        """Changements non acquittes depuis le journal (None s'il n'y en a pas)"""
+        return journal.changements_a_envoyer()
 
     def appliquer_changements_distants(self, data):
         """Applique les changements recus du serveur"""
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-
-            # Produits : last write wins
-            for p in data.get('produits', []):
-                existant = cursor.execute(
-                    "SELECT updated_at FROM produits WHERE code_barre = ?",
-                    (p['code_barre'],)
-                ).fetchone()
-
-                if existant and existant[0] and existant[0] > p.get('updated_at', ''):
-                    continue
-
-                cursor.execute('''
-                    INSERT INTO produits (nom, categorie, prix_achat, prix_vente, stock_actuel,
-                        stock_alerte, code_barre, type_code_barre, date_ajout, description, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(code_barre) DO UPDATE SET
-                        nom=excluded.nom, categorie=excluded.categorie,
-                        prix_achat=excluded.prix_achat, prix_vente=excluded.prix_vente,
-                        stock_actuel=excluded.stock_actuel, stock_alerte=excluded.stock_alerte,
-                        type_code_barre=excluded.type_code_barre, description=excluded.description,
-                        updated_at=excluded.updated_at
-                ''', (
-                    p['nom'], p['categorie'], p['prix_achat'], p['prix_vente'],
-                    p['stock_actuel'], p['stock_alerte'], p['code_barre'],
-                    p['type_code_barre'], p['date_ajout'], p['description'],
-                    p.get('updated_at', datetime.now().isoformat())
-                ))
-
-            # Ventes : INSERT OR IGNORE
-            for v in data.get('ventes', []):
-                cursor.execute('''
-                    INSERT OR IGNORE INTO ventes (numero_vente, date_vente, total, client, statut, deleted_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    v['numero_vente'], v['date_vente'], v['total'],
-                    v['client'], v['statut'], v.get('deleted_at')
-                ))
-
-            # Details ventes
-            for d in data.get('details_ventes', []):
-                vente_locale = cursor.execute(
-                    "SELECT id FROM ventes WHERE numero_vente = (SELECT numero_vente FROM ventes WHERE id = ? LIMIT 1)",
-                    (d['vente_id'],)
-                ).fetchone()
-
-                vente_id = vente_locale[0] if vente_locale else d['vente_id']
-                cursor.execute('''
-                    INSERT OR IGNORE INTO details_ventes (vente_id, produit_id, quantite, prix_unitaire, sous_total)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (vente_id, d['produit_id'], d['quantite'], d['prix_unitaire'], d['sous_total']))
-
-            # Historique stock
-            for h in data.get('historique_stock', []):
-                cursor.execute('''
-                    INSERT OR IGNORE INTO historique_stock (produit_id, quantite_avant, quantite_apres, operation, date_operation)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (h['produit_id'], h['quantite_avant'], h['quantite_apres'], h['operation'], h['date_operation']))
-
-            # Utilisateurs : last write wins
-            for u in data.get('utilisateurs', []):
-                existant = cursor.execute(
-                    "SELECT updated_at FROM utilisateurs WHERE email = ?",
-                    (u['email'],)
-                ).fetchone()
-
-                if existant and existant[0] and existant[0] > u.get('updated_at', ''):
-                    continue
-
-                cursor.execute('''
-                    INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe, role, actif, date_creation, dernier_login, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(email) DO UPDATE SET
-                        nom=excluded.nom, prenom=excluded.prenom,
-                        mot_de_passe=excluded.mot_de_passe, role=excluded.role,
-                        actif=excluded.actif, dernier_login=excluded.dernier_login,
-                        updated_at=excluded.updated_at
-                ''', (
-                    u['nom'], u['prenom'], u['email'], u['mot_de_passe'],
-                    u['role'], u['actif'], u['date_creation'],
-                    u['dernier_login'], u.get('updated_at', datetime.now().isoformat())
-                ))
-
-            conn.commit()
-            conn.close()
+            journal.appliquer_changements(data)
             logger.info("Changements distants appliques")
         except Exception as e:
             logger.error(f"Erreur application changements: {e}")
@@ -5,6 +5,7 @@ Fonctionne avec repos privés et publics
 import requests
 import webbrowser
 from packaging import version as pkg_version
+from modules.client_http import client_http
 from modules.logger import get_logger
 
 logger = get_logger('updater')
@@ -14,10 +15,6 @@ GITHUB_OWNER = "TIDJANI12345"
 GITHUB_REPO = "gestion-boutique"
 RELEASES_API = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/latest"
 
-# Timeout adapté aux réseaux africains (en secondes)
-TIMEOUT_VERIFICATION = 10
-RETRY_ATTEMPTS = 2
-
 
 class Updater:
     """Gestionnaire de vérification et téléchargement des mises à jour"""
@@ -35,55 +32,51 @@ class Updater:
                 - bool: True si nouvelle version disponible
                 - dict: Informations de la nouvelle version ou None
         """
-        for tentative in range(RETRY_ATTEMPTS):
-            try:
-                logger.info(f"Vérification des mises à jour (tentative {tentative + 1}/{RETRY_ATTEMPTS})...")
-
-                response = requests.get(
-                    RELEASES_API,
-                    timeout=TIMEOUT_VERIFICATION,
-                    headers={
-                        'Accept': 'application/vnd.github.v3+json',
-                        'Cache-Control': 'no-cache'
-                    }
-                )
-                response.raise_for_status()
-
-                release = response.json()
-                remote_info = Updater._parser_release(release)
-                remote_version = remote_info.get('version', '0.0.0')
-
-                logger.info(f"Version actuelle: {version_actuelle}, Version distante: {remote_version}")
-
-                if pkg_version.parse(remote_version) > pkg_version.parse(version_actuelle):
-                    logger.info(f"Nouvelle version disponible : {remote_version}")
-                    return True, remote_info
-                else:
-                    logger.info("Application à jour")
-                    return False, None
-
-            except requests.exceptions.Timeout:
-                logger.warning(f"Timeout (tentative {tentative + 1}/{RETRY_ATTEMPTS})")
-                if tentative < RETRY_ATTEMPTS - 1:
-                    continue
+        try:
+            logger.info("Vérification des mises à jour...")
+
+            # Tentatives et délais : modules.client_http (point 'updater.verifier')
+            response = client_http.get(
+                'updater.verifier',
+                RELEASES_API,
+                headers={
+                    'Accept': 'application/vnd.github.v3+json',
+                    'Cache-Control': 'no-cache'
+                }
+            )
+            response.raise_for_status()
+
+            release = response.json()
+            remote_info = Updater._parser_release(release)
+            remote_version = remote_info.get('version', '0.0.0')
+
+            logger.info(f"Version actuelle: {version_actuelle}, Version distante: {remote_version}")
+
+            if pkg_version.parse(remote_version) > pkg_version.parse(version_actuelle):
+                logger.info(f"Nouvelle version disponible : {remote_version}")
+                return True, remote_info
+            else:
+                logger.info("Application à jour")
                 return False, None
 
-            except requests.exceptions.ConnectionError:
-                logger.warning("Pas de connexion internet")
-                return False, None
+        except requests.exceptions.Timeout:
+            logger.warning("Timeout lors de la vérification des mises à jour")
+            return False, None
 
-            except requests.exceptions.HTTPError as e:
-                if e.response and e.response.status_code == 404:
-                    logger.info("Aucune release trouvée sur GitHub")
-                else:
-                    logger.error(f"Erreur HTTP : {e}")
-                return False, None
+        except requests.exceptions.ConnectionError:
+            logger.warning("Pas de connexion internet")
+            return False, None
 
-            except Exception as e:
-                logger.error(f"Erreur inattendue : {e}")
-                return False, None
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                logger.info("Aucune release trouvée sur GitHub")
+            else:
+                logger.error(f"Erreur HTTP : {e}")
+            return False, None
 
-        return False, None
+        except Exception as e:
+            logger.error(f"Erreur inattendue : {e}")
+            return False, None
 
     @staticmethod
     def _parser_release(release):
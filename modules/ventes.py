@@ -3,14 +3,19 @@ Module de gestion des ventes
 """
 from database import db
 from datetime import datetime
-from modules.produits import Produit
+from modules.produits import Produit, cache_produits
 from modules.logger import get_logger
+from modules.periodes import condition_plage, plage_jour, plage_jours
 import random
 import string
 
 logger = get_logger('ventes')
 
 
+class _VenteAnnulee(Exception):
+    """Interruption de la transaction de caisse (message affichable)"""
+
+
 class Vente:
 
     @staticmethod
@@ -70,6 +75,106 @@ class Vente:
 
         return False
 
+    @staticmethod
+    def finaliser_panier(panier, paiements, client_nom=None, client_id=None, utilisateur_id=None):
+        """Enregistrer une vente complete en une seule transaction.
+
+        panier: liste de dicts {produit_id, nom, prix_vente, quantite, sous_total}
+        paiements: liste de dicts {mode, montant, reference, montant_recu, monnaie_rendue}
+
+        Vente, details, decrements de stock, historique, paiements et points
+        fidelite sont ecrits dans un BEGIN IMMEDIATE unique : un seul COMMIT,
+        et un stock insuffisant annule tout.
+
+        Returns: (succes, message, resultat) avec resultat =
+            {vente_id, numero_vente, date_vente, total, points_gagnes}
+        """
+        if not panier:
+            return False, "Le panier est vide", None
+        for item in panier:
+            if item['quantite'] <= 0:
+                return False, f"Quantite invalide pour '{item['nom']}'", None
+
+        numero_vente = Vente.generer_numero_vente()
+        date_vente = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        total = sum(item['sous_total'] for item in panier)
+
+        # Parametres fidelite lus avant de prendre le verrou d'ecriture
+        points_gagnes, requete_points = 0, None
+        if client_id:
+            from modules.clients import Client
+            points_gagnes, requete_points = Client.preparer_ajout_points(client_id, total)
+
+        try:
+            with db.transaction() as cur:
+                cur.execute(
+                    """INSERT INTO ventes (numero_vente, date_vente, total, client, client_id, utilisateur_id)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (numero_vente, date_vente, total, client_nom or None, client_id, utilisateur_id)
+                )
+                vente_id = cur.lastrowid
+
+                for item in panier:
+                    produit_id, quantite = item['produit_id'], item['quantite']
+                    row = cur.execute(
+                        "SELECT stock_actuel FROM produits WHERE id = ?", (produit_id,)
+                    ).fetchone()
+                    stock_avant = row[0] if row else 0
+                    if not row or stock_avant < quantite:
+                        raise _VenteAnnulee(
+                            f"Le produit '{item['nom']}' n'a plus assez de stock!\n"
+                            f"Stock actuel: {stock_avant}\n"
+                            f"Quantité demandée: {quantite}"
+                        )
+
+                    cur.execute(
+                        """INSERT INTO details_ventes
+                           (vente_id, produit_id, quantite, prix_unitaire, sous_total)
+                           VALUES (?, ?, ?, ?, ?)""",
+                        (vente_id, produit_id, quantite, item['prix_vente'], item['sous_total'])
+                    )
+                    cur.execute(
+                        """UPDATE produits
+                           SET stock_actuel = stock_actuel - ?, updated_at = datetime('now')
+                           WHERE id = ? AND stock_actuel >= ?""",
+                        (quantite, produit_id, quantite)
+                    )
+                    if cur.rowcount != 1:
+                        raise _VenteAnnulee(f"Impossible de mettre à jour le stock de '{item['nom']}'")
+                    cur.execute(
+                        """INSERT INTO historique_stock (produit_id, quantite_avant, quantite_apres, operation)
+                           VALUES (?, ?, ?, 'Vente')""",
+                        (produit_id, stock_avant, stock_avant - quantite)
+                    )
+
+                cur.executemany(
+                    """INSERT INTO paiements (vente_id, mode, montant, reference, montant_recu, monnaie_rendue)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    [(vente_id, p['mode'], p['montant'], p.get('reference'),
+                      p.get('montant_recu'), p.get('monnaie_rendue')) for p in paiements]
+                )
+
+                if requete_points:
+                    cur.execute(*requete_points)
+
+        except _VenteAnnulee as e:
+            logger.warning(f"Vente {numero_vente} annulee : {e}")
+            return False, f"{e}\n\nLa vente a été annulée.", None
+        except Exception as e:
+            logger.error(f"Erreur transaction vente {numero_vente} : {e}")
+            return False, f"Erreur lors de l'enregistrement de la vente : {e}", None
+
+        cache_produits.rafraichir(item['produit_id'] for item in panier)
+        logger.info(f"Vente finalisee : ID={vente_id}, numero={numero_vente}, "
+                    f"{len(panier)} lignes, total={total}, utilisateur={utilisateur_id}")
+        return True, "Vente enregistree", {
+            'vente_id': vente_id,
+            'numero_vente': numero_vente,
+            'date_vente': date_vente,
+            'total': total,
+            'points_gagnes': points_gagnes,
+        }
+
     @staticmethod
     def calculer_total(vente_id):
         """Calculer le total d'une vente"""
@@ -116,6 +221,61 @@ class Vente:
                 query = "SELECT * FROM ventes ORDER BY date_vente DESC"
                 return db.fetch_all(query)
 
+    @staticmethod
+    def lister_ventes(premier_jour, dernier_jour, utilisateur_id=None):
+        """Historique d'une periode en une seule requete.
+
+        premier_jour et dernier_jour (inclus) : date ou 'YYYY-MM-DD[...]',
+        filtres en plage semi-ouverte (modules.periodes) : les ventes a
+        fractions de seconde du dernier jour sont comprises.
+        Chaque vente porte son vendeur, son nombre d'articles et ses modes de
+        paiement ; les totaux par vendeur sont calcules dans la meme passe.
+
+        Retourne {'ventes': [dict], 'ca': float,
+                  'vendeurs': [(nom, nb, ca)] tries par CA decroissant}
+        """
+        query = f"""
+            SELECT v.id, v.numero_vente, v.date_vente, v.total, v.client,
+                   u.prenom, u.nom,
+                   (SELECT COALESCE(SUM(dv.quantite), 0) FROM details_ventes dv
+                    WHERE dv.vente_id = v.id) AS nb_articles,
+                   (SELECT GROUP_CONCAT(DISTINCT p.mode) FROM paiements p
+                    WHERE p.vente_id = v.id) AS modes
+            FROM ventes v
+            LEFT JOIN utilisateurs u ON v.utilisateur_id = u.id
+            WHERE {condition_plage('v.date_vente')}
+        """
+        params = list(plage_jours(premier_jour, dernier_jour))
+        if utilisateur_id is not None:
+            query += " AND v.utilisateur_id = ?"
+            params.append(utilisateur_id)
+        query += " ORDER BY v.date_vente DESC"
+
+        rows = db.fetch_all(query, params)
+
+        ventes = []
+        ca = 0
+        vendeurs = {}
+        for r in rows:
+            total = r[3] or 0
+            vendeur = f"{r[5] or ''} {r[6] or ''}".strip()
+            ventes.append({
+                'id': r[0], 'numero_vente': r[1], 'date_vente': r[2],
+                'total': total, 'client': r[4] or "", 'vendeur': vendeur,
+                'nb_articles': r[7], 'modes': r[8].split(',') if r[8] else [],
+            })
+            ca += total
+            stats = vendeurs.setdefault(vendeur, [0, 0])
+            stats[0] += 1
+            stats[1] += total
+
+        return {
+            'ventes': ventes,
+            'ca': ca,
+            'vendeurs': sorted(((nom, nb, total) for nom, (nb, total) in vendeurs.items()),
+                               key=lambda x: x[2], reverse=True),
+        }
+
     @staticmethod
     def supprimer_ligne_vente(detail_id, vente_id):
         """Supprimer une ligne d'une vente"""
@@ -156,6 +316,9 @@ class Vente:
         query_details = "DELETE FROM details_ventes WHERE vente_id = ?"
         db.execute_query(query_details, (vente_id,))
 
+        query_paiements = "DELETE FROM paiements WHERE vente_id = ?"
+        db.execute_query(query_paiements, (vente_id,))
+
         query_vente = "DELETE FROM ventes WHERE id = ?"
         result = db.execute_query(query_vente, (vente_id,))
 
@@ -170,9 +333,8 @@ class Vente:
     @staticmethod
     def obtenir_ventes_du_jour():
         """Obtenir les ventes du jour"""
-        aujourd_hui = datetime.now().strftime("%Y-%m-%d")
-        query = "SELECT * FROM ventes WHERE DATE(date_vente) = ? ORDER BY date_vente DESC"
-        return db.fetch_all(query, (aujourd_hui,))
+        query = f"SELECT * FROM ventes WHERE {condition_plage('date_vente')} ORDER BY date_vente DESC"
+        return db.fetch_all(query, plage_jour())
 
     @staticmethod
     def obtenir_chiffre_affaires(date_debut=None, date_fin=None):
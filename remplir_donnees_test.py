@@ -4,6 +4,7 @@ Uniquement Code128, codes fixes, CA prévisible
 """
 from database import db
 from modules.produits import Produit
+from modules.catalogue import COLONNES, importer_lignes
 from modules.ventes import Vente
 from modules.codebarres import CodeBarre
 
@@ -37,13 +38,20 @@ def remplir_produits():
         ("Produit Stock Faible", "Test", 500, 800, 3, 5, "TEST002", "Stock critique"),
     ]
     
-    for nom, cat, pa, pv, stock, alerte, code, desc in produits_test:
-        code_genere = Produit.ajouter(nom, cat, pa, pv, stock, alerte, code, 'code128', desc)
-        if code_genere:
-            CodeBarre.generer_image(code_genere, nom, pv, 'code128')
-            print(f"  ✅ {nom} - {code_genere}")
+    # Un seul import en masse (une transaction) au lieu d'un INSERT + COMMIT par produit
+    lignes = [
+        (numero, dict(zip(COLONNES, (code, nom, cat, pa, pv, stock, alerte, 'code128', desc))))
+        for numero, (nom, cat, pa, pv, stock, alerte, code, desc) in enumerate(produits_test, start=1)
+    ]
+    rapport = importer_lignes(lignes)
+    rejetes = {numero: message for numero, _, message in rapport.erreurs}
+
+    for numero, (nom, cat, pa, pv, stock, alerte, code, desc) in enumerate(produits_test, start=1):
+        if numero in rejetes:
+            print(f"  ❌ Échec: {nom} ({rejetes[numero]})")
         else:
-            print(f"  ❌ Échec: {nom}")
+            CodeBarre.generer_image(code, nom, pv, 'code128')
+            print(f"  ✅ {nom} - {code}")
 
 def remplir_ventes():
     """Créer des ventes de test - CA PRÉVISIBLE"""
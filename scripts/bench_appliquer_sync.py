@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de l'application des changements recus du serveur (pull)
+
+USAGE:
+    python scripts/bench_appliquer_sync.py [--lignes 50000]
+
+Lot de --lignes lignes au format du pull : 10 % de produits, le reste en
+ventes (une vente, deux lignes, deux mouvements de stock), base sur disque.
+- Ligne a ligne : ancienne application, un execute par ligne recue, un
+  SELECT par produit (last write wins) et par vente (id des lignes) ;
+- En masse      : journal.appliquer_changements, tables TEMP puis un
+  INSERT ... SELECT ... ON CONFLICT par table.
+Deux passes : base vide (premier pull), puis meme lot avec des produits plus
+recents (mises a jour). Debit en lignes par seconde.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from bench_commun import preparer_base_temporaire, afficher_entete
+
+preparer_base_temporaire('bench_appliquer_sync')
+
+from database import db  # noqa: E402
+from modules import journal  # noqa: E402
+
+CATEGORIES = ["Alimentaire", "Hygiène", "Boissons", "Tissus", "Cosmétique"]
+
+
+def generer(nb_lignes, updated_at):
+    rng = random.Random(25)
+    nb_produits = nb_lignes // 10
+    nb_ventes = (nb_lignes - nb_produits) // 5
+    debut = datetime(2024, 3, 1, 8, 0)
+    produits = [{
+        'id': i, 'nom': f"Article {i}", 'categorie': rng.choice(CATEGORIES),
+        'prix_achat': rng.randint(50, 40000), 'prix_vente': rng.randint(100, 50000),
+        'stock_actuel': rng.randint(0, 200), 'stock_alerte': 5, 'code_barre': f"2000000{i:06d}",
+        'type_code_barre': 'ean13', 'date_ajout': "2024-01-15 09:00:00", 'description': None,
+        'updated_at': updated_at,
+    } for i in range(1, nb_produits + 1)]
+    ventes, details, historique = [], [], []
+    for v in range(1, nb_ventes + 1):
+        date = (debut + timedelta(seconds=v * 37)).strftime("%Y-%m-%d %H:%M:%S")
+        numero = f"V{date[:10].replace('-', '')}-{v:06d}"
+        total = 0
+        for _ in range(2):
+            produit = rng.choice(produits)
+            quantite = rng.randint(1, 4)
+            total += quantite * produit['prix_vente']
+            details.append({
+                'vente_id': v, 'produit_id': produit['id'], 'quantite': quantite,
+                'prix_unitaire': produit['prix_vente'], 'sous_total': quantite * produit['prix_vente'],
+                'numero_vente': numero, 'produit_code_barre': produit['code_barre'],
+            })
+            historique.append({
+                'produit_id': produit['id'], 'quantite_avant': 50, 'quantite_apres': 50 - quantite,
+                'operation': f"Vente {numero}", 'date_operation': date,
+                'produit_code_barre': produit['code_barre'],
+            })
+        ventes.append({'numero_vente': numero, 'date_vente': date, 'total': float(total),
+                       'client': rng.choice([None, "", "Awa Kouassi", "Koffi Yao"]),
+                       'statut': 'terminee', 'deleted_at': None})
+    return {'produits': produits, 'ventes': ventes, 'details_ventes': details,
+            'historique_stock': historique, 'utilisateurs': [], 'suppressions': {}}
+
+
+def _id_produit(cur, ligne):
+    if ligne.get('produit_code_barre'):
+        produit = cur.execute("SELECT id FROM produits WHERE code_barre = ?",
+                              (ligne['produit_code_barre'],)).fetchone()
+        return produit[0] if produit else None
+    return ligne.get('produit_id')
+
+
+def appliquer_ligne_a_ligne(data):
+    """Reference : application precedente (sans suppressions ni utilisateurs,
+    absents du lot)"""
+    with db.transaction() as cur, journal.hors_journal(cur):
+        for p in data['produits']:
+            existant = cur.execute(
+                "SELECT updated_at FROM produits WHERE code_barre = ?", (p['code_barre'],)
+            ).fetchone()
+            if existant and existant[0] and existant[0] > p.get('updated_at', ''):
+                continue
+            cur.execute('''
+                INSERT INTO produits (nom, categorie, prix_achat, prix_vente, stock_actuel,
+                    stock_alerte, code_barre, type_code_barre, date_ajout, description, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(code_barre) DO UPDATE SET
+                    nom=excluded.nom, categorie=excluded.categorie,
+                    prix_achat=excluded.prix_achat, prix_vente=excluded.prix_vente,
+                    stock_actuel=excluded.stock_actuel, stock_alerte=excluded.stock_alerte,
+                    type_code_barre=excluded.type_code_barre, description=excluded.description,
+                    updated_at=excluded.updated_at
+            ''', (p['nom'], p['categorie'], p['prix_achat'], p['prix_vente'], p['stock_actuel'],
+                  p['stock_alerte'], p['code_barre'], p['type_code_barre'], p['date_ajout'],
+                  p['description'], p['updated_at']))
+
+        for v in data['ventes']:
+            cur.execute('''
+                INSERT INTO ventes (numero_vente, date_vente, total, client, statut, deleted_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(numero_vente) DO UPDATE SET
+                    total=excluded.total, client=excluded.client,
+                    statut=excluded.statut, deleted_at=excluded.deleted_at
+            ''', (v['numero_vente'], v['date_vente'], v['total'], v['client'], v['statut'],
+                  v.get('deleted_at')))
+
+        details_par_vente = {}
+        for d in data['details_ventes']:
+            details_par_vente.setdefault(d.get('numero_vente'), []).append(d)
+        for numero_vente, details in details_par_vente.items():
+            vente = cur.execute("SELECT id FROM ventes WHERE numero_vente = ?", (numero_vente,)).fetchone()
+            if not vente:
+                continue
+            cur.execute("DELETE FROM details_ventes WHERE vente_id = ?", (vente[0],))
+            for d in details:
+                cur.execute('''
+                    INSERT INTO details_ventes (vente_id, produit_id, quantite, prix_unitaire, sous_total)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (vente[0], _id_produit(cur, d), d['quantite'], d['prix_unitaire'], d['sous_total']))
+
+        for h in data['historique_stock']:
+            produit_id = _id_produit(cur, h)
+            if produit_id is None:
+                continue
+            cur.execute('''
+                INSERT INTO historique_stock (produit_id, quantite_avant, quantite_apres, operation, date_operation)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (produit_id, h['quantite_avant'], h['quantite_apres'], h['operation'], h['date_operation']))
+
+
+def vider():
+    with db.transaction() as cur, journal.hors_journal(cur):
+        for table in ('details_ventes', 'historique_stock', 'ventes', 'produits'):
+            cur.execute(f"DELETE FROM {table}")
+
+
+def empreinte():
+    """Contenu applique, pour verifier que les deux variantes concordent"""
+    return (
+        db.fetch_one("SELECT COUNT(*), SUM(prix_vente) FROM produits")[:],
+        db.fetch_one("SELECT COUNT(*), SUM(total) FROM ventes")[:],
+        db.fetch_one("SELECT COUNT(*), SUM(p.prix_vente * d.quantite) FROM details_ventes d "
+                     "JOIN produits p ON p.id = d.produit_id")[:],
+        db.fetch_one("SELECT COUNT(*) FROM historique_stock h JOIN produits p ON p.id = h.produit_id")[:],
+    )
+
+
+def chronometrer_passe(appliquer, lot):
+    debut = time.perf_counter()
+    appliquer(lot)
+    return time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--lignes', type=int, default=50000)
+    args = parser.parse_args()
+
+    premier = generer(args.lignes, "2024-03-01T08:00:00")
+    second = generer(args.lignes, "2024-03-02T08:00:00")
+    nb_lignes = sum(len(premier[t]) for t in ('produits', 'ventes', 'details_ventes', 'historique_stock'))
+    afficher_entete(f"APPLICATION DU PULL : {nb_lignes:,} lignes")
+
+    print(f"{'Variante':<16}{'passe':<14}{'lignes/s':>12}{'duree (s)':>12}")
+    empreintes = []
+    for nom, appliquer in (("Ligne a ligne", appliquer_ligne_a_ligne),
+                           ("En masse", journal.appliquer_changements)):
+        vider()
+        for passe, lot in (("base vide", premier), ("mises a jour", second)):
+            duree = chronometrer_passe(appliquer, lot)
+            print(f"{nom:<16}{passe:<14}{nb_lignes / duree:>12,.0f}{duree:>12.2f}")
+        empreintes.append(empreinte())
+    print(f"\nResultats identiques : {'oui' if empreintes[0] == empreintes[1] else 'NON'}")
+
+
+if __name__ == "__main__":
+    main()
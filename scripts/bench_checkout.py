@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la transaction de caisse
+
+USAGE:
+    python scripts/bench_checkout.py [--ventes 200] [--lignes 40]
+
+Compare, sur une base temporaire (fichier, donc avec fsync reels) :
+1. L'ancien flux de VentesWindow._finaliser_vente (un COMMIT par instruction)
+2. Vente.finaliser_panier (une seule transaction BEGIN IMMEDIATE)
+
+chacun avec et sans l'ancienne sonde de connexion (SELECT 1 avant chaque
+appel a Database, remplacee par la reconnexion sur erreur).
+
+Affiche le nombre de COMMIT et d'instructions SQL par vente, et la latence p50/p95.
+"""
+import argparse
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from bench_commun import preparer_base_temporaire, percentile, CompteurSQL, afficher_entete
+
+preparer_base_temporaire('bench_checkout')
+
+from database import db  # noqa: E402
+from modules.produits import Produit  # noqa: E402
+from modules.ventes import Vente  # noqa: E402
+from modules.paiements import Paiement  # noqa: E402
+from modules.clients import Client  # noqa: E402
+
+
+def creer_panier(nb_lignes):
+    """Creer nb_lignes produits (stock illimite) et le panier correspondant"""
+    panier = []
+    for i in range(nb_lignes):
+        code = Produit.ajouter(f"Article {i}", "Bench", 100, 250, 10_000_000, 5,
+                               code_barre=f"BENCH{i:06d}")
+        produit = Produit.obtenir_par_code_barre(code)
+        panier.append({
+            'produit_id': produit['id'], 'nom': produit['nom'],
+            'prix_vente': produit['prix_vente'], 'quantite': 1 + i % 3,
+            'sous_total': produit['prix_vente'] * (1 + i % 3),
+        })
+    return panier
+
+
+def checkout_ancien(panier, paiements, client_id):
+    """Reproduction de l'ancien _finaliser_vente (execute_query par instruction)"""
+    total = sum(item['sous_total'] for item in panier)
+    vente_id = db.execute_query(
+        """INSERT INTO ventes (numero_vente, date_vente, total, client, client_id, utilisateur_id)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        (Vente.generer_numero_vente(), datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+         total, None, client_id, 1)
+    )
+    for item in panier:
+        db.fetch_one("SELECT stock_actuel FROM produits WHERE id = ?", (item['produit_id'],))
+        db.execute_query(
+            """INSERT INTO details_ventes (vente_id, produit_id, quantite, prix_unitaire, sous_total)
+               VALUES (?, ?, ?, ?, ?)""",
+            (vente_id, item['produit_id'], item['quantite'], item['prix_vente'], item['sous_total'])
+        )
+        db.execute_query(
+            "UPDATE produits SET stock_actuel = stock_actuel - ? WHERE id = ? AND stock_actuel >= ?",
+            (item['quantite'], item['produit_id'], item['quantite'])
+        )
+    for p in paiements:
+        Paiement.enregistrer_paiement(vente_id, p['mode'], p['montant'])
+    Client.ajouter_points(client_id, total)
+
+
+def checkout_nouveau(panier, paiements, client_id):
+    Vente.finaliser_panier(panier, paiements, client_id=client_id, utilisateur_id=1)
+
+
+@contextmanager
+def sonde_select_1():
+    """Reproduire l'ancien Database._ensure_connection : SELECT 1 sur la
+    connexion d'ecriture avant chaque execute_*/fetch_*/transaction"""
+    noms = ('execute_query', 'execute_transaction', 'fetch_all', 'fetch_one', 'transaction')
+
+    def sonder(methode):
+        def appel(*args, **kwargs):
+            with db._verrou:
+                db.conn.execute("SELECT 1")
+            return methode(*args, **kwargs)
+        return appel
+
+    for nom in noms:
+        setattr(db, nom, sonder(getattr(db, nom)))
+    try:
+        yield
+    finally:
+        for nom in noms:
+            delattr(db, nom)
+
+
+def mesurer(nom, fonction, panier, paiements, client_id, nb_ventes):
+    durees = []
+    with CompteurSQL(db) as compteur:
+        for _ in range(nb_ventes):
+            debut = time.perf_counter()
+            fonction(panier, paiements, client_id)
+            durees.append((time.perf_counter() - debut) * 1000)
+    print(f"{nom:<36} commits/vente={compteur.commits / nb_ventes:6.1f}  "
+          f"instructions/vente={compteur.instructions / nb_ventes:6.1f}  "
+          f"p50={percentile(durees, 50):7.2f} ms  p95={percentile(durees, 95):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--ventes', type=int, default=200)
+    parser.add_argument('--lignes', type=int, default=40)
+    args = parser.parse_args()
+
+    afficher_entete(f"CHECKOUT : {args.ventes} ventes de {args.lignes} lignes")
+    panier = creer_panier(args.lignes)
+    total = sum(item['sous_total'] for item in panier)
+    paiements = [{'mode': 'especes', 'montant': total, 'montant_recu': total, 'monnaie_rendue': 0}]
+    client_id = Client.ajouter("Client Bench", telephone="00000000")
+
+    for nom, fonction in (("Avant (commit/instruction)", checkout_ancien),
+                          ("Apres (finaliser_panier)", checkout_nouveau)):
+        with sonde_select_1():
+            mesurer(f"{nom} + SELECT 1", fonction, panier, paiements, client_id, args.ventes)
+        mesurer(nom, fonction, panier, paiements, client_id, args.ventes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Outils communs aux scripts de benchmark (scripts/bench_*.py)
+
+IMPORTANT: preparer_base_temporaire() doit etre appele AVANT tout import de
+database, pour que l'instance globale db pointe sur une base jetable
+(meme principe que tests/conftest.py).
+"""
+import os
+import sys
+import math
+import time
+import random
+import logging
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def preparer_base_temporaire(nom='bench'):
+    """Rediriger DB_PATH et DATA_DIR vers un dossier temporaire. Retourne le chemin de la base."""
+    import config
+    dossier = tempfile.mkdtemp(prefix=f'{nom}_')
+    config.DATA_DIR = dossier
+    config.DB_PATH = os.path.join(dossier, f'{nom}.db')
+    os.makedirs(os.path.join(dossier, 'logs'), exist_ok=True)
+    # Les logs INFO par operation faussent les mesures
+    logging.disable(logging.INFO)
+    return config.DB_PATH
+
+
+def percentile(valeurs, p):
+    """Percentile p (0-100) par rang le plus proche"""
+    if not valeurs:
+        return 0.0
+    triees = sorted(valeurs)
+    rang = min(len(triees) - 1, max(0, math.ceil(p / 100 * len(triees)) - 1))
+    return triees[rang]
+
+
+def chronometrer(fonction, repetitions):
+    """Duree mediane d'un appel, en millisecondes"""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return statistics.median(durees)
+
+
+class CompteurSQL:
+    """Compter les instructions SQL et les COMMIT executes sur une connexion,
+    ou sur toutes celles d'une Database (ecriture et lecteurs du pool).
+
+        with CompteurSQL(db) as c:
+            ...
+        c.instructions, c.commits
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.instructions = 0
+        self.commits = 0
+
+    def _trace(self, sql):
+        self.instructions += 1
+        if sql.strip().upper() == 'COMMIT':
+            self.commits += 1
+
+    def _poser(self, rappel):
+        if hasattr(self.conn, 'tracer'):
+            self.conn.tracer(rappel)
+        else:
+            self.conn.set_trace_callback(rappel)
+
+    def __enter__(self):
+        self._poser(self._trace)
+        return self
+
+    def __exit__(self, *exc):
+        self._poser(None)
+        return False
+
+
+def afficher_entete(titre):
+    print("=" * 60)
+    print(titre)
+    print("=" * 60)
+    print()
+
+
+MODES_PAIEMENT = ('especes', 'orange_money', 'mtn_momo', 'moov_money')
+
+
+def generer_produits(conn, nb_produits, stock=0):
+    """Inserer nb_produits produits (codes G000000...) en une transaction"""
+    conn.executemany(
+        "INSERT INTO produits (nom, categorie, prix_achat, prix_vente, stock_actuel, code_barre) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"Produit {i}", f"Cat {i % 20}", 60 + i, 100 + i, stock, f"G{i:06d}") for i in range(nb_produits)]
+    )
+    conn.commit()
+
+
+def generer_ventes(conn, nb_ventes, nb_produits, nb_jours=730, premier_id=1, graine=42):
+    """Inserer nb_ventes ventes reparties sur nb_jours jours jusqu'a maintenant,
+    avec 2 lignes et 1 paiement chacune, en une transaction (executemany).
+    Ecrit directement dans les tables : les triggers s'appliquent, pas le code des modules."""
+    rng = random.Random(graine)
+    maintenant = datetime.now()
+    ids = range(premier_id, premier_id + nb_ventes)
+
+    def ventes():
+        for n, vente_id in enumerate(ids):
+            # Les ventes les plus anciennes d'abord, comme en production
+            age = (nb_ventes - n) / nb_ventes * nb_jours * 86400
+            date_vente = (maintenant - timedelta(seconds=age)).strftime("%Y-%m-%d %H:%M:%S")
+            yield (vente_id, f"G{vente_id:08d}", date_vente, 1000, 1 + vente_id % 5)
+
+    def details():
+        for vente_id in ids:
+            for _ in range(2):
+                yield (vente_id, rng.randint(1, nb_produits), 1, 500, 500)
+
+    def paiements():
+        for vente_id in ids:
+            yield (vente_id, MODES_PAIEMENT[vente_id % len(MODES_PAIEMENT)], 1000)
+
+    conn.executemany(
+        "INSERT INTO ventes (id, numero_vente, date_vente, total, utilisateur_id) VALUES (?, ?, ?, ?, ?)",
+        ventes())
+    conn.executemany(
+        "INSERT INTO details_ventes (vente_id, produit_id, quantite, prix_unitaire, sous_total) "
+        "VALUES (?, ?, ?, ?, ?)", details())
+    conn.executemany("INSERT INTO paiements (vente_id, mode, montant) VALUES (?, ?, ?)", paiements())
+    conn.commit()
+    conn.execute("ANALYZE")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de concurrence lecteurs/ecrivain selon le profil SQLite
+
+USAGE:
+    python scripts/bench_concurrence.py [--duree 5] [--lecteurs 3]
+
+Pour chaque profil de config.SQLITE_PROFILS (caisse = WAL, compatibilite =
+journal classique), sur une base temporaire :
+- 1 thread ecrivain enchaine des ventes de 10 lignes (BEGIN IMMEDIATE ... COMMIT)
+- N threads lecteurs rejouent les requetes du dashboard (rafraichissement, sync, sauvegarde)
+
+Affiche le debit d'ecriture et de lecture, la latence p95 des lectures
+et le nombre d'erreurs "database is locked".
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from bench_commun import preparer_base_temporaire, percentile, afficher_entete
+
+DOSSIER = os.path.dirname(preparer_base_temporaire('bench_concurrence'))
+
+import config  # noqa: E402
+import database  # noqa: E402
+
+LECTURES_DASHBOARD = (
+    "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM ventes WHERE date_vente >= date('now', 'start of day')",
+    "SELECT COALESCE(SUM(prix_vente * stock_actuel), 0) FROM produits",
+    "SELECT * FROM ventes ORDER BY id DESC LIMIT 5",
+)
+
+
+def preparer(profil):
+    """Creer une base neuve pour le profil, avec 200 produits. Retourne son chemin."""
+    chemin = os.path.join(DOSSIER, f'{profil}.db')
+    database.DB_PATH = chemin
+    base = database.Database(profil)
+    base.conn.executemany(
+        "INSERT INTO produits (nom, prix_vente, stock_actuel, code_barre) VALUES (?, 500, 100000000, ?)",
+        [(f"P{i}", f"C{i:05d}") for i in range(200)]
+    )
+    base.conn.commit()
+    base.close()
+    return chemin
+
+
+def ouvrir(chemin, profil):
+    conn = sqlite3.connect(chemin, timeout=0, check_same_thread=False)
+    database.appliquer_profil(conn, config.SQLITE_PROFILS[profil])
+    return conn
+
+
+def ecrivain(chemin, profil, stop, stats):
+    conn = ouvrir(chemin, profil)
+    n = 0
+    while not stop.is_set():
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute(
+                "INSERT INTO ventes (numero_vente, date_vente, total) VALUES (?, ?, 5000)",
+                (f"B{threading.get_ident()}-{n}", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            vente_id = cur.lastrowid
+            for ligne in range(10):
+                produit_id = 1 + (n * 10 + ligne) % 200
+                conn.execute(
+                    "INSERT INTO details_ventes (vente_id, produit_id, quantite, prix_unitaire, sous_total) "
+                    "VALUES (?, ?, 1, 500, 500)", (vente_id, produit_id)
+                )
+                conn.execute("UPDATE produits SET stock_actuel = stock_actuel - 1 WHERE id = ?", (produit_id,))
+            conn.commit()
+            stats['ecritures'] += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            stats['verrous'] += 1
+        n += 1
+    conn.close()
+
+
+def lecteur(chemin, profil, stop, stats):
+    conn = ouvrir(chemin, profil)
+    while not stop.is_set():
+        debut = time.perf_counter()
+        try:
+            for query in LECTURES_DASHBOARD:
+                conn.execute(query).fetchall()
+            stats['latences'].append((time.perf_counter() - debut) * 1000)
+        except sqlite3.OperationalError:
+            stats['verrous'] += 1
+        time.sleep(0.001)
+    conn.close()
+
+
+def mesurer(profil, duree, nb_lecteurs):
+    chemin = preparer(profil)
+    stop = threading.Event()
+    stats = {'ecritures': 0, 'verrous': 0, 'latences': []}
+    threads = [threading.Thread(target=ecrivain, args=(chemin, profil, stop, stats))]
+    threads += [threading.Thread(target=lecteur, args=(chemin, profil, stop, stats))
+                for _ in range(nb_lecteurs)]
+    for t in threads:
+        t.start()
+    time.sleep(duree)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(f"{profil:<14} ventes/s={stats['ecritures'] / duree:8.1f}  "
+          f"lectures/s={len(stats['latences']) / duree:8.1f}  "
+          f"lecture p95={percentile(stats['latences'], 95):7.2f} ms  "
+          f"verrous={stats['verrous']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--duree', type=float, default=5.0)
+    parser.add_argument('--lecteurs', type=int, default=3)
+    args = parser.parse_args()
+
+    afficher_entete(f"CONCURRENCE : 1 ecrivain, {args.lecteurs} lecteurs, {args.duree:.0f}s par profil")
+    for profil in ('compatibilite', 'caisse'):
+        mesurer(profil, args.duree, args.lecteurs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark des statistiques du dashboard (Rapport.statistiques_generales)
+
+USAGE:
+    python scripts/bench_dashboard.py [--paliers 10000,100000,1000000] [--repetitions 20]
+
+Remplit une base temporaire par paliers d'historique et mesure a chaque palier :
+- Avant : les 5 requetes d'origine (dont SUM(total) sur toutes les ventes)
+- Apres : la requete unique (plages indexees + table compteurs)
+Le temps "apres" doit rester stable quand l'historique grossit.
+"""
+import argparse
+
+from bench_commun import (preparer_base_temporaire, afficher_entete, chronometrer,
+                          generer_produits, generer_ventes)
+
+preparer_base_temporaire('bench_dashboard')
+
+from database import db  # noqa: E402
+from modules.rapports import Rapport  # noqa: E402
+from modules.periodes import plage_jour, plage_mois  # noqa: E402
+
+NB_PRODUITS = 2000
+
+
+def statistiques_avant():
+    """Les 5 aller-retours de l'ancienne version"""
+    jour, mois = plage_jour(), plage_mois()
+    db.fetch_one("SELECT COUNT(*), COALESCE(SUM(total), 0) FROM ventes WHERE DATE(date_vente) = ?", (jour[0],))
+    db.fetch_one("SELECT COALESCE(SUM(total), 0) FROM ventes WHERE date_vente >= ?", (mois[0],))
+    db.fetch_one("SELECT COALESCE(SUM(total), 0) FROM ventes")
+    db.fetch_one("SELECT COUNT(*) FROM produits")
+    db.fetch_one("SELECT COALESCE(SUM(prix_vente * stock_actuel), 0) FROM produits")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--paliers', default='10000,100000,1000000')
+    parser.add_argument('--repetitions', type=int, default=20)
+    args = parser.parse_args()
+    paliers = [int(p) for p in args.paliers.split(',')]
+
+    afficher_entete("DASHBOARD : statistiques_generales selon la taille de l'historique")
+    generer_produits(db.conn, NB_PRODUITS, stock=50)
+
+    print(f"{'Ventes':>12}{'Avant (ms)':>14}{'Apres (ms)':>14}")
+    deja = 0
+    for palier in paliers:
+        generer_ventes(db.conn, palier - deja, NB_PRODUITS, premier_id=deja + 1, graine=palier)
+        deja = palier
+        t_avant = chronometrer(statistiques_avant, args.repetitions)
+        t_apres = chronometrer(Rapport.statistiques_generales, args.repetitions)
+        print(f"{palier:>12,}{t_avant:>14.2f}{t_apres:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark du format d'echange de la synchronisation
+
+USAGE:
+    python scripts/bench_format_sync.py [--ventes 10000] [--repetitions 5]
+
+Push de --ventes ventes (3 lignes et 3 mouvements de stock par vente, 500
+produits touches), au format du journal des changements :
+- JSON          : ancien corps (dicts, noms de colonnes sur chaque ligne)
+- JSON + gzip
+- Colonnes      : lots en-tete de colonnes + lignes (modules.format_sync)
+- Colonnes + gzip / zstd (zstd si le module zstandard est installe)
+Octets envoyes et temps d'encodage / decodage (mediane, ms).
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from bench_commun import afficher_entete, chronometrer
+
+from modules import format_sync  # noqa: E402
+
+CATEGORIES = ["Alimentaire", "Hygiène", "Boissons", "Tissus", "Cosmétique"]
+
+
+def generer(nb_ventes):
+    rng = random.Random(23)
+    debut = datetime(2024, 3, 1, 8, 0)
+    produits = [{
+        'id': i, 'nom': f"Article {i}", 'categorie': rng.choice(CATEGORIES),
+        'prix_achat': rng.randint(50, 40000), 'prix_vente': rng.randint(100, 50000),
+        'stock_actuel': rng.randint(0, 200), 'stock_alerte': 5, 'code_barre': f"2000000{i:06d}",
+        'type_code_barre': 'ean13', 'date_ajout': "2024-01-15 09:00:00", 'description': None,
+        'updated_at': "2024-03-01T08:00:00",
+    } for i in range(1, 501)]
+    ventes, details, historique = [], [], []
+    for v in range(1, nb_ventes + 1):
+        date = (debut + timedelta(seconds=v * 37)).strftime("%Y-%m-%d %H:%M:%S")
+        numero = f"V{date[:10].replace('-', '')}-{v:05d}"
+        total = 0
+        for _ in range(3):
+            produit = rng.choice(produits)
+            quantite = rng.randint(1, 4)
+            total += quantite * produit['prix_vente']
+            details.append({
+                'id': len(details) + 1, 'vente_id': v, 'produit_id': produit['id'], 'quantite': quantite,
+                'prix_unitaire': produit['prix_vente'], 'sous_total': quantite * produit['prix_vente'],
+                'numero_vente': numero, 'produit_code_barre': produit['code_barre'],
+            })
+            historique.append({
+                'id': len(historique) + 1, 'produit_id': produit['id'], 'quantite_avant': 50,
+                'quantite_apres': 50 - quantite, 'operation': f"Vente {numero}", 'date_operation': date,
+                'produit_code_barre': produit['code_barre'],
+            })
+        ventes.append({'id': v, 'numero_vente': numero, 'date_vente': date, 'total': float(total),
+                       'client': rng.choice([None, "", "Awa Kouassi", "Koffi Yao"]),
+                       'statut': 'terminee', 'deleted_at': None})
+    return {
+        'produits': produits, 'ventes': ventes, 'details_ventes': details,
+        'historique_stock': historique, 'utilisateurs': [], 'suppressions': {},
+        'journal': "0" * 32, 'depuis': 0, 'seq': nb_ventes * 8, 'timestamp': debut.isoformat(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--ventes', type=int, default=10000)
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    afficher_entete(f"FORMAT SYNC : {args.ventes:,} ventes")
+    changements = generer(args.ventes)
+
+    variantes = [("JSON", False, None), ("JSON + gzip", False, 'gzip'),
+                 ("Colonnes", True, None), ("Colonnes + gzip", True, 'gzip')]
+    if format_sync.ZSTD:
+        variantes.append(("Colonnes + zstd", True, 'zstd'))
+
+    reference = None
+    print(f"{'Format':<18}{'octets':>12}{'ratio':>8}{'encodage (ms)':>16}{'decodage (ms)':>16}")
+    for nom, colonnes, encodage in variantes:
+        corps, _ = format_sync.encoder(changements, colonnes, encodage)
+        reference = reference or len(corps)
+        encoder = chronometrer(lambda: format_sync.encoder(changements, colonnes, encodage), args.repetitions)
+        decoder = chronometrer(lambda: format_sync.decoder(corps), args.repetitions)
+        print(f"{nom:<18}{len(corps):>12,}{reference / len(corps):>7.1f}x{encoder:>16.1f}{decoder:>16.1f}")
+    if not format_sync.ZSTD:
+        print("\n(zstd non mesure : module zstandard non installe)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de l'import / export du catalogue produits
+
+USAGE:
+    python scripts/bench_import_produits.py [--lignes 10000] [--unitaires 1000]
+
+Catalogue fournisseur CSV genere (5 % de lignes invalides), base sur disque :
+- Produit.ajouter : une validation SELECT + un COMMIT par produit (sur
+  --unitaires lignes, le debit suffit a extrapoler)
+- Simulation      : importer_produits(simulation=True), validation seule
+- Import en masse : importer_produits, lots executemany dans une transaction
+- Export CSV      : exporter_produits
+Debit en lignes par seconde.
+"""
+import argparse
+import csv
+import os
+import random
+import time
+
+from bench_commun import preparer_base_temporaire, afficher_entete
+
+chemin_base = preparer_base_temporaire('bench_import_produits')
+
+from database import db  # noqa: E402
+from modules.catalogue import importer_produits, exporter_produits, lire_fichier  # noqa: E402
+from modules.produits import Produit  # noqa: E402
+
+CATEGORIES = ["Alimentaire", "Hygiène", "Boissons", "Tissus", "Cosmétique"]
+
+
+def generer_csv(chemin, nb_lignes):
+    rng = random.Random(5)
+    with open(chemin, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['code_barre', 'nom', 'categorie', 'prix_achat', 'prix_vente', 'stock_actuel'])
+        for i in range(nb_lignes):
+            code = f"FRN{i:07d}"
+            prix = f"{rng.randint(100, 50000)}"
+            if i % 20 == 0:
+                prix = "-1"  # Ligne invalide
+            writer.writerow([code, f"Article fournisseur {i}", rng.choice(CATEGORIES),
+                             rng.randint(50, 40000), prix, rng.randint(0, 200)])
+
+
+def vider():
+    db.execute_query("DELETE FROM produits")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--lignes', type=int, default=10000)
+    parser.add_argument('--unitaires', type=int, default=1000)
+    args = parser.parse_args()
+
+    afficher_entete(f"IMPORT PRODUITS : {args.lignes:,} lignes CSV")
+    dossier = os.path.dirname(chemin_base)
+    fichier = os.path.join(dossier, 'fournisseur.csv')
+    generer_csv(fichier, args.lignes)
+
+    debut = time.perf_counter()
+    for i, (_, brut) in enumerate(lire_fichier(fichier)):
+        if i >= args.unitaires:
+            break
+        prix_vente = float(brut['prix_vente'])
+        if prix_vente < 0:
+            continue  # Refuse par Produit.ajouter (avertissement dans le log)
+        Produit.ajouter(brut['nom'], brut['categorie'], float(brut['prix_achat']), prix_vente,
+                        int(brut['stock_actuel']), 5, brut['code_barre'])
+    unitaire = min(args.unitaires, args.lignes) / (time.perf_counter() - debut)
+    vider()
+
+    debut = time.perf_counter()
+    simulation = importer_produits(fichier, simulation=True)
+    duree_simulation = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    rapport = importer_produits(fichier)
+    duree_import = time.perf_counter() - debut
+
+    sortie = os.path.join(dossier, 'export.csv')
+    debut = time.perf_counter()
+    exportes = exporter_produits(sortie)
+    duree_export = time.perf_counter() - debut
+
+    print(f"{'Operation':<20}{'lignes/s':>12}{'duree (s)':>12}")
+    print(f"{'Produit.ajouter':<20}{unitaire:>12,.0f}{args.lignes / unitaire:>12.2f}  (extrapole)")
+    print(f"{'Simulation':<20}{simulation.lues / duree_simulation:>12,.0f}{duree_simulation:>12.2f}")
+    print(f"{'Import en masse':<20}{rapport.lues / duree_import:>12,.0f}{duree_import:>12.2f}")
+    print(f"{'Export CSV':<20}{exportes / duree_export:>12,.0f}{duree_export:>12.2f}")
+    print(f"\n{rapport.resume()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark du chargement de la liste des ventes (vue d'un mois)
+
+USAGE:
+    python scripts/bench_liste_ventes.py [--ventes 6000] [--repetitions 5]
+
+Compare, sur une base temporaire de N ventes sur 30 jours :
+- Avant : liste des ventes puis details et paiements pour chaque vente (1 + 2N requetes)
+- Apres : Vente.lister_ventes (une requete, totaux par vendeur dans la meme passe)
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from bench_commun import (preparer_base_temporaire, afficher_entete, chronometrer,
+                          CompteurSQL, generer_produits, generer_ventes)
+
+preparer_base_temporaire('bench_liste_ventes')
+
+from database import db  # noqa: E402
+from modules.ventes import Vente  # noqa: E402
+from modules.paiements import Paiement  # noqa: E402
+
+NB_PRODUITS = 500
+PERIODE = ((datetime.now() - timedelta(days=31)).strftime("%Y-%m-%d 00:00:00"),
+           datetime.now().strftime("%Y-%m-%d 23:59:59"))
+
+
+def avant():
+    ventes = db.fetch_all("""
+        SELECT v.id, v.numero_vente, v.date_vente, v.total, v.client, u.prenom, u.nom
+        FROM ventes v LEFT JOIN utilisateurs u ON v.utilisateur_id = u.id
+        WHERE v.date_vente BETWEEN ? AND ? ORDER BY v.date_vente DESC""", PERIODE)
+    for v in ventes:
+        details = Vente.obtenir_details_vente(v[0])
+        sum(d[2] for d in details)
+        paiements = Paiement.obtenir_paiements_vente(v[0])
+        set(p[2] for p in paiements)
+
+
+def apres():
+    Vente.lister_ventes(*PERIODE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--ventes', type=int, default=6000)
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    afficher_entete(f"LISTE DES VENTES : {args.ventes:,} ventes sur 30 jours")
+    generer_produits(db.conn, NB_PRODUITS)
+    generer_ventes(db.conn, args.ventes, NB_PRODUITS, nb_jours=30)
+
+    for nom, fonction in (("Avant (N+1)", avant), ("Apres (lister_ventes)", apres)):
+        with CompteurSQL(db) as compteur:
+            fonction()
+        duree = chronometrer(fonction, args.repetitions)
+        print(f"{nom:<24}{duree:>10.1f} ms  {compteur.instructions:>7,} instructions SQL")
+
+
+if __name__ == "__main__":
+    main()
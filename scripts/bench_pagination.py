@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la pagination des listes produits et clients
+
+USAGE:
+    python scripts/bench_pagination.py [--produits 50000] [--clients 50000] [--repetitions 5]
+
+Cout d'affichage d'une page de plus en plus profonde (page + total) :
+- OFFSET : LIMIT/OFFSET et COUNT(*) a chaque page (ancienne fenetre)
+- Cle    : page_filtre reprenant apres le curseur (tri, id), comptage memorise
+"""
+import argparse
+import random
+
+from bench_commun import preparer_base_temporaire, afficher_entete, chronometrer
+
+preparer_base_temporaire('bench_pagination')
+
+from database import db  # noqa: E402
+from modules.clients import Client  # noqa: E402
+from modules.produits import Produit  # noqa: E402
+
+PAGE = 50
+PROFONDEURS = [1, 10, 100, 500]
+NOMS = ["Awa", "Koffi", "Aya", "Yao", "Adjoua", "Kouame", "Bintou", "Moussa", "Fatou", "Ibrahim"]
+
+
+def generer(nb_produits, nb_clients):
+    rng = random.Random(3)
+    db.conn.executemany(
+        "INSERT INTO produits (nom, categorie, prix_achat, prix_vente, stock_actuel, code_barre) "
+        "VALUES (?, ?, 100, ?, ?, ?)",
+        [(f"Produit {i}", "Tissus" if i % 3 else "Mode", 150 + i % 900, i % 40, f"P{i:07d}")
+         for i in range(nb_produits)]
+    )
+    db.conn.executemany(
+        "INSERT INTO clients (nom, telephone) VALUES (?, ?)",
+        [(f"{rng.choice(NOMS)} {rng.randint(1, 99999)}", f"07{rng.randint(0, 99999999):08d}")
+         for _ in range(nb_clients)]
+    )
+    db.conn.commit()
+
+
+def curseur_produits(page):
+    """Curseur de debut de la page (obtenu en parcourant, comme la fenetre)"""
+    curseur = None
+    for _ in range(page):
+        _, curseur = Produit.page_filtre(categorie="Tissus", apres=curseur, limit=PAGE)
+    return curseur
+
+
+def curseur_clients(page):
+    curseur = None
+    for _ in range(page):
+        _, curseur = Client.page_filtre(apres=curseur, limit=PAGE)
+    return curseur
+
+
+def page_offset_produits(page):
+    db.fetch_all("SELECT * FROM produits WHERE categorie = ? ORDER BY id ASC LIMIT ? OFFSET ?",
+                 ("Tissus", PAGE, page * PAGE))
+    db.fetch_one("SELECT COUNT(*) FROM produits WHERE categorie = ?", ("Tissus",))
+
+
+def page_offset_clients(page):
+    db.fetch_all("SELECT * FROM clients ORDER BY nom ASC, id ASC LIMIT ? OFFSET ?", (PAGE, page * PAGE))
+    db.fetch_one("SELECT COUNT(*) FROM clients")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--produits', type=int, default=50000)
+    parser.add_argument('--clients', type=int, default=50000)
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    afficher_entete(f"PAGINATION : {args.produits:,} produits, {args.clients:,} clients, page de {PAGE}")
+    generer(args.produits, args.clients)
+
+    print(f"{'Liste':<10}{'Page':>6}{'OFFSET (ms)':>14}{'Cle (ms)':>12}")
+    for liste, curseur_page, page_offset, page_cle in [
+        ("Produits", curseur_produits, page_offset_produits,
+         lambda c: (Produit.page_filtre(categorie="Tissus", apres=c, limit=PAGE),
+                    Produit.compter_filtre(categorie="Tissus"))),
+        ("Clients", curseur_clients, page_offset_clients,
+         lambda c: (Client.page_filtre(apres=c, limit=PAGE), Client.compter_filtre())),
+    ]:
+        for page in PROFONDEURS:
+            curseur = curseur_page(page)
+            offset = chronometrer(lambda: page_offset(page), args.repetitions)
+            cle = chronometrer(lambda: page_cle(curseur), args.repetitions)
+            print(f"{liste:<10}{page:>6}{offset:>14.2f}{cle:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
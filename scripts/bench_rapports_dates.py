@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark des rapports par date : DATE(date_vente) = ? contre plage semi-ouverte
+
+USAGE:
+    python scripts/bench_rapports_dates.py [--ventes 1000000] [--repetitions 5]
+
+Genere une base temporaire de N ventes reparties sur 2 ans (2 lignes et
+1 paiement par vente), puis compare pour chaque rapport du jour :
+- Avant : les anciennes requetes filtrant sur DATE(date_vente) (parcours complet)
+- Apres : les fonctions actuelles des modules (modules.periodes, index idx_ventes_date)
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from bench_commun import (preparer_base_temporaire, afficher_entete, chronometrer,
+                          generer_produits, generer_ventes)
+
+preparer_base_temporaire('bench_rapports_dates')
+
+from database import db  # noqa: E402
+from modules.rapports import Rapport  # noqa: E402
+from modules.ventes import Vente  # noqa: E402
+from modules.paiements import Paiement  # noqa: E402
+
+NB_PRODUITS = 500
+NB_JOURS = 730
+
+
+# Anciennes requetes (avant modules.periodes)
+def avant_rapport_journalier(jour):
+    db.fetch_one("SELECT COUNT(*), COALESCE(SUM(total), 0) FROM ventes WHERE DATE(date_vente) = ?", (jour,))
+    db.fetch_one("SELECT COALESCE(SUM(dv.quantite), 0) FROM details_ventes dv "
+                 "JOIN ventes v ON dv.vente_id = v.id WHERE DATE(v.date_vente) = ?", (jour,))
+    db.fetch_all("SELECT numero_vente, date_vente, total, client FROM ventes "
+                 "WHERE DATE(date_vente) = ? ORDER BY date_vente DESC", (jour,))
+    db.fetch_all("SELECT p.nom, SUM(dv.quantite) as qte, SUM(dv.sous_total) as ca FROM details_ventes dv "
+                 "JOIN produits p ON dv.produit_id = p.id JOIN ventes v ON dv.vente_id = v.id "
+                 "WHERE DATE(v.date_vente) = ? GROUP BY p.id ORDER BY qte DESC LIMIT 10", (jour,))
+
+
+def avant_comparaison(jour):
+    hier = (datetime.strptime(jour, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+    db.fetch_all("SELECT DATE(date_vente) as jour, COUNT(*) as nb, COALESCE(SUM(total), 0) as ca "
+                 "FROM ventes WHERE DATE(date_vente) IN (?, ?) GROUP BY DATE(date_vente)", (jour, hier))
+
+
+def avant_total_par_mode(jour):
+    db.fetch_all("SELECT p.mode, SUM(p.montant) as total, COUNT(*) as nb FROM paiements p "
+                 "JOIN ventes v ON p.vente_id = v.id WHERE DATE(v.date_vente) = ? GROUP BY p.mode", (jour,))
+
+
+def avant_ventes_du_jour(jour):
+    db.fetch_all("SELECT * FROM ventes WHERE DATE(date_vente) = ? ORDER BY date_vente DESC", (jour,))
+
+
+def avant_statistiques_utilisateur(jour):
+    db.fetch_one("SELECT COUNT(*), COALESCE(SUM(total), 0) FROM ventes "
+                 "WHERE DATE(date_vente) = ? AND utilisateur_id = ?", (jour, 1))
+
+
+def avant_graphique_jour(jour):
+    db.fetch_all("SELECT strftime('%H', date_vente) as heure, COALESCE(SUM(total), 0) FROM ventes "
+                 "WHERE DATE(date_vente) = ? GROUP BY heure ORDER BY heure", (jour,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--ventes', type=int, default=1_000_000)
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    afficher_entete(f"RAPPORTS PAR DATE : {args.ventes:,} ventes sur {NB_JOURS} jours")
+    debut = time.perf_counter()
+    generer_produits(db.conn, NB_PRODUITS)
+    generer_ventes(db.conn, args.ventes, NB_PRODUITS, NB_JOURS)
+    print(f"Base generee en {time.perf_counter() - debut:.1f}s\n")
+
+    jour = datetime.now().strftime("%Y-%m-%d")
+    cas = [
+        ("rapport_journalier", lambda: avant_rapport_journalier(jour), lambda: Rapport.rapport_journalier(jour)),
+        ("comparaison_jour_precedent", lambda: avant_comparaison(jour), Rapport.comparaison_jour_precedent),
+        ("total_par_mode_jour", lambda: avant_total_par_mode(jour), lambda: Paiement.total_par_mode_jour(jour)),
+        ("obtenir_ventes_du_jour", lambda: avant_ventes_du_jour(jour), Vente.obtenir_ventes_du_jour),
+        ("statistiques_utilisateur", lambda: avant_statistiques_utilisateur(jour),
+         lambda: Rapport.statistiques_utilisateur(1)),
+        ("graphique jour", lambda: avant_graphique_jour(jour), lambda: Rapport.donnees_graphique_ventes('jour')),
+    ]
+    print(f"{'Rapport':<28}{'Avant (ms)':>12}{'Apres (ms)':>12}{'Gain':>8}")
+    for nom, avant, apres in cas:
+        t_avant = chronometrer(avant, args.repetitions)
+        t_apres = chronometrer(apres, args.repetitions)
+        print(f"{nom:<28}{t_avant:>12.2f}{t_apres:>12.2f}{t_avant / max(t_apres, 1e-6):>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la recherche client en caisse pendant la saisie
+
+USAGE:
+    python scripts/bench_recherche_clients.py [--clients 100000] [--repetitions 20]
+
+Chaque frappe ('0', '07', '071'... puis 'a', 'aw', 'awa'...) lance une
+recherche des 5 premiers clients :
+- LIKE    : ancienne recherche nom/telephone/email LIKE '%terme%'
+- Suggerer: Client.suggerer (fin du telephone indexee, prefixes FTS5 du nom)
+Temps par frappe en ms, mediane et 95e centile.
+"""
+import argparse
+import random
+import time
+
+from bench_commun import preparer_base_temporaire, afficher_entete, percentile
+
+preparer_base_temporaire('bench_recherche_clients')
+
+from database import db  # noqa: E402
+from modules.clients import Client  # noqa: E402
+
+PRENOMS = ["Awa", "Koffi", "Aya", "Yao", "Adjoua", "Kouamé", "Bintou", "Moussa", "Fatou", "Ibrahim",
+           "Aminata", "Konan", "Affoué", "Seydou", "Mariam", "Jean", "Marie", "Paul", "Esther", "Serge"]
+NOMS = ["Kouassi", "Traoré", "Koné", "Ouattara", "Bamba", "Diallo", "Coulibaly", "Yao", "N'Guessan",
+        "Touré", "Kouadio", "Soro", "Diabaté", "Aka", "Brou", "Gbagbo", "Konaté", "Sanogo", "Zadi", "Ehui"]
+FORMATS = ["+225 07 {0} {1} {2}", "07{0}{1}{2}", "07-{0}-{1}-{2}", "07 {0} {1} {2}"]
+SAISIES = ["0712 3456", "3456", "awa kouassi", "n'guessan", "kon"]
+LIMIT = 5
+
+
+def generer(nb_clients):
+    rng = random.Random(11)
+    lignes = []
+    for _ in range(nb_clients):
+        prenom, nom = rng.choice(PRENOMS), rng.choice(NOMS)
+        telephone = rng.choice(FORMATS).format(
+            f"{rng.randint(0, 99):02d}", f"{rng.randint(0, 99):02d}", f"{rng.randint(0, 9999):04d}")
+        email = f"{prenom.lower()}.{nom.lower()}@mail.ci" if rng.random() < 0.3 else None
+        lignes.append((f"{prenom} {nom}", telephone, email, rng.randint(0, 80)))
+    db.conn.executemany(
+        "INSERT INTO clients (nom, telephone, email, nombre_achats) VALUES (?, ?, ?, ?)", lignes)
+    db.conn.commit()
+
+
+def frappes(saisie):
+    return [saisie[:n] for n in range(2, len(saisie) + 1) if saisie[:n].strip()]
+
+
+def mesurer(fonction, termes, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        for terme in termes:
+            debut = time.perf_counter()
+            fonction(terme)
+            durees.append((time.perf_counter() - debut) * 1000)
+    return percentile(durees, 50), percentile(durees, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=100000)
+    parser.add_argument('--repetitions', type=int, default=20)
+    args = parser.parse_args()
+
+    afficher_entete(f"RECHERCHE CLIENTS : {args.clients:,} clients, {LIMIT} suggestions par frappe")
+    generer(args.clients)
+
+    def like(terme):
+        return Client.rechercher_filtre(terme, limit=LIMIT)
+
+    def suggerer(terme):
+        return Client.suggerer(terme, LIMIT)
+
+    print(f"{'Saisie':<14}{'LIKE p50/p95 (ms)':>22}{'Suggerer p50/p95 (ms)':>26}")
+    for saisie in SAISIES:
+        termes = frappes(saisie)
+        l50, l95 = mesurer(like, termes, args.repetitions)
+        s50, s95 = mesurer(suggerer, termes, args.repetitions)
+        print(f"{saisie:<14}{l50:>11.2f} / {l95:<8.2f}{s50:>15.2f} / {s95:<8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la recherche produits pendant la saisie
+
+USAGE:
+    python scripts/bench_recherche_produits.py [--produits 20000] [--repetitions 5]
+
+Pour chaque frappe de quelques termes ('p', 'pa', 'pag'...), la fenetre
+Produits charge une page de 50 lignes et le nombre total de resultats :
+- LIKE : ancien filtre nom/categorie/code_barre LIKE '%terme%' (parcours complet)
+- FTS5 : Produit.rechercher_filtre + compter_filtre (index produits_fts)
+"""
+import argparse
+import random
+
+from bench_commun import preparer_base_temporaire, afficher_entete, chronometrer
+
+preparer_base_temporaire('bench_recherche_produits')
+
+from database import db  # noqa: E402
+from modules.produits import Produit  # noqa: E402
+
+ARTICLES = ["Pagne", "Savon", "Crème", "Huile", "Riz", "Sucre", "Lait", "Café", "Thé", "Biscuit",
+            "Jus", "Eau", "Farine", "Pâtes", "Sardine", "Tomate", "Beurre", "Chaussure", "Sac", "Parfum"]
+QUALIFICATIFS = ["wax", "local", "importé", "bio", "karité", "vanille", "coco", "premium", "éco",
+                 "familial", "mini", "géant", "doux", "épicé", "sucré", "naturel", "rouge", "bleu"]
+CATEGORIES = ["Tissus", "Hygiène", "Cosmétique", "Alimentation", "Boissons", "Épicerie", "Mode"]
+TERMES = ["pagne wax", "creme", "G0123", "sucre bio"]
+PAGE = 50
+
+
+def generer(nb_produits):
+    rng = random.Random(7)
+    db.conn.executemany(
+        "INSERT INTO produits (nom, categorie, prix_achat, prix_vente, stock_actuel, code_barre, description) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(f"{rng.choice(ARTICLES)} {rng.choice(QUALIFICATIFS)} {rng.randint(1, 999)}",
+          rng.choice(CATEGORIES), 100, 150 + i % 900, i % 40, f"G{i:06d}",
+          f"{rng.choice(QUALIFICATIFS)} {rng.choice(QUALIFICATIFS)}")
+         for i in range(nb_produits)]
+    )
+    db.conn.commit()
+
+
+def page_like(terme):
+    t = f"%{terme}%"
+    condition = "(nom LIKE ? OR categorie LIKE ? OR code_barre LIKE ?)"
+    db.fetch_all(f"SELECT * FROM produits WHERE {condition} ORDER BY id ASC LIMIT ? OFFSET ?",
+                 (t, t, t, PAGE, 0))
+    return db.fetch_one(f"SELECT COUNT(*) FROM produits WHERE {condition}", (t, t, t))[0]
+
+
+def page_fts(terme):
+    Produit.rechercher_filtre(terme=terme, limit=PAGE, offset=0)
+    return Produit.compter_filtre(terme=terme)
+
+
+def frappes(terme):
+    return [terme[:n] for n in range(1, len(terme) + 1) if terme[:n].strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--produits', type=int, default=20000)
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    afficher_entete(f"RECHERCHE PRODUITS : {args.produits:,} produits, page de {PAGE}")
+    generer(args.produits)
+
+    print(f"{'Terme':<12}{'LIKE (ms/frappe)':>18}{'FTS5 (ms/frappe)':>18}{'resultats LIKE/FTS5':>22}")
+    total_like = total_fts = 0.0
+    for terme in TERMES:
+        saisies = frappes(terme)
+        like = chronometrer(lambda: [page_like(s) for s in saisies], args.repetitions) / len(saisies)
+        fts = chronometrer(lambda: [page_fts(s) for s in saisies], args.repetitions) / len(saisies)
+        total_like += like
+        total_fts += fts
+        print(f"{terme:<12}{like:>18.2f}{fts:>18.2f}{page_like(terme):>12,} / {page_fts(terme):,}")
+    print(f"{'Moyenne':<12}{total_like / len(TERMES):>18.2f}{total_fts / len(TERMES):>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
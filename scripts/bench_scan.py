@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de latence du scan : recherche d'un produit par code-barres
+
+USAGE:
+    python scripts/bench_scan.py [--produits 10000] [--scans 20000]
+
+Mesure, par scan, sur un catalogue de N produits :
+- Avant : SELECT * FROM produits WHERE code_barre = ? a chaque scan
+- Cache, absent : premier scan d'un code (requete puis mise en cache)
+- Cache, present : scans suivants (dictionnaire + PRAGMA data_version)
+"""
+import argparse
+import random
+import time
+
+from bench_commun import preparer_base_temporaire, afficher_entete, percentile, generer_produits
+
+preparer_base_temporaire('bench_scan')
+
+from database import db  # noqa: E402
+from modules.produits import Produit, cache_produits  # noqa: E402
+
+
+def mesurer(fonction, codes):
+    """Latences en microsecondes d'un appel par code"""
+    durees = []
+    for code in codes:
+        debut = time.perf_counter()
+        fonction(code)
+        durees.append((time.perf_counter() - debut) * 1e6)
+    return durees
+
+
+def afficher(nom, durees):
+    print(f"{nom:<22} p50={percentile(durees, 50):>7.1f} us  "
+          f"p95={percentile(durees, 95):>7.1f} us  p99={percentile(durees, 99):>7.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--produits', type=int, default=10000)
+    parser.add_argument('--scans', type=int, default=20000)
+    args = parser.parse_args()
+
+    afficher_entete(f"SCAN : {args.scans:,} scans sur {args.produits:,} produits")
+    generer_produits(db.conn, args.produits, stock=1000)
+    codes = [r['code_barre'] for r in db.fetch_all("SELECT code_barre FROM produits")]
+    rng = random.Random(42)
+    scans = [rng.choice(codes) for _ in range(args.scans)]
+
+    afficher("Avant (SQL)", mesurer(
+        lambda code: db.fetch_one("SELECT * FROM produits WHERE code_barre = ?", (code,)), scans))
+
+    cache_produits.invalider()
+    afficher("Cache, absent", mesurer(Produit.obtenir_par_code_barre, codes))
+    afficher("Cache, present", mesurer(Produit.obtenir_par_code_barre, scans))
+
+    debut = time.perf_counter()
+    cache_produits.invalider()
+    nb = cache_produits.precharger()
+    print(f"\nprecharger() : {nb:,} produits en {(time.perf_counter() - debut) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark du modele de tableau : temps de chargement et memoire (RSS)
+
+USAGE:
+    python scripts/bench_table.py [--lignes 10000 100000]
+
+Compare, pour N lignes de 8 colonnes affichees dans une BoutiqueTableView :
+- Avant : QStandardItemModel, un QStandardItem par cellule, ligne par ligne
+- Apres : BoutiqueTableModel (lignes gardees telles quelles, exposees par lots)
+- Pages : BoutiqueTableModel.charger_pages, lignes lues page par page a la
+  source au fil du defilement (pagination par cle)
+Chaque mesure tourne dans un processus neuf pour que le RSS soit comparable.
+Pour avant/apres, les lignes sont generees avant le releve initial : le RSS
+compte ce que le modele et la vue ajoutent, pas les donnees elles-memes.
+Pour pages, la source genere chaque page a la demande : le RSS compte les
+donnees chargees, et la vue defile jusqu'en bas de la premiere page.
+
+Mesure (PySide6 6.7.3, Python 3.11, QT_QPA_PLATFORM=offscreen) :
+       Lignes  Variante    Temps (ms)   RSS (+Mo)
+       10,000     avant         662.7        60.3
+       10,000     apres          30.2         9.7
+       10,000     pages          62.4         9.6
+      100,000     avant        8525.0       519.9
+      100,000     apres          28.1        13.0
+      100,000     pages          35.0         9.7
+Avec pages, le RSS (donnees comprises) ne depend plus du nombre de lignes.
+PySide6 6.12 plante sur la variante avant a 10 000 lignes (none_dealloc,
+erreur de compteur de references dans QStandardItem) ; la 6.7.3 passe.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+COLONNES = ["ID", "Numero", "Date", "Heure", "Client", "Total (FCFA)", "Paiement", "Nb Articles"]
+
+
+def rss_mo():
+    """Memoire residente du processus en Mo (Linux /proc, sinon psutil, sinon None)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        return None
+
+
+def generer_ligne(i):
+    return (i, f"V{i:08d}", "2024-03-01", "10:30", f"Client {i % 500}",
+            f"{1000 + i % 9000:,}", "Especes", 1 + i % 7)
+
+
+def generer_lignes(nombre):
+    return [generer_ligne(i) for i in range(nombre)]
+
+
+def source_paginee(nombre, taille):
+    """page(apres) -> (lignes, suivant) sur nombre lignes generees a la demande"""
+    def page(apres):
+        debut = 0 if apres is None else apres + 1
+        fin = min(nombre, debut + taille)
+        lignes = [generer_ligne(i) for i in range(debut, fin)]
+        return lignes, (fin - 1 if fin < nombre else None)
+    return page
+
+
+class AncienModele:
+    """Chargement de l'ancien BoutiqueTableModel (QStandardItemModel)"""
+
+    def __init__(self, colonnes):
+        from PySide6.QtGui import QStandardItemModel
+        self.model = QStandardItemModel(0, len(colonnes))
+        self.model.setHorizontalHeaderLabels(colonnes)
+
+    def charger_donnees(self, lignes):
+        from PySide6.QtCore import Qt
+        from PySide6.QtGui import QStandardItem
+        self.model.removeRows(0, self.model.rowCount())
+        for ligne in lignes:
+            items = []
+            for valeur in ligne:
+                item = QStandardItem()
+                if isinstance(valeur, (int, float)):
+                    item.setData(valeur, Qt.DisplayRole)
+                else:
+                    item.setText(str(valeur) if valeur is not None else "")
+                item.setEditable(False)
+                items.append(item)
+            self.model.appendRow(items)
+
+
+def mesurer(variante, nombre):
+    """Execute dans le processus enfant : affiche 'duree_ms rss_mo'"""
+    from PySide6.QtWidgets import QApplication
+    from ui.components.table import BoutiqueTableView, BoutiqueTableModel
+
+    app = QApplication.instance() or QApplication([])
+    lignes = generer_lignes(nombre) if variante != 'pages' else None
+    rss_avant = rss_mo()
+
+    debut = time.perf_counter()
+    if variante == 'avant':
+        modele = AncienModele(COLONNES)
+        modele.charger_donnees(lignes)
+        qt_model = modele.model
+    elif variante == 'apres':
+        qt_model = BoutiqueTableModel(COLONNES)
+        qt_model.charger_donnees(lignes)
+    else:
+        qt_model = BoutiqueTableModel(COLONNES)
+        qt_model.charger_pages(source_paginee(nombre, BoutiqueTableModel.TAILLE_LOT))
+    vue = BoutiqueTableView()
+    vue.setModel(qt_model)
+    vue.resize(1200, 700)
+    vue.show()
+    app.processEvents()
+    if variante == 'pages':
+        vue.scrollToBottom()
+        app.processEvents()
+    duree = (time.perf_counter() - debut) * 1000
+
+    rss_apres = rss_mo()
+    delta = rss_apres - rss_avant if rss_avant is not None and rss_apres is not None else -1
+    print(f"{duree:.1f} {delta:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--lignes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--mesure', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mesure:
+        mesurer(args.mesure[0], int(args.mesure[1]))
+        return
+
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    print("=" * 60)
+    print("MODELE DE TABLEAU : chargement + premier affichage")
+    print("=" * 60)
+    print(f"{'Lignes':>10}{'Variante':>10}{'Temps (ms)':>14}{'RSS (+Mo)':>12}")
+    for nombre in args.lignes:
+        for variante in ('avant', 'apres', 'pages'):
+            sortie = subprocess.run(
+                [sys.executable, __file__, '--mesure', variante, str(nombre)],
+                capture_output=True, text=True, env=env)
+            if sortie.returncode != 0:
+                print(sortie.stderr.strip().splitlines()[-1])
+                return
+            duree, delta = sortie.stdout.split()[-2:]
+            print(f"{nombre:>10,}{variante:>10}{float(duree):>14.1f}{float(delta):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
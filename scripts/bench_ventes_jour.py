@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de l'agregat ventes_jour : rapports par periode
+
+USAGE:
+    python scripts/bench_ventes_jour.py [--ventes 300000] [--repetitions 10]
+
+Compare, sur une base temporaire de N ventes reparties sur 2 ans :
+- Avant : agregation des lignes de ventes sur la plage (idx_ventes_date)
+- Apres : les fonctions de Rapport, qui lisent ventes_jour (O(jours))
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from bench_commun import (preparer_base_temporaire, afficher_entete, chronometrer,
+                          generer_produits, generer_ventes)
+
+preparer_base_temporaire('bench_ventes_jour')
+
+from database import db  # noqa: E402
+from modules.rapports import Rapport  # noqa: E402
+from modules.periodes import plage_mois, plage_jours, plage_derniers_jours  # noqa: E402
+
+NB_PRODUITS = 500
+
+
+def avant_par_jour(plage):
+    db.fetch_all("SELECT DATE(date_vente), COUNT(*), SUM(total) FROM ventes "
+                 "WHERE date_vente >= ? AND date_vente < ? GROUP BY DATE(date_vente)", plage)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--ventes', type=int, default=300000)
+    parser.add_argument('--repetitions', type=int, default=10)
+    args = parser.parse_args()
+
+    afficher_entete(f"AGREGAT ventes_jour : {args.ventes:,} ventes sur 730 jours")
+    debut = time.perf_counter()
+    generer_produits(db.conn, NB_PRODUITS)
+    generer_ventes(db.conn, args.ventes, NB_PRODUITS)
+    print(f"Base generee en {time.perf_counter() - debut:.1f}s\n")
+
+    annee = (str(date.today() - timedelta(days=365)), str(date.today()))
+    cas = [
+        ("graphique semaine", lambda: avant_par_jour(plage_derniers_jours(7)),
+         lambda: Rapport.donnees_graphique_ventes('semaine')),
+        ("graphique mois", lambda: avant_par_jour(plage_mois()),
+         lambda: Rapport.donnees_graphique_ventes('mois')),
+        ("ventes_par_periode 1 an", lambda: avant_par_jour(plage_jours(*annee)),
+         lambda: Rapport.ventes_par_periode(*annee)),
+    ]
+    print(f"{'Rapport':<28}{'Avant (ms)':>12}{'Apres (ms)':>12}{'Gain':>8}")
+    for nom, avant, apres in cas:
+        t_avant = chronometrer(avant, args.repetitions)
+        t_apres = chronometrer(apres, args.repetitions)
+        print(f"{nom:<28}{t_avant:>12.2f}{t_apres:>12.2f}{t_avant / t_apres:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
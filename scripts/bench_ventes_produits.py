@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark des agregats par produit : top produits, CA par categorie, marges
+
+USAGE:
+    python scripts/bench_ventes_produits.py [--ventes 300000] [--repetitions 10]
+
+Compare, sur une base temporaire de N ventes (2 lignes chacune) :
+- Avant : jointure details_ventes -> produits avec GROUP BY a chaque appel
+- Apres : les fonctions de Rapport, qui lisent ventes_produits
+"""
+import argparse
+import time
+
+from bench_commun import (preparer_base_temporaire, afficher_entete, chronometrer,
+                          generer_produits, generer_ventes)
+
+preparer_base_temporaire('bench_ventes_produits')
+
+from database import db  # noqa: E402
+from modules.rapports import Rapport  # noqa: E402
+
+NB_PRODUITS = 2000
+
+
+def avant_top_produits():
+    db.fetch_all("""
+        SELECT p.nom, p.categorie, SUM(dv.quantite) as total_vendu, SUM(dv.sous_total) as ca_total
+        FROM details_ventes dv JOIN produits p ON dv.produit_id = p.id
+        GROUP BY p.id ORDER BY total_vendu DESC LIMIT 20""")
+
+
+def avant_ca_par_categorie():
+    db.fetch_all("""
+        SELECT p.categorie, SUM(dv.sous_total) as ca_total
+        FROM details_ventes dv JOIN produits p ON dv.produit_id = p.id
+        GROUP BY p.categorie ORDER BY ca_total DESC""")
+
+
+def avant_marges():
+    db.fetch_all("""
+        SELECT p.nom, SUM(dv.quantite), SUM(dv.sous_total), SUM(dv.quantite * p.prix_achat)
+        FROM details_ventes dv JOIN produits p ON dv.produit_id = p.id
+        GROUP BY p.id""")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--ventes', type=int, default=300000)
+    parser.add_argument('--repetitions', type=int, default=10)
+    args = parser.parse_args()
+
+    afficher_entete(f"VENTES PAR PRODUIT : {args.ventes:,} ventes, {NB_PRODUITS} produits")
+    debut = time.perf_counter()
+    generer_produits(db.conn, NB_PRODUITS)
+    generer_ventes(db.conn, args.ventes, NB_PRODUITS)
+    print(f"Base generee en {time.perf_counter() - debut:.1f}s\n")
+
+    cas = [
+        ("top_produits(20)", avant_top_produits, lambda: Rapport.top_produits(20)),
+        ("ca_par_categorie", avant_ca_par_categorie, Rapport.ca_par_categorie),
+        ("marges_produits", avant_marges, Rapport.marges_produits),
+    ]
+    print(f"{'Rapport':<22}{'Avant (ms)':>12}{'Apres (ms)':>12}{'Gain':>8}")
+    for nom, avant, apres in cas:
+        t_avant = chronometrer(avant, args.repetitions)
+        t_apres = chronometrer(apres, args.repetitions)
+        print(f"{nom:<22}{t_avant:>12.2f}{t_apres:>12.2f}{t_avant / t_apres:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Reconstruction des tables d'agregats (compteurs, ventes_jour, ventes par produit)
+
+USAGE:
+    python scripts/reconstruire_agregats.py
+
+Ces tables sont tenues a jour par triggers. A lancer si elles ont diverge
+des donnees (import manuel avec triggers desactives, base restauree
+partiellement...) : tout est recalcule depuis ventes, details_ventes et
+produits, dans une seule transaction. Le cout des ventes par produit est
+alors recalcule au prix d'achat actuel.
+"""
+import sys
+import os
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db, reconstruire_compteurs, reconstruire_ventes_jour, reconstruire_ventes_produits
+from modules.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def reconstruire_agregats():
+    """Recalculer compteurs, ventes_jour et ventes par produit depuis les donnees"""
+    print("=" * 60)
+    print("RECONSTRUCTION DES AGREGATS")
+    print("=" * 60)
+
+    with db.transaction() as cur:
+        reconstruire_compteurs(cur)
+        reconstruire_ventes_jour(cur)
+        reconstruire_ventes_produits(cur)
+        nb_lignes, = cur.execute("SELECT COUNT(*) FROM ventes_jour").fetchone()
+
+    logger.info(f"Agregats reconstruits ({nb_lignes} lignes ventes_jour)")
+    print(f"\n✓ compteurs, ventes_jour et ventes par produit reconstruits ({nb_lignes} lignes ventes_jour)")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(reconstruire_agregats())
+    except Exception as e:
+        logger.error(f"Erreur fatale: {e}")
+        print(f"\n✗ Erreur fatale: {e}")
+        sys.exit(1)
@@ -8,13 +8,26 @@ import sqlite3
 from datetime import datetime
 from functools import wraps
 from flask import Flask, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+
+import format_sync  # Copie de modules/format_sync.py, livree avec ce serveur
 
 app = Flask(__name__)
+# Corps de requete : compresse, puis une fois decompresse (format_sync.decoder)
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+TAILLE_MAX_CORPS = 64 * 1024 * 1024
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SYNC_DB_PATH = os.path.join(BASE_DIR, 'sync_data.db')
 LICENCE_DB_PATH = os.path.join(BASE_DIR, '..', 'serveur_licence', 'licences.db')
 
+# Suppressions propagees : table du poste -> (table miroir, colonne cle)
+TABLES_SUPPRESSIONS = {
+    'produits': ('sync_produits', 'code_barre'),
+    'ventes': ('sync_ventes', 'numero_vente'),
+    'utilisateurs': ('sync_utilisateurs', 'email'),
+}
+
 # --- Base de données sync ---
 
 def get_sync_db():
@@ -112,6 +125,30 @@ def init_sync_db():
         )
     ''')
 
+    # Dernier lot recu de chaque poste (seq de son journal des changements)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_postes (
+            licence_key TEXT NOT NULL,
+            machine_id TEXT NOT NULL,
+            journal TEXT,
+            seq INTEGER DEFAULT 0,
+            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (licence_key, machine_id)
+        )
+    ''')
+
+    # Suppressions faites sur un poste, a rejouer chez les autres au pull
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_suppressions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            licence_key TEXT NOT NULL,
+            machine_id TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            cle TEXT NOT NULL,
+            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
     conn.commit()
     conn.close()
 
@@ -177,10 +214,16 @@ def require_auth(f):
 
 # --- Routes API ---
 
+def repondre_sync(donnees, code=200):
+    """Reponse au format demande par le poste (JSON ou colonnes compressees)"""
+    corps, entetes = format_sync.reponse(donnees, request.headers)
+    return corps, code, entetes
+
+
 @app.route('/api/sync/ping', methods=['GET'])
 def ping():
     """Health check"""
-    return jsonify({
+    return repondre_sync({
         'status': 'ok',
         'service': 'sync',
         'timestamp': datetime.now().isoformat()
@@ -192,13 +235,45 @@ def ping():
 def push(licence_key, machine_id):
     """Recevoir les changements d'un client"""
     try:
-        data = request.json
+        data = format_sync.decoder(request.get_data(), TAILLE_MAX_CORPS)
         if not data:
             return jsonify({'error': 'Aucune donnee'}), 400
 
         conn = get_sync_db()
         now = datetime.now().isoformat()
 
+        # Lots du journal : un lot deja recu (reponse perdue) n'est pas rejoue
+        seq = data.get('seq')
+        if seq is not None:
+            poste = conn.execute(
+                "SELECT journal, seq FROM sync_postes WHERE licence_key = ? AND machine_id = ?",
+                (licence_key, machine_id)
+            ).fetchone()
+            seq_poste = poste['seq'] if poste and poste['journal'] == data.get('journal') else 0
+            if seq <= seq_poste:
+                conn.close()
+                return repondre_sync({'status': 'ok', 'message': 'Lot deja recu', 'seq': seq_poste})
+            if data.get('depuis', 0) < seq_poste:
+                conn.close()
+                return repondre_sync({'status': 'reprise', 'seq': seq_poste}, 409)
+
+        # Suppressions (avant les insertions : une cle peut etre recreee)
+        for table, cles in (data.get('suppressions') or {}).items():
+            if table not in TABLES_SUPPRESSIONS:
+                continue
+            miroir, colonne = TABLES_SUPPRESSIONS[table]
+            for cle in cles:
+                if table == 'ventes':
+                    conn.execute(
+                        "DELETE FROM sync_details_ventes WHERE licence_key = ? AND numero_vente = ?",
+                        (licence_key, cle))
+                conn.execute(f"DELETE FROM {miroir} WHERE licence_key = ? AND {colonne} = ?",
+                             (licence_key, cle))
+                conn.execute('''
+                    INSERT INTO sync_suppressions (licence_key, machine_id, table_name, cle, synced_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (licence_key, machine_id, table, cle, now))
+
         # Produits
         for p in data.get('produits', []):
             conn.execute('''
@@ -226,17 +301,22 @@ def push(licence_key, machine_id):
         # Ventes
         for v in data.get('ventes', []):
             conn.execute('''
-                INSERT OR IGNORE INTO sync_ventes
+                INSERT INTO sync_ventes
                     (licence_key, machine_id, numero_vente, date_vente, total,
                      client, statut, deleted_at, synced_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(licence_key, numero_vente) DO UPDATE SET
+                    machine_id=excluded.machine_id, total=excluded.total,
+                    client=excluded.client, statut=excluded.statut,
+                    deleted_at=excluded.deleted_at, synced_at=excluded.synced_at
             ''', (
                 licence_key, machine_id, v['numero_vente'], v['date_vente'],
                 v['total'], v.get('client'), v.get('statut', 'terminee'),
                 v.get('deleted_at'), now
             ))
 
-        # Details ventes
+        # Details ventes : les lignes recues remplacent celles de leur vente
+        remplacees = set()
         for d in data.get('details_ventes', []):
             # Retrouver le numero_vente pour ce detail
             numero_vente = d.get('numero_vente', '')
@@ -247,6 +327,12 @@ def push(licence_key, machine_id):
                         numero_vente = v['numero_vente']
                         break
 
+            if numero_vente not in remplacees:
+                conn.execute(
+                    "DELETE FROM sync_details_ventes WHERE licence_key = ? AND numero_vente = ?",
+                    (licence_key, numero_vente))
+                remplacees.add(numero_vente)
+
             conn.execute('''
                 INSERT INTO sync_details_ventes
                     (licence_key, machine_id, numero_vente, produit_code_barre,
@@ -291,11 +377,21 @@ def push(licence_key, machine_id):
                 u.get('dernier_login'), u.get('updated_at', now), now
             ))
 
+        if seq is not None:
+            conn.execute('''
+                INSERT INTO sync_postes (licence_key, machine_id, journal, seq, synced_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(licence_key, machine_id) DO UPDATE SET
+                    journal=excluded.journal, seq=excluded.seq, synced_at=excluded.synced_at
+            ''', (licence_key, machine_id, data.get('journal'), seq, now))
+
         conn.commit()
         conn.close()
 
-        return jsonify({'status': 'ok', 'message': 'Push recu'})
+        return repondre_sync({'status': 'ok', 'message': 'Push recu', 'seq': seq})
 
+    except (RequestEntityTooLarge, format_sync.CorpsTropVolumineux) as e:
+        return jsonify({'error': str(e)}), 413
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -305,7 +401,7 @@ def push(licence_key, machine_id):
 def pull(licence_key, machine_id):
     """Renvoyer les changements depuis un timestamp, en excluant ceux du meme machine_id"""
     try:
-        data = request.json or {}
+        data = format_sync.decoder(request.get_data(), TAILLE_MAX_CORPS)
         depuis = data.get('depuis', '2000-01-01T00:00:00')
 
         conn = get_sync_db()
@@ -396,17 +492,31 @@ def pull(licence_key, machine_id):
                 'updated_at': u['updated_at']
             })
 
+        # Suppressions
+        suppressions = conn.execute('''
+            SELECT table_name, cle FROM sync_suppressions
+            WHERE licence_key = ? AND machine_id != ? AND synced_at > ?
+            ORDER BY id
+        ''', (licence_key, machine_id, depuis)).fetchall()
+
+        result_suppressions = {}
+        for s in suppressions:
+            result_suppressions.setdefault(s['table_name'], []).append(s['cle'])
+
         conn.close()
 
-        return jsonify({
+        return repondre_sync({
             'produits': result_produits,
             'ventes': result_ventes,
             'details_ventes': result_details,
             'historique_stock': result_historique,
             'utilisateurs': result_utilisateurs,
+            'suppressions': result_suppressions,
             'timestamp': datetime.now().isoformat()
         })
 
+    except (RequestEntityTooLarge, format_sync.CorpsTropVolumineux) as e:
+        return jsonify({'error': str(e)}), 413
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
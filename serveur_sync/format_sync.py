@@ -0,0 +1,178 @@
+"""
+Format d'echange compact de la synchronisation
+
+Les corps JSON de push / pull repetent le nom de chaque colonne sur chaque
+ligne. En format 'colonnes', chaque table est un lot :
+
+    {'format': 'colonnes',
+     'ventes': {'colonnes': ['id', 'numero_vente', ...], 'lignes': [[1, 'V-...', ...], ...]},
+     ...}
+
+et le corps est compresse (zstd si le module zstandard est installe, gzip
+sinon). Negociation :
+- le client annonce ce qu'il sait lire (X-Sync-Format, Accept-Encoding) ;
+- le serveur repond dans ce format et annonce ce qu'il accepte
+  (X-Sync-Format, X-Sync-Encodages) ; le client n'envoie de corps compacts
+  qu'apres cette annonce, un ancien serveur continue de recevoir du JSON.
+La lecture reconnait la compression a ses premiers octets : un corps deja
+decompresse par la couche HTTP passe tel quel. Cote serveur, decoder()
+recoit une taille maximale : un petit corps compresse ne peut pas gonfler
+sans limite en memoire.
+
+Une copie de ce fichier accompagne chaque serveur (serveur_sync/,
+serveur_licence/), deployables seuls : les trois doivent rester identiques
+(tests/test_format_sync.py le verifie).
+"""
+import gzip
+import io
+import json
+import zlib
+
+try:
+    import zstandard
+    ZSTD = True
+except ImportError:
+    ZSTD = False
+
+FORMAT = 'colonnes'
+ENCODAGES = ('zstd', 'gzip') if ZSTD else ('gzip',)
+SEUIL_COMPRESSION = 1024  # octets ; en dessous, l'en-tete gzip coute plus qu'il ne gagne
+
+ENTETE_FORMAT = 'X-Sync-Format'
+ENTETE_ENCODAGES = 'X-Sync-Encodages'
+
+_MAGIQUE_GZIP = b'\x1f\x8b'
+_MAGIQUE_ZSTD = b'\x28\xb5\x2f\xfd'
+
+
+class CorpsTropVolumineux(ValueError):
+    """Corps decompresse au-dela de la taille maximale demandee"""
+
+
+def en_colonnes(donnees):
+    """Listes de dicts -> {'colonnes', 'lignes'} ; les autres cles sont gardees"""
+    resultat = {'format': FORMAT}
+    for cle, valeur in donnees.items():
+        if isinstance(valeur, list) and valeur and all(isinstance(ligne, dict) for ligne in valeur):
+            colonnes = list(dict.fromkeys(c for ligne in valeur for c in ligne))
+            valeur = {'colonnes': colonnes,
+                      'lignes': [[ligne.get(c) for c in colonnes] for ligne in valeur]}
+        resultat[cle] = valeur
+    return resultat
+
+
+def depuis_colonnes(donnees):
+    """Inverse de en_colonnes ; un dict deja en lignes est rendu tel quel"""
+    if donnees.get('format') != FORMAT:
+        return donnees
+    resultat = {}
+    for cle, valeur in donnees.items():
+        if cle == 'format':
+            continue
+        if isinstance(valeur, dict) and set(valeur) == {'colonnes', 'lignes'}:
+            colonnes = valeur['colonnes']
+            valeur = [dict(zip(colonnes, ligne)) for ligne in valeur['lignes']]
+        resultat[cle] = valeur
+    return resultat
+
+
+def choisir_encodage(annonce):
+    """Meilleur encodage commun avec une liste 'zstd, gzip;q=0.8' (None : aucun)"""
+    proposes = {partie.split(';')[0].strip().lower() for partie in (annonce or '').split(',')}
+    return next((encodage for encodage in ENCODAGES if encodage in proposes), None)
+
+
+def compresser(corps, encodage):
+    if encodage == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(corps)
+    if encodage == 'gzip':
+        return gzip.compress(corps, compresslevel=6)
+    return corps
+
+
+def encodage_de(corps):
+    """Compression d'un corps d'apres ses premiers octets (None : aucune)"""
+    if corps[:2] == _MAGIQUE_GZIP:
+        return 'gzip'
+    if corps[:4] == _MAGIQUE_ZSTD:
+        return 'zstd'
+    return None
+
+
+def decompresser(corps, taille_max=None):
+    """Corps eventuellement compresse -> octets.
+
+    taille_max : octets decompresses au-dela desquels CorpsTropVolumineux est
+    levee, sans decompresser la suite (None : pas de limite).
+    """
+    encodage = encodage_de(corps)
+    if encodage == 'gzip':
+        if taille_max is None:
+            return gzip.decompress(corps)
+        decompresseur = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        resultat = decompresseur.decompress(corps, taille_max + 1)
+    elif encodage == 'zstd':
+        if not ZSTD:
+            raise ValueError("Corps zstd recu mais zstandard n'est pas installe")
+        if taille_max is None:
+            return zstandard.ZstdDecompressor().decompressobj().decompress(corps)
+        morceaux, lus = [], 0
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(corps)) as lecteur:
+            while lus <= taille_max:
+                morceau = lecteur.read(taille_max + 1 - lus)
+                if not morceau:
+                    break
+                morceaux.append(morceau)
+                lus += len(morceau)
+        resultat = b''.join(morceaux)
+    else:
+        resultat = corps
+    if taille_max is not None and len(resultat) > taille_max:
+        raise CorpsTropVolumineux(f"Corps de plus de {taille_max} octets une fois decompresse")
+    return resultat
+
+
+def encoder(donnees, colonnes=False, encodage=None):
+    """dict -> (corps en octets, encodage effectivement applique ou None)"""
+    if colonnes:
+        donnees = en_colonnes(donnees)
+    corps = json.dumps(donnees, default=str, separators=(',', ':') if colonnes else None).encode('utf-8')
+    if encodage is None or len(corps) < SEUIL_COMPRESSION:
+        return corps, None
+    return compresser(corps, encodage), encodage
+
+
+def decoder(corps, taille_max=None):
+    """Corps recu (JSON ou compact, compresse ou non) -> dict en lignes"""
+    if not corps:
+        return {}
+    return depuis_colonnes(json.loads(decompresser(corps, taille_max)))
+
+
+def entetes_requete(encodage=None):
+    """En-tetes d'un envoi : ce que le client sait lire, et l'encodage du corps"""
+    entetes = {ENTETE_FORMAT: FORMAT, 'Accept-Encoding': ', '.join(ENCODAGES)}
+    if encodage:
+        entetes['Content-Encoding'] = encodage
+    return entetes
+
+
+def negocier(entetes_reponse):
+    """(colonnes, encodage) a utiliser pour les envois, d'apres une reponse du serveur"""
+    colonnes = (entetes_reponse.get(ENTETE_FORMAT) or '').strip().lower() == FORMAT
+    return colonnes, choisir_encodage(entetes_reponse.get(ENTETE_ENCODAGES))
+
+
+def reponse(donnees, entetes_client):
+    """Cote serveur : (corps, en-tetes) d'une reponse au format demande par le client"""
+    colonnes = (entetes_client.get(ENTETE_FORMAT) or '').strip().lower() == FORMAT
+    corps, encodage = encoder(donnees, colonnes, choisir_encodage(entetes_client.get('Accept-Encoding')))
+    entetes = {
+        'Content-Type': 'application/json',
+        ENTETE_FORMAT: FORMAT,
+        ENTETE_ENCODAGES: ', '.join(ENCODAGES),
+        'Vary': f"Accept-Encoding, {ENTETE_FORMAT}",
+    }
+    if encodage:
+        entetes['Content-Encoding'] = encodage
+    return corps, entetes
@@ -28,10 +28,16 @@ def reset_db():
     db = database.db
     for table in ['paiements', 'details_ventes', 'historique_stock', 'logs_actions',
                   'sync_queue', 'ventes', 'produits', 'clients', 'utilisateurs',
-                  'parametres', 'taux_tva', 'devises']:
+                  'parametres', 'taux_tva', 'devises', 'journal_changements']:
         try:
             db.execute_query(f"DELETE FROM {table}")
         except Exception:
             pass
     db.init_parametres()
+    # Base jamais synchronisee : pas de capture (modules.journal.activer)
+    with db.transaction() as cur:
+        database.supprimer_triggers_journal(cur)
+    # Les DELETE ci-dessus contournent les hooks d'invalidation
+    from modules.produits import cache_produits
+    cache_produits.invalider()
     return db
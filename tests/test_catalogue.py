@@ -0,0 +1,158 @@
+"""Tests de l'import / export du catalogue produits en masse"""
+import os
+import shutil
+import tempfile
+import unittest
+from tests.conftest import reset_db
+
+from database import db
+from modules.catalogue import (
+    importer_produits, importer_lignes, exporter_produits, lire_fichier, ErreurFichier, COLONNES
+)
+from modules.produits import Produit
+
+try:
+    import openpyxl  # noqa: F401
+    OPENPYXL = True
+except ImportError:
+    OPENPYXL = False
+
+
+class BaseCatalogue(unittest.TestCase):
+    def setUp(self):
+        reset_db()
+        self.dossier = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dossier, ignore_errors=True)
+
+    def _fichier(self, nom, contenu):
+        chemin = os.path.join(self.dossier, nom)
+        with open(chemin, 'w', encoding='utf-8-sig', newline='') as f:
+            f.write(contenu)
+        return chemin
+
+    def _nb_produits(self):
+        return db.fetch_one("SELECT COUNT(*) FROM produits")[0]
+
+
+class TestImport(BaseCatalogue):
+    CSV = (
+        "Code-barres;Nom;Categorie;Prix_achat;Prix;Stock\n"
+        "ALI001;Riz 5kg;Alimentaire;6000;7 500,50;50\n"
+        "ALI002;Huile 1L;Alimentaire;2000;2500;30\n"
+        ";Sucre 1kg;Alimentaire;600;850;100\n"
+        "EXIST01;Doublon base;Test;1;2;3\n"
+        "ALI001;Doublon fichier;Test;1;2;3\n"
+        "ALI003;;Test;1;2;3\n"
+        "ALI004;Prix negatif;Test;1;-2;3\n"
+        "ALI005;Stock decimal;Test;1;2;3.5\n"
+        "ALI006;Sans prix;Test;1;;3\n"
+    )
+
+    def setUp(self):
+        super().setUp()
+        Produit.ajouter("Existant", "Test", 1, 2, 3, 1, "EXIST01")
+
+    def test_lignes_valides_importees_et_erreurs_par_ligne(self):
+        rapport = importer_produits(self._fichier("f.csv", self.CSV))
+        self.assertEqual((rapport.lues, rapport.importees, len(rapport.erreurs)), (9, 3, 6))
+        self.assertEqual(self._nb_produits(), 4)
+        riz = Produit.obtenir_par_code_barre("ALI001")
+        self.assertEqual(riz['nom'], "Riz 5kg")
+        self.assertEqual(riz['prix_vente'], 7500.5)
+        self.assertEqual(riz['stock_alerte'], 5)
+        self.assertEqual(len(Produit.rechercher("sucre")), 1)  # Code genere, index FTS a jour
+
+        erreurs = {ligne: message for ligne, _, message in rapport.erreurs}
+        self.assertEqual(sorted(erreurs), [5, 6, 7, 8, 9, 10])
+        self.assertIn("existe deja", erreurs[5])
+        self.assertIn("existe deja", erreurs[6])
+        self.assertEqual(erreurs[7], "Nom manquant")
+        self.assertIn("negatif", erreurs[8])
+        self.assertIn("entier", erreurs[9])
+        self.assertEqual(erreurs[10], "Prix de vente manquant")
+
+        chemin = os.path.join(self.dossier, "erreurs.csv")
+        rapport.ecrire_erreurs(chemin)
+        with open(chemin, encoding='utf-8-sig') as f:
+            self.assertEqual(len(f.read().splitlines()), 7)
+
+    def test_simulation_n_ecrit_rien(self):
+        rapport = importer_produits(self._fichier("f.csv", self.CSV), simulation=True)
+        self.assertEqual((rapport.valides, rapport.importees, len(rapport.erreurs)), (3, 0, 6))
+        self.assertEqual(self._nb_produits(), 1)
+        self.assertIn("3 a importer", rapport.resume())
+
+    def test_lots_et_checksum_ean(self):
+        lignes = [(i + 2, {'nom': f"Produit {i}", 'prix_vente': 100 + i}) for i in range(25)]
+        lignes.append((27, {'nom': "EAN faux", 'prix_vente': 1, 'code_barre': "1234567890123",
+                            'type_code_barre': "ean13"}))
+        rapport = importer_lignes(lignes, taille_lot=10)
+        self.assertEqual(rapport.importees, 25)
+        self.assertEqual(rapport.erreurs, [(27, "1234567890123", "Checksum EAN-13 invalide")])
+        self.assertEqual(self._nb_produits(), 26)
+
+    def test_nombres_non_finis_rejetes(self):
+        lignes = [(2, {'nom': "Valide", 'prix_vente': 100}),
+                  (3, {'nom': "Prix nan", 'prix_vente': "nan"}),
+                  (4, {'nom': "Stock inf", 'prix_vente': 100, 'stock_actuel': "inf"}),
+                  (5, {'nom': "Achat nan", 'prix_vente': 100, 'prix_achat': float('nan')})]
+        rapport = importer_lignes(lignes)
+        self.assertEqual(rapport.importees, 1)
+        self.assertEqual([(ligne, message) for ligne, _, message in rapport.erreurs], [
+            (3, "Prix de vente invalide : 'nan'"), (4, "Stock invalide : 'inf'"),
+            (5, "Prix d'achat invalide : nan")])
+        self.assertEqual(self._nb_produits(), 2)
+
+    def test_index_plein_texte_et_annulation(self):
+        def trigger_present():
+            return db.fetch_one("SELECT 1 FROM sqlite_master WHERE name = 'produits_fts_insert'") is not None
+
+        importer_lignes([(2, {'nom': "Pagne wax", 'prix_vente': 5000})])
+        self.assertTrue(trigger_present())
+        self.assertEqual(len(Produit.rechercher("wax")), 1)
+
+        def lignes_puis_panne():
+            yield 2, {'nom': "Pagne kita", 'prix_vente': 5000}
+            raise OSError("fichier tronque")
+        with self.assertRaises(OSError):
+            importer_lignes(lignes_puis_panne(), taille_lot=1)
+        self.assertTrue(trigger_present())
+        self.assertEqual(Produit.rechercher("kita"), [])
+        Produit.ajouter("Pagne kita", "Tissus", 1, 2, 3, 1, "KITA01")
+        self.assertEqual(len(Produit.rechercher("kita")), 1)
+
+    def test_fichier_illisible(self):
+        with self.assertRaises(ErreurFichier):
+            list(lire_fichier(self._fichier("f.csv", "nom,categorie\nRiz,Alimentaire\n")))
+        with self.assertRaises(ErreurFichier):
+            importer_produits(self._fichier("f.txt", "nom;prix_vente\n"))
+
+
+class TestExport(BaseCatalogue):
+    def test_aller_retour_csv(self):
+        for i in range(7):
+            Produit.ajouter(f"Pagne {i}", "Tissus", 1000, 1500 + i, i, 2, f"PG{i:03d}", description="wax")
+        chemin = os.path.join(self.dossier, "catalogue.csv")
+        self.assertEqual(exporter_produits(chemin), 7)
+        avant = [tuple(p) for p in db.fetch_all(f"SELECT {', '.join(COLONNES)} FROM produits ORDER BY id")]
+
+        db.execute_query("DELETE FROM produits")
+        rapport = importer_produits(chemin)
+        self.assertEqual((rapport.importees, rapport.erreurs), (7, []))
+        apres = [tuple(p) for p in db.fetch_all(f"SELECT {', '.join(COLONNES)} FROM produits ORDER BY id")]
+        self.assertEqual(apres, avant)
+
+    @unittest.skipUnless(OPENPYXL, "openpyxl non installe")
+    def test_aller_retour_xlsx(self):
+        Produit.ajouter("Savon", "Hygiene", 150, 250, 10, 2, "HYG001")
+        chemin = os.path.join(self.dossier, "catalogue.xlsx")
+        self.assertEqual(exporter_produits(chemin), 1)
+        db.execute_query("DELETE FROM produits")
+        self.assertEqual(importer_produits(chemin).importees, 1)
+        self.assertEqual(Produit.obtenir_par_code_barre("HYG001")['prix_vente'], 250)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Tests du client HTTP partage (tentatives, delais, connexions reutilisees)"""
+import socket
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import requests
+    from modules.client_http import ClientHTTP
+    REQUESTS = True
+except ImportError:
+    REQUESTS = False
+
+
+class ServeurTest(ThreadingHTTPServer):
+    """Repond selon plan : une liste de (code, en-tetes) consommee a chaque requete"""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), Gestionnaire)
+        self.plan = []
+        self.ports_clients = []
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/api/sync/push"
+
+
+class Gestionnaire(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.ports_clients.append(self.client_address[1])
+        code, entetes = self.server.plan.pop(0) if self.server.plan else (200, {})
+        corps = b'{"status": "ok"}'
+        self.send_response(code)
+        for nom, valeur in entetes.items():
+            self.send_header(nom, valeur)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+
+@unittest.skipUnless(REQUESTS, "requests non installe")
+class TestClientHTTP(unittest.TestCase):
+    def setUp(self):
+        self.serveur = ServeurTest()
+        threading.Thread(target=self.serveur.serve_forever, daemon=True).start()
+        self.attentes = []
+        self.client = ClientHTTP(attendre=self.attentes.append, hasard=lambda a, b: b)
+
+    def tearDown(self):
+        self.client.fermer()
+        self.serveur.shutdown()
+        self.serveur.server_close()
+
+    def test_delai_exponentiel_plafonne(self):
+        self.assertEqual([self.client.delai(n) for n in range(6)], [0.5, 1, 2, 4, 8, 8])
+
+    def test_reessaie_les_erreurs_passageres(self):
+        self.serveur.plan = [(503, {}), (429, {'Retry-After': '3'})]
+        reponse = self.client.post('licence.activer', self.serveur.url, json={})
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(self.attentes, [0.5, 3.0])
+
+    def test_derniere_tentative_rendue(self):
+        self.serveur.plan = [(503, {}), (503, {})]
+        reponse = self.client.post('sync.push', self.serveur.url, data=b'{}')
+        self.assertEqual(reponse.status_code, 503)
+        self.assertEqual(len(self.serveur.ports_clients), 2)
+
+    def test_erreur_definitive_non_reessayee(self):
+        self.serveur.plan = [(500, {})]
+        self.assertEqual(self.client.post('sync.push', self.serveur.url).status_code, 500)
+        self.assertEqual(self.attentes, [])
+
+    def test_connexion_reutilisee(self):
+        for _ in range(3):
+            self.client.post('sync.pull', self.serveur.url, data=b'{}')
+        self.assertEqual(len(set(self.serveur.ports_clients)), 1)
+
+    def test_serveur_injoignable(self):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        with self.assertRaises(requests.ConnectionError):
+            self.client.post('licence.activer', f"http://127.0.0.1:{port}/api/activer", json={})
+        self.assertEqual(self.attentes, [0.5, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
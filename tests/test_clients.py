@@ -205,5 +205,48 @@ class TestHistoriqueAchats(unittest.TestCase):
         self.assertEqual(Client.calculer_total_achats(client_id), 3000.0)
 
 
+class TestSuggestions(unittest.TestCase):
+    """Recherche pendant la saisie en caisse (Client.suggerer)"""
+
+    def setUp(self):
+        reset_db()
+        self.awa = Client.ajouter("Awa Kouassi", "+225 07 12 12 34", "awa@mail.ci")
+        self.koffi = Client.ajouter("Koffi Adjoua", "0506-99-1234")
+        self.aya = Client.ajouter("Aya Kouamé", "27 22 44 55 66")
+        database.db.execute_query("UPDATE clients SET nombre_achats = 9 WHERE id = ?", (self.koffi,))
+
+    def _ids(self, terme, limit=5):
+        return [c['id'] for c in Client.suggerer(terme, limit)]
+
+    def test_fin_du_telephone_tous_formats(self):
+        # Le plus fidele d'abord
+        self.assertEqual(self._ids("1234"), [self.koffi, self.awa])
+        self.assertEqual(self._ids("12 34"), [self.koffi, self.awa])
+        self.assertEqual(self._ids("07 12 12 34"), [self.awa])
+        self.assertEqual(self._ids("5566"), [self.aya])
+        self.assertEqual(self._ids("9999"), [])
+
+    def test_debut_des_mots_du_nom_sans_accents(self):
+        self.assertEqual(self._ids("kou"), [self.awa, self.aya])
+        self.assertEqual(self._ids("kouame"), [self.aya])
+        self.assertEqual(self._ids("awa kou"), [self.awa])
+        self.assertEqual(self._ids("adj"), [self.koffi])
+        self.assertEqual(self._ids("mail"), [self.awa])
+
+    def test_index_suit_les_modifications(self):
+        Client.modifier(self.aya, "Aya Traoré", "01 02 03 04")
+        self.assertEqual(self._ids("kouame"), [])
+        self.assertEqual(self._ids("trao"), [self.aya])
+        self.assertEqual(self._ids("0304"), [self.aya])
+        self.assertEqual(self._ids("5566"), [])
+        Client.supprimer(self.aya)
+        self.assertEqual(self._ids("trao"), [])
+
+    def test_limite_et_saisie_vide(self):
+        self.assertEqual(len(self._ids("k", limit=1)), 1)
+        self.assertEqual(self._ids(""), [])
+        self.assertEqual(self._ids("+ -"), [])
+
+
 if __name__ == '__main__':
     unittest.main()
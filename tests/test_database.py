@@ -0,0 +1,449 @@
+"""Tests unitaires pour la couche Database (profils de connexion, WAL)"""
+import unittest
+import os
+import tempfile
+import shutil
+import sqlite3
+import threading
+from tests.conftest import reset_db
+
+import database
+from modules.ventes import Vente
+from modules.paiements import Paiement
+from modules.clients import Client
+from modules.fiscalite import Fiscalite
+from modules.rapports import Rapport
+
+
+class BaseSurFichier(unittest.TestCase):
+    """Instances de Database sur un fichier temporaire"""
+
+    def setUp(self):
+        reset_db()
+        self.temp_dir = tempfile.mkdtemp()
+        self._orig_db_path = database.DB_PATH
+        database.DB_PATH = os.path.join(self.temp_dir, 'boutique.db')
+        self.instances = []
+
+    def tearDown(self):
+        for instance in self.instances:
+            instance.close()
+        database.DB_PATH = self._orig_db_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _ouvrir(self, profil=None):
+        instance = database.Database(profil)
+        self.instances.append(instance)
+        return instance
+
+
+class TestProfilConnexion(BaseSurFichier):
+    """Profils SQLite appliques a la connexion sur un vrai fichier"""
+
+    def test_profil_caisse_wal(self):
+        db = self._ouvrir('caisse')
+        self.assertEqual(db.conn.execute("PRAGMA journal_mode").fetchone()[0].lower(), 'wal')
+        self.assertEqual(db.conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+        self.assertEqual(db.conn.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+        self.assertEqual(db.conn.execute("PRAGMA temp_store").fetchone()[0], 2)  # MEMORY
+
+    def test_profil_compatibilite(self):
+        db = self._ouvrir('compatibilite')
+        self.assertEqual(db.conn.execute("PRAGMA journal_mode").fetchone()[0].lower(), 'delete')
+        self.assertEqual(db.conn.execute("PRAGMA synchronous").fetchone()[0], 2)  # FULL
+
+    def test_profil_inconnu_retombe_sur_caisse(self):
+        db = self._ouvrir('inexistant')
+        self.assertEqual(db.nom_profil, 'caisse')
+
+    def test_politique_checkpoint_remplacable(self):
+        db = self._ouvrir('caisse')
+        db.execute_query("INSERT INTO clients (nom) VALUES ('WAL')")
+        self.assertGreater(db.taille_wal(), 0)
+
+        # Politique par defaut : WAL sous le seuil, rien a faire
+        self.assertIsNone(db.checkpoint_si_necessaire())
+
+        db.politique_checkpoint = lambda d: 'TRUNCATE'
+        result = db.checkpoint_si_necessaire()
+        self.assertIsNotNone(result)
+        self.assertEqual(result[0], 0)  # non bloque
+        self.assertEqual(db.taille_wal(), 0)
+
+    def test_checkpoint_mode_invalide(self):
+        db = self._ouvrir('caisse')
+        self.assertIsNone(db.checkpoint('IMMEDIATE; DROP TABLE produits'))
+
+    def test_version_donnees_et_jeton_ecritures(self):
+        db = self._ouvrir('caisse')
+        autre = self._ouvrir('caisse')
+        version, jeton = db.version_donnees(), db.jeton_ecritures()
+
+        # Commit de db : invisible pour version_donnees, compte par jeton_ecritures
+        db.execute_query("INSERT INTO clients (nom) VALUES ('Local')")
+        self.assertEqual(db.version_donnees(), version)
+        self.assertNotEqual(db.jeton_ecritures(), jeton)
+
+        # Commit d'une autre connexion : vu par les deux
+        version, jeton = db.version_donnees(), db.jeton_ecritures()
+        autre.execute_query("INSERT INTO clients (nom) VALUES ('Distant')")
+        self.assertNotEqual(db.version_donnees(), version)
+        self.assertNotEqual(db.jeton_ecritures(), jeton)
+
+
+class TestConnexionsLecture(BaseSurFichier):
+    """Lectures d'un thread secondaire sur sa propre connexion (executeur de requetes)"""
+
+    def _dans_un_thread(self, db, fonction):
+        conn = db.ouvrir_connexion_lecture()
+        self.addCleanup(conn.close)
+        resultat = {}
+
+        def executer():
+            db.lier_connexion_lecture(conn)
+            try:
+                resultat['valeur'] = fonction()
+            except Exception as e:
+                resultat['erreur'] = e
+
+        t = threading.Thread(target=executer)
+        t.start()
+        return t, conn, resultat
+
+    def test_lectures_routees_vers_la_connexion_du_thread(self):
+        db = self._ouvrir()
+        db.execute_query("INSERT INTO clients (nom) VALUES ('Awa')")
+        db.set_parametre('devise_principale', 'XOF')
+        t, _, resultat = self._dans_un_thread(db, lambda: (
+            db.fetch_one("SELECT COUNT(*) FROM clients")[0],
+            db.get_parametre('devise_principale'),
+        ))
+        t.join(5)
+        self.assertEqual(resultat['valeur'], (1, 'XOF'))
+        # Le thread principal garde sa connexion
+        self.assertIsNone(db._connexion_thread())
+        self.assertTrue(db.execute_query("INSERT INTO clients (nom) VALUES ('Koffi')"))
+
+    def test_parametres_en_cache_sur_le_lecteur(self):
+        db = self._ouvrir()
+        db.set_parametre('devise_principale', 'XOF')
+        lectures = []
+        valeurs = []
+
+        def lire():
+            db._connexion_thread().set_trace_callback(lectures.append)
+            valeurs.append(db.get_parametre('devise_principale'))
+            valeurs.append(db.get_parametre('devise_principale'))
+            db.set_parametre('devise_principale', 'EUR')  # Commit de db : vu par le lecteur
+            valeurs.append(db.get_parametre('devise_principale'))
+
+        t, conn, resultat = self._dans_un_thread(db, lire)
+        t.join(5)
+        self.assertNotIn('erreur', resultat)
+        self.assertEqual(valeurs, ['XOF', 'XOF', 'EUR'])
+        self.assertEqual(sum('FROM parametres' in sql for sql in lectures), 2)
+
+        # Meme lecteur, nouvel etat de thread (tache suivante du pool Qt) : cache garde
+        def relire():
+            db.lier_connexion_lecture(conn)
+            valeurs.append(db.get_parametre('devise_principale'))
+
+        t = threading.Thread(target=relire)
+        t.start()
+        t.join(5)
+        self.assertEqual(valeurs[-1], 'EUR')
+        self.assertEqual(sum('FROM parametres' in sql for sql in lectures), 2)
+
+    def test_lecteur_lie_ferme_avec_la_base(self):
+        """Restauration : db.close() ferme aussi les lecteurs lies aux threads
+        (sinon ouverts sur l'ancien fichier, -wal et -shm compris)"""
+        db = self._ouvrir()
+        t, conn, resultat = self._dans_un_thread(db, lambda: db.fetch_one("SELECT 1")[0])
+        t.join(5)
+        self.assertEqual(resultat['valeur'], 1)
+        db.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+        db.close()  # Deja fermes : sans erreur
+
+    def test_interruption(self):
+        db = self._ouvrir()
+        t, conn, resultat = self._dans_un_thread(db, lambda: db.fetch_all(
+            "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) "
+            "SELECT COUNT(*) FROM c"))
+        while t.is_alive():
+            conn.interrupt()
+            t.join(0.01)
+        self.assertIsInstance(resultat.get('erreur'), database.RequeteInterrompue)
+
+    def test_base_en_memoire(self):
+        database.DB_PATH = ':memory:'
+        db = self._ouvrir()
+        self.assertFalse(db.lectures_paralleles_possibles())
+        self.assertIsNone(db.ouvrir_connexion_lecture())
+
+
+class TestPoolConnexions(BaseSurFichier):
+    """Une connexion d'ecriture partagee et un pool de lecteurs, depuis plusieurs threads"""
+
+    NB_THREADS = 8
+    NB_OPERATIONS = 40
+
+    def _marteler(self, db):
+        erreurs = []
+        depart = threading.Barrier(self.NB_THREADS)
+
+        def travailler(n):
+            try:
+                depart.wait(5)
+                for i in range(self.NB_OPERATIONS):
+                    nom = f"T{n}-{i}"
+                    client_id = db.execute_query("INSERT INTO clients (nom) VALUES (?)", (nom,))
+                    # lastrowid du curseur de cet appel, pas de celui d'un autre thread
+                    ligne = db.fetch_one("SELECT nom FROM clients WHERE id = ?", (client_id,))
+                    if ligne is None or ligne['nom'] != nom:
+                        erreurs.append((nom, client_id, ligne and ligne['nom']))
+                    self.assertTrue(db.execute_transaction([
+                        ("UPDATE clients SET nombre_achats = nombre_achats + 1 WHERE id = ?", (client_id,)),
+                        ("UPDATE clients SET total_achats = total_achats + 10 WHERE id = ?", (client_id,)),
+                    ]))
+                    with db.transaction() as cur:
+                        cur.execute("UPDATE clients SET notes = 'vu' WHERE id = ?", (client_id,))
+                        # Lecture dans la transaction : voit l'ecriture non commitee
+                        if db.fetch_one("SELECT notes FROM clients WHERE id = ?", (client_id,))['notes'] != 'vu':
+                            erreurs.append((nom, 'transaction'))
+                    db.fetch_all("SELECT id, nom FROM clients ORDER BY id DESC LIMIT 20")
+            except Exception as e:
+                erreurs.append(e)
+
+        threads = [threading.Thread(target=travailler, args=(n,)) for n in range(self.NB_THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(60)
+
+        self.assertEqual(erreurs, [])
+        total = self.NB_THREADS * self.NB_OPERATIONS
+        ligne = db.fetch_one(
+            "SELECT COUNT(*), SUM(nombre_achats), SUM(total_achats), SUM(notes = 'vu') FROM clients")
+        self.assertEqual(tuple(ligne), (total, total, total * 10, total))
+
+    def test_plusieurs_threads_sur_fichier(self):
+        db = self._ouvrir()
+        self._marteler(db)
+        self.assertLessEqual(db._nb_lecteurs, db.nb_lecteurs_max)
+
+    def test_plusieurs_threads_en_memoire(self):
+        database.DB_PATH = ':memory:'
+        self._marteler(self._ouvrir())
+
+    def test_lecteurs_en_lecture_seule(self):
+        db = self._ouvrir()
+        db.execute_query("INSERT INTO clients (nom) VALUES ('Awa')")
+        self.assertEqual(db.fetch_all("DELETE FROM clients"), [])
+        self.assertEqual(db.fetch_one("SELECT COUNT(*) FROM clients")[0], 1)
+
+    def test_reconnexion_ferme_les_lecteurs(self):
+        """Restauration de sauvegarde : close() puis connect() sur le nouveau fichier"""
+        db = self._ouvrir()
+        db.execute_query("INSERT INTO clients (nom) VALUES ('Awa')")
+        self.assertEqual(db.fetch_one("SELECT COUNT(*) FROM clients")[0], 1)
+        ancien, _ = db._lecteurs.queue[0]
+
+        db.close()
+        os.remove(database.DB_PATH)
+        db.connect()
+        db.create_tables()
+        self.assertEqual(db.fetch_one("SELECT COUNT(*) FROM clients")[0], 0)
+        self.assertRaises(sqlite3.ProgrammingError, ancien.execute, "SELECT 1")
+        self.assertEqual(db._nb_lecteurs, 1)
+
+
+class TestReconnexion(BaseSurFichier):
+    """Pas de requete de sonde ; reconnexion sur erreur de connexion"""
+
+    def _instructions(self, db, fonction):
+        instructions = []
+        db.tracer(instructions.append)
+        try:
+            fonction()
+        finally:
+            db.tracer(None)
+        return instructions
+
+    def test_une_instruction_par_appel(self):
+        db = self._ouvrir()
+        db.fetch_one("SELECT 1")  # Ouvrir le lecteur hors comptage (PRAGMAs du profil)
+        self.assertEqual(self._instructions(db, lambda: db.fetch_one("SELECT COUNT(*) FROM clients")),
+                         ["SELECT COUNT(*) FROM clients"])
+        self.assertEqual(self._instructions(db, lambda: db.fetch_all("SELECT id FROM clients")),
+                         ["SELECT id FROM clients"])
+        # INSERT + COMMIT (BEGIN implicite) ; table sans triggers (clients_fts en ajoute)
+        sql = "INSERT INTO parametres (cle, valeur) VALUES ('essai', '1')"
+        instructions = self._instructions(db, lambda: db.execute_query(sql))
+        self.assertNotIn("SELECT 1", instructions)
+        self.assertEqual([i for i in instructions if i.startswith("INSERT")], [sql])
+
+    def test_reconnexion_apres_perte(self):
+        db = self._ouvrir()
+        client_id = db.execute_query("INSERT INTO clients (nom) VALUES ('Awa')")
+        db.conn.close()
+        self.assertEqual(db.fetch_one("SELECT nom FROM clients WHERE id = ?", (client_id,))['nom'], 'Awa')
+        db.conn.close()
+        self.assertTrue(db.execute_query("UPDATE clients SET nom = 'Koffi' WHERE id = ?", (client_id,)))
+        db.conn.close()
+        self.assertTrue(db.execute_transaction([("DELETE FROM clients WHERE id = ?", (client_id,))]))
+        db.conn.close()
+        with db.transaction() as cur:
+            cur.execute("INSERT INTO clients (nom) VALUES ('Ama')")
+        self.assertEqual(db.fetch_one("SELECT COUNT(*) FROM clients")[0], 1)
+
+    def test_pas_de_reconnexion_pour_une_erreur_de_requete(self):
+        db = self._ouvrir()
+        conn = db.conn
+        self.assertIsNone(db.execute_query("INSERT INTO table_absente VALUES (1)"))
+        self.assertEqual(db.fetch_all("SELECT * FROM table_absente"), [])
+        self.assertIs(db.conn, conn)
+
+    def test_abandon_apres_tentatives(self):
+        db = self._ouvrir()
+        tentatives = []
+
+        def toujours_fermee():
+            tentatives.append(1)
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+
+        self.assertRaises(sqlite3.ProgrammingError, db._reessayer, toujours_fermee)
+        self.assertEqual(len(tentatives), database.TENTATIVES_RECONNEXION + 1)
+
+
+class TestMigrations(unittest.TestCase):
+    """Migrations versionnees (table schema_version)"""
+
+    def setUp(self):
+        reset_db()
+        self.temp_dir = tempfile.mkdtemp()
+        self._orig_db_path = database.DB_PATH
+        database.DB_PATH = os.path.join(self.temp_dir, 'boutique.db')
+
+    def tearDown(self):
+        database.DB_PATH = self._orig_db_path
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_base_courante_a_jour(self):
+        self.assertEqual(database.db.version_schema(), database.MIGRATIONS[-1][0])
+
+    def test_versions_ordonnees_et_uniques(self):
+        versions = [m[0] for m in database.MIGRATIONS]
+        self.assertEqual(versions, sorted(set(versions)))
+
+    def test_migration_base_ancienne(self):
+        """Une base d'avant schema_version (sans client_id ni updated_at) est migree"""
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("""CREATE TABLE ventes (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        numero_vente TEXT UNIQUE NOT NULL, date_vente TIMESTAMP,
+                        total REAL NOT NULL, client TEXT)""")
+        conn.execute("""CREATE TABLE produits (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        nom TEXT NOT NULL, prix_vente REAL NOT NULL, code_barre TEXT UNIQUE NOT NULL)""")
+        conn.execute("INSERT INTO ventes (numero_vente, total, client) VALUES ('V1', 100, 'Awa')")
+        conn.execute("INSERT INTO produits (nom, prix_vente, code_barre) VALUES ('Riz', 500, 'RIZ01')")
+        conn.commit()
+        conn.close()
+
+        db = database.Database()
+        try:
+            self.assertEqual(db.version_schema(), database.MIGRATIONS[-1][0])
+            colonnes = [r[1] for r in db.conn.execute("PRAGMA table_info(ventes)")]
+            self.assertIn('client_id', colonnes)
+            self.assertIn('utilisateur_id', colonnes)
+            vente = db.fetch_one("SELECT client_id FROM ventes WHERE numero_vente = 'V1'")
+            client = db.fetch_one("SELECT nom FROM clients WHERE id = ?", (vente['client_id'],))
+            self.assertEqual(client['nom'], 'Awa')
+            colonnes = [r[1] for r in db.conn.execute("PRAGMA table_info(produits)")]
+            self.assertIn('stock_actuel', colonnes)
+            self.assertIn('prix_achat', colonnes)
+            self.assertEqual(db.fetch_one("SELECT valeur FROM compteurs WHERE cle = 'nb_produits'")[0], 1)
+        finally:
+            db.close()
+
+        # Reouverture : rien n'est rejoue
+        db = database.Database()
+        try:
+            self.assertEqual(db.fetch_one("SELECT COUNT(*) FROM clients")[0], 1)
+        finally:
+            db.close()
+
+
+# Seules les petites tables de reference (et leurs alias usuels) peuvent etre
+# parcourues entierement ; tout autre SCAN est une regression.
+# ventes_produits a une ligne par produit vendu : bornee par le catalogue.
+SCAN_AUTORISES = ('produits', 'p', 'utilisateurs', 'u', 'parametres', 'taux_tva', 'devises',
+                  'compteurs', 'ventes_produits', 'vp', 'CONSTANT')
+
+
+class TestPlansRequetes(unittest.TestCase):
+    """EXPLAIN QUERY PLAN des requetes chaudes : aucune ne doit parcourir
+    une table volumineuse entiere. Les requetes sont capturees en appelant
+    les vraies fonctions des modules."""
+
+    @classmethod
+    def setUpClass(cls):
+        reset_db()
+
+    def _requetes(self, fonction, *args):
+        capturees = []
+        database.db.conn.set_trace_callback(capturees.append)
+        try:
+            fonction(*args)
+        finally:
+            database.db.conn.set_trace_callback(None)
+        return [q for q in capturees if q.lstrip().upper().startswith('SELECT')]
+
+    def _verifier_sans_scan(self, fonction, *args):
+        requetes = self._requetes(fonction, *args)
+        self.assertTrue(requetes, f"Aucune requete capturee pour {fonction.__qualname__}")
+        for query in requetes:
+            plan = [row[3] for row in database.db.conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+            # Sous-requetes deja calculees (MATERIALIZE j) : les relire n'est pas un parcours de table
+            sous_requetes = {e.split()[1] for e in plan if e.split()[0] in ('MATERIALIZE', 'CO-ROUTINE')}
+            for etape in plan:
+                mots = etape.split()
+                if mots[0] == 'SCAN' and mots[1] not in SCAN_AUTORISES + tuple(sous_requetes):
+                    self.fail(f"{fonction.__qualname__} : {etape}\n{query}")
+
+    def test_historique_client(self):
+        self._verifier_sans_scan(Client.obtenir_historique_achats, 1)
+        self._verifier_sans_scan(Client.compter_achats, 1)
+        self._verifier_sans_scan(Client.calculer_total_achats, 1)
+
+    def test_details_et_paiements_vente(self):
+        self._verifier_sans_scan(Vente.obtenir_details_vente, 1)
+        self._verifier_sans_scan(Paiement.obtenir_paiements_vente, 1)
+
+    def test_ventes_par_periode(self):
+        self._verifier_sans_scan(Vente.obtenir_toutes_ventes, '2025-01-01', '2025-01-31')
+        self._verifier_sans_scan(Vente.obtenir_toutes_ventes, '2025-01-01', '2025-01-31', 1)
+        self._verifier_sans_scan(Fiscalite.rapport_tva_mensuel, 1, 2025)
+        self._verifier_sans_scan(Rapport.evolution_ventes_7_jours)
+
+    def test_dashboard(self):
+        self._verifier_sans_scan(Rapport.statistiques_generales)
+
+    def test_rapports_produits(self):
+        self._verifier_sans_scan(Rapport.top_produits)
+        self._verifier_sans_scan(Rapport.ca_par_categorie)
+        self._verifier_sans_scan(Rapport.marges_produits)
+        self._verifier_sans_scan(Rapport.marges_produits, '2025-01-01', '2025-01-31')
+
+    def test_rapports_du_jour(self):
+        self._verifier_sans_scan(Rapport.rapport_journalier)
+        self._verifier_sans_scan(Rapport.statistiques_utilisateur, 1)
+        self._verifier_sans_scan(Rapport.comparaison_jour_precedent)
+        self._verifier_sans_scan(Rapport.donnees_graphique_ventes, 'jour')
+        self._verifier_sans_scan(Rapport.donnees_graphique_ventes, 'mois')
+        self._verifier_sans_scan(Vente.obtenir_ventes_du_jour)
+        self._verifier_sans_scan(Paiement.total_par_mode_jour)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Tests de la file de generation des recus en arriere-plan"""
+import threading
+import unittest
+from tests.conftest import reset_db
+
+from modules.file_recus import FileRecus
+
+
+def _collecte(vente_id):
+    return {'vente_id': vente_id} if vente_id > 0 else None
+
+
+class TestFileRecus(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        reset_db()
+
+    def test_rendu_hors_thread_appelant(self):
+        threads = []
+
+        def rendu(donnees):
+            threads.append(threading.current_thread())
+            return f"/tmp/recu_{donnees['vente_id']}.pdf"
+
+        f = FileRecus(collecte=_collecte, rendu=rendu)
+        rappels = []
+        travail = f.soumettre(7, rappel=rappels.append)
+        self.assertEqual(travail.attendre(5), "/tmp/recu_7.pdf")
+        f.arreter(5)
+        self.assertIsNot(threads[0], threading.current_thread())
+        self.assertEqual(rappels, [travail])
+        self.assertEqual(travail.tentatives, 1)
+        self.assertIsNotNone(travail.duree_ms)
+
+    def test_vente_introuvable(self):
+        f = FileRecus(collecte=_collecte, rendu=lambda d: "x.pdf")
+        self.assertIsNone(f.soumettre(0))
+        self.assertEqual(f.statistiques()['generes'], 0)
+
+    def test_reessai_puis_succes(self):
+        appels = []
+
+        def rendu(donnees):
+            appels.append(1)
+            if len(appels) < 3:
+                raise IOError("disque occupe")
+            return "ok.pdf"
+
+        f = FileRecus(collecte=_collecte, rendu=rendu, tentatives=3, delai_reessai=0.001)
+        travail = f.soumettre(1)
+        self.assertEqual(travail.attendre(5), "ok.pdf")
+        f.arreter(5)
+        self.assertEqual(travail.tentatives, 3)
+        self.assertIsNone(travail.erreur)
+        self.assertEqual(f.statistiques()['echecs'], 0)
+
+    def test_abandon_apres_tentatives(self):
+        def rendu(donnees):
+            raise RuntimeError("police manquante")
+
+        f = FileRecus(collecte=_collecte, rendu=rendu, tentatives=2, delai_reessai=0.001)
+        rappels = []
+        travail = f.soumettre(1, rappel=rappels.append)
+        self.assertIsNone(travail.attendre(5))
+        f.arreter(5)
+        self.assertTrue(travail.termine)
+        self.assertEqual(travail.tentatives, 2)
+        self.assertIn("police manquante", travail.erreur)
+        self.assertEqual(rappels, [travail])
+        stats = f.statistiques()
+        self.assertEqual((stats['generes'], stats['echecs']), (0, 1))
+
+    def test_profondeur_et_statistiques(self):
+        bloque = threading.Event()
+
+        def rendu(donnees):
+            bloque.wait(5)
+            return f"{donnees['vente_id']}.pdf"
+
+        f = FileRecus(collecte=_collecte, rendu=rendu)
+        travaux = [f.soumettre(i) for i in range(1, 5)]
+        # Le premier peut etre deja pris par le thread
+        self.assertGreaterEqual(f.profondeur(), 3)
+        bloque.set()
+        for t in travaux:
+            self.assertIsNotNone(t.attendre(5))
+        f.arreter(5)
+        stats = f.statistiques()
+        self.assertEqual(stats['en_attente'], 0)
+        self.assertEqual(stats['generes'], 4)
+        self.assertIsNotNone(stats['duree_moyenne_ms'])
+        self.assertIsNotNone(stats['derniere_duree_ms'])
+
+    def test_rappel_en_erreur_ne_bloque_pas_la_file(self):
+        def rappel(travail):
+            raise RuntimeError("fenetre fermee")
+
+        f = FileRecus(collecte=_collecte, rendu=lambda d: "a.pdf")
+        t1 = f.soumettre(1, rappel=rappel)
+        t2 = f.soumettre(2)
+        self.assertEqual(t1.attendre(5), "a.pdf")
+        self.assertEqual(t2.attendre(5), "a.pdf")
+        f.arreter(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
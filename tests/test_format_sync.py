@@ -0,0 +1,133 @@
+"""Tests du format d'echange compact de la synchronisation"""
+import gzip
+import json
+import os
+import unittest
+from tests.conftest import reset_db
+
+from modules import format_sync, journal
+from modules.produits import Produit
+
+VENTES = [{'id': i, 'numero_vente': f"V{i:05d}", 'total': 1500.0 + i, 'client': None,
+           'statut': 'terminee'} for i in range(200)]
+
+
+class TestColonnes(unittest.TestCase):
+    def test_aller_retour(self):
+        donnees = {'ventes': VENTES, 'produits': [], 'suppressions': {'produits': ["P1"]}, 'seq': 12}
+        compact = format_sync.en_colonnes(donnees)
+        self.assertEqual(compact['ventes']['colonnes'], ['id', 'numero_vente', 'total', 'client', 'statut'])
+        self.assertEqual(compact['ventes']['lignes'][1], [1, "V00001", 1501.0, None, 'terminee'])
+        self.assertEqual(format_sync.depuis_colonnes(compact), donnees)
+
+    def test_colonnes_heterogenes(self):
+        donnees = {'historique_stock': [{'id': 1}, {'id': 2, 'operation': "Vente"}]}
+        self.assertEqual(format_sync.depuis_colonnes(format_sync.en_colonnes(donnees)),
+                         {'historique_stock': [{'id': 1, 'operation': None}, {'id': 2, 'operation': "Vente"}]})
+
+    def test_json_non_compact_rendu_tel_quel(self):
+        self.assertEqual(format_sync.decoder(json.dumps({'ventes': VENTES}).encode()), {'ventes': VENTES})
+        self.assertEqual(format_sync.decoder(b''), {})
+
+
+class TestCompression(unittest.TestCase):
+    def test_encoder_decoder(self):
+        corps_json, _ = format_sync.encoder({'ventes': VENTES})
+        corps, encodage = format_sync.encoder({'ventes': VENTES}, colonnes=True, encodage='gzip')
+        self.assertEqual(encodage, 'gzip')
+        self.assertEqual(format_sync.encodage_de(corps), 'gzip')
+        self.assertLess(len(corps) * 5, len(corps_json))
+        self.assertEqual(format_sync.decoder(corps), {'ventes': VENTES})
+        # Corps deja decompresse par la couche HTTP
+        self.assertEqual(format_sync.decoder(gzip.decompress(corps)), {'ventes': VENTES})
+
+    def test_petit_corps_non_compresse(self):
+        corps, encodage = format_sync.encoder({'depuis': '2024-01-01'}, encodage='gzip')
+        self.assertIsNone(encodage)
+        self.assertEqual(json.loads(corps), {'depuis': '2024-01-01'})
+
+    @unittest.skipUnless(format_sync.ZSTD, "zstandard non installe")
+    def test_zstd(self):
+        corps, encodage = format_sync.encoder({'ventes': VENTES}, colonnes=True, encodage='zstd')
+        self.assertEqual((encodage, format_sync.encodage_de(corps)), ('zstd', 'zstd'))
+        self.assertEqual(format_sync.decoder(corps), {'ventes': VENTES})
+
+
+class TestTailleMax(unittest.TestCase):
+    GONFLE = b'{"a": "' + b'0' * 1000000 + b'"}'
+
+    def test_corps_gzip_trop_volumineux(self):
+        corps = gzip.compress(self.GONFLE)
+        self.assertLess(len(corps), 5000)
+        with self.assertRaises(format_sync.CorpsTropVolumineux):
+            format_sync.decoder(corps, taille_max=100000)
+        self.assertEqual(len(format_sync.decoder(corps, taille_max=len(self.GONFLE))['a']), 1000000)
+
+    def test_corps_non_compresse_trop_volumineux(self):
+        with self.assertRaises(format_sync.CorpsTropVolumineux):
+            format_sync.decoder(self.GONFLE, taille_max=100000)
+
+    @unittest.skipUnless(format_sync.ZSTD, "zstandard non installe")
+    def test_corps_zstd_trop_volumineux(self):
+        corps = format_sync.compresser(self.GONFLE, 'zstd')
+        with self.assertRaises(format_sync.CorpsTropVolumineux):
+            format_sync.decoder(corps, taille_max=100000)
+        self.assertEqual(format_sync.decompresser(corps, taille_max=len(self.GONFLE)), self.GONFLE)
+
+
+class TestCopiesServeurs(unittest.TestCase):
+    def test_copies_identiques(self):
+        """Chaque serveur livre sa copie du format : elle suit celle des postes"""
+        racine = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        with open(format_sync.__file__, 'rb') as f:
+            reference = f.read()
+        for serveur in ('serveur_sync', 'serveur_licence'):
+            with open(os.path.join(racine, serveur, 'format_sync.py'), 'rb') as f:
+                self.assertEqual(f.read(), reference, f"{serveur}/format_sync.py differe de modules/format_sync.py")
+
+
+class TestNegociation(unittest.TestCase):
+    def test_ancien_serveur(self):
+        self.assertEqual(format_sync.negocier({'Content-Type': 'application/json'}), (False, None))
+
+    def test_serveur_compact(self):
+        _, entetes = format_sync.reponse({'status': 'ok'}, {})
+        self.assertEqual(format_sync.negocier(entetes), (True, format_sync.ENCODAGES[0]))
+
+    def test_reponse_selon_le_client(self):
+        donnees = {'ventes': VENTES}
+        corps, entetes = format_sync.reponse(donnees, {})
+        self.assertNotIn('Content-Encoding', entetes)
+        self.assertEqual(json.loads(corps), donnees)
+
+        corps, entetes = format_sync.reponse(donnees, format_sync.entetes_requete())
+        self.assertEqual(entetes['Content-Encoding'], format_sync.ENCODAGES[0])
+        self.assertEqual(format_sync.decoder(corps), donnees)
+
+    def test_choisir_encodage(self):
+        self.assertEqual(format_sync.choisir_encodage("br, gzip;q=0.8"), 'gzip')
+        self.assertIsNone(format_sync.choisir_encodage("identity"))
+        self.assertIsNone(format_sync.choisir_encodage(None))
+
+
+class TestLotDuJournal(unittest.TestCase):
+    def setUp(self):
+        reset_db()
+        journal.activer()
+
+    def test_lot_compact_borne_en_octets(self):
+        for i in range(300):
+            Produit.ajouter(f"Produit {i}", "Test", 100, 200 + i, 5, 1, f"P{i:03d}")
+
+        def serialiser(changements):
+            return format_sync.encoder(changements, colonnes=True, encodage='gzip')[0]
+
+        changements, corps = journal.prochain_envoi(octets_max=2000, serialiser=serialiser)
+        self.assertLessEqual(len(corps), 2000)
+        self.assertLess(len(changements['produits']), 300)
+        self.assertEqual(format_sync.decoder(corps)['produits'],
+                         json.loads(json.dumps(changements['produits'])))
+
+
+if __name__ == '__main__':
+    unittest.main()
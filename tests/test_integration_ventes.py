@@ -4,6 +4,7 @@ Tests d'integration pour le flux complet de ventes
 import pytest
 from tests.conftest import reset_db
 from database import db
+from modules.paiements import Paiement
 from modules.produits import Produit
 from modules.ventes import Vente
 
@@ -93,6 +94,7 @@ def test_flux_annulation_complete():
     # Vente
     vente_id = Vente.creer_vente()
     Vente.ajouter_produit(vente_id, produit_id, 20)
+    Paiement.enregistrer_paiement(vente_id, 'especes', 4000)
 
     # Verifier stock reduit
     assert Produit.obtenir_par_id(produit_id)['stock_actuel'] == 80
@@ -103,8 +105,9 @@ def test_flux_annulation_complete():
     # Verifier stock restaure
     assert Produit.obtenir_par_id(produit_id)['stock_actuel'] == 100
 
-    # Verifier vente supprimee
+    # Verifier vente supprimee, paiements compris
     assert Vente.obtenir_vente(vente_id) is None
+    assert db.fetch_one("SELECT COUNT(*) FROM paiements WHERE vente_id = ?", (vente_id,))[0] == 0
 
 
 def test_protection_stock_negatif():
@@ -0,0 +1,467 @@
+"""Tests du journal des changements (push incremental, suppressions, pull)"""
+import http.client
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tests.conftest import reset_db
+
+import config
+import database
+from database import db
+from modules import journal
+from modules.produits import Produit
+from modules.ventes import Vente
+
+
+def nb_journal():
+    return db.fetch_one("SELECT COUNT(*) FROM journal_changements")[0]
+
+
+class BaseJournal(unittest.TestCase):
+    def setUp(self):
+        reset_db()
+        journal.activer()
+
+    def _produit(self, nom, code, stock=10):
+        Produit.ajouter(nom, "Test", 100, 200, stock, 2, code)
+        return Produit.obtenir_par_code_barre(code)
+
+    def _vendre(self, produit, quantite):
+        panier = [{'produit_id': produit['id'], 'nom': produit['nom'], 'prix_vente': 200,
+                   'quantite': quantite, 'sous_total': 200 * quantite}]
+        succes, _, resultat = Vente.finaliser_panier(panier, [{'mode': 'especes', 'montant': 200 * quantite}])
+        self.assertTrue(succes)
+        return resultat
+
+
+class TestCapture(BaseJournal):
+    def test_rien_a_envoyer(self):
+        self.assertIsNone(journal.changements_a_envoyer())
+
+    def test_seules_les_lignes_touchees(self):
+        riz = self._produit("Riz", "RIZ01")
+        self._produit("Huile", "HUI01")
+        journal.acquitter(journal.changements_a_envoyer()['seq'])
+
+        resultat = self._vendre(riz, 3)
+        changements = journal.changements_a_envoyer()
+        self.assertEqual([p['code_barre'] for p in changements['produits']], ["RIZ01"])
+        self.assertEqual(changements['produits'][0]['stock_actuel'], 7)
+        self.assertEqual([v['numero_vente'] for v in changements['ventes']], [resultat['numero_vente']])
+        detail, = changements['details_ventes']
+        self.assertEqual((detail['numero_vente'], detail['produit_code_barre'], detail['quantite']),
+                         (resultat['numero_vente'], "RIZ01", 3))
+        self.assertEqual([h['produit_code_barre'] for h in changements['historique_stock']], ["RIZ01"])
+        self.assertEqual(changements['suppressions'], {})
+
+    def test_acquittement_et_purge(self):
+        riz = self._produit("Riz", "RIZ01")
+        changements = journal.changements_a_envoyer()
+        Produit.mettre_a_jour_stock(riz['id'], 4)  # Apres la lecture : cycle suivant
+
+        journal.acquitter(changements['seq'])
+        self.assertEqual(journal.sequence_acquittee(), changements['seq'])
+        suivants = journal.changements_a_envoyer()
+        self.assertEqual([p['stock_actuel'] for p in suivants['produits']], [4])
+
+        journal.acquitter(suivants['seq'])
+        self.assertIsNone(journal.changements_a_envoyer())
+        self.assertEqual(nb_journal(), 0)
+        journal.acquitter(1)  # Acquittement en retard : ne recule pas
+        self.assertEqual(journal.sequence_acquittee(), suivants['seq'])
+
+    def test_suppressions(self):
+        riz = self._produit("Riz", "RIZ01")
+        resultat = self._vendre(riz, 2)
+        journal.acquitter(journal.changements_a_envoyer()['seq'])
+
+        Vente.annuler_vente(resultat['vente_id'])
+        Produit.supprimer(riz['id'])
+        changements = journal.changements_a_envoyer()
+        self.assertEqual(changements['suppressions'],
+                         {'ventes': [resultat['numero_vente']], 'produits': ["RIZ01"]})
+        self.assertEqual((changements['produits'], changements['ventes'], changements['details_ventes']),
+                         ([], [], []))
+
+    def test_ligne_supprimee_renvoie_la_vente(self):
+        riz = self._produit("Riz", "RIZ01")
+        huile = self._produit("Huile", "HUI01")
+        vente_id = Vente.creer_vente()
+        Vente.ajouter_produit(vente_id, riz['id'], 1)
+        Vente.ajouter_produit(vente_id, huile['id'], 1)
+        journal.acquitter(journal.changements_a_envoyer()['seq'])
+
+        detail = db.fetch_one("SELECT id FROM details_ventes WHERE produit_id = ?", (riz['id'],))
+        Vente.supprimer_ligne_vente(detail['id'], vente_id)
+        details = journal.changements_a_envoyer()['details_ventes']
+        self.assertEqual([d['produit_code_barre'] for d in details], ["HUI01"])
+
+
+class TestApplication(BaseJournal):
+    def test_changements_distants_non_journalises(self):
+        self._produit("Riz", "RIZ01")
+        self._produit("Savon", "SAV01")
+        journal.acquitter(journal.changements_a_envoyer()['seq'])
+
+        journal.appliquer_changements({
+            'produits': [{'nom': "Huile", 'categorie': "Test", 'prix_achat': 1, 'prix_vente': 2,
+                          'stock_actuel': 3, 'stock_alerte': 1, 'code_barre': "HUI01",
+                          'type_code_barre': "code128", 'date_ajout': None, 'description': None,
+                          'updated_at': "2030-01-01T00:00:00"}],
+            'ventes': [{'numero_vente': "V-DISTANTE", 'date_vente': "2030-01-01 10:00:00",
+                        'total': 2, 'client': "", 'statut': "terminee"}],
+            'details_ventes': [{'numero_vente': "V-DISTANTE", 'produit_code_barre': "HUI01",
+                                'quantite': 1, 'prix_unitaire': 2, 'sous_total': 2}],
+            'suppressions': {'produits': ["SAV01"]},
+        })
+        self.assertIsNone(Produit.obtenir_par_code_barre("SAV01"))
+        vente = db.fetch_one("SELECT id FROM ventes WHERE numero_vente = 'V-DISTANTE'")
+        detail = db.fetch_one("SELECT produit_id FROM details_ventes WHERE vente_id = ?", (vente['id'],))
+        self.assertEqual(detail['produit_id'], Produit.obtenir_par_code_barre("HUI01")['id'])
+        self.assertIsNone(journal.changements_a_envoyer())
+
+        # Ecriture locale ensuite : journalisee normalement
+        Produit.mettre_a_jour_stock(detail['produit_id'], 9)
+        self.assertEqual([p['code_barre'] for p in journal.changements_a_envoyer()['produits']], ["HUI01"])
+
+    def test_vente_supprimee_a_distance(self):
+        riz = self._produit("Riz", "RIZ01")
+        resultat = self._vendre(riz, 1)
+        journal.appliquer_changements({'suppressions': {'ventes': [resultat['numero_vente']]}})
+        self.assertEqual(db.fetch_one("SELECT COUNT(*) FROM details_ventes")[0], 0)
+        self.assertEqual(db.fetch_one("SELECT COUNT(*) FROM paiements")[0], 0)
+        self.assertEqual(db.fetch_one("SELECT COUNT(*) FROM ventes")[0], 0)
+
+    def _recu(self, code, prix, updated_at):
+        return {'nom': f"Produit {code}", 'categorie': "Test", 'prix_achat': 1, 'prix_vente': prix,
+                'stock_actuel': 3, 'stock_alerte': 1, 'code_barre': code, 'type_code_barre': "code128",
+                'date_ajout': None, 'description': None, 'updated_at': updated_at}
+
+    def test_last_write_wins(self):
+        self._produit("Riz", "RIZ01")
+        self._produit("Huile", "HUI01")
+        db.execute_query("UPDATE produits SET updated_at = '2030-01-01T00:00:00'")
+        journal.appliquer_changements({'produits': [
+            self._recu("RIZ01", 500, "2029-12-31T00:00:00"),  # Plus ancien que la version locale
+            self._recu("HUI01", 600, "2030-01-02T00:00:00"),
+            # Meme code deux fois dans le lot : la plus recente gagne
+            self._recu("SUC01", 800, "2030-01-03T00:00:00"),
+            self._recu("SUC01", 700, "2030-01-02T00:00:00"),
+        ]})
+        prix = dict(db.fetch_all("SELECT code_barre, prix_vente FROM produits"))
+        self.assertEqual(prix, {"RIZ01": 200, "HUI01": 600, "SUC01": 800})
+
+    def test_last_write_wins_meme_jour(self):
+        # Local : datetime('now') (UTC, espace) ; recu : isoformat 'T' ou absent
+        self._produit("Riz", "RIZ01")
+        self._produit("Huile", "HUI01")
+        self._produit("Mil", "MIL01")
+        db.execute_query("UPDATE produits SET updated_at = '2030-01-01 12:00:00'")
+        recu_sans_date = self._recu("MIL01", 700, None)
+        journal.appliquer_changements({'produits': [
+            self._recu("RIZ01", 500, "2030-01-01T11:00:00"),  # Plus ancien, meme jour
+            self._recu("HUI01", 600, "2030-01-01T13:00:00+00:00"),
+            recu_sans_date,  # Recu maintenant : plus ancien que 2030
+        ]})
+        prix = dict(db.fetch_all("SELECT code_barre, prix_vente FROM produits"))
+        self.assertEqual(prix, {"RIZ01": 200, "HUI01": 600, "MIL01": 200})
+        self.assertEqual(db.fetch_one("SELECT updated_at FROM produits WHERE code_barre = 'HUI01'")[0],
+                         "2030-01-01 13:00:00")
+
+    def test_ids_resolus_par_code_barre(self):
+        self._produit("Riz", "RIZ01")
+        huile = self._produit("Huile", "HUI01")
+        journal.appliquer_changements({
+            'ventes': [{'numero_vente': "V-DISTANTE", 'date_vente': "2030-01-01 10:00:00",
+                        'total': 400, 'client': None, 'statut': "terminee"}],
+            'details_ventes': [{'numero_vente': "V-DISTANTE", 'produit_id': 1, 'produit_code_barre': "HUI01",
+                                'quantite': 2, 'prix_unitaire': 200, 'sous_total': 400}],
+            'historique_stock': [
+                {'produit_id': 1, 'produit_code_barre': "HUI01", 'quantite_avant': 10,
+                 'quantite_apres': 8, 'operation': "Vente V-DISTANTE", 'date_operation': "2030-01-01 10:00:00"},
+                {'produit_id': 1, 'produit_code_barre': "INCONNU", 'quantite_avant': 5,
+                 'quantite_apres': 4, 'operation': "Vente", 'date_operation': "2030-01-01 10:00:00"},
+            ],
+        })
+        self.assertEqual(db.fetch_one("SELECT produit_id FROM details_ventes")[0], huile['id'])
+        self.assertEqual([tuple(r) for r in db.fetch_all(
+            "SELECT produit_id, operation FROM historique_stock WHERE operation LIKE 'Vente%'")],
+            [(huile['id'], "Vente V-DISTANTE")])
+
+        # Vente recue a nouveau : ses lignes sont remplacees, pas ajoutees
+        journal.appliquer_changements({
+            'details_ventes': [{'numero_vente': "V-DISTANTE", 'produit_code_barre': "HUI01",
+                                'quantite': 1, 'prix_unitaire': 200, 'sous_total': 200}],
+        })
+        self.assertEqual([tuple(r) for r in db.fetch_all("SELECT quantite FROM details_ventes")], [(1,)])
+
+    def test_abonnes_prevenus_et_cache_invalide(self):
+        self._produit("Riz", "RIZ01")
+        self._produit("Savon", "SAV01")
+        self.assertEqual(Produit.obtenir_par_code_barre("RIZ01")['prix_vente'], 200)
+        recus = []
+        journal.abonner(recus.append)
+        self.addCleanup(journal.desabonner, recus.append)
+
+        journal.appliquer_changements({'produits': [self._recu("RIZ01", 900, "2099-01-01T00:00:00")],
+                                       'suppressions': {'produits': ["SAV01"]}})
+        self.assertEqual(recus, [{'produits': {"RIZ01", "SAV01"}}])
+        self.assertEqual(Produit.obtenir_par_code_barre("RIZ01")['prix_vente'], 900)
+        self.assertIsNone(Produit.obtenir_par_code_barre("SAV01"))
+
+
+class TestActivation(unittest.TestCase):
+    def setUp(self):
+        reset_db()
+
+    def _vendre(self, produit):
+        panier = [{'produit_id': produit['id'], 'nom': produit['nom'], 'prix_vente': 200,
+                   'quantite': 1, 'sous_total': 200}]
+        succes, _, resultat = Vente.finaliser_panier(panier, [{'mode': 'especes', 'montant': 200}])
+        self.assertTrue(succes)
+        return resultat['numero_vente']
+
+    def test_sans_synchronisation_rien_n_est_journalise(self):
+        Produit.ajouter("Riz", "Test", 100, 200, 1000, 2, "RIZ01")
+        riz = Produit.obtenir_par_code_barre("RIZ01")
+        for _ in range(50):
+            self._vendre(riz)
+        self.assertFalse(journal.actif())
+        self.assertEqual(nb_journal(), 0)
+
+    def _pousser(self):
+        recues = {'ventes': [], 'produits': [], 'suppressions': {}}
+
+        def envoyer(corps):
+            changements = json.loads(corps)
+            recues['ventes'].extend(v['numero_vente'] for v in changements['ventes'])
+            recues['produits'].extend(p['code_barre'] for p in changements['produits'])
+            for table, cles in changements['suppressions'].items():
+                recues['suppressions'].setdefault(table, []).extend(cles)
+            return 200, {'seq': changements['seq']}
+
+        self.assertTrue(journal.pousser(envoyer))
+        return recues
+
+    def test_premier_push_envoie_tout(self):
+        Produit.ajouter("Riz", "Test", 100, 200, 1000, 2, "RIZ01")
+        riz = Produit.obtenir_par_code_barre("RIZ01")
+        numeros = [self._vendre(riz) for _ in range(10)]
+        self.assertEqual(nb_journal(), 0)
+
+        recues = self._pousser()
+        self.assertTrue(journal.actif())
+        self.assertEqual(sorted(recues['ventes']), sorted(numeros))
+        self.assertEqual(recues['produits'], ["RIZ01"])
+
+    def test_compactage_sans_perte(self):
+        Produit.ajouter("Riz", "Test", 100, 200, 1000, 2, "RIZ01")
+        Produit.ajouter("Mil", "Test", 100, 200, 10, 2, "MIL01")
+        riz = Produit.obtenir_par_code_barre("RIZ01")
+        journal.activer()
+        numeros = [self._vendre(riz) for _ in range(10)]
+        Produit.supprimer(Produit.obtenir_par_code_barre("MIL01")['id'])
+        self.assertEqual(journal.limiter(entrees_max=1000), 0)
+        avant = nb_journal()
+        self.assertGreater(journal.limiter(entrees_max=20), 0)
+        self.assertLess(nb_journal(), avant)
+        self.assertTrue(journal.actif())
+        # Une entree par ligne touchee (+ suppressions) : recompacter ne retire rien
+        self.assertEqual(journal.limiter(entrees_max=0), 0)
+
+        recues = self._pousser()
+        self.assertEqual(sorted(recues['ventes']), sorted(numeros))
+        self.assertEqual(recues['produits'], ["RIZ01"])
+        self.assertEqual(recues['suppressions'], {'produits': ["MIL01"]})
+
+    def test_reprise_apres_suspension(self):
+        Produit.ajouter("Riz", "Test", 100, 200, 1000, 2, "RIZ01")
+        Produit.ajouter("Mil", "Test", 100, 200, 10, 2, "MIL01")
+        riz = Produit.obtenir_par_code_barre("RIZ01")
+        journal.activer()
+        self._pousser()
+        non_acquittee = self._vendre(riz)
+
+        # Suspension juste apres l'acquittement (meme seconde, meme jour) ;
+        # un pull reussi a avance dernier_sync, sans effet sur la reprise
+        journal.desactiver()
+        self.assertFalse(journal.actif())
+        db.set_parametre('dernier_sync', "2099-01-01T00:00:00")
+        suspendues = [self._vendre(riz) for _ in range(3)]
+        Produit.supprimer(Produit.obtenir_par_code_barre("MIL01")['id'])
+
+        recues = self._pousser()
+        self.assertTrue(journal.actif())
+        self.assertEqual(sorted(set(recues['ventes'])), sorted([non_acquittee] + suspendues))
+        self.assertIn("RIZ01", recues['produits'])
+        self.assertEqual(recues['suppressions'], {'produits': ["MIL01"]})
+
+
+class ServeurPush(ThreadingHTTPServer):
+    """Serveur de push local : protocole de serveur_sync (seq, depuis, 409)
+    et coupures de connexion programmees via plan"""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), GestionnairePush)
+        self.journal = None  # Un journal par poste, comme sync_postes
+        self.seq = 0
+        self.codes = []  # Codes produits recus, dans l'ordre
+        self.tailles = []
+        self.plan = []  # 'couper_envoi' | 'couper_reponse' | 'ok', une action par requete
+
+
+class GestionnairePush(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _couper(self):
+        self.close_connection = True
+        self.connection.shutdown(socket.SHUT_RDWR)
+
+    def do_POST(self):
+        serveur = self.server
+        action = serveur.plan.pop(0) if serveur.plan else 'ok'
+        longueur = int(self.headers['Content-Length'])
+        if action == 'couper_envoi':
+            self.rfile.read(longueur // 2)
+            return self._couper()
+
+        serveur.tailles.append(longueur)
+        data = json.loads(self.rfile.read(longueur))
+        seq_poste = serveur.seq if data['journal'] == serveur.journal else 0
+        if data['seq'] <= seq_poste:
+            code, reponse = 200, {'seq': seq_poste}
+        elif data['depuis'] < seq_poste:
+            code, reponse = 409, {'seq': seq_poste}
+        else:
+            serveur.codes.extend(p['code_barre'] for p in data['produits'])
+            serveur.journal, serveur.seq = data['journal'], data['seq']
+            code, reponse = 200, {'seq': data['seq']}
+        if action == 'couper_reponse':
+            return self._couper()
+
+        corps = json.dumps(reponse).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+
+class AvecServeurPush:
+    def setUp(self):
+        super().setUp()
+        self.serveur = ServeurPush()
+        threading.Thread(target=self.serveur.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.serveur.shutdown()
+        self.serveur.server_close()
+        super().tearDown()
+
+    def envoyer(self, corps):
+        conn = http.client.HTTPConnection(*self.serveur.server_address, timeout=5)
+        try:
+            conn.request('POST', '/api/sync/push', body=corps,
+                         headers={'Content-Type': 'application/json'})
+            reponse = conn.getresponse()
+            return reponse.status, json.loads(reponse.read() or b'{}')
+        finally:
+            conn.close()
+
+    def _produits(self, debut, nombre):
+        codes = [f"P{i:03d}" for i in range(debut, debut + nombre)]
+        db.execute_transaction([
+            ("INSERT INTO produits (nom, prix_vente, code_barre) VALUES (?, 1, ?)", (f"Produit {code}", code))
+            for code in codes
+        ])
+        return codes
+
+
+class TestPushParLots(AvecServeurPush, BaseJournal):
+    def test_coupures_et_reprise(self):
+        codes = self._produits(0, 30)
+        self.serveur.plan = ['ok', 'couper_envoi']
+        with self.assertRaises((ConnectionError, http.client.HTTPException, OSError)):
+            journal.pousser(self.envoyer, limite=10)
+        acquitte = journal.sequence_acquittee()
+        self.assertEqual(acquitte, self.serveur.seq)
+        self.assertEqual(self.serveur.codes, codes[:10])
+
+        # Lot recu mais reponse perdue : le renvoi est acquitte sans etre rejoue
+        self.serveur.plan = ['couper_reponse']
+        with self.assertRaises((ConnectionError, http.client.HTTPException, OSError)):
+            journal.pousser(self.envoyer, limite=10)
+        self.assertEqual(journal.sequence_acquittee(), acquitte)
+        self.assertTrue(journal.pousser(self.envoyer, limite=10))
+
+        self.assertEqual(self.serveur.codes, codes)
+        self.assertEqual(journal.sequence_acquittee(), self.serveur.seq)
+        self.assertEqual(nb_journal(), 0)
+
+    def test_reprise_apres_le_serveur(self):
+        codes = self._produits(0, 10)
+        self.serveur.plan = ['couper_reponse']
+        with self.assertRaises((ConnectionError, http.client.HTTPException, OSError)):
+            journal.pousser(self.envoyer, limite=5)
+        # Lot suivant plus large que celui deja recu : 409, reprise apres le serveur
+        self.assertTrue(journal.pousser(self.envoyer, limite=100))
+        self.assertEqual(self.serveur.codes, codes)
+
+    def test_taille_des_envois_bornee(self):
+        codes = self._produits(0, 40)
+        self.assertTrue(journal.pousser(self.envoyer, octets_max=4000))
+        self.assertEqual(self.serveur.codes, codes)
+        self.assertGreater(len(self.serveur.tailles), 1)
+        self.assertLessEqual(max(self.serveur.tailles), 4000)
+
+
+class TestRestauration(AvecServeurPush, unittest.TestCase):
+    """Base fichier : restaurer() remplace le fichier et rouvre la connexion"""
+
+    def setUp(self):
+        reset_db()
+        super().setUp()
+        import modules.sauvegarde as sauvegarde
+        self.dossier = tempfile.mkdtemp()
+        self.origine = (db.conn, database.DB_PATH, config.DB_PATH, sauvegarde.BACKUP_DIR)
+        database.DB_PATH = config.DB_PATH = os.path.join(self.dossier, 'boutique.db')
+        sauvegarde.BACKUP_DIR = os.path.join(self.dossier, 'backups')
+        db.connect()
+        db.create_tables()
+        journal.activer()
+
+    def tearDown(self):
+        import modules.sauvegarde as sauvegarde
+        db.close()
+        db.conn, database.DB_PATH, config.DB_PATH, sauvegarde.BACKUP_DIR = self.origine
+        shutil.rmtree(self.dossier, ignore_errors=True)
+        super().tearDown()
+
+    def test_push_apres_restauration_d_une_ancienne_copie(self):
+        from modules.sauvegarde import sauvegarder_locale, restaurer
+        anciens = self._produits(0, 5)
+        self.assertTrue(journal.pousser(self.envoyer))
+        _, _, chemin = sauvegarder_locale()
+        copie = os.path.join(self.dossier, 'ancienne.db')
+        shutil.copy2(chemin, copie)
+
+        perdus = self._produits(5, 5)  # Pousses, puis effaces par la restauration
+        self.assertTrue(journal.pousser(self.envoyer))
+        succes, message = restaurer(copie)
+        self.assertTrue(succes, message)
+
+        # Memes seq qu'avant la restauration, mais sous un nouveau journal
+        nouveaux = self._produits(10, 5)
+        self.assertTrue(journal.pousser(self.envoyer))
+        self.assertEqual(self.serveur.codes, anciens + perdus + nouveaux)
+        self.assertEqual(nb_journal(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
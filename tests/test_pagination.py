@@ -0,0 +1,144 @@
+"""Tests de la pagination par cle et des comptages memorises"""
+import sqlite3
+import unittest
+from tests.conftest import reset_db
+
+from database import db
+from modules.clients import Client
+from modules.pagination import comptages, condition_apres
+from modules.produits import Produit
+
+
+def toutes_les_pages(charger, limit):
+    """Parcourir toutes les pages ; retourne la liste des pages (listes d'ids)"""
+    pages = []
+    curseur = None
+    while True:
+        lignes, curseur = charger(curseur, limit)
+        pages.append([ligne['id'] for ligne in lignes])
+        if curseur is None:
+            return pages
+
+
+class TestConditionApres(unittest.TestCase):
+    def test_clause(self):
+        self.assertEqual(condition_apres(["nom", "id"], ("Awa", 3)),
+                         ("(nom, id) > (?, ?)", ["Awa", 3]))
+
+
+class TestPaginationProduits(unittest.TestCase):
+    def setUp(self):
+        reset_db()
+        for i in range(23):
+            db.execute_query(
+                "INSERT INTO produits (nom, categorie, prix_achat, prix_vente, stock_actuel, code_barre) "
+                "VALUES (?, ?, 100, 200, 5, ?)",
+                (f"Pagne wax {i}" if i % 2 else f"Savon {i}", "Tissus" if i % 2 else "Hygiene", f"PG{i:04d}"))
+
+    def test_pages_sans_trou_ni_doublon(self):
+        pages = toutes_les_pages(
+            lambda apres, limit: Produit.page_filtre(apres=apres, limit=limit), 5)
+        self.assertEqual([len(p) for p in pages], [5, 5, 5, 5, 3])
+        ids = [i for p in pages for i in p]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(ids), 23)
+
+    def test_derniere_page_pleine(self):
+        pages = toutes_les_pages(
+            lambda apres, limit: Produit.page_filtre(apres=apres, limit=limit), 23)
+        self.assertEqual([len(p) for p in pages], [23])
+
+    def test_recherche_classee(self):
+        attendus = {p['id'] for p in Produit.rechercher_filtre(terme="pagne", limit=-1)}
+        lignes, suivant = Produit.page_filtre(terme="pagne", limit=4)
+        self.assertEqual(len(suivant), 2)  # (pertinence, id)
+        pages = toutes_les_pages(
+            lambda apres, limit: Produit.page_filtre(terme="pagne", apres=apres, limit=limit), 4)
+        ids = [i for p in pages for i in p]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), attendus)
+        self.assertEqual(len(ids), Produit.compter_filtre(terme="pagne"))
+
+    def test_curseur_d_une_autre_forme_repart_du_debut(self):
+        premiere, _ = Produit.page_filtre(categorie="Tissus", limit=3)
+        lignes, _ = Produit.page_filtre(categorie="Tissus", apres=(-1.5, 7), limit=3)
+        self.assertEqual([p['id'] for p in lignes], [p['id'] for p in premiere])
+
+
+class TestPaginationClients(unittest.TestCase):
+    def setUp(self):
+        reset_db()
+        for nom in ["Koffi", "Awa", "Awa", "Bintou", "Awa", "Yao", "Koffi"]:
+            db.execute_query("INSERT INTO clients (nom, telephone) VALUES (?, '0700')", (nom,))
+
+    def test_tri_par_nom_avec_homonymes(self):
+        pages = toutes_les_pages(
+            lambda apres, limit: Client.page_filtre(apres=apres, limit=limit), 2)
+        self.assertEqual([len(p) for p in pages], [2, 2, 2, 1])
+        attendus = [c['id'] for c in db.fetch_all("SELECT id FROM clients ORDER BY nom, id")]
+        self.assertEqual([i for p in pages for i in p], attendus)
+
+    def test_filtre(self):
+        lignes, suivant = Client.page_filtre("awa", limit=3)
+        self.assertEqual([c['nom'] for c in lignes], ["Awa"] * 3)
+        self.assertIsNone(suivant)
+
+
+class TestCacheComptages(unittest.TestCase):
+    def setUp(self):
+        reset_db()
+        db.execute_query("INSERT INTO clients (nom) VALUES ('Awa')")
+        comptages.vider()
+
+    def test_memorise_puis_invalide_par_ecriture(self):
+        self.assertEqual(Client.compter_filtre("Aw"), 1)
+        echecs = comptages.echecs
+        self.assertEqual(Client.compter_filtre("Aw"), 1)
+        self.assertEqual(comptages.echecs, echecs)
+
+        db.execute_query("INSERT INTO clients (nom) VALUES ('Awa B')")
+        self.assertEqual(Client.compter_filtre("Aw"), 2)
+
+        with db.transaction() as cur:
+            cur.execute("INSERT INTO clients (nom) VALUES ('Awa C')")
+        self.assertEqual(Client.compter_filtre("Aw"), 3)
+
+    def test_cles_distinctes(self):
+        self.assertEqual(Client.compter_filtre("Aw"), 1)
+        self.assertEqual(Client.compter_filtre("Zz"), 0)
+        self.assertEqual(Produit.compter_filtre(terme="Aw"), 0)
+
+
+class TestCacheComptagesFichier(unittest.TestCase):
+    """Ecriture par une autre connexion (autre processus) : PRAGMA data_version"""
+
+    def setUp(self):
+        import os
+        import tempfile
+        import database
+        self.dossier = tempfile.mkdtemp()
+        self.chemin = os.path.join(self.dossier, 'pagination.db')
+        self.origine = (database.db.conn, database.DB_PATH)
+        database.DB_PATH = self.chemin
+        database.db.connect()
+        database.db.create_tables()
+        comptages.vider()
+
+    def tearDown(self):
+        import shutil
+        import database
+        database.db.close()
+        database.db.conn, database.DB_PATH = self.origine
+        shutil.rmtree(self.dossier, ignore_errors=True)
+
+    def test_ecriture_externe_invalide(self):
+        self.assertEqual(Client.compter_filtre(), 0)
+        autre = sqlite3.connect(self.chemin)
+        autre.execute("INSERT INTO clients (nom) VALUES ('Externe')")
+        autre.commit()
+        autre.close()
+        self.assertEqual(Client.compter_filtre(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""Tests unitaires pour les plages de dates SQL (module periodes)"""
+import unittest
+from datetime import date, datetime
+from tests.conftest import reset_db
+
+import database
+from modules.periodes import (condition_plage, plage_jour, plage_jours, plage_mois,
+                              plage_derniers_jours)
+
+
+class TestPlages(unittest.TestCase):
+
+    def test_plage_jour(self):
+        self.assertEqual(plage_jour('2025-03-31'), ('2025-03-31', '2025-04-01'))
+        self.assertEqual(plage_jour(date(2024, 12, 31)), ('2024-12-31', '2025-01-01'))
+        self.assertEqual(plage_jour(datetime(2025, 2, 28, 15, 30)), ('2025-02-28', '2025-03-01'))
+
+    def test_plage_jours_et_derniers_jours(self):
+        self.assertEqual(plage_jours('2025-01-30', '2025-02-01'), ('2025-01-30', '2025-02-02'))
+        self.assertEqual(plage_derniers_jours(7, '2025-01-08'), ('2025-01-01', '2025-01-09'))
+
+    def test_plage_mois(self):
+        self.assertEqual(plage_mois(2, 2024), ('2024-02-01', '2024-03-01'))
+        self.assertEqual(plage_mois(12, 2024), ('2024-12-01', '2025-01-01'))
+
+
+class TestPlageSurVentes(unittest.TestCase):
+    """La plage semi-ouverte equivaut a DATE(date_vente) = jour"""
+
+    @classmethod
+    def setUpClass(cls):
+        reset_db()
+
+    def setUp(self):
+        database.db.execute_query("DELETE FROM ventes")
+        for i, date_vente in enumerate([
+            '2025-03-30 23:59:59', '2025-03-31 00:00:00', '2025-03-31 12:00:00',
+            '2025-03-31T23:59:59.500', '2025-04-01 00:00:00',
+        ]):
+            database.db.execute_query(
+                "INSERT INTO ventes (numero_vente, date_vente, total) VALUES (?, ?, 100)",
+                (f"P{i}", date_vente)
+            )
+
+    def test_meme_resultat_que_date(self):
+        avec_date = database.db.fetch_one(
+            "SELECT COUNT(*) FROM ventes WHERE DATE(date_vente) = '2025-03-31'")[0]
+        avec_plage = database.db.fetch_one(
+            f"SELECT COUNT(*) FROM ventes WHERE {condition_plage('date_vente')}",
+            plage_jour('2025-03-31'))[0]
+        self.assertEqual(avec_plage, 3)
+        self.assertEqual(avec_plage, avec_date)
+
+
+if __name__ == '__main__':
+    unittest.main()
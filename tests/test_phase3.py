@@ -1,10 +1,12 @@
 """Tests unitaires pour la Phase 3 - Experience utilisateur"""
 import unittest
+from datetime import date
 from tests.conftest import reset_db
 
 import database
 from modules.rapports import Rapport
 from modules.produits import Produit
+from modules.ventes import Vente
 
 
 class TestComparaisonJour(unittest.TestCase):
@@ -29,6 +31,193 @@ class TestComparaisonJour(unittest.TestCase):
         self.assertEqual(data['variation_ca_pct'], 0.0)
 
 
+class TestStatistiquesGenerales(unittest.TestCase):
+    """Compteurs du dashboard tenus a jour par triggers"""
+
+    @classmethod
+    def setUpClass(cls):
+        reset_db()
+
+    def setUp(self):
+        for table in ('paiements', 'details_ventes', 'ventes', 'historique_stock', 'produits'):
+            database.db.execute_query(f"DELETE FROM {table}")
+
+    def _attendu(self):
+        """Les memes agregats calcules par parcours complet"""
+        ca_total, = database.db.fetch_one("SELECT COALESCE(SUM(total), 0) FROM ventes")
+        nb_produits, valeur, alertes = database.db.fetch_one(
+            "SELECT COUNT(*), COALESCE(SUM(prix_vente * stock_actuel), 0), "
+            "COALESCE(SUM(stock_actuel < stock_alerte), 0) FROM produits")
+        return ca_total, nb_produits, valeur, alertes
+
+    def _verifier(self):
+        stats = Rapport.statistiques_generales()
+        self.assertEqual(
+            (stats['ca_total'], stats['nb_produits'], stats['valeur_stock'], stats['nb_alertes_stock']),
+            self._attendu()
+        )
+        return stats
+
+    def test_compteurs_suivent_les_operations(self):
+        self._verifier()
+        code = Produit.ajouter("Lait", "Frais", 300, 500, 10, 5)
+        Produit.ajouter("Pain", "Frais", 100, 150, 3, 5)
+        produit = Produit.obtenir_par_code_barre(code)
+        self._verifier()
+
+        panier = [{'produit_id': produit['id'], 'nom': "Lait", 'prix_vente': 500,
+                   'quantite': 6, 'sous_total': 3000}]
+        succes, _, resultat = Vente.finaliser_panier(panier, [{'mode': 'especes', 'montant': 3000}])
+        self.assertTrue(succes)
+        stats = self._verifier()
+        self.assertEqual(stats['nb_ventes'], 1)
+        self.assertEqual(stats['ca_jour'], 3000)
+        self.assertEqual(stats['ca_mois'], 3000)
+        self.assertEqual(stats['nb_alertes_stock'], 2)  # Lait 4 < 5, Pain 3 < 5
+
+        Vente.annuler_vente(resultat['vente_id'])
+        stats = self._verifier()
+        self.assertEqual(stats['ca_total'], 0)
+
+        Produit.supprimer(produit['id'])
+        self._verifier()
+
+    def test_reconstruction(self):
+        Produit.ajouter("Eau", "Boissons", 100, 200, 50, 5)
+        database.db.execute_query("UPDATE compteurs SET valeur = -1")
+        with database.db.transaction() as cur:
+            database.reconstruire_compteurs(cur)
+        self._verifier()
+
+
+class TestVentesJour(unittest.TestCase):
+    """Agregat ventes_jour tenu a jour par triggers"""
+
+    @classmethod
+    def setUpClass(cls):
+        reset_db()
+
+    def setUp(self):
+        for table in ('paiements', 'details_ventes', 'ventes', 'historique_stock', 'produits'):
+            database.db.execute_query(f"DELETE FROM {table}")
+        code = Produit.ajouter("Riz", "Epicerie", 400, 600, 100, 5)
+        self.produit = Produit.obtenir_par_code_barre(code)
+
+    def _agregat(self):
+        return [tuple(r) for r in database.db.fetch_all(
+            "SELECT jour, heure, utilisateur_id, nb_ventes, ca, nb_articles "
+            "FROM ventes_jour ORDER BY 1, 2, 3")]
+
+    def _attendu(self):
+        """Le meme agregat calcule depuis les ventes"""
+        return [tuple(r) for r in database.db.fetch_all("""
+            SELECT DATE(v.date_vente), CAST(strftime('%H', v.date_vente) AS INTEGER),
+                   COALESCE(v.utilisateur_id, 0), COUNT(*), SUM(v.total),
+                   COALESCE(SUM((SELECT SUM(quantite) FROM details_ventes WHERE vente_id = v.id)), 0)
+            FROM ventes v GROUP BY 1, 2, 3 ORDER BY 1, 2, 3""")]
+
+    def _vendre(self, quantite, utilisateur_id=None):
+        panier = [{'produit_id': self.produit['id'], 'nom': "Riz", 'prix_vente': 600,
+                   'quantite': quantite, 'sous_total': 600 * quantite}]
+        succes, _, resultat = Vente.finaliser_panier(
+            panier, [{'mode': 'especes', 'montant': 600 * quantite}], utilisateur_id=utilisateur_id)
+        self.assertTrue(succes)
+        return resultat
+
+    def test_encaissement_et_annulation(self):
+        self._vendre(2, utilisateur_id=1)
+        annulee = self._vendre(3, utilisateur_id=1)
+        self._vendre(1)
+        self.assertEqual(self._agregat(), self._attendu())
+
+        rapport = Rapport.rapport_journalier()
+        self.assertEqual((rapport['nb_ventes'], rapport['ca_total'], rapport['nb_articles']), (3, 3600, 6))
+        self.assertEqual(Rapport.statistiques_utilisateur(1)['ca_jour'], 3000)
+
+        Vente.annuler_vente(annulee['vente_id'])
+        self.assertEqual(self._agregat(), self._attendu())
+        self.assertEqual(Rapport.rapport_journalier()['nb_articles'], 3)
+
+    def test_vente_pas_a_pas_et_changement_de_date(self):
+        """Ancien parcours creer_vente/ajouter_produit : total mis a jour apres coup"""
+        vente_id = Vente.creer_vente(utilisateur_id=2)
+        Vente.ajouter_produit(vente_id, self.produit['id'], 4)
+        self.assertEqual(self._agregat(), self._attendu())
+
+        database.db.execute_query(
+            "UPDATE ventes SET date_vente = '2024-02-29 18:30:00' WHERE id = ?", (vente_id,))
+        self.assertEqual(self._agregat(), self._attendu())
+        self.assertEqual(Rapport.ventes_par_periode('2024-02-29', '2024-02-29')[0]['ca'], 2400)
+
+        Vente.annuler_vente(vente_id)
+        self.assertEqual(self._agregat(), [])
+
+    def test_reconstruction(self):
+        self._vendre(2)
+        database.db.execute_query("UPDATE ventes_jour SET ca = -1, nb_articles = 0")
+        with database.db.transaction() as cur:
+            database.reconstruire_ventes_jour(cur)
+        self.assertEqual(self._agregat(), self._attendu())
+
+
+class TestVentesProduits(unittest.TestCase):
+    """Agregats par produit (top produits, categories, marges)"""
+
+    @classmethod
+    def setUpClass(cls):
+        reset_db()
+
+    def setUp(self):
+        for table in ('paiements', 'details_ventes', 'ventes', 'historique_stock', 'produits'):
+            database.db.execute_query(f"DELETE FROM {table}")
+        self.riz = Produit.obtenir_par_code_barre(Produit.ajouter("Riz", "Epicerie", 400, 600, 100, 5))
+        self.savon = Produit.obtenir_par_code_barre(Produit.ajouter("Savon", "Hygiene", 150, 250, 100, 5))
+
+    def _vendre(self, *lignes):
+        panier = [{'produit_id': p['id'], 'nom': p['nom'], 'prix_vente': p['prix_vente'],
+                   'quantite': q, 'sous_total': p['prix_vente'] * q} for p, q in lignes]
+        total = sum(item['sous_total'] for item in panier)
+        succes, _, resultat = Vente.finaliser_panier(panier, [{'mode': 'especes', 'montant': total}])
+        self.assertTrue(succes)
+        return resultat
+
+    def test_top_et_categories(self):
+        self._vendre((self.riz, 2), (self.savon, 5))
+        annulee = self._vendre((self.riz, 4))
+        top = [tuple(r) for r in Rapport.top_produits(10)]
+        self.assertEqual(top, [("Riz", "Epicerie", 6, 3600), ("Savon", "Hygiene", 5, 1250)])
+
+        Vente.annuler_vente(annulee['vente_id'])
+        top = [tuple(r) for r in Rapport.top_produits(10)]
+        self.assertEqual(top, [("Savon", "Hygiene", 5, 1250), ("Riz", "Epicerie", 2, 1200)])
+        self.assertEqual([tuple(r) for r in Rapport.ca_par_categorie()],
+                         [("Hygiene", 1250), ("Epicerie", 1200)])
+
+        rapport = Rapport.rapport_journalier()
+        self.assertEqual([r['nom'] for r in rapport['top_produits']], ["Savon", "Riz"])
+
+    def test_marges_au_prix_achat_de_la_vente(self):
+        self._vendre((self.riz, 2))
+        Produit.modifier(self.riz['id'], "Riz", "Epicerie", 500, 600, self.riz['stock_actuel'] - 2, 5)
+        self._vendre((self.riz, 2))
+        marge = Rapport.marges_produits()[0]
+        self.assertEqual((marge['quantite'], marge['ca'], marge['cout']), (4, 2400, 1800))
+        self.assertEqual(marge['marge'], 600)
+        self.assertEqual(marge['taux_marge'], 25)
+
+        aujourd_hui = Rapport.marges_produits(date.today(), date.today())
+        self.assertEqual([tuple(r) for r in aujourd_hui], [tuple(marge)])
+        self.assertEqual(Rapport.marges_produits('2020-01-01', '2020-01-31'), [])
+
+    def test_reconstruction(self):
+        self._vendre((self.riz, 3), (self.savon, 1))
+        attendu = [tuple(r) for r in Rapport.marges_produits()]
+        database.db.execute_query("DELETE FROM ventes_produits")
+        with database.db.transaction() as cur:
+            database.reconstruire_ventes_produits(cur)
+        self.assertEqual([tuple(r) for r in Rapport.marges_produits()], attendu)
+
+
 class TestDonneesGraphique(unittest.TestCase):
     """Test donnees formatees pour graphiques"""
 
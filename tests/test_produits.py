@@ -1,9 +1,14 @@
 """Tests unitaires pour le module Produits"""
 import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
 from tests.conftest import reset_db
 
 import database
-from modules.produits import Produit
+from modules.produits import Produit, cache_produits, requete_fts
+from modules.ventes import Vente
 
 
 class TestProduitAjouter(unittest.TestCase):
@@ -106,5 +111,141 @@ class TestProduitRechercher(unittest.TestCase):
         self.assertEqual(len(results), 0)
 
 
+class TestRecherchePleinTexte(unittest.TestCase):
+    """Index produits_fts : prefixes, accents, pertinence, triggers"""
+
+    @classmethod
+    def setUpClass(cls):
+        reset_db()
+
+    def setUp(self):
+        database.db.execute_query("DELETE FROM historique_stock")
+        database.db.execute_query("DELETE FROM produits")
+        self.creme = Produit.ajouter("Crème de karité", "Cosmétique", 800, 1500, 10, 2,
+                                     code_barre="KAR0001", description="Pot de 250 g")
+        self.beurre = Produit.ajouter("Beurre doux", "Alimentation", 900, 1200, 5, 2,
+                                      code_barre="BEU0001", description="Au lait de karite")
+
+    def _noms(self, terme):
+        return [p['nom'] for p in Produit.rechercher(terme)]
+
+    def test_sans_accents_ni_casse(self):
+        self.assertEqual(self._noms("CREME"), ["Crème de karité"])
+        self.assertEqual(self._noms("cosmetique"), ["Crème de karité"])
+
+    def test_prefixes_et_mots_multiples(self):
+        self.assertEqual(self._noms("cr kar"), ["Crème de karité"])
+        self.assertEqual(self._noms("KAR000"), ["Crème de karité"])
+        self.assertEqual(self._noms("bo"), [])
+
+    def test_pertinence(self):
+        """Le nom pese plus que la description"""
+        self.assertEqual(self._noms("karite"), ["Crème de karité", "Beurre doux"])
+
+    def test_index_suit_les_ecritures(self):
+        produit = Produit.obtenir_par_code_barre("BEU0001")
+        Produit.mettre_a_jour_stock(produit['id'], 3)
+        self.assertEqual(self._noms("beurre"), ["Beurre doux"])
+        database.db.execute_query("UPDATE produits SET nom = 'Margarine' WHERE id = ?", (produit['id'],))
+        self.assertEqual(self._noms("beurre"), [])
+        self.assertEqual(self._noms("marg"), ["Margarine"])
+        Produit.supprimer(produit['id'])
+        self.assertEqual(self._noms("marg"), [])
+
+    def test_filtres_et_comptage(self):
+        self.assertEqual(Produit.compter_filtre(terme="karite"), 2)
+        self.assertEqual(Produit.compter_filtre(terme="karite", categorie="Alimentation"), 1)
+        self.assertEqual(len(Produit.rechercher_filtre(terme="karite", prix_max=1300)), 1)
+
+    def test_saisie_quelconque(self):
+        for terme in ('"', "*", "a OR b", "NEAR(", "--", "c'est"):
+            self.assertIsInstance(Produit.rechercher(terme), list)
+        self.assertEqual(requete_fts("sav  palm!"), '"sav"* "palm"*')
+        self.assertIsNone(requete_fts("--"))
+
+
+class TestCacheProduits(unittest.TestCase):
+    """Cache des codes-barres du scan en caisse"""
+
+    @classmethod
+    def setUpClass(cls):
+        reset_db()
+
+    def setUp(self):
+        database.db.execute_query("DELETE FROM historique_stock")
+        database.db.execute_query("DELETE FROM produits")
+        cache_produits.invalider()
+        self.code = Produit.ajouter("Lait", "Frais", 300, 500, 10, 5)
+
+    def _requetes_produits(self, fonction, *args):
+        """Executer fonction et compter les SELECT sur produits"""
+        requetes = []
+        database.db.conn.set_trace_callback(requetes.append)
+        try:
+            resultat = fonction(*args)
+        finally:
+            database.db.conn.set_trace_callback(None)
+        return resultat, [r for r in requetes if 'FROM produits' in r]
+
+    def test_scan_repete_sans_requete(self):
+        produit, requetes = self._requetes_produits(Produit.obtenir_par_code_barre, self.code)
+        self.assertEqual(len(requetes), 1)
+        produit2, requetes = self._requetes_produits(Produit.obtenir_par_code_barre, self.code)
+        self.assertEqual(requetes, [])
+        self.assertIs(produit2, produit)
+        self.assertIsNone(Produit.obtenir_par_code_barre("INCONNU"))
+
+    def test_precharger(self):
+        Produit.ajouter("Pain", "Frais", 100, 150, 3, 5)
+        self.assertEqual(cache_produits.precharger(), 2)
+        _, requetes = self._requetes_produits(Produit.obtenir_par_code_barre, self.code)
+        self.assertEqual(requetes, [])
+
+    def test_invalidation_par_les_ecritures(self):
+        produit = Produit.obtenir_par_code_barre(self.code)
+        Produit.modifier(produit['id'], "Lait entier", "Frais", 300, 550, 10, 5)
+        produit = Produit.obtenir_par_code_barre(self.code)
+        self.assertEqual((produit['nom'], produit['prix_vente']), ("Lait entier", 550))
+
+        Produit.mettre_a_jour_stock(produit['id'], 8, "Ajustement")
+        self.assertEqual(Produit.obtenir_par_code_barre(self.code)['stock_actuel'], 8)
+
+        panier = [{'produit_id': produit['id'], 'nom': "Lait", 'prix_vente': 550,
+                   'quantite': 3, 'sous_total': 1650}]
+        succes, _, _ = Vente.finaliser_panier(panier, [{'mode': 'especes', 'montant': 1650}])
+        self.assertTrue(succes)
+        self.assertEqual(Produit.obtenir_par_code_barre(self.code)['stock_actuel'], 5)
+
+        Produit.supprimer(produit['id'])
+        self.assertIsNone(Produit.obtenir_par_code_barre(self.code))
+
+    def test_ecriture_d_une_autre_connexion(self):
+        """PRAGMA data_version detecte les commits des autres connexions"""
+        temp_dir = tempfile.mkdtemp()
+        chemin = os.path.join(temp_dir, 'boutique.db')
+        conn_origine, chemin_origine = database.db.conn, database.DB_PATH
+        try:
+            # Comme une restauration de sauvegarde : nouvelle connexion
+            database.DB_PATH = chemin
+            database.db.connect()
+            database.db.conn.execute(
+                "CREATE TABLE produits (id INTEGER PRIMARY KEY, code_barre TEXT, stock_actuel INTEGER)")
+            database.db.conn.execute("INSERT INTO produits VALUES (1, 'EXT001', 10)")
+            database.db.conn.commit()
+            self.assertEqual(Produit.obtenir_par_code_barre('EXT001')['stock_actuel'], 10)
+
+            autre = sqlite3.connect(chemin)
+            autre.execute("UPDATE produits SET stock_actuel = 4 WHERE id = 1")
+            autre.commit()
+            autre.close()
+            self.assertEqual(Produit.obtenir_par_code_barre('EXT001')['stock_actuel'], 4)
+        finally:
+            database.db.conn.close()
+            database.db.conn, database.DB_PATH = conn_origine, chemin_origine
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        # Retour a la connexion d'origine : le cache repart de zero
+        self.assertIsNone(Produit.obtenir_par_code_barre('EXT001'))
+
+
 if __name__ == '__main__':
     unittest.main()
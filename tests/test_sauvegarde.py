@@ -81,6 +81,32 @@ class TestSauvegardeLocale(unittest.TestCase):
         if len(sauvegardes) >= 2:
             self.assertGreaterEqual(sauvegardes[0]['date'], sauvegardes[1]['date'])
 
+    def test_restaurer_reconnecte_la_base(self):
+        """Apres restauration, db (ecriture et lecteurs) travaille sur la base restauree"""
+        from modules.sauvegarde import sauvegarder_locale, restaurer
+        conn_origine, chemin_origine = database.db.conn, database.DB_PATH
+        try:
+            database.DB_PATH = self.temp_db
+            database.db.connect()
+            database.db.create_tables()
+            database.db.execute_query("INSERT INTO clients (nom) VALUES ('Awa')")
+            _, _, chemin = sauvegarder_locale()
+            # restaurer() sauvegarde d'abord : eviter l'ecrasement dans la meme seconde
+            copie = os.path.join(self.temp_dir, 'a_restaurer.db')
+            shutil.copy2(chemin, copie)
+
+            database.db.execute_query("INSERT INTO clients (nom) VALUES ('Koffi')")
+            self.assertEqual(database.db.fetch_one("SELECT COUNT(*) FROM clients")[0], 2)
+
+            succes, message = restaurer(copie)
+            self.assertTrue(succes, message)
+            self.assertEqual(database.db.fetch_one("SELECT COUNT(*) FROM clients")[0], 1)
+            self.assertTrue(database.db.execute_query("INSERT INTO clients (nom) VALUES ('Ama')"))
+            self.assertEqual(database.db.fetch_one("SELECT COUNT(*) FROM clients")[0], 2)
+        finally:
+            database.db.close()
+            database.db.conn, database.DB_PATH = conn_origine, chemin_origine
+
 
 class TestExportImportZip(unittest.TestCase):
     """Test export et import ZIP"""
@@ -152,6 +178,58 @@ class TestExportImportZip(unittest.TestCase):
         self.assertIn("introuvable", message.lower())
 
 
+class TestCopieCoherente(unittest.TestCase):
+    """Base en WAL ouverte par db : les copies contiennent les transactions
+    encore dans le WAL"""
+
+    def setUp(self):
+        reset_db()
+        import modules.sauvegarde as mod
+        self.temp_dir = tempfile.mkdtemp()
+        self.origine = (database.db.conn, database.DB_PATH, config.DB_PATH, mod.BACKUP_DIR,
+                        config.IMAGES_DIR, config.RECUS_DIR)
+        database.DB_PATH = config.DB_PATH = os.path.join(self.temp_dir, 'boutique.db')
+        mod.BACKUP_DIR = os.path.join(self.temp_dir, 'backups')
+        config.IMAGES_DIR = os.path.join(self.temp_dir, 'images')
+        config.RECUS_DIR = os.path.join(self.temp_dir, 'recus')
+        database.db.connect()
+        database.db.create_tables()
+        from modules.produits import Produit
+        Produit.ajouter("Riz", "Test", 100, 200, 10, 2, "RIZ01")
+        self.assertGreater(os.path.getsize(f"{config.DB_PATH}-wal"), 0)
+
+    def tearDown(self):
+        import modules.sauvegarde as mod
+        database.db.close()
+        (database.db.conn, database.DB_PATH, config.DB_PATH, mod.BACKUP_DIR,
+         config.IMAGES_DIR, config.RECUS_DIR) = self.origine
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _produits(self, chemin):
+        conn = sqlite3.connect(chemin)
+        try:
+            return [r[0] for r in conn.execute("SELECT code_barre FROM produits")]
+        finally:
+            conn.close()
+
+    def test_sauvegarde_locale(self):
+        from modules.sauvegarde import sauvegarder_locale
+        succes, message, chemin = sauvegarder_locale()
+        self.assertTrue(succes, message)
+        self.assertEqual(self._produits(chemin), ["RIZ01"])
+        self.assertEqual([f for f in os.listdir(os.path.dirname(chemin)) if f.endswith('.tmp')], [])
+
+    def test_export_zip(self):
+        from modules.sauvegarde import exporter_zip
+        import zipfile
+        succes, message, chemin = exporter_zip()
+        self.assertTrue(succes, message)
+        with zipfile.ZipFile(chemin) as zf:
+            zf.extract('data/boutique.db', self.temp_dir)
+        self.assertEqual(self._produits(os.path.join(self.temp_dir, 'data', 'boutique.db')), ["RIZ01"])
+        self.assertEqual(os.listdir(os.path.dirname(chemin)), [os.path.basename(chemin)])
+
+
 class TestNettoyageSauvegardes(unittest.TestCase):
     """Test nettoyage des anciennes sauvegardes"""
 
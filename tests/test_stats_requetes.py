@@ -0,0 +1,91 @@
+"""Tests des statistiques de requetes SQL par gabarit"""
+import unittest
+from tests.conftest import reset_db
+
+from database import db
+from modules.produits import Produit
+from modules.stats_requetes import StatistiquesRequetes, gabarit_requete, AUTRES
+
+
+class TestGabarit(unittest.TestCase):
+    def test_litteraux_et_espaces(self):
+        self.assertEqual(
+            gabarit_requete("SELECT *  FROM produits\n WHERE nom = 'Pagne''s' AND prix > 1500.5 LIMIT 10"),
+            "SELECT * FROM produits WHERE nom = ? AND prix > ? LIMIT ?")
+
+    def test_listes_in(self):
+        self.assertEqual(gabarit_requete("DELETE FROM t WHERE id IN (?, ?, ?)"),
+                         gabarit_requete("DELETE FROM t WHERE id IN (?,?)"))
+        self.assertEqual(gabarit_requete("SELECT 1 FROM t WHERE id IN (1, 2, 3)"),
+                         "SELECT ? FROM t WHERE id IN (?...)")
+
+    def test_identifiants_intacts(self):
+        self.assertEqual(gabarit_requete("SELECT t1.id FROM table2 t1"), "SELECT t1.id FROM table2 t1")
+
+
+class TestStatistiquesRequetes(unittest.TestCase):
+    def test_cumul_par_gabarit(self):
+        stats = StatistiquesRequetes()
+        stats.enregistrer("SELECT * FROM clients WHERE id = 1", 0.002, 1)
+        stats.enregistrer("SELECT * FROM clients WHERE id = 2", 0.004, 1)
+        stats.enregistrer("UPDATE clients SET nom = ?", 0.001, 3)
+        top = stats.top()
+        self.assertEqual(len(top), 2)
+        self.assertEqual(top[0]['gabarit'], "SELECT * FROM clients WHERE id = ?")
+        self.assertEqual(top[0]['appels'], 2)
+        self.assertAlmostEqual(top[0]['temps_total_ms'], 6.0)
+        self.assertAlmostEqual(top[0]['temps_moyen_ms'], 3.0)
+        self.assertAlmostEqual(top[0]['temps_max_ms'], 4.0)
+        self.assertEqual(top[0]['lignes'], 2)
+        self.assertEqual(stats.top(1, tri='lignes')[0]['lignes'], 3)
+        self.assertRaises(ValueError, stats.top, 5, 'inconnu')
+
+        stats.reinitialiser()
+        self.assertEqual(stats.top(), [])
+
+    def test_nombre_de_gabarits_borne(self):
+        stats = StatistiquesRequetes(max_gabarits=3)
+        for i in range(10):
+            stats.enregistrer(f"SELECT * FROM table_{i}", 0.001, 0)
+        self.assertEqual(stats.nombre_gabarits(), 4)
+        autres = [s for s in stats.top(0) if s['gabarit'] == AUTRES]
+        self.assertEqual(autres[0]['appels'], 7)
+
+    def test_inactif(self):
+        stats = StatistiquesRequetes()
+        stats.actif = False
+        stats.enregistrer("SELECT 1", 0.001, 1)
+        self.assertEqual(stats.top(), [])
+
+
+class TestStatistiquesDatabase(unittest.TestCase):
+    def setUp(self):
+        reset_db()
+        db.statistiques.reinitialiser()
+
+    def _stats(self):
+        return {s['gabarit']: s for s in db.statistiques.top(0)}
+
+    def test_lectures_et_ecritures_comptees(self):
+        db.execute_query("INSERT INTO clients (nom) VALUES ('Awa')")
+        db.execute_query("INSERT INTO clients (nom) VALUES ('Koffi')")
+        db.fetch_all("SELECT nom FROM clients")
+        db.fetch_one("SELECT nom FROM clients WHERE nom = 'Absent'")
+        stats = self._stats()
+        self.assertEqual(stats["INSERT INTO clients (nom) VALUES (?)"]['appels'], 2)
+        self.assertEqual(stats["INSERT INTO clients (nom) VALUES (?)"]['lignes'], 2)
+        self.assertEqual(stats["SELECT nom FROM clients"]['lignes'], 2)
+        self.assertEqual(stats["SELECT nom FROM clients WHERE nom = ?"]['lignes'], 0)
+
+    def test_filtres_produits_meme_gabarit(self):
+        """Meme combinaison de filtres, valeurs differentes : un seul gabarit"""
+        Produit.rechercher_filtre(terme="pagne", categorie="Tissus")
+        Produit.rechercher_filtre(terme="wax", categorie="Bijoux", limit=10, offset=20)
+        Produit.rechercher_filtre(prix_min=100)
+        pages = [s for s in db.statistiques.top(0) if s['gabarit'].startswith("SELECT p.*")]
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(sorted(s['appels'] for s in pages), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,17 @@
 """Tests unitaires pour le module Ventes"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
 import unittest
 from tests.conftest import reset_db
 
 import database
 from modules.produits import Produit
 from modules.ventes import Vente
+from modules.clients import Client
+from modules.permissions import Permissions
 
 
 class TestVenteCycleComplet(unittest.TestCase):
@@ -92,5 +99,212 @@ class TestVenteCycleComplet(unittest.TestCase):
         self.assertEqual(produit['stock_actuel'], 20)
 
 
+class TestFinaliserPanier(unittest.TestCase):
+    """Transaction de caisse unique (vente + details + stock + paiements)"""
+
+    @classmethod
+    def setUpClass(cls):
+        reset_db()
+
+    def setUp(self):
+        for table in ('paiements', 'details_ventes', 'ventes', 'historique_stock', 'produits', 'clients'):
+            database.db.execute_query(f"DELETE FROM {table}")
+        code1 = Produit.ajouter("Savon", "Hygiene", 200, 350, 20, 5)
+        code2 = Produit.ajouter("Riz 5kg", "Alimentation", 2500, 3500, 2, 1)
+        self.p1 = Produit.obtenir_par_code_barre(code1)['id']
+        self.p2 = Produit.obtenir_par_code_barre(code2)['id']
+        self.panier = [
+            {'produit_id': self.p1, 'nom': "Savon", 'prix_vente': 350, 'quantite': 3, 'sous_total': 1050},
+            {'produit_id': self.p2, 'nom': "Riz 5kg", 'prix_vente': 3500, 'quantite': 2, 'sous_total': 7000},
+        ]
+        self.paiements = [{'mode': 'especes', 'montant': 8050, 'montant_recu': 10000, 'monnaie_rendue': 1950}]
+
+    def test_vente_complete_ecrite(self):
+        succes, _, resultat = Vente.finaliser_panier(self.panier, self.paiements, utilisateur_id=1)
+        self.assertTrue(succes)
+        vente = Vente.obtenir_vente(resultat['vente_id'])
+        self.assertEqual(vente['total'], 8050)
+        self.assertEqual(len(Vente.obtenir_details_vente(resultat['vente_id'])), 2)
+        self.assertEqual(Produit.obtenir_par_id(self.p1)['stock_actuel'], 17)
+        self.assertEqual(Produit.obtenir_par_id(self.p2)['stock_actuel'], 0)
+        historique = database.db.fetch_all(
+            "SELECT quantite_avant, quantite_apres FROM historique_stock WHERE produit_id = ?", (self.p1,)
+        )
+        self.assertEqual([tuple(h) for h in historique], [(20, 17)])
+        nb_paiements = database.db.fetch_one(
+            "SELECT COUNT(*) FROM paiements WHERE vente_id = ?", (resultat['vente_id'],)
+        )[0]
+        self.assertEqual(nb_paiements, 1)
+
+    def test_stock_insuffisant_annule_tout(self):
+        self.panier[1]['quantite'] = 5
+        succes, message, resultat = Vente.finaliser_panier(self.panier, self.paiements)
+        self.assertFalse(succes)
+        self.assertIsNone(resultat)
+        self.assertIn("Riz 5kg", message)
+        # La premiere ligne deja traitee doit etre annulee elle aussi
+        self.assertEqual(Produit.obtenir_par_id(self.p1)['stock_actuel'], 20)
+        for table in ('ventes', 'details_ventes', 'historique_stock', 'paiements'):
+            self.assertEqual(database.db.fetch_one(f"SELECT COUNT(*) FROM {table}")[0], 0)
+
+    def test_points_fidelite(self):
+        client_id = Client.ajouter("Awa")
+        succes, _, resultat = Vente.finaliser_panier(self.panier, self.paiements, client_id=client_id)
+        self.assertTrue(succes)
+        self.assertEqual(resultat['points_gagnes'], 8)  # 8050 // 1000
+        client = Client.obtenir_par_id(client_id)
+        self.assertEqual(client['points_fidelite'], 8)
+        self.assertEqual(client['nombre_achats'], 1)
+
+    def test_un_seul_commit(self):
+        instructions = []
+        database.db.conn.set_trace_callback(instructions.append)
+        try:
+            succes, _, _ = Vente.finaliser_panier(self.panier, self.paiements)
+        finally:
+            database.db.conn.set_trace_callback(None)
+        self.assertTrue(succes)
+        self.assertEqual(sum(1 for i in instructions if i.strip().upper() == 'COMMIT'), 1)
+
+    def _encaisser(self, client_id):
+        """Parcours de caisse : droit de vente, scan de chaque ligne
+        (produit + mode de scan), puis encaissement. Retourne les instructions SQL."""
+        instructions = []
+        database.db.conn.set_trace_callback(instructions.append)
+        try:
+            self.assertTrue(Permissions.peut({'role': 'gestionnaire'}, 'effectuer_ventes'))
+            for item in self.panier:
+                code = Produit.obtenir_par_id(item['produit_id'])['code_barre']
+                Produit.obtenir_par_code_barre(code)
+                database.db.get_parametre('mode_scan_auto', '1')
+            succes, _, _ = Vente.finaliser_panier(
+                [dict(item, quantite=1, sous_total=item['prix_vente']) for item in self.panier],
+                [{'mode': 'especes', 'montant': 3850}], client_id=client_id)
+        finally:
+            database.db.conn.set_trace_callback(None)
+        self.assertTrue(succes)
+        return instructions
+
+    def test_parametres_lus_sans_requete(self):
+        """Avant le cache : 5 SELECT sur parametres par encaissement de 2 lignes
+        (droit de vente, 2 x mode de scan, 2 x fidelite) ; apres : aucun."""
+        client_id = Client.ajouter("Awa")
+        self._encaisser(client_id)
+        instructions = self._encaisser(client_id)
+        self.assertEqual([i for i in instructions if 'parametres' in i], [])
+        self.assertEqual([i for i in instructions if 'WHERE code_barre' in i], [])
+
+        # Ecriture immediate : la valeur ecrite est relue sans requete
+        database.db.set_parametre('mode_scan_auto', '0')
+        self.assertEqual(database.db.get_parametre('mode_scan_auto'), '0')
+        database.db.set_parametre('fidelite_points_par_fcfa', 500)
+        self.assertEqual(database.db.get_parametre('fidelite_points_par_fcfa'), '500')
+        database.db.set_parametre('fidelite_points_par_fcfa', '1000')
+        database.db.set_parametre('mode_scan_auto', '1')
+
+    def test_panier_vide(self):
+        succes, _, resultat = Vente.finaliser_panier([], self.paiements)
+        self.assertFalse(succes)
+        self.assertIsNone(resultat)
+
+
+class TestListerVentes(unittest.TestCase):
+    """Historique des ventes : une requete pour toute la periode"""
+
+    @classmethod
+    def setUpClass(cls):
+        reset_db()
+
+    def setUp(self):
+        for table in ('paiements', 'details_ventes', 'ventes', 'historique_stock', 'produits', 'utilisateurs'):
+            database.db.execute_query(f"DELETE FROM {table}")
+        self.u1 = database.db.execute_query(
+            "INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe) VALUES ('Dossou', 'Awa', 'awa@b.bj', 'x')")
+        self.u2 = database.db.execute_query(
+            "INSERT INTO utilisateurs (nom, prenom, email, mot_de_passe) VALUES ('Houngbo', 'Koffi', 'k@b.bj', 'x')")
+        p1 = Produit.obtenir_par_code_barre(Produit.ajouter("Savon", "Hygiene", 200, 350, 50, 5))['id']
+        p2 = Produit.obtenir_par_code_barre(Produit.ajouter("Riz 5kg", "Alimentation", 2500, 3500, 50, 1))['id']
+
+        def ligne(pid, prix, qte):
+            return {'produit_id': pid, 'nom': "", 'prix_vente': prix, 'quantite': qte, 'sous_total': prix * qte}
+
+        Vente.finaliser_panier([ligne(p1, 350, 3), ligne(p2, 3500, 1)],
+                               [{'mode': 'especes', 'montant': 2000}, {'mode': 'mtn_momo', 'montant': 2550}],
+                               utilisateur_id=self.u1)
+        Vente.finaliser_panier([ligne(p1, 350, 2)], [{'mode': 'especes', 'montant': 700}],
+                               utilisateur_id=self.u1)
+        Vente.finaliser_panier([ligne(p2, 3500, 2)], [], utilisateur_id=self.u2)
+
+    def test_une_seule_requete(self):
+        instructions = []
+        database.db.conn.set_trace_callback(instructions.append)
+        try:
+            resultat = Vente.lister_ventes("2000-01-01", "2999-12-31")
+        finally:
+            database.db.conn.set_trace_callback(None)
+        # Avant : 1 + 2 requetes par vente (details, paiements)
+        self.assertEqual(len([i for i in instructions if 'FROM' in i]), 1)
+
+        par_articles = {v['nb_articles']: v for v in resultat['ventes']}
+        self.assertEqual(sorted(v['nb_articles'] for v in resultat['ventes']), [2, 2, 4])
+        mixte = par_articles[4]
+        self.assertEqual(sorted(mixte['modes']), ['especes', 'mtn_momo'])
+        self.assertEqual(mixte['vendeur'], "Awa Dossou")
+        self.assertEqual(mixte['total'], 4550)
+        sans_paiement = [v for v in resultat['ventes'] if v['vendeur'] == "Koffi Houngbo"][0]
+        self.assertEqual(sans_paiement['modes'], [])
+
+        self.assertEqual(resultat['ca'], 4550 + 700 + 7000)
+        self.assertEqual(resultat['vendeurs'], [("Koffi Houngbo", 1, 7000), ("Awa Dossou", 2, 5250)])
+
+    def test_filtre_caissier(self):
+        resultat = Vente.lister_ventes("2000-01-01", "2999-12-31", self.u2)
+        self.assertEqual(len(resultat['ventes']), 1)
+        self.assertEqual(resultat['vendeurs'], [("Koffi Houngbo", 1, 7000)])
+
+    def test_bornes_de_la_periode(self):
+        for numero, date_vente in (("V-VEILLE", "2024-02-29 23:59:59.900"),
+                                   ("V-DEBUT", "2024-03-01 00:00:00"),
+                                   ("V-FIN", "2024-03-02 23:59:59.500"),
+                                   ("V-LENDEMAIN", "2024-03-03 00:00:00")):
+            database.db.execute_query("INSERT INTO ventes (numero_vente, date_vente, total) VALUES (?, ?, 100)",
+                                      (numero, date_vente))
+        resultat = Vente.lister_ventes("2024-03-01", "2024-03-02")
+        self.assertEqual([v['numero_vente'] for v in resultat['ventes']], ["V-FIN", "V-DEBUT"])
+
+    def test_connexion_lecture_en_memoire(self):
+        """Une base :memory: ne se partage pas : chargement sur db"""
+        self.assertIsNone(database.db.ouvrir_connexion_lecture())
+
+    def test_lecture_depuis_un_autre_thread(self):
+        temp_dir = tempfile.mkdtemp()
+        conn_origine, chemin_origine = database.db.conn, database.DB_PATH
+        try:
+            database.DB_PATH = os.path.join(temp_dir, 'boutique.db')
+            database.db.connect()
+            database.db.create_tables()
+            database.db.execute_query(
+                "INSERT INTO ventes (numero_vente, date_vente, total) VALUES ('V1', '2024-03-01 10:00:00', 500)")
+
+            conn = database.db.ouvrir_connexion_lecture()
+            resultats = []
+
+            def charger():
+                # Comme un thread de l'executeur de requetes
+                database.db.lier_connexion_lecture(conn)
+                resultats.append(Vente.lister_ventes("2024-03-01", "2024-03-01"))
+
+            t = threading.Thread(target=charger)
+            t.start()
+            t.join(5)
+            self.assertEqual(resultats[0]['ca'], 500)
+            self.assertRaises(sqlite3.OperationalError, conn.execute, "DELETE FROM ventes")
+            conn.close()
+        finally:
+            database.db.conn.close()
+            database.db.conn, database.DB_PATH = conn_origine, chemin_origine
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
 if __name__ == '__main__':
     unittest.main()
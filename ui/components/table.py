@@ -1,69 +1,253 @@
 """
 Composant tableau reutilisable pour l'application.
-QTableView preconfigure avec tri, filtrage et style.
+QTableView preconfigure avec tri, filtrage et style, sur un modele virtuel.
 """
 from PySide6.QtWidgets import (
     QTableView, QHeaderView, QAbstractItemView, QWidget,
     QVBoxLayout, QHBoxLayout, QLineEdit, QLabel
 )
 from PySide6.QtCore import (
-    Qt, QSortFilterProxyModel, QModelIndex, Signal
+    Qt, QAbstractTableModel, QSortFilterProxyModel, QModelIndex, Signal
 )
-from PySide6.QtGui import QStandardItemModel, QStandardItem
 
 
-class BoutiqueTableModel(QStandardItemModel):
-    """Modele de donnees pour les tableaux de l'application."""
+def _cle_tri(valeur):
+    """Cle de tri tolerant les types melanges : nombres, puis textes, puis vides."""
+    if valeur is None or valeur == "":
+        return (2, 0)
+    if isinstance(valeur, (int, float)):
+        return (0, valeur)
+    return (1, str(valeur).lower())
+
+
+def _affichage(valeur):
+    """Valeur affichee d'une cellule : nombres tels quels, texte sinon (\"\" pour None)."""
+    if isinstance(valeur, (int, float)):
+        return valeur
+    return str(valeur) if valeur is not None else ""
+
+
+def _contient(ligne, filtre):
+    """Vrai si une cellule de la ligne contient filtre (deja en minuscules)."""
+    return any(filtre in str(v).lower() for v in ligne if v is not None)
+
+
+class BoutiqueTableModel(QAbstractTableModel):
+    """Modele de donnees pour les tableaux de l'application.
+
+    Les lignes sont gardees telles quelles (tuples, listes, sqlite3.Row) et
+    converties a l'affichage : pas d'objet par cellule. La vue recoit les
+    lignes par lots (canFetchMore/fetchMore) au fil du defilement ; le tri
+    et le filtre s'appliquent ici, sur les donnees.
+
+    Une liste passee a charger_donnees est gardee sans copie : ajouter_ligne
+    et supprimer_ligne la modifient. Le modele n'ajoute par ligne qu'un
+    indice dans _ordre : la memoire est celle des lignes chargees.
+
+    Les grandes listes se chargent par charger_pages : fetchMore lit alors
+    la page suivante a la source (pagination par cle, modules.pagination)
+    et seules les pages atteintes par le defilement sont en memoire (voir
+    scripts/bench_table.py).
+    """
+
+    TAILLE_LOT = 500
 
     def __init__(self, colonnes: list[str], parent=None):
-        super().__init__(0, len(colonnes), parent)
-        self.setHorizontalHeaderLabels(colonnes)
+        super().__init__(parent)
         self._colonnes = colonnes
-
-    def charger_donnees(self, lignes: list[list]):
+        self._lignes = []
+        self._ordre = []       # indices dans _lignes des lignes visibles (tri + filtre)
+        self._exposees = 0     # lignes deja annoncees a la vue
+        self._filtre = ""
+        self._tri = (-1, Qt.AscendingOrder)
+        self._page = None      # source paginee (charger_pages), sinon None
+        self._suivant = None   # curseur de la page suivante, None en fin de liste
+
+    # --- Interface QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._exposees
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._colonnes)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return _affichage(self._lignes[self._ordre[index.row()]][index.column()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._colonnes[section]
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._exposees < len(self._ordre) or self._suivant is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        if self._exposees == len(self._ordre) and self._suivant is not None:
+            self._lire_page()
+        nombre = min(self.TAILLE_LOT, len(self._ordre) - self._exposees)
+        if nombre <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._exposees, self._exposees + nombre - 1)
+        self._exposees += nombre
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if self._page is not None:
+            return  # l'ordre est celui de la source
+        self._tri = (column, order)
+        self.beginResetModel()
+        self._appliquer_tri()
+        self._exposees = min(len(self._ordre), max(self._exposees, self.TAILLE_LOT))
+        self.endResetModel()
+
+    # --- API de l'application ---
+
+    def charger_donnees(self, lignes):
         """Remplace toutes les donnees du modele.
 
         Args:
-            lignes: Liste de listes, chaque sous-liste = une ligne.
+            lignes: Iterable de lignes (liste, tuple, sqlite3.Row...).
+                Une liste est gardee telle quelle, sans copie.
         """
-        self.removeRows(0, self.rowCount())
-        for ligne in lignes:
-            items = []
-            for valeur in ligne:
-                item = QStandardItem()
-                if isinstance(valeur, (int, float)):
-                    item.setData(valeur, Qt.DisplayRole)
-                else:
-                    item.setText(str(valeur) if valeur is not None else "")
-                item.setEditable(False)
-                items.append(item)
-            self.appendRow(items)
+        self.beginResetModel()
+        self._page = self._suivant = None
+        self._lignes = lignes if isinstance(lignes, list) else list(lignes)
+        self._recalculer_ordre()
+        self._exposees = min(len(self._ordre), self.TAILLE_LOT)
+        self.endResetModel()
+
+    def charger_pages(self, page, lignes=None, suivant=None):
+        """Remplace les donnees par une liste paginee a la source.
+
+        Args:
+            page: page(apres) -> (lignes, suivant), page reprenant apres le
+                curseur apres (voir modules.pagination) ; rappelee par
+                fetchMore quand la vue atteint la fin des lignes chargees.
+            lignes, suivant: premiere page deja lue (ex. hors du thread GUI) ;
+                sans lignes, page(None) est lue ici.
+
+        L'ordre et le filtre sont ceux de la source : sort() et filtrer()
+        sont sans effet, la fenetre recharge avec une autre fonction page.
+        """
+        if lignes is None:
+            lignes, suivant = page(None)
+        self.beginResetModel()
+        self._page, self._suivant = page, suivant
+        self._filtre = ""
+        self._lignes = list(lignes)
+        self._ordre = list(range(len(self._lignes)))
+        self._exposees = min(len(self._ordre), self.TAILLE_LOT)
+        self.endResetModel()
 
     def ajouter_ligne(self, ligne: list):
-        """Ajoute une ligne a la fin du modele."""
-        items = []
-        for valeur in ligne:
-            item = QStandardItem()
-            if isinstance(valeur, (int, float)):
-                item.setData(valeur, Qt.DisplayRole)
-            else:
-                item.setText(str(valeur) if valeur is not None else "")
-            item.setEditable(False)
-            items.append(item)
-        self.appendRow(items)
+        """Ajoute une ligne, a sa place selon le tri courant (a la fin sans tri)."""
+        index = len(self._lignes)
+        self._lignes.append(ligne)
+        if self._filtre and not _contient(ligne, self._filtre):
+            return
+        position = self._position_insertion(ligne)
+        if position < self._exposees or self._exposees == len(self._ordre):
+            self.beginInsertRows(QModelIndex(), position, position)
+            self._ordre.insert(position, index)
+            self._exposees += 1
+            self.endInsertRows()
+        else:
+            # Au-dela des lignes exposees : fetchMore l'annoncera
+            self._ordre.insert(position, index)
 
     def supprimer_ligne(self, row: int):
-        """Supprime une ligne par son index."""
-        self.removeRow(row)
+        """Supprime une ligne par son index (ligne affichee)."""
+        if not 0 <= row < self._exposees:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        index = self._ordre.pop(row)
+        del self._lignes[index]
+        self._ordre = [i - 1 if i > index else i for i in self._ordre]
+        self._exposees -= 1
+        self.endRemoveRows()
+
+    def filtrer(self, texte: str):
+        """N'afficher que les lignes contenant texte (toutes colonnes, sans casse)."""
+        if self._page is not None:
+            return
+        texte = texte.lower().strip()
+        self.beginResetModel()
+        if self._filtre and self._filtre in texte:
+            # Filtre affine : seules les lignes deja retenues peuvent passer,
+            # et elles sont deja triees
+            self._filtre = texte
+            lignes = self._lignes
+            self._ordre = [i for i in self._ordre if _contient(lignes[i], texte)]
+        else:
+            self._filtre = texte
+            self._recalculer_ordre()
+        self._exposees = min(len(self._ordre), self.TAILLE_LOT)
+        self.endResetModel()
+
+    def nombre_total(self) -> int:
+        """Nombre de lignes chargees, filtre ignore."""
+        return len(self._lignes)
+
+    def nombre_visible(self) -> int:
+        """Nombre de lignes passant le filtre (y compris pas encore exposees)."""
+        return len(self._ordre)
 
     def obtenir_ligne(self, row: int) -> list:
-        """Retourne les valeurs d'une ligne."""
-        result = []
-        for col in range(self.columnCount()):
-            index = self.index(row, col)
-            data = self.data(index, Qt.DisplayRole)
-            result.append(data)
-        return result
+        """Retourne les valeurs affichees d'une ligne (index d'affichage)."""
+        if not 0 <= row < len(self._ordre):
+            return []
+        return [_affichage(v) for v in self._lignes[self._ordre[row]]]
+
+    def _lire_page(self):
+        """Ajoute la page suivante de la source aux lignes chargees."""
+        lignes, self._suivant = self._page(self._suivant)
+        debut = len(self._lignes)
+        self._lignes.extend(lignes)
+        self._ordre.extend(range(debut, len(self._lignes)))
+
+    def _recalculer_ordre(self):
+        if self._filtre:
+            filtre = self._filtre
+            self._ordre = [i for i, ligne in enumerate(self._lignes) if _contient(ligne, filtre)]
+        else:
+            self._ordre = list(range(len(self._lignes)))
+        self._appliquer_tri()
+
+    def _appliquer_tri(self):
+        colonne, ordre = self._tri
+        if 0 <= colonne < len(self._colonnes):
+            lignes = self._lignes
+            self._ordre.sort(key=lambda i: _cle_tri(lignes[i][colonne]),
+                             reverse=(ordre == Qt.DescendingOrder))
+        else:
+            self._ordre.sort()
+
+    def _position_insertion(self, ligne) -> int:
+        """Position dans _ordre d'une nouvelle ligne, apres ses egales (tri stable)."""
+        colonne, ordre = self._tri
+        if not 0 <= colonne < len(self._colonnes):
+            return len(self._ordre)
+        cle = _cle_tri(ligne[colonne])
+        decroissant = ordre == Qt.DescendingOrder
+        lignes, bas, haut = self._lignes, 0, len(self._ordre)
+        while bas < haut:
+            milieu = (bas + haut) // 2
+            autre = _cle_tri(lignes[self._ordre[milieu]][colonne])
+            if (autre >= cle) if decroissant else (autre <= cle):
+                bas = milieu + 1
+            else:
+                haut = milieu
+        return bas
 
 
 class BoutiqueTableView(QTableView):
@@ -146,10 +330,6 @@ class TableauRecherche(QWidget):
         super().__init__(parent)
 
         self._model = BoutiqueTableModel(colonnes)
-        self._proxy = QSortFilterProxyModel()
-        self._proxy.setSourceModel(self._model)
-        self._proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
-        self._proxy.setFilterKeyColumn(-1)  # Rechercher dans toutes les colonnes
 
         # Layout
         layout = QVBoxLayout(self)
@@ -174,7 +354,7 @@ class TableauRecherche(QWidget):
 
         # Tableau
         self._table = BoutiqueTableView()
-        self._table.setModel(self._proxy)
+        self._table.setModel(self._model)
         self._table.ligne_selectionnee.connect(self.ligne_selectionnee.emit)
         self._table.ligne_double_clic.connect(self.ligne_double_clic.emit)
         layout.addWidget(self._table)
@@ -187,10 +367,6 @@ class TableauRecherche(QWidget):
     def table(self) -> BoutiqueTableView:
         return self._table
 
-    @property
-    def proxy(self) -> QSortFilterProxyModel:
-        return self._proxy
-
     def charger_donnees(self, lignes: list[list]):
         """Charge les donnees et met a jour le compteur."""
         self._model.charger_donnees(lignes)
@@ -198,23 +374,23 @@ class TableauRecherche(QWidget):
         self._table.ajuster_colonnes()
 
     def _on_search(self, text: str):
-        self._proxy.setFilterFixedString(text)
+        self._model.filtrer(text)
         self._update_count()
 
     def _update_count(self):
-        total = self._model.rowCount()
-        filtre = self._proxy.rowCount()
+        total = self._model.nombre_total()
+        filtre = self._model.nombre_visible()
         if total == filtre:
             self._label_count.setText(f"{total} elements")
         else:
             self._label_count.setText(f"{filtre}/{total} elements")
 
     def ligne_courante(self) -> int:
-        """Retourne l'index source de la ligne selectionnee, ou -1."""
+        """Retourne l'index de la ligne selectionnee (pour obtenir_ligne), ou -1."""
         return self._table.ligne_courante()
 
     def obtenir_ligne(self, row: int) -> list:
-        """Retourne les valeurs d'une ligne source."""
+        """Retourne les valeurs d'une ligne affichee."""
         return self._model.obtenir_ligne(row)
 
     def focus_recherche(self):
@@ -0,0 +1,163 @@
+"""
+Execution des lectures SQL hors du thread GUI (QThreadPool)
+
+    executeur.soumettre('rapports.top', Rapport.top_produits, 20,
+                        rappel=self._afficher_top, echec=self._erreur_top)
+
+La fonction tourne dans un thread du pool ; chaque thread a sa connexion
+SQLite en lecture seule (db.ouvrir_connexion_lecture), vers laquelle sont
+routes les db.fetch_* des modules, rouverte apres une reconnexion ou une
+restauration (db.close ferme les lecteurs lies). Le resultat revient par
+signal sur le thread GUI. Une soumission avec la meme cle remplace la precedente : non
+demarree elle est sautee, en cours sa requete est interrompue, et son
+resultat n'est jamais livre.
+
+Base :memory: (tests) : pas de seconde connexion possible, la fonction
+s'execute tout de suite sur le thread appelant.
+"""
+import threading
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from database import db, RequeteInterrompue
+from modules.logger import get_logger
+
+logger = get_logger('requetes')
+
+
+class _SignauxTache(QObject):
+    termine = Signal(object)
+    echec = Signal(str)
+
+
+class TacheRequete(QRunnable):
+    """Une fonction de lecture a executer dans le pool"""
+
+    def __init__(self, executeur, cle, fonction, args, kwargs):
+        super().__init__()
+        self.setAutoDelete(False)  # Reference gardee par l'executeur
+        self.cle = cle
+        self.fonction = fonction
+        self.args = args
+        self.kwargs = kwargs
+        self.annulee = False
+        self.signaux = _SignauxTache()  # Cree sur le thread GUI
+        self._executeur = executeur
+        self._conn = None
+
+    def annuler(self):
+        """Ne pas livrer le resultat ; interrompre la requete en cours"""
+        self.annulee = True
+        conn = self._conn
+        if conn is not None:
+            conn.interrupt()
+
+    def run(self):
+        if self.annulee:
+            return
+        self._conn = self._executeur._connexion_du_thread()
+        try:
+            if self.annulee:
+                return
+            resultat = self.fonction(*self.args, **self.kwargs)
+        except RequeteInterrompue:
+            return
+        except Exception as e:
+            logger.error(f"Requete '{self.cle}' en echec : {e}")
+            if not self.annulee:
+                self.signaux.echec.emit(str(e))
+            return
+        finally:
+            self._conn = None
+        if not self.annulee:
+            self.signaux.termine.emit(resultat)
+
+
+class ExecuteurRequetes:
+    """Pool de threads de lecture avec remplacement des requetes par cle"""
+
+    def __init__(self, nb_threads=2):
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(nb_threads)
+        # Threads permanents : leur connexion de lecture vit avec eux
+        self._pool.setExpiryTimeout(-1)
+        # thread (get_ident) -> (connexion, db.conn a son ouverture). Pas de
+        # threading.local : un thread du pool Qt recoit un etat Python neuf a
+        # chaque tache
+        self._connexions = {}
+        self._verrou = threading.Lock()
+        self._taches = {}  # cle -> TacheRequete en attente ou en cours
+
+    def _connexion_du_thread(self):
+        thread = threading.get_ident()
+        with self._verrou:
+            conn, ecrivain = self._connexions.get(thread, (None, None))
+        if conn is None or ecrivain is not db.conn:
+            # Premiere tache du thread, ou connexion ouverte avant une
+            # reconnexion (deja fermee par db, sur l'ancien fichier)
+            ecrivain = db.conn
+            conn = db.ouvrir_connexion_lecture()
+            with self._verrou:
+                self._connexions[thread] = (conn, ecrivain)
+        db.lier_connexion_lecture(conn)
+        return conn
+
+    def soumettre(self, cle, fonction, *args, rappel=None, echec=None, **kwargs):
+        """Executer fonction(*args, **kwargs) dans le pool.
+
+        rappel(resultat) et echec(message) sont appeles sur le thread GUI.
+        Remplace (annule) la tache precedente de meme cle.
+        """
+        self.annuler(cle)
+
+        if not db.lectures_paralleles_possibles():
+            try:
+                resultat = fonction(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Requete '{cle}' en echec : {e}")
+                if echec:
+                    echec(str(e))
+                return None
+            if rappel:
+                rappel(resultat)
+            return None
+
+        tache = TacheRequete(self, cle, fonction, args, kwargs)
+        tache.signaux.termine.connect(lambda resultat: self._livrer(tache, rappel, resultat))
+        tache.signaux.echec.connect(lambda message: self._livrer(tache, echec, message))
+        self._taches[cle] = tache
+        self._pool.start(tache)
+        return tache
+
+    def _livrer(self, tache, fonction, valeur):
+        # Thread GUI : une tache remplacee entre-temps n'est pas livree
+        if self._taches.get(tache.cle) is not tache:
+            return
+        del self._taches[tache.cle]
+        if fonction:
+            try:
+                fonction(valeur)
+            except RuntimeError as e:
+                # Fenetre detruite avant la livraison
+                logger.warning(f"Resultat de '{tache.cle}' non affiche : {e}")
+
+    def annuler(self, prefixe):
+        """Annuler les taches dont la cle commence par prefixe"""
+        for cle in [c for c in self._taches if c.startswith(prefixe)]:
+            self._taches.pop(cle).annuler()
+
+    def en_cours(self, prefixe=""):
+        """Y a-t-il des taches non livrees dont la cle commence par prefixe"""
+        return any(cle.startswith(prefixe) for cle in self._taches)
+
+    def arreter(self, timeout_ms=5000):
+        """Annuler tout, attendre les threads et fermer les connexions"""
+        self.annuler("")
+        self._pool.clear()
+        self._pool.waitForDone(timeout_ms)
+        with self._verrou:
+            for conn, _ in self._connexions.values():
+                conn.close()
+            self._connexions.clear()
+
+
+executeur = ExecuteurRequetes()
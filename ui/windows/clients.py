@@ -26,6 +26,8 @@ class ClientsWindow(QDialog):
         self.setModal(True)
 
         self._page = 0
+        self._curseurs = [None]  # Curseur de debut de chaque page visitee (pagination par cle)
+        self._suivant = None
         self._total = 0
         self._client_selectionne_id = None
 
@@ -212,9 +214,13 @@ class ClientsWindow(QDialog):
         from modules.clients import Client
 
         terme = self._entry_recherche.text().strip()
-        offset = self._page * self.PAGE_SIZE
 
-        clients = Client.rechercher_filtre(terme, limit=self.PAGE_SIZE, offset=offset)
+        clients, self._suivant = Client.page_filtre(
+            terme, apres=self._curseurs[self._page], limit=self.PAGE_SIZE)
+        if not clients and self._page > 0:
+            # Derniere page videe par une suppression
+            self._page_precedente()
+            return
         self._total = Client.compter_filtre(terme)
 
         lignes = []
@@ -236,19 +242,22 @@ class ClientsWindow(QDialog):
         self._label_page.setText(f"Page {self._page + 1} / {total_pages}")
         self._label_total.setText(f"({self._total} clients)")
         self._btn_prev.setEnabled(self._page > 0)
-        self._btn_next.setEnabled((self._page + 1) * self.PAGE_SIZE < self._total)
+        self._btn_next.setEnabled(self._suivant is not None)
 
     def _rechercher(self):
         self._page = 0
+        self._curseurs = [None]
         self._charger_page()
 
     def _page_precedente(self):
         if self._page > 0:
             self._page -= 1
+            del self._curseurs[self._page + 1:]
             self._charger_page()
 
     def _page_suivante(self):
-        if (self._page + 1) * self.PAGE_SIZE < self._total:
+        if self._suivant is not None:
+            self._curseurs.append(self._suivant)
             self._page += 1
             self._charger_page()
 
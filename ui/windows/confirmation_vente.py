@@ -15,9 +15,14 @@ import os
 
 
 class ConfirmationVenteWindow(QDialog):
-    """Dialogue de confirmation apres une vente reussie."""
+    """Dialogue de confirmation apres une vente reussie.
+
+    Sans chemin_recu, le PDF est en cours de generation (modules.file_recus) :
+    les boutons PDF s'activent a la reception de recu_termine.
+    """
 
     nouvelle_vente = Signal()
+    recu_termine = Signal(str)  # Chemin du PDF, "" si la generation a echoue
 
     def __init__(self, vente_info: dict, chemin_recu: str, parent=None):
         super().__init__(parent)
@@ -29,6 +34,7 @@ class ConfirmationVenteWindow(QDialog):
         self.setModal(True)
 
         self._setup_ui()
+        self.recu_termine.connect(self._on_recu_termine)
 
     def _setup_ui(self):
         layout = QVBoxLayout(self)
@@ -114,7 +120,15 @@ class ConfirmationVenteWindow(QDialog):
         lbl_articles.setStyleSheet(f"color: {Theme.c('gray')};")
         lbl_articles.setAlignment(Qt.AlignCenter)
         content_layout.addWidget(lbl_articles)
-        content_layout.addSpacing(20)
+        content_layout.addSpacing(6)
+
+        # Etat du recu PDF (genere en arriere-plan)
+        self.lbl_recu = QLabel("" if self.chemin_recu else "Reçu PDF en cours de génération…")
+        self.lbl_recu.setFont(QFont("Segoe UI", 9))
+        self.lbl_recu.setStyleSheet(f"color: {Theme.c('gray')};")
+        self.lbl_recu.setAlignment(Qt.AlignCenter)
+        content_layout.addWidget(self.lbl_recu)
+        content_layout.addSpacing(14)
 
         # === BOUTONS D'ACTION ===
         buttons = [
@@ -124,8 +138,12 @@ class ConfirmationVenteWindow(QDialog):
             ("Nouvelle vente", 'success', self._nouvelle_vente),
         ]
 
+        self._boutons_pdf = []
         for text, color_key, slot in buttons:
             btn = QPushButton(text)
+            if slot in (self._ouvrir_pdf, self._imprimer):
+                self._boutons_pdf.append(btn)
+                btn.setEnabled(bool(self.chemin_recu))
             btn.setFont(QFont("Segoe UI", 13, QFont.Bold))
             btn.setMinimumHeight(50)
             btn.setCursor(Qt.PointingHandCursor)
@@ -170,6 +188,17 @@ class ConfirmationVenteWindow(QDialog):
         content_layout.addStretch()
         layout.addWidget(content, 1)
 
+    def _on_recu_termine(self, chemin: str):
+        """Le thread des recus a fini (succes ou abandon apres reessais)."""
+        self.chemin_recu = chemin
+        for btn in self._boutons_pdf:
+            btn.setEnabled(bool(chemin))
+        if chemin:
+            self.lbl_recu.setText("")
+        else:
+            self.lbl_recu.setText("Échec de génération du reçu PDF (réessayez depuis la liste des ventes)")
+            self.lbl_recu.setStyleSheet(f"color: {Theme.c('danger')};")
+
     def _ouvrir_pdf(self):
         """Ouvrir le PDF avec l'application par defaut du systeme."""
         if self.chemin_recu and os.path.exists(self.chemin_recu):
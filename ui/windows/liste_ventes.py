@@ -12,6 +12,7 @@ from PySide6.QtGui import QFont, QDesktopServices, QAction
 from ui.theme import Theme
 from ui.components.table import BoutiqueTableView, BoutiqueTableModel
 from ui.components.dialogs import confirmer, information, erreur
+from ui.utils.requetes import executeur
 
 
 class ListeVentesWindow(QDialog):
@@ -129,129 +130,66 @@ class ListeVentesWindow(QDialog):
 
         layout.addWidget(main)
 
+    def _est_caissier(self):
+        return bool(self.utilisateur and self.utilisateur.get('role') == 'caissier')
+
     def _charger_ventes(self):
+        """Charger la periode (Vente.lister_ventes) hors du thread GUI"""
         from modules.ventes import Vente
-        from modules.paiements import Paiement, MODE_LABELS
-        from database import db
-
-        d1 = self.date_debut.date().toString("yyyy-MM-dd") + " 00:00:00"
-        d2 = self.date_fin.date().toString("yyyy-MM-dd") + " 23:59:59"
-
-        # Requête avec JOIN pour récupérer nom vendeur
-        est_caissier = self.utilisateur and self.utilisateur.get('role') == 'caissier'
-
-        if est_caissier:
-            # Caissier : uniquement ses ventes
-            query = """
-                SELECT v.id, v.numero_vente, v.date_vente, v.total, v.client
-                FROM ventes v
-                WHERE v.date_vente BETWEEN ? AND ?
-                AND v.utilisateur_id = ?
-                ORDER BY v.date_vente DESC
-            """
-            ventes = db.fetch_all(query, (d1, d2, self.utilisateur['id']))
-        else:
-            # Admin : toutes les ventes + nom vendeur
-            query = """
-                SELECT v.id, v.numero_vente, v.date_vente, v.total, v.client,
-                       u.prenom, u.nom
-                FROM ventes v
-                LEFT JOIN utilisateurs u ON v.utilisateur_id = u.id
-                WHERE v.date_vente BETWEEN ? AND ?
-                ORDER BY v.date_vente DESC
-            """
-            ventes = db.fetch_all(query, (d1, d2))
 
+        d1 = self.date_debut.date().toString("yyyy-MM-dd")
+        d2 = self.date_fin.date().toString("yyyy-MM-dd")
+        utilisateur_id = self.utilisateur['id'] if self._est_caissier() else None
+
+        self.lbl_stats.setText("Chargement des ventes...")
+        executeur.soumettre(
+            'liste_ventes', Vente.lister_ventes, d1, d2, utilisateur_id,
+            rappel=self._afficher_ventes,
+            echec=lambda message: self.lbl_stats.setText(f"Erreur de chargement : {message}"),
+        )
+
+    def _afficher_ventes(self, resultat):
+        from modules.paiements import MODE_LABELS
+
+        est_caissier = self._est_caissier()
         lignes = []
-        total_ca = 0
-
-        for v in ventes:
-            vente_id = v[0]
-            numero = v[1]
-            date_str = str(v[2])[:10] if v[2] else ""
-            heure_str = str(v[2])[11:16] if v[2] else ""
-            client = v[4] or ""
-            total = v[3] or 0
-            total_ca += total
-
-            # Nom vendeur (seulement pour admin)
+        for v in resultat['ventes']:
+            date_vente = str(v['date_vente'] or "")
+            modes = " + ".join(MODE_LABELS.get(m, m) for m in v['modes']) or "-"
+            ligne = [v['id'], v['numero_vente'], date_vente[:10], date_vente[11:16]]
             if not est_caissier:
-                vendeur_prenom = v[5] or ""
-                vendeur_nom = v[6] or ""
-                vendeur = f"{vendeur_prenom} {vendeur_nom}".strip() if vendeur_prenom or vendeur_nom else "-"
-
-            # Nombre d'articles
-            details = Vente.obtenir_details_vente(vente_id)
-            nb_articles = sum(d[2] for d in details) if details else 0
-
-            # Mode de paiement
-            paiements = Paiement.obtenir_paiements_vente(vente_id)
-            if paiements:
-                modes = [MODE_LABELS.get(p[2], p[2]) for p in paiements]
-                mode_str = " + ".join(set(modes))
-            else:
-                mode_str = "-"
-
-            # Ligne selon rôle
-            if est_caissier:
-                lignes.append([
-                    vente_id, numero, date_str, heure_str, client,
-                    f"{total:,.0f}", mode_str, nb_articles
-                ])
-            else:
-                lignes.append([
-                    vente_id, numero, date_str, heure_str, vendeur, client,
-                    f"{total:,.0f}", mode_str, nb_articles
-                ])
+                ligne.append(v['vendeur'] or "-")
+            ligne += [v['client'], f"{v['total']:,.0f}", modes, v['nb_articles']]
+            lignes.append(ligne)
 
+        # Le filtre de recherche en cours reste applique par le modele
         self.model.charger_donnees(lignes)
         self.table.ajuster_colonnes()
         self.lbl_stats.setText(
-            f"{len(lignes)} vente(s)  |  CA total : {total_ca:,.0f} FCFA"
+            f"{len(lignes)} vente(s)  |  CA total : {resultat['ca']:,.0f} FCFA"
         )
 
-        # Stats par vendeur (Admin seulement)
+        # Stats par vendeur (Admin seulement), top 5
         if self.lbl_stats_vendeurs and not est_caissier:
-            stats_vendeurs = {}
-            for v in ventes:
-                vendeur_prenom = v[5] or ""
-                vendeur_nom = v[6] or ""
-                vendeur_key = f"{vendeur_prenom} {vendeur_nom}".strip() if vendeur_prenom or vendeur_nom else "Non assigné"
-                total_vente = v[3] or 0
-
-                if vendeur_key not in stats_vendeurs:
-                    stats_vendeurs[vendeur_key] = {'nb': 0, 'ca': 0}
-                stats_vendeurs[vendeur_key]['nb'] += 1
-                stats_vendeurs[vendeur_key]['ca'] += total_vente
-
-            # Afficher top 5 vendeurs
-            top_vendeurs = sorted(stats_vendeurs.items(), key=lambda x: x[1]['ca'], reverse=True)[:5]
+            top_vendeurs = resultat['vendeurs'][:5]
             if top_vendeurs:
                 stats_text = "📊 Performance vendeurs : " + " | ".join([
-                    f"{nom}: {stats['nb']} vente(s), {stats['ca']:,.0f} F"
-                    for nom, stats in top_vendeurs
+                    f"{nom or 'Non assigné'}: {nb} vente(s), {ca:,.0f} F"
+                    for nom, nb, ca in top_vendeurs
                 ])
                 self.lbl_stats_vendeurs.setText(stats_text)
             else:
                 self.lbl_stats_vendeurs.setText("")
 
     def _rechercher_ventes(self):
-        terme = self.search_input.text().lower().strip()
-        if not terme:
-            self._charger_ventes()
-            return
-
-        row_count = self.model.rowCount()
-        lignes_filtrees = []
-        for row in range(row_count):
-            ligne = self.model.obtenir_ligne(row)
-            texte = " ".join(str(v) for v in ligne).lower()
-            if terme in texte:
-                lignes_filtrees.append(ligne)
-
-        self.model.charger_donnees(lignes_filtrees)
+        """Filtrer les lignes deja chargees (sans relire la base)"""
+        self.model.filtrer(self.search_input.text())
         self.table.ajuster_colonnes()
 
+    def done(self, result):
+        executeur.annuler('liste_ventes')
+        super().done(result)
+
     def _menu_contextuel(self, pos):
         row = self.table.ligne_courante()
         if row < 0:
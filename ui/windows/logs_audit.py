@@ -2,15 +2,45 @@
 Fenetre de consultation des logs d'audit
 Acces : Super-Admin uniquement
 """
+from functools import partial
+
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QTableWidget, QTableWidgetItem, QHeaderView, QComboBox,
-    QLineEdit, QDateEdit, QMessageBox
+    QComboBox, QLineEdit, QDateEdit, QMessageBox
 )
 from PySide6.QtCore import Qt, QDate
 from PySide6.QtGui import QFont
 from modules.permissions import Permissions
 from database import db
+from ui.components.table import BoutiqueTableView, BoutiqueTableModel
+from ui.utils.requetes import executeur
+
+TAILLE_PAGE = BoutiqueTableModel.TAILLE_LOT
+
+
+def page_logs(requete, params, apres=None):
+    """Page de logs du plus recent au plus ancien, reprenant apres le curseur
+    (date_action, id) ; voir modules.pagination.
+    Retourne (lignes, suivant) ; suivant vaut None en fin de liste."""
+    if apres is not None:
+        requete += " AND (la.date_action, la.id) < (?, ?)"
+        params = params + tuple(apres)
+    lignes = db.fetch_all(
+        requete + " ORDER BY la.date_action DESC, la.id DESC LIMIT ?",
+        params + (TAILLE_PAGE + 1,)
+    )
+    suivant = None
+    if len(lignes) > TAILLE_PAGE:
+        lignes = lignes[:TAILLE_PAGE]
+        suivant = (lignes[-1]['date_action'], lignes[-1]['id'])
+    return lignes, suivant
+
+
+def premiere_page_logs(requete, params):
+    """Premiere page et nombre total de logs du filtre (tache de fond)"""
+    lignes, suivant = page_logs(requete, params)
+    total = db.fetch_one(f"SELECT COUNT(*) FROM ({requete})", params)[0]
+    return lignes, suivant, total
 
 
 class LogsAuditWindow(QDialog):
@@ -94,20 +124,15 @@ class LogsAuditWindow(QDialog):
         layout.addLayout(filtres_layout)
 
         # === TABLE ===
-        self._table = QTableWidget()
-        self._table.setColumnCount(5)
-        self._table.setHorizontalHeaderLabels([
-            'ID', 'Date/Heure', 'Utilisateur', 'Action', 'Détails'
-        ])
-        self._table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self._table_model = BoutiqueTableModel(['ID', 'Date/Heure', 'Utilisateur', 'Action', 'Détails'])
+        self._table = BoutiqueTableView()
+        self._table.setSortingEnabled(False)  # ordre de la pagination
+        self._table.setModel(self._table_model)
         self._table.setColumnWidth(0, 50)
         self._table.setColumnWidth(1, 180)
         self._table.setColumnWidth(2, 200)
         self._table.setColumnWidth(3, 180)
         self._table.setColumnWidth(4, 500)
-        self._table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self._table.setSelectionBehavior(QTableWidget.SelectRows)
-        self._table.setAlternatingRowColors(True)
         layout.addWidget(self._table)
 
         # === FOOTER ===
@@ -155,25 +180,24 @@ class LogsAuditWindow(QDialog):
             params.append(action)
 
         # Filtre date
+        from modules.periodes import condition_plage, plage_jours
         date_debut = self._date_debut.date().toString("yyyy-MM-dd")
         date_fin = self._date_fin.date().toString("yyyy-MM-dd")
-        query += " AND DATE(la.date_action) BETWEEN ? AND ?"
-        params.extend([date_debut, date_fin])
-
-        query += " ORDER BY la.date_action DESC LIMIT 1000"
+        query += f" AND {condition_plage('la.date_action')}"
+        params.extend(plage_jours(date_debut, date_fin))
 
-        logs = db.fetch_all(query, tuple(params))
+        self._label_count.setText("Chargement...")
+        executeur.soumettre('logs_audit', premiere_page_logs, query, tuple(params),
+                            rappel=partial(self._afficher_logs, partial(page_logs, query, tuple(params))),
+                            echec=lambda message: self._label_count.setText(f"Erreur : {message}"))
 
-        # Remplir la table
-        self._table.setRowCount(0)
-        for log in logs:
-            row = self._table.rowCount()
-            self._table.insertRow(row)
+    def _afficher_logs(self, page, resultat):
+        # Les pages suivantes sont lues au defilement (fetchMore du modele)
+        lignes, suivant, total = resultat
+        self._table_model.charger_pages(page, lignes, suivant)
 
-            self._table.setItem(row, 0, QTableWidgetItem(str(log['id'])))
-            self._table.setItem(row, 1, QTableWidgetItem(log['date_action']))
-            self._table.setItem(row, 2, QTableWidgetItem(log['utilisateur']))
-            self._table.setItem(row, 3, QTableWidgetItem(log['action']))
-            self._table.setItem(row, 4, QTableWidgetItem(log['details']))
+        self._label_count.setText(f"{total} log(s)")
 
-        self._label_count.setText(f"{len(logs)} log(s)")
+    def done(self, result):
+        executeur.annuler('logs_audit')
+        super().done(result)
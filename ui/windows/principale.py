@@ -167,6 +167,7 @@ class PrincipaleWindow(QMainWindow):
 
             for label, slot in [
                 ("Logs d'audit", self.ouvrir_logs_audit),
+                ("Requetes SQL (diagnostic)", self.ouvrir_stats_requetes),
                 ("Sauvegarde", self.sauvegarder),
                 ("Restaurer", self.restaurer),
             ]:
@@ -437,13 +438,11 @@ class PrincipaleWindow(QMainWindow):
     # === GRAPHIQUE ===
 
     def _dessiner_graphique(self):
-        # Vider le conteneur
-        while self._chart_container.count():
-            item = self._chart_container.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
         if not MATPLOTLIB_DISPONIBLE:
+            while self._chart_container.count():
+                item = self._chart_container.takeAt(0)
+                if item.widget():
+                    item.widget().deleteLater()
             lbl = QLabel("matplotlib non installe")
             lbl.setAlignment(Qt.AlignCenter)
             lbl.setStyleSheet(f"color: {Theme.c('gray')};")
@@ -451,10 +450,20 @@ class PrincipaleWindow(QMainWindow):
             return
 
         from modules.rapports import Rapport
+        from ui.utils.requetes import executeur
 
         periodes = {"Jour": "jour", "Semaine": "semaine", "Mois": "mois"}
         periode = periodes.get(self._combo_periode.currentText(), "semaine")
-        data = Rapport.donnees_graphique_ventes(periode)
+        # Le graphique precedent reste affiche jusqu'a l'arrivee des donnees
+        executeur.soumettre('principale.graphique', Rapport.donnees_graphique_ventes, periode,
+                            rappel=self._tracer_graphique)
+
+    def _tracer_graphique(self, data):
+        # Vider le conteneur
+        while self._chart_container.count():
+            item = self._chart_container.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
 
         if not data:
             lbl = QLabel("Pas de donnees pour cette periode")
@@ -493,22 +502,45 @@ class PrincipaleWindow(QMainWindow):
 
     # === STATISTIQUES ===
 
-    def actualiser_stats(self):
+    @staticmethod
+    def _donnees_stats():
+        """Lectures du tableau de bord (thread de l'executeur de requetes)"""
+        from modules.rapports import Rapport
+        from modules.produits import Produit
+        from modules.ventes import Vente
+
         try:
-            from modules.rapports import Rapport
-            from modules.produits import Produit
+            comparaison = Rapport.comparaison_jour_precedent()
+        except Exception:
+            comparaison = None
+        return {
+            'stats': Rapport.statistiques_generales(),
+            'produits_alerte': Produit.obtenir_stock_faible(),
+            'comparaison': comparaison,
+            'ventes_jour': Vente.obtenir_ventes_du_jour()[:5],
+        }
 
-            stats = Rapport.statistiques_generales()
+    def actualiser_stats(self):
+        from ui.utils.requetes import executeur
+        self._label_comparaison.setText("Actualisation...")
+        executeur.soumettre('principale.stats', self._donnees_stats,
+                            rappel=self._afficher_stats,
+                            echec=lambda message: print(f"Erreur actualisation: {message}"))
+        self._dessiner_graphique()
+
+    def _afficher_stats(self, donnees):
+        try:
+            stats = donnees['stats']
 
             self.carte_ventes.set_valeur(str(stats['nb_ventes']))
             self.carte_ca.set_valeur(f"{stats['ca_jour']:,.0f} FCFA")
 
-            produits_alerte = Produit.obtenir_stock_faible()
+            produits_alerte = donnees['produits_alerte']
             self.carte_alertes.set_valeur(str(len(produits_alerte)))
 
             # Comparaison vs hier
-            try:
-                comp = Rapport.comparaison_jour_precedent()
+            comp = donnees['comparaison']
+            if comp:
                 variation = comp['variation_ca_pct']
                 signe = "+" if variation >= 0 else ""
                 couleur = Theme.c('success') if variation >= 0 else Theme.c('danger')
@@ -520,17 +552,16 @@ class PrincipaleWindow(QMainWindow):
                 self._label_comparaison.setStyleSheet(
                     f"color: {couleur}; font-size: 11px; font-weight: bold;"
                 )
-            except Exception:
-                pass
+            else:
+                self._label_comparaison.setText("")
 
             # Dernieres ventes
-            from modules.ventes import Vente
-            ventes_jour = Vente.obtenir_ventes_du_jour()
+            ventes_jour = donnees['ventes_jour']
             if not ventes_jour:
                 self._text_ventes.setPlainText("Aucune vente aujourd'hui")
             else:
                 lines = []
-                for v in ventes_jour[:5]:
+                for v in ventes_jour:
                     numero = v[1] if len(v) > 1 else "N/A"
                     total = v[3] if len(v) > 3 else 0
                     lines.append(f"  {numero}: {total:,.0f} FCFA")
@@ -545,8 +576,12 @@ class PrincipaleWindow(QMainWindow):
                     lines.append(f"  {p[1]}: Stock {p[5]}")
                 self._text_stock.setPlainText("\n".join(lines))
 
-            # Graphique
-            self._dessiner_graphique()
+            # Moment calme : checkpoint WAL si le journal a trop grossi
+            from database import db
+            db.checkpoint_si_necessaire()
+            # Et journal de synchronisation compacte si la boutique ne synchronise plus
+            from modules import journal
+            journal.limiter()
 
         except Exception as e:
             print(f"Erreur actualisation: {e}")
@@ -721,6 +756,12 @@ class PrincipaleWindow(QMainWindow):
         dlg = LogsAuditWindow(self.utilisateur, parent=self)
         dlg.exec()
 
+    def ouvrir_stats_requetes(self):
+        """Ouvrir le diagnostic des requetes SQL (appels et temps par gabarit)"""
+        from ui.windows.stats_requetes import StatistiquesRequetesWindow
+        dlg = StatistiquesRequetesWindow(self.utilisateur, parent=self)
+        dlg.exec()
+
     def _fenetre_non_migree(self, nom: str):
         QMessageBox.information(
             self, "En construction",
@@ -221,13 +221,15 @@ class PrincipaleCaissierWindow(QMainWindow):
 
     def actualiser_stats(self):
         """Actualiser stats PERSONNELLES du caissier (uniquement ses ventes)"""
-        try:
-            from modules.rapports import Rapport
-            stats = Rapport.statistiques_utilisateur(self.utilisateur['id'])
-            self._label_ventes.setText(str(stats['nb_ventes']))
-            self._label_ca.setText(f"{stats['ca_jour']:,.0f} FCFA")
-        except Exception as e:
-            logger.error(f"Erreur actualisation: {e}")
+        from modules.rapports import Rapport
+        from ui.utils.requetes import executeur
+        executeur.soumettre('caissier.stats', Rapport.statistiques_utilisateur, self.utilisateur['id'],
+                            rappel=self._afficher_stats,
+                            echec=lambda message: logger.error(f"Erreur actualisation: {message}"))
+
+    def _afficher_stats(self, stats):
+        self._label_ventes.setText(str(stats['nb_ventes']))
+        self._label_ca.setText(f"{stats['ca_jour']:,.0f} FCFA")
 
     def ouvrir_ventes(self):
         from ui.windows.ventes import VentesWindow
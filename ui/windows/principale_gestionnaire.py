@@ -320,25 +320,23 @@ class PrincipaleGestionnaireWindow(QMainWindow):
 
     def actualiser_stats(self):
         """Actualiser stats pour gestionnaire (stock, produits en alerte, etc.)"""
+        from modules.rapports import Rapport
+        from ui.utils.requetes import executeur
+        # Stats Produits (compteurs maintenus en base, une seule requete)
+        executeur.soumettre('gestionnaire.stats', Rapport.statistiques_generales,
+                            rappel=self._afficher_stats,
+                            echec=lambda message: logger.error(f"Erreur actualisation stats gestionnaire: {message}"))
+
+    def _afficher_stats(self, stats):
         try:
-            from modules.produits import Produit
-            from modules.rapports import Rapport
-
-            # Stats Produits
-            total_produits = Produit.compter_produits()
-            produits_alerte = Produit.compter_produits_alerte()
-            valeur_stock = Produit.calculer_valeur_stock_globale()
+            total_produits = stats['nb_produits']
+            produits_alerte = stats['nb_alertes_stock']
+            valeur_stock = stats['valeur_stock']
 
             self._label_total_produits.setText(str(total_produits))
             self._label_produits_alerte.setText(str(produits_alerte))
             self._label_valeur_stock.setText(f"{valeur_stock:,.0f} FCFA")
 
-            # Stats Ventes (si le gestionnaire peut vendre)
-            if Permissions.peut(self.utilisateur, 'voir_mes_ventes'):
-                stats_ventes = Rapport.statistiques_utilisateur(self.utilisateur['id'])
-                # Vous pouvez ajouter ces stats a l'interface si desire
-                logger.info(f"Stats ventes gestionnaire: {stats_ventes}")
-
         except Exception as e:
             logger.error(f"Erreur actualisation stats gestionnaire: {e}")
 
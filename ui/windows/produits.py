@@ -2,11 +2,13 @@
 Fenetre de gestion des produits - PySide6
 CRUD produits, codes-barres, filtres, pagination.
 """
+import os
+
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QPushButton, QFrame, QMessageBox, QWidget, QComboBox,
     QTextEdit, QRadioButton, QButtonGroup, QScrollArea,
-    QSpinBox
+    QSpinBox, QFileDialog
 )
 from PySide6.QtCore import Qt, QUrl
 from PySide6.QtGui import QFont, QDesktopServices, QDoubleValidator, QIntValidator
@@ -15,7 +17,7 @@ from ui.theme import Theme
 from ui.components.table import BoutiqueTableView, BoutiqueTableModel
 from ui.components.dialogs import confirmer, information, erreur
 
-from config import BARCODE_TYPES
+from config import BARCODE_TYPES, EXPORTS_DIR
 
 
 class ProduitsWindow(QDialog):
@@ -30,6 +32,8 @@ class ProduitsWindow(QDialog):
         self.setModal(True)
 
         self._page = 0
+        self._curseurs = [None]  # Curseur de debut de chaque page visitee (pagination par cle)
+        self._suivant = None
         self._total = 0
         self._produit_selectionne_id = None
 
@@ -300,6 +304,16 @@ class ProduitsWindow(QDialog):
         btn_actualiser.clicked.connect(self._actualiser)
         actions_row.addWidget(btn_actualiser)
 
+        btn_importer = QPushButton("Importer...")
+        btn_importer.setCursor(Qt.PointingHandCursor)
+        btn_importer.clicked.connect(self._importer_catalogue)
+        actions_row.addWidget(btn_importer)
+
+        btn_exporter = QPushButton("Exporter...")
+        btn_exporter.setCursor(Qt.PointingHandCursor)
+        btn_exporter.clicked.connect(self._exporter_catalogue)
+        actions_row.addWidget(btn_exporter)
+
         right_layout.addLayout(actions_row)
 
         # Tableau
@@ -414,13 +428,16 @@ class ProduitsWindow(QDialog):
         from modules.produits import Produit
 
         terme, categorie, stock_filter, prix_min, prix_max = self._get_filtres()
-        offset = self._page * self.PAGE_SIZE
 
-        produits = Produit.rechercher_filtre(
+        produits, self._suivant = Produit.page_filtre(
             terme=terme, categorie=categorie, stock_filter=stock_filter,
             prix_min=prix_min, prix_max=prix_max,
-            limit=self.PAGE_SIZE, offset=offset
+            apres=self._curseurs[self._page], limit=self.PAGE_SIZE
         )
+        if not produits and self._page > 0:
+            # Derniere page videe par une suppression
+            self._page_precedente()
+            return
         self._total = Produit.compter_filtre(
             terme=terme, categorie=categorie, stock_filter=stock_filter,
             prix_min=prix_min, prix_max=prix_max
@@ -446,10 +463,11 @@ class ProduitsWindow(QDialog):
         self._label_page.setText(f"Page {self._page + 1} / {total_pages}")
         self._label_total.setText(f"({self._total} produits)")
         self._btn_prev.setEnabled(self._page > 0)
-        self._btn_next.setEnabled((self._page + 1) * self.PAGE_SIZE < self._total)
+        self._btn_next.setEnabled(self._suivant is not None)
 
     def _rechercher(self):
         self._page = 0
+        self._curseurs = [None]
         self._charger_page()
 
     def _actualiser(self):
@@ -459,10 +477,12 @@ class ProduitsWindow(QDialog):
     def _page_precedente(self):
         if self._page > 0:
             self._page -= 1
+            del self._curseurs[self._page + 1:]
             self._charger_page()
 
     def _page_suivante(self):
-        if (self._page + 1) * self.PAGE_SIZE < self._total:
+        if self._suivant is not None:
+            self._curseurs.append(self._suivant)
             self._page += 1
             self._charger_page()
 
@@ -644,6 +664,70 @@ class ProduitsWindow(QDialog):
 
         QDesktopServices.openUrl(QUrl.fromLocalFile(chemin))
 
+    # === Import / export ===
+
+    def _importer_catalogue(self):
+        """Import CSV/XLSX : simulation, confirmation, puis import."""
+        chemin, _ = QFileDialog.getOpenFileName(
+            self, "Importer des produits", "",
+            "Catalogue (*.csv *.xlsx);;CSV (*.csv);;Excel (*.xlsx)"
+        )
+        if not chemin:
+            return
+
+        from modules.catalogue import importer_produits, ErreurFichier
+        try:
+            simulation = importer_produits(chemin, simulation=True)
+        except (ErreurFichier, OSError, UnicodeDecodeError) as e:
+            erreur(self, "Erreur", f"Fichier illisible :\n{e}")
+            return
+
+        message = simulation.resume()
+        if simulation.erreurs:
+            message += "\n\nLes lignes en erreur seront ignorees (rapport disponible apres l'import)."
+        if not simulation.valides:
+            self._proposer_rapport_erreurs(simulation, message)
+            return
+        if not confirmer(self, "Importer des produits", f"{message}\n\nImporter ?"):
+            return
+
+        try:
+            rapport = importer_produits(chemin)
+        except Exception as e:
+            erreur(self, "Erreur", f"Import annule, aucun produit ajoute :\n{e}")
+            return
+        self._charger_categories()
+        self._rechercher()
+        self._proposer_rapport_erreurs(rapport, rapport.resume())
+
+    def _proposer_rapport_erreurs(self, rapport, message):
+        if not rapport.erreurs:
+            information(self, "Import", message)
+            return
+        if not confirmer(self, "Import", f"{message}\n\nEnregistrer le rapport des erreurs ?"):
+            return
+        chemin, _ = QFileDialog.getSaveFileName(
+            self, "Rapport des erreurs", "erreurs_import.csv", "CSV (*.csv)")
+        if chemin:
+            rapport.ecrire_erreurs(chemin)
+
+    def _exporter_catalogue(self):
+        """Export de tout le catalogue en CSV ou XLSX."""
+        chemin, _ = QFileDialog.getSaveFileName(
+            self, "Exporter les produits", os.path.join(EXPORTS_DIR, "produits.csv"),
+            "CSV (*.csv);;Excel (*.xlsx)"
+        )
+        if not chemin:
+            return
+
+        from modules.catalogue import exporter_produits, ErreurFichier
+        try:
+            nombre = exporter_produits(chemin)
+        except (ErreurFichier, OSError) as e:
+            erreur(self, "Erreur", f"Export impossible :\n{e}")
+            return
+        information(self, "Export", f"{nombre} produit(s) exporte(s) vers :\n{chemin}")
+
     def _reinitialiser_formulaire(self):
         self._produit_selectionne_id = None
         self._entry_nom.clear()
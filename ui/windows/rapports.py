@@ -12,6 +12,7 @@ from PySide6.QtGui import QFont
 from ui.theme import Theme
 from ui.components.table import BoutiqueTableView, BoutiqueTableModel
 from ui.components.dialogs import information, erreur
+from ui.utils.requetes import executeur
 
 
 class RapportsWindow(QDialog):
@@ -73,6 +74,7 @@ class RapportsWindow(QDialog):
 
         self.tabs.addTab(self._creer_tab_overview(), "Vue d'ensemble")
         self.tabs.addTab(self._creer_tab_top_produits(), "Top Produits")
+        self.tabs.addTab(self._creer_tab_marges(), "Marges")
         self.tabs.addTab(self._creer_tab_caisse(), "Caisse")
         self.tabs.addTab(self._creer_tab_tva(), "TVA")
         self.tabs.addTab(self._creer_tab_stock(), "Stock Faible")
@@ -194,6 +196,28 @@ class RapportsWindow(QDialog):
 
         return widget
 
+    # === TAB 2 BIS : MARGES ===
+
+    def _creer_tab_marges(self):
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(20, 15, 20, 15)
+        layout.setSpacing(12)
+
+        self.lbl_marge_totale = QLabel()
+        self.lbl_marge_totale.setFont(QFont("Segoe UI", 13, QFont.Bold))
+        layout.addWidget(self.lbl_marge_totale)
+
+        # Table
+        colonnes = ["Produit", "Categorie", "Qte Vendue", "CA (FCFA)", "Cout (FCFA)",
+                    "Marge (FCFA)", "Taux marge"]
+        self.marges_model = BoutiqueTableModel(colonnes)
+        self.marges_table = BoutiqueTableView()
+        self.marges_table.setModel(self.marges_model)
+        layout.addWidget(self.marges_table)
+
+        return widget
+
     # === TAB 3 : CAISSE ===
 
     def _creer_tab_caisse(self):
@@ -317,47 +341,75 @@ class RapportsWindow(QDialog):
 
     # === DATA LOADING ===
 
+    def _charger(self, onglet, fonction, *args, rappel, libelle):
+        """Lire les donnees d'un onglet hors du thread GUI (curseur occupe en attendant)"""
+        def afficher(resultat):
+            try:
+                rappel(resultat)
+            except Exception as e:
+                erreur(self, "Erreur", f"Erreur chargement {libelle} :\n{e}")
+            finally:
+                self._fin_chargement()
+
+        def echec(message):
+            self._fin_chargement()
+            erreur(self, "Erreur", f"Erreur chargement {libelle} :\n{message}")
+
+        self.setCursor(Qt.BusyCursor)
+        executeur.soumettre(f"rapports.{onglet}", fonction, *args, rappel=afficher, echec=echec)
+
+    def _fin_chargement(self):
+        if not executeur.en_cours("rapports."):
+            self.unsetCursor()
+
+    def done(self, result):
+        executeur.annuler("rapports.")
+        super().done(result)
+
     def _actualiser(self):
         self._charger_overview()
         self._charger_top_produits()
+        self._charger_marges()
         self._charger_caisse()
         self._charger_tva()
         self._charger_stock()
 
-    def _charger_overview(self):
+    @staticmethod
+    def _donnees_overview():
         from modules.rapports import Rapport
         from modules.produits import Produit
+        return (Rapport.statistiques_generales(), Rapport.evolution_ventes_7_jours(),
+                Produit.obtenir_stock_faible())
 
-        try:
-            stats = Rapport.statistiques_generales()
-            evol = Rapport.evolution_ventes_7_jours()
-            alertes = Produit.obtenir_stock_faible()
-
-            nb_ventes_jour = stats.get('nb_ventes', 0)
-            ca_jour = stats.get('ca_jour', 0)
-            ca_total = stats.get('ca_total', 0)
-            valeur_stock = stats.get('valeur_stock', 0)
-
-            # Count today's sales from evolution data
-            from datetime import datetime
-            today = datetime.now().strftime("%Y-%m-%d")
-            ventes_jour = 0
-            for e in evol:
-                if str(e[0]) == today:
-                    ventes_jour = e[1]
-                    break
-
-            self._maj_card(self._cards_overview["ventes_jour"], str(ventes_jour or nb_ventes_jour))
-            self._maj_card(self._cards_overview["ca_jour"], f"{ca_jour:,.0f} FCFA")
-            self._maj_card(self._cards_overview["stock_alertes"], str(len(alertes) if alertes else 0))
-            self._maj_card(self._cards_overview["nb_ventes_total"], str(stats.get('nb_ventes', 0)))
-            self._maj_card(self._cards_overview["ca_total"], f"{ca_total:,.0f} FCFA")
-            self._maj_card(self._cards_overview["valeur_stock"], f"{valeur_stock:,.0f} FCFA")
-
-            # Chart
-            self._afficher_graphique_evolution(evol)
-        except Exception as e:
-            erreur(self, "Erreur", f"Impossible de charger les statistiques :\n{e}")
+    def _charger_overview(self):
+        self._charger("overview", self._donnees_overview,
+                      rappel=self._afficher_overview, libelle="des statistiques")
+
+    def _afficher_overview(self, donnees):
+        stats, evol, alertes = donnees
+        nb_ventes_jour = stats.get('nb_ventes', 0)
+        ca_jour = stats.get('ca_jour', 0)
+        ca_total = stats.get('ca_total', 0)
+        valeur_stock = stats.get('valeur_stock', 0)
+
+        # Count today's sales from evolution data
+        from datetime import datetime
+        today = datetime.now().strftime("%Y-%m-%d")
+        ventes_jour = 0
+        for e in evol:
+            if str(e[0]) == today:
+                ventes_jour = e[1]
+                break
+
+        self._maj_card(self._cards_overview["ventes_jour"], str(ventes_jour or nb_ventes_jour))
+        self._maj_card(self._cards_overview["ca_jour"], f"{ca_jour:,.0f} FCFA")
+        self._maj_card(self._cards_overview["stock_alertes"], str(len(alertes) if alertes else 0))
+        self._maj_card(self._cards_overview["nb_ventes_total"], str(stats.get('nb_ventes', 0)))
+        self._maj_card(self._cards_overview["ca_total"], f"{ca_total:,.0f} FCFA")
+        self._maj_card(self._cards_overview["valeur_stock"], f"{valeur_stock:,.0f} FCFA")
+
+        # Chart
+        self._afficher_graphique_evolution(evol)
 
     def _afficher_graphique_evolution(self, evol):
         # Clear previous chart
@@ -401,19 +453,38 @@ class RapportsWindow(QDialog):
 
     def _charger_top_produits(self):
         from modules.rapports import Rapport
-        try:
-            top = Rapport.top_produits(20)
-            lignes = []
-            for i, p in enumerate(top, 1):
-                # (nom, categorie, total_vendu, ca_total)
-                lignes.append([i, p[0], p[1], p[2], f"{p[3]:,.0f}"])
-            self.top_model.charger_donnees(lignes)
-            self.top_table.ajuster_colonnes()
-
-            # Bar chart
-            self._afficher_top_chart(top[:10])
-        except Exception as e:
-            erreur(self, "Erreur", f"Erreur chargement top produits :\n{e}")
+        self._charger("top_produits", Rapport.top_produits, 20,
+                      rappel=self._afficher_top_produits, libelle="top produits")
+
+    def _afficher_top_produits(self, top):
+        lignes = []
+        for i, p in enumerate(top, 1):
+            # (nom, categorie, total_vendu, ca_total)
+            lignes.append([i, p[0], p[1], p[2], f"{p[3]:,.0f}"])
+        self.top_model.charger_donnees(lignes)
+        self.top_table.ajuster_colonnes()
+
+        # Bar chart
+        self._afficher_top_chart(top[:10])
+
+    def _charger_marges(self):
+        from modules.rapports import Rapport
+        self._charger("marges", Rapport.marges_produits,
+                      rappel=self._afficher_marges, libelle="marges")
+
+    def _afficher_marges(self, marges):
+        lignes = []
+        for m in marges:
+            # (nom, categorie, quantite, ca, cout, marge, taux_marge)
+            lignes.append([m[0], m[1], m[2], f"{m[3]:,.0f}", f"{m[4]:,.0f}",
+                           f"{m[5]:,.0f}", f"{m[6]:.1f}%"])
+        self.marges_model.charger_donnees(lignes)
+        self.marges_table.ajuster_colonnes()
+
+        ca = sum(m[3] for m in marges)
+        marge = sum(m[5] for m in marges)
+        taux = marge * 100 / ca if ca else 0
+        self.lbl_marge_totale.setText(f"Marge brute totale : {marge:,.0f} FCFA ({taux:.1f}%)")
 
     def _afficher_top_chart(self, top):
         while self.top_chart_container.count():
@@ -450,85 +521,86 @@ class RapportsWindow(QDialog):
         from modules.paiements import Paiement
 
         date = self.caisse_date.date().toString("yyyy-MM-dd")
-        try:
-            rapport = Paiement.rapport_caisse_jour(date)
-
-            # Update cards
-            for key in ["especes", "orange_money", "mtn_momo", "moov_money"]:
-                val = rapport.get(f"total_{key}", 0)
-                self._maj_card(self._caisse_cards[key], f"{val:,.0f} FCFA")
-
-            # Table
-            lignes = []
-            for d in rapport.get('details_par_mode', []):
-                lignes.append([d['label'], d['nb'], f"{d['total']:,.0f}"])
-            self.caisse_model.charger_donnees(lignes)
-            self.caisse_table.ajuster_colonnes()
-
-            self.lbl_total_caisse.setText(
-                f"Total general : {rapport.get('total_general', 0):,.0f} FCFA  "
-                f"({rapport.get('nb_transactions', 0)} transactions)"
-            )
-        except Exception as e:
-            erreur(self, "Erreur", f"Erreur chargement caisse :\n{e}")
+        self._charger("caisse", Paiement.rapport_caisse_jour, date,
+                      rappel=self._afficher_caisse, libelle="caisse")
 
-    def _charger_tva(self):
+    def _afficher_caisse(self, rapport):
+        # Update cards
+        for key in ["especes", "orange_money", "mtn_momo", "moov_money"]:
+            val = rapport.get(f"total_{key}", 0)
+            self._maj_card(self._caisse_cards[key], f"{val:,.0f} FCFA")
+
+        # Table
+        lignes = []
+        for d in rapport.get('details_par_mode', []):
+            lignes.append([d['label'], d['nb'], f"{d['total']:,.0f}"])
+        self.caisse_model.charger_donnees(lignes)
+        self.caisse_table.ajuster_colonnes()
+
+        self.lbl_total_caisse.setText(
+            f"Total general : {rapport.get('total_general', 0):,.0f} FCFA  "
+            f"({rapport.get('nb_transactions', 0)} transactions)"
+        )
+
+    @staticmethod
+    def _donnees_tva():
         from modules.fiscalite import Fiscalite
+        active = Fiscalite.tva_active()
+        rapport = Fiscalite.rapport_tva_mensuel() if active else None
+        return active, rapport, Fiscalite.lister_taux_tva()
 
-        try:
-            active = Fiscalite.tva_active()
-            if active:
-                self.tva_banner.setText("TVA ACTIVE")
-                self.tva_banner.setStyleSheet(
-                    f"background-color: {Theme.c('success')}; color: white; "
-                    f"border-radius: 6px; padding: 5px;"
-                )
-
-                rapport = Fiscalite.rapport_tva_mensuel()
-                self._maj_card(self._tva_cards["ca_ttc"], f"{rapport['total_ttc']:,.0f} FCFA")
-                self._maj_card(self._tva_cards["ca_ht"], f"{rapport['total_ht']:,.0f} FCFA")
-                self._maj_card(self._tva_cards["tva_collectee"], f"{rapport['total_tva']:,.0f} FCFA")
-            else:
-                self.tva_banner.setText("TVA INACTIVE")
-                self.tva_banner.setStyleSheet(
-                    f"background-color: {Theme.c('gray')}; color: white; "
-                    f"border-radius: 6px; padding: 5px;"
-                )
-                for card in self._tva_cards.values():
-                    self._maj_card(card, "N/A")
-
-            # Taux par categorie
-            taux = Fiscalite.lister_taux_tva()
-            lignes = []
-            for t in (taux or []):
-                # (id, categorie, taux, description)
-                lignes.append([t[0], t[1], f"{t[2]}%", t[3] or ""])
-            self.tva_model.charger_donnees(lignes)
-            self.tva_table.ajuster_colonnes()
-        except Exception as e:
-            erreur(self, "Erreur", f"Erreur chargement TVA :\n{e}")
+    def _charger_tva(self):
+        self._charger("tva", self._donnees_tva, rappel=self._afficher_tva, libelle="TVA")
+
+    def _afficher_tva(self, donnees):
+        active, rapport, taux = donnees
+        if active:
+            self.tva_banner.setText("TVA ACTIVE")
+            self.tva_banner.setStyleSheet(
+                f"background-color: {Theme.c('success')}; color: white; "
+                f"border-radius: 6px; padding: 5px;"
+            )
+
+            self._maj_card(self._tva_cards["ca_ttc"], f"{rapport['total_ttc']:,.0f} FCFA")
+            self._maj_card(self._tva_cards["ca_ht"], f"{rapport['total_ht']:,.0f} FCFA")
+            self._maj_card(self._tva_cards["tva_collectee"], f"{rapport['total_tva']:,.0f} FCFA")
+        else:
+            self.tva_banner.setText("TVA INACTIVE")
+            self.tva_banner.setStyleSheet(
+                f"background-color: {Theme.c('gray')}; color: white; "
+                f"border-radius: 6px; padding: 5px;"
+            )
+            for card in self._tva_cards.values():
+                self._maj_card(card, "N/A")
+
+        # Taux par categorie
+        lignes = []
+        for t in (taux or []):
+            # (id, categorie, taux, description)
+            lignes.append([t[0], t[1], f"{t[2]}%", t[3] or ""])
+        self.tva_model.charger_donnees(lignes)
+        self.tva_table.ajuster_colonnes()
 
     def _charger_stock(self):
         from modules.produits import Produit
-
-        try:
-            produits = Produit.obtenir_stock_faible()
-            nb = len(produits) if produits else 0
-
-            self.lbl_stock_alert.setText(f"{nb} produit(s) en stock faible")
-            if nb > 0:
-                self.lbl_stock_alert.setStyleSheet(f"color: {Theme.c('danger')};")
-            else:
-                self.lbl_stock_alert.setStyleSheet(f"color: {Theme.c('success')};")
-
-            lignes = []
-            for p in (produits or []):
-                # produit tuple: (id, nom, categorie, prix_achat, prix_vente, stock_actuel, stock_alerte, ...)
-                lignes.append([p[1], p[2], p[5], p[6], f"{p[4]:,.0f}"])
-            self.stock_model.charger_donnees(lignes)
-            self.stock_table.ajuster_colonnes()
-        except Exception as e:
-            erreur(self, "Erreur", f"Erreur chargement stock :\n{e}")
+        self._charger("stock", Produit.obtenir_stock_faible,
+                      rappel=self._afficher_stock, libelle="stock")
+
+    def _afficher_stock(self, produits):
+        nb = len(produits) if produits else 0
+
+        self.lbl_stock_alert.setText(f"{nb} produit(s) en stock faible")
+        if nb > 0:
+            self.lbl_stock_alert.setStyleSheet(f"color: {Theme.c('danger')};")
+        else:
+            self.lbl_stock_alert.setStyleSheet(f"color: {Theme.c('success')};")
+
+        lignes = []
+        for p in (produits or []):
+            # produit tuple: (id, nom, categorie, prix_achat, prix_vente, stock_actuel, stock_alerte, ...)
+            lignes.append([p[1], p[2], p[5], p[6], f"{p[4]:,.0f}"])
+        self.stock_model.charger_donnees(lignes)
+        self.stock_table.ajuster_colonnes()
 
     def _exporter_excel(self):
         try:
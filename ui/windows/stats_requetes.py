@@ -0,0 +1,102 @@
+"""
+Fenetre de diagnostic : requetes SQL les plus couteuses (db.statistiques)
+Acces : Super-Admin uniquement
+"""
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QComboBox, QMessageBox
+)
+from PySide6.QtGui import QFont
+from modules.permissions import Permissions
+from database import db
+from ui.components.table import BoutiqueTableView, BoutiqueTableModel
+
+TRIS = [
+    ("Temps total", 'temps_total_ms'),
+    ("Appels", 'appels'),
+    ("Temps moyen", 'temps_moyen_ms'),
+    ("Temps max", 'temps_max_ms'),
+    ("Lignes", 'lignes'),
+]
+
+
+class StatistiquesRequetesWindow(QDialog):
+    def __init__(self, utilisateur, parent=None):
+        super().__init__(parent)
+        self.utilisateur = utilisateur
+
+        if not Permissions.peut(utilisateur, 'sauvegarde_restore'):
+            QMessageBox.warning(
+                self, "Accès refusé",
+                "Seul le Super-Admin peut consulter les statistiques des requêtes."
+            )
+            self.reject()
+            return
+
+        self.setWindowTitle("Requêtes SQL - Diagnostic")
+        self.setMinimumSize(1100, 600)
+        self._setup_ui()
+        self._charger()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        titre = QLabel("Requêtes SQL par gabarit (depuis le démarrage)")
+        titre_font = QFont()
+        titre_font.setPointSize(14)
+        titre_font.setBold(True)
+        titre.setFont(titre_font)
+        layout.addWidget(titre)
+
+        barre = QHBoxLayout()
+        barre.addWidget(QLabel("Trier par :"))
+        self._combo_tri = QComboBox()
+        for libelle, cle in TRIS:
+            self._combo_tri.addItem(libelle, cle)
+        self._combo_tri.currentIndexChanged.connect(self._charger)
+        barre.addWidget(self._combo_tri)
+        barre.addStretch()
+
+        btn_refresh = QPushButton("🔄 Rafraîchir")
+        btn_refresh.clicked.connect(self._charger)
+        barre.addWidget(btn_refresh)
+
+        btn_reset = QPushButton("Remettre à zéro")
+        btn_reset.clicked.connect(self._reinitialiser)
+        barre.addWidget(btn_reset)
+        layout.addLayout(barre)
+
+        self._table_model = BoutiqueTableModel(
+            ['Gabarit', 'Appels', 'Total (ms)', 'Moyen (ms)', 'Max (ms)', 'Lignes'])
+        self._table = BoutiqueTableView()
+        self._table.setModel(self._table_model)
+        self._table.setColumnWidth(0, 620)
+        for colonne in range(1, 6):
+            self._table.setColumnWidth(colonne, 90)
+        layout.addWidget(self._table)
+
+        footer_layout = QHBoxLayout()
+        self._label_info = QLabel("")
+        footer_layout.addWidget(self._label_info)
+        footer_layout.addStretch()
+
+        btn_fermer = QPushButton("Fermer")
+        btn_fermer.clicked.connect(self.close)
+        footer_layout.addWidget(btn_fermer)
+        layout.addLayout(footer_layout)
+
+    def _charger(self):
+        stats = db.statistiques.top(0, tri=self._combo_tri.currentData())
+        self._table_model.charger_donnees([
+            (s['gabarit'], s['appels'], round(s['temps_total_ms'], 1),
+             round(s['temps_moyen_ms'], 3), round(s['temps_max_ms'], 1), s['lignes'])
+            for s in stats
+        ])
+        self._label_info.setText(
+            f"{len(stats)} gabarit(s) - {sum(s['appels'] for s in stats)} appel(s) - "
+            f"cache de requêtes préparées : {db.taille_cache_requetes} par connexion"
+        )
+
+    def _reinitialiser(self):
+        db.statistiques.reinitialiser()
+        self._charger()
@@ -16,6 +16,7 @@ from ui.theme import Theme
 from ui.components.table import BoutiqueTableView, BoutiqueTableModel
 from ui.components.dialogs import DialogueQuantite, confirmer
 from ui.components.camera_widget import CameraWidget
+from ui.utils.requetes import executeur
 
 
 class VentesWindow(QDialog):
@@ -23,6 +24,9 @@ class VentesWindow(QDialog):
 
     vente_terminee = Signal()
 
+    # Pause de frappe avant de chercher un client (une requete par saisie, pas par touche)
+    DELAI_RECHERCHE_CLIENT_MS = 150
+
     def __init__(self, parent=None, utilisateur=None):
         super().__init__(parent)
         print("DEBUG: Initialisation de VentesWindow commence.")
@@ -55,8 +59,9 @@ class VentesWindow(QDialog):
             self._check_scanner_mobile_auto()
             print("DEBUG: _check_scanner_mobile_auto() terminé.")
 
-            # Focus scanner au demarrage
+            # Focus scanner au demarrage, puis catalogue en memoire pour le scan
             QTimer.singleShot(0, self._entry_scan.setFocus)
+            QTimer.singleShot(0, self._precharger_catalogue)
             print("DEBUG: Initialisation de VentesWindow terminée avec succès.")
         except Exception as e:
             print(f"FATAL: Erreur dans VentesWindow.__init__: {e}")
@@ -65,6 +70,14 @@ class VentesWindow(QDialog):
             QMessageBox.critical(self, "Erreur Critique", f"Impossible d'ouvrir la fenêtre de vente:\n\n{e}")
 
 
+    def _precharger_catalogue(self):
+        """Remplir le cache des codes-barres : les scans suivants evitent SQLite"""
+        from modules.produits import cache_produits
+        try:
+            cache_produits.precharger()
+        except Exception as e:
+            print(f"Préchargement catalogue impossible: {e}")
+
     def _setup_ui(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
@@ -304,6 +317,10 @@ class VentesWindow(QDialog):
         self._entry_client = QLineEdit()
         self._entry_client.setPlaceholderText("Rechercher un client...")
         self._entry_client.textChanged.connect(self._rechercher_client)
+        self._minuteur_client = QTimer(self)
+        self._minuteur_client.setSingleShot(True)
+        self._minuteur_client.setInterval(self.DELAI_RECHERCHE_CLIENT_MS)
+        self._minuteur_client.timeout.connect(self._lancer_recherche_client)
         client_row.addWidget(self._entry_client)
 
         btn_clear_client = QPushButton("X")
@@ -684,19 +701,34 @@ class VentesWindow(QDialog):
     # === CLIENT ===
 
     def _rechercher_client(self, terme: str):
-        """Rechercher des clients pendant la frappe."""
+        """Rechercher des clients pendant la frappe (apres une courte pause)."""
         if self.client_id:
             self.client_id = None
             self.client_selectionne = None
             self._label_fidelite.setText("")
 
-        terme = terme.strip()
-        if len(terme) < 2:
+        if len(terme.strip()) < 2:
+            self._minuteur_client.stop()
+            executeur.annuler('ventes.clients')
             self._list_clients.setVisible(False)
             return
+        self._minuteur_client.start()  # Relance la pause a chaque touche
 
+    def _lancer_recherche_client(self):
+        """Soumettre la recherche ; remplace (annule) la precedente encore en cours."""
         from modules.clients import Client
-        resultats = Client.rechercher_filtre(terme, limit=5, offset=0)
+        terme = self._entry_client.text().strip()
+        if len(terme) < 2 or self.client_id:
+            return
+        executeur.soumettre(
+            'ventes.clients', Client.suggerer, terme, 5,
+            rappel=lambda resultats: self._afficher_clients(terme, resultats),
+        )
+
+    def _afficher_clients(self, terme, resultats):
+        """Liste de suggestions, si la saisie n'a pas change entre-temps."""
+        if terme != self._entry_client.text().strip() or self.client_id:
+            return
 
         self._list_clients.clear()
         if resultats:
@@ -728,6 +760,8 @@ class VentesWindow(QDialog):
 
     def _effacer_client(self):
         """Effacer la selection client."""
+        self._minuteur_client.stop()
+        executeur.annuler('ventes.clients')
         self.client_id = None
         self.client_selectionne = None
         self._entry_client.blockSignals(True)
@@ -758,92 +792,23 @@ class VentesWindow(QDialog):
 
         try:
             from modules.ventes import Vente
-            from modules.paiements import Paiement
-            from database import db
-
-            # Generer le numero de vente
-            numero_vente = Vente.generer_numero_vente()
 
-            # Total
-            total = sum(item['sous_total'] for item in self.panier)
-
-            # INSERT vente
             utilisateur_id = self.utilisateur['id'] if self.utilisateur else None
-            vente_id = db.execute_query(
-                """INSERT INTO ventes (numero_vente, date_vente, total, client, client_id, utilisateur_id)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (numero_vente,
-                 datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                 total,
-                 client_nom or None,
-                 client_id,
-                 utilisateur_id)
+
+            # Vente + details + stock + historique + paiements + fidelite : une transaction
+            succes, message, resultat = Vente.finaliser_panier(
+                self.panier, paiements,
+                client_nom=client_nom or None,
+                client_id=client_id,
+                utilisateur_id=utilisateur_id,
             )
+            if not succes:
+                QMessageBox.critical(self, "Vente annulée", message)
+                return False
 
-            # INSERT details + MAJ stock (avec re-verification)
-            for item in self.panier:
-                # RE-VÉRIFIER le stock AVANT l'insertion (protection race condition)
-                stock_actuel = db.fetch_one(
-                    "SELECT stock_actuel FROM produits WHERE id = ?",
-                    (item['produit_id'],)
-                )
-
-                if not stock_actuel or stock_actuel['stock_actuel'] < item['quantite']:
-                    # ROLLBACK + alerte utilisateur
-                    db.conn.rollback()
-                    QMessageBox.critical(
-                        self, "Stock insuffisant",
-                        f"Le produit '{item['nom']}' n'a plus assez de stock!\n"
-                        f"Stock actuel: {stock_actuel['stock_actuel'] if stock_actuel else 0}\n"
-                        f"Quantité demandée: {item['quantite']}\n\n"
-                        f"La vente a été annulée."
-                    )
-                    return False
-
-                # INSERT details
-                db.execute_query(
-                    """INSERT INTO details_ventes
-                       (vente_id, produit_id, quantite, prix_unitaire, sous_total)
-                       VALUES (?, ?, ?, ?, ?)""",
-                    (vente_id, item['produit_id'], item['quantite'],
-                     item['prix_vente'], item['sous_total'])
-                )
-
-                # UPDATE stock ATOMIQUE avec WHERE clause
-                rows_affected = db.execute_query(
-                    """UPDATE produits
-                       SET stock_actuel = stock_actuel - ?
-                       WHERE id = ? AND stock_actuel >= ?""",
-                    (item['quantite'], item['produit_id'], item['quantite'])
-                )
-
-                # Vérifier que l'UPDATE a bien modifié une ligne
-                if rows_affected == 0:
-                    db.conn.rollback()
-                    QMessageBox.critical(
-                        self, "Erreur Stock",
-                        f"Impossible de mettre à jour le stock de '{item['nom']}'\n"
-                        f"La vente a été annulée."
-                    )
-                    return False
-
-            # Enregistrer les paiements
-            for p in paiements:
-                Paiement.enregistrer_paiement(
-                    vente_id, p['mode'], p['montant'],
-                    reference=p.get('reference'),
-                    montant_recu=p.get('montant_recu'),
-                    monnaie_rendue=p.get('monnaie_rendue')
-                )
-
-            # Points fidelite
-            if client_id:
-                from modules.clients import Client as ClientModule
-                ClientModule.ajouter_points(client_id, total)
-
-            # Generer le recu PDF
-            from modules.recus import generer_recu_pdf
-            chemin_recu = generer_recu_pdf(vente_id)
+            vente_id = resultat['vente_id']
+            numero_vente = resultat['numero_vente']
+            total = resultat['total']
 
             # Preparer les infos pour la confirmation
             vente_info = {
@@ -856,12 +821,17 @@ class VentesWindow(QDialog):
                 'paiements': paiements,
             }
 
-            # Afficher la confirmation
+            # Afficher la confirmation tout de suite : le recu PDF est genere
+            # en arriere-plan et la fenetre est prevenue quand il est pret
             from ui.windows.confirmation_vente import ConfirmationVenteWindow
-            dlg_confirm = ConfirmationVenteWindow(
-                vente_info, chemin_recu or "", parent=self
-            )
+            from modules.file_recus import file_recus
+            dlg_confirm = ConfirmationVenteWindow(vente_info, "", parent=self)
             dlg_confirm.nouvelle_vente.connect(self._reset_pour_nouvelle_vente)
+            travail = file_recus.soumettre(
+                vente_id, rappel=lambda t: dlg_confirm.recu_termine.emit(t.chemin or "")
+            )
+            if travail is None:
+                dlg_confirm.recu_termine.emit("")
 
             self.vente_terminee.emit()
 
@@ -917,3 +887,8 @@ class VentesWindow(QDialog):
             print(f"ERREUR arrêt scanner mobile : {e}")
 
         super().closeEvent(event)
+
+    def done(self, result):
+        self._minuteur_client.stop()
+        executeur.annuler('ventes.clients')
+        super().done(result)